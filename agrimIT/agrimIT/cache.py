@@ -0,0 +1,292 @@
+"""
+Shared cache backends for AgrimIT project
+
+Every backend here is shared between worker processes, stores values as JSON
+(never pickle) and keeps hit/miss counters:
+
+- RedisCache: production backend when REDIS_URL is configured.
+- SQLiteCache: single-file backend for one box (and for tests), used when
+  there is no Redis available.
+"""
+
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.redis import RedisCache as DjangoRedisCache
+from django.core.serializers.json import DjangoJSONEncoder
+
+
+def dumps(value):
+    """
+    Integers are kept as-is so backends can increment them atomically;
+    anything else becomes compact JSON. Decimals and datetimes are encoded as
+    strings by DjangoJSONEncoder, so cache JSON-friendly values.
+    """
+    if type(value) is int:
+        return value
+    return json.dumps(value, cls=DjangoJSONEncoder, separators=(',', ':'))
+
+
+def loads(value):
+    if isinstance(value, int):
+        return value
+    return json.loads(value)
+
+
+class JSONSerializer:
+    """Pickle-free serializer for django's Redis client"""
+
+    def dumps(self, obj):
+        return dumps(obj)
+
+    def loads(self, data):
+        try:
+            return int(data)
+        except ValueError:
+            return loads(data)
+
+
+class CacheStatsMixin:
+    """
+    Hit/miss counters for a cache backend.
+
+    Counts are kept per process and, every STATS_FLUSH_EVERY lookups (an
+    OPTIONS entry, default 100), added to shared counters stored in the cache
+    itself so ``stats(shared=True)`` reports totals for all workers.
+    """
+    STATS_KEYS = {'hits': '__cache_stats__:hits', 'misses': '__cache_stats__:misses'}
+
+    def _init_stats(self, params):
+        self._stats_lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0}
+        self._unflushed = {'hits': 0, 'misses': 0}
+        options = params.get('OPTIONS', {})
+        self._stats_flush_every = options.get('STATS_FLUSH_EVERY', 100)
+
+    def _record(self, hits=0, misses=0):
+        with self._stats_lock:
+            self._stats['hits'] += hits
+            self._stats['misses'] += misses
+            self._unflushed['hits'] += hits
+            self._unflushed['misses'] += misses
+            if sum(self._unflushed.values()) < self._stats_flush_every:
+                return
+            pending, self._unflushed = self._unflushed, {'hits': 0, 'misses': 0}
+        self._flush_stats(pending)
+
+    def _flush_stats(self, pending):
+        for name, delta in pending.items():
+            if not delta:
+                continue
+            key = self.STATS_KEYS[name]
+            self.add(key, 0, timeout=None)
+            try:
+                self.incr(key, delta)
+            except ValueError:
+                pass
+
+    def stats(self, shared=False):
+        """
+        Return {'hits', 'misses', 'hit_rate'} for this process, or for every
+        process sharing the backend when ``shared`` is True.
+        """
+        if shared:
+            with self._stats_lock:
+                pending, self._unflushed = self._unflushed, {'hits': 0, 'misses': 0}
+            self._flush_stats(pending)
+            values = self.get_many(self.STATS_KEYS.values())
+            hits = values.get(self.STATS_KEYS['hits'], 0)
+            misses = values.get(self.STATS_KEYS['misses'], 0)
+        else:
+            hits, misses = self._stats['hits'], self._stats['misses']
+        total = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / total, 4) if total else 0.0,
+        }
+
+
+class RedisCache(CacheStatsMixin, DjangoRedisCache):
+    """
+    Django's Redis backend with JSON values and hit/miss counters.
+
+    Usage in settings:
+        'BACKEND': 'agrimIT.cache.RedisCache',
+        'LOCATION': 'redis://host:6379/0',
+    """
+
+    def __init__(self, server, params):
+        # STATS_FLUSH_EVERY is ours, the remaining OPTIONS go to redis-py.
+        # Copied so the CACHES setting itself is left untouched.
+        options = dict(params.get('OPTIONS', {}))
+        options.pop('STATS_FLUSH_EVERY', None)
+        options.setdefault('serializer', JSONSerializer)
+        super().__init__(server, {**params, 'OPTIONS': options})
+        self._init_stats(params)
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, self._missing_key, version)
+        if value is self._missing_key:
+            self._record(misses=1)
+            return default
+        self._record(hits=1)
+        return value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        result = super().get_many(keys, version)
+        self._record(hits=len(result), misses=len(keys) - len(result))
+        return result
+
+
+class SQLiteCache(CacheStatsMixin, BaseCache):
+    """
+    Cache stored in a single SQLite file, shared by every process on the box.
+
+    All gunicorn workers see the same entries, and ``add``/``incr`` are single
+    SQL statements, so counters stay exact under concurrency. Integers are
+    stored natively (that is what makes ``incr`` atomic); everything else is
+    stored as JSON text. Entries survive restarts as long as the file does.
+
+    Usage in settings:
+        'BACKEND': 'agrimIT.cache.SQLiteCache',
+        'LOCATION': '/path/to/cache.sqlite3',
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._init_stats(params)
+        self._path = location
+        self._local = threading.local()
+
+    # Connection handling -------------------------------------------------
+
+    def _connection(self):
+        """One connection per thread, reopened after a fork"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            directory = os.path.dirname(self._path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self._path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS cache_entries ('
+                'key TEXT PRIMARY KEY, value, expires REAL)'
+            )
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _expires(self, timeout):
+        return self.get_backend_timeout(timeout)
+
+    # Cache API -----------------------------------------------------------
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        cursor = self._connection().execute(
+            'INSERT INTO cache_entries (key, value, expires) VALUES (?, ?, ?) '
+            'ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires = excluded.expires '
+            'WHERE cache_entries.expires IS NOT NULL AND cache_entries.expires <= ?',
+            (key, dumps(value), self._expires(timeout), now),
+        )
+        self._maybe_cull()
+        return cursor.rowcount == 1
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        row = self._connection().execute(
+            'SELECT value FROM cache_entries WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (key, time.time()),
+        ).fetchone()
+        if row is None:
+            self._record(misses=1)
+            return default
+        self._record(hits=1)
+        return loads(row[0])
+
+    def get_many(self, keys, version=None):
+        key_map = {self.make_and_validate_key(key, version=version): key for key in keys}
+        if not key_map:
+            return {}
+        placeholders = ', '.join('?' * len(key_map))
+        rows = self._connection().execute(
+            f'SELECT key, value FROM cache_entries WHERE key IN ({placeholders}) '
+            'AND (expires IS NULL OR expires > ?)',
+            (*key_map, time.time()),
+        ).fetchall()
+        self._record(hits=len(rows), misses=len(key_map) - len(rows))
+        return {key_map[key]: loads(value) for key, value in rows}
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self._connection().execute(
+            'INSERT OR REPLACE INTO cache_entries (key, value, expires) VALUES (?, ?, ?)',
+            (key, dumps(value), self._expires(timeout)),
+        )
+        self._maybe_cull()
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        cursor = self._connection().execute(
+            'UPDATE cache_entries SET expires = ? WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (self._expires(timeout), key, time.time()),
+        )
+        return cursor.rowcount == 1
+
+    def incr(self, key, delta=1, version=None):
+        """Atomically add ``delta`` and return the new value"""
+        validated = self.make_and_validate_key(key, version=version)
+        row = self._connection().execute(
+            'UPDATE cache_entries SET value = value + ? '
+            "WHERE key = ? AND typeof(value) = 'integer' AND (expires IS NULL OR expires > ?) "
+            'RETURNING value',
+            (delta, validated, time.time()),
+        ).fetchone()
+        if row is None:
+            raise ValueError(f"Key '{key}' not found")
+        return row[0]
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        cursor = self._connection().execute('DELETE FROM cache_entries WHERE key = ?', (key,))
+        return cursor.rowcount == 1
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        row = self._connection().execute(
+            'SELECT 1 FROM cache_entries WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (key, time.time()),
+        ).fetchone()
+        return row is not None
+
+    def clear(self):
+        self._connection().execute('DELETE FROM cache_entries')
+
+    # Culling -------------------------------------------------------------
+
+    def _maybe_cull(self):
+        """
+        Every ~100 writes drop expired rows and, above MAX_ENTRIES, the
+        1/CULL_FREQUENCY entries closest to expiring.
+        """
+        if random.random() > 0.01:
+            return
+        conn = self._connection()
+        conn.execute('DELETE FROM cache_entries WHERE expires IS NOT NULL AND expires <= ?', (time.time(),))
+        count = conn.execute('SELECT COUNT(*) FROM cache_entries').fetchone()[0]
+        if count > self._max_entries:
+            conn.execute(
+                'DELETE FROM cache_entries WHERE key IN ('
+                'SELECT key FROM cache_entries ORDER BY expires IS NULL, expires LIMIT ?)',
+                (max(count // self._cull_frequency, 1),),
+            )
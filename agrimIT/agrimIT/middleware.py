@@ -1,12 +1,21 @@
 """
 Custom security middleware for AgrimIT project
+
+Every middleware here works in both sync (WSGI) and async (ASGI) mode, so
+Django never has to adapt it with a thread switch when the async views are
+served by uvicorn.
 """
 
-import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
 from django.http import HttpResponseForbidden, HttpResponse
-from django.core.cache import cache
+from django.core.cache import caches
 from django.conf import settings
+from django.http.response import ResponseHeaders
+from whitenoise.middleware import WhiteNoiseMiddleware
+from apps.utils.replica import PIN_COOKIE, replica_alias, track_writes
+from .ratelimit import SlidingWindowRateLimiter
 import logging
+import re
 
 logger = logging.getLogger(__name__)
 
@@ -22,73 +31,148 @@ def create_rate_limit_response(message="Rate limit exceeded. Please try again la
     return response
 
 
+DEFAULT_SECURITY_HEADERS = {
+    # Prevent clickjacking
+    'X-Frame-Options': 'DENY',
+
+    # Prevent MIME type sniffing
+    'X-Content-Type-Options': 'nosniff',
+
+    # Enable XSS protection
+    'X-XSS-Protection': '1; mode=block',
+
+    # Referrer Policy
+    'Referrer-Policy': 'strict-origin-when-cross-origin',
+
+    # Content Security Policy (basic)
+    'Content-Security-Policy': (
+        "default-src 'self'; "
+        "script-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net; "
+        "style-src 'self' 'unsafe-inline' https://fonts.googleapis.com; "
+        "font-src 'self' https://fonts.gstatic.com; "
+        "img-src 'self' data: https:; "
+        "connect-src 'self';"
+    ),
+
+    # Permissions Policy (formerly Feature Policy)
+    'Permissions-Policy': (
+        "camera=(), microphone=(), geolocation=(), "
+        "payment=(), usb=(), magnetometer=(), gyroscope=()"
+    ),
+
+    # Server header removal (security through obscurity)
+    'Server': 'AgrimIT/1.0',
+}
+
+
+def compile_prefixes(prefixes):
+    """
+    Compile a list of path prefixes into a single anchored regex.
+    Longer prefixes are tried first so the most specific one wins.
+    """
+    if not prefixes:
+        return None
+    alternatives = sorted(prefixes, key=len, reverse=True)
+    return re.compile('|'.join(re.escape(prefix) for prefix in alternatives))
+
+
 class SecurityHeadersMiddleware:
     """
-    Adds security headers to all responses
+    Adds security headers to all responses.
+
+    Header sets are built once at startup: DEFAULT_SECURITY_HEADERS (plus HSTS
+    when SECURE_SSL_REDIRECT is on) and, optionally, per-route profiles from
+    the SECURITY_HEADER_PROFILES setting:
+
+        SECURITY_HEADER_PROFILES = {
+            'api': {
+                'paths': ['/api/', '/accounting/chart-data/'],
+                'headers': {'Content-Security-Policy': "default-src 'none'"},
+            },
+        }
+
+    A profile overrides the default headers it names; a value of None drops
+    that header. Each request only does one regex match on the path and sets
+    the prepared headers on the response.
     """
-    
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
 
-    def __call__(self, request):
-        response = self.get_response(request)
-        
-        # Add security headers
-        security_headers = {
-            # Prevent clickjacking
-            'X-Frame-Options': 'DENY',
-            
-            # Prevent MIME type sniffing
-            'X-Content-Type-Options': 'nosniff',
-            
-            # Enable XSS protection
-            'X-XSS-Protection': '1; mode=block',
-            
-            # Referrer Policy
-            'Referrer-Policy': 'strict-origin-when-cross-origin',
-            
-            # Content Security Policy (basic)
-            'Content-Security-Policy': (
-                "default-src 'self'; "
-                "script-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net; "
-                "style-src 'self' 'unsafe-inline' https://fonts.googleapis.com; "
-                "font-src 'self' https://fonts.gstatic.com; "
-                "img-src 'self' data: https:; "
-                "connect-src 'self';"
-            ),
-            
-            # Permissions Policy (formerly Feature Policy)
-            'Permissions-Policy': (
-                "camera=(), microphone=(), geolocation=(), "
-                "payment=(), usb=(), magnetometer=(), gyroscope=()"
-            ),
-            
-            # Server header removal (security through obscurity)
-            'Server': 'AgrimIT/1.0',
-        }
-        
+        default = dict(DEFAULT_SECURITY_HEADERS)
         # Only add HSTS in production with HTTPS
         if getattr(settings, 'SECURE_SSL_REDIRECT', False):
-            security_headers['Strict-Transport-Security'] = 'max-age=31536000; includeSubDomains'
-        
-        # Apply headers
-        for header, value in security_headers.items():
-            response[header] = value
-        
-        # Remove server disclosure
-        if 'Server' in response:
-            response['Server'] = 'AgrimIT/1.0'
-            
+            default['Strict-Transport-Security'] = 'max-age=31536000; includeSubDomains'
+        self.default_headers = self._prepare(default)
+
+        self.profile_headers = {}
+        prefixes = {}
+        for name, profile in getattr(settings, 'SECURITY_HEADER_PROFILES', {}).items():
+            headers = {**default, **profile.get('headers', {})}
+            self.profile_headers[name] = self._prepare(
+                {header: value for header, value in headers.items() if value is not None}
+            )
+            for prefix in profile.get('paths', []):
+                prefixes.setdefault(prefix, name)
+        self.profile_for_prefix = prefixes
+        self.profile_pattern = compile_prefixes(prefixes)
+
+    @staticmethod
+    def _prepare(headers):
+        """
+        Validate the headers once (ResponseHeaders raises BadHeaderError on
+        invalid values) and return them as (name, value) pairs to set on
+        each response.
+        """
+        ResponseHeaders(headers)
+        return tuple(headers.items())
+
+    def headers_for_path(self, path):
+        if self.profile_pattern is not None:
+            match = self.profile_pattern.match(path)
+            if match:
+                return self.profile_headers[self.profile_for_prefix[match.group()]]
+        return self.default_headers
+
+    def add_headers(self, request, response):
+        headers = response.headers
+        for header, value in self.headers_for_path(request.path):
+            headers[header] = value
         return response
 
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.add_headers(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.add_headers(request, await self.get_response(request))
+
 
 class RateLimitMiddleware:
     """
-    Simple rate limiting middleware using Django cache
+    Rate limiting middleware using a sliding-window counter.
+    Counters live in the RATE_LIMIT_CACHE alias, which must be shared between
+    workers (and support atomic incr) for the limits to hold globally.
     """
+
+    SKIP_PATHS = [
+        '/admin/',
+        '/static/',
+        '/media/',
+        '/logout/',     # Skip rate limiting for logout
+        '/accounts/logout/',
+    ]
+    AUTH_KEYWORDS = ['login', 'logout', 'register', 'password']
+    async_capable = True
     
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
         
         # Rate limiting configuration
         self.RATE_LIMITS = {
@@ -97,10 +181,31 @@ class RateLimitMiddleware:
             'logout': {'requests': 50, 'window': 60},     # 50 logout requests per minute
             'api': {'requests': 1000, 'window': 3600},    # 1000 API calls per hour
         }
+        
+        cache = caches[getattr(settings, 'RATE_LIMIT_CACHE', 'default')]
+        self.limiters = {
+            limit_type: SlidingWindowRateLimiter(
+                cache,
+                limit=config['requests'],
+                window=config['window'],
+                prefix=f"rate_limit:{limit_type}",
+            )
+            for limit_type, config in self.RATE_LIMITS.items()
+        }
+
+        # Path rules and settings, resolved once
+        self.enabled = not settings.DEBUG
+        self.skip_pattern = compile_prefixes(self.SKIP_PATHS)
+        self.auth_pattern = re.compile('|'.join(self.AUTH_KEYWORDS), re.IGNORECASE)
+        self.logout_pattern = re.compile('logout', re.IGNORECASE)
+        self.login_pattern = re.compile('login', re.IGNORECASE)
 
     def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
         # Skip rate limiting for certain paths or in development
-        if settings.DEBUG or self._should_skip_rate_limit(request):
+        if not self.enabled or self._should_skip_rate_limit(request):
             return self.get_response(request)
         
         # Skip rate limiting for authenticated users on regular operations
@@ -112,41 +217,54 @@ class RateLimitMiddleware:
         limit_type = self._get_limit_type(request)
         
         # Check rate limit
-        if self._is_rate_limited(request, limit_type):
-            logger.warning(
-                f"Rate limit exceeded for IP {self._get_client_ip(request)} "
-                f"on path {request.path} (type: {limit_type})"
-            )
-            return create_rate_limit_response()
+        limited, retry_after = self._is_rate_limited(request, limit_type)
+        if limited:
+            return self._limited_response(request, limit_type, retry_after)
         
         return self.get_response(request)
+
+    async def __acall__(self, request):
+        if not self.enabled or self._should_skip_rate_limit(request):
+            return await self.get_response(request)
+
+        user = await request.auser()
+        if user.is_authenticated and not self._is_auth_operation(request):
+            return await self.get_response(request)
+
+        limit_type = self._get_limit_type(request)
+        # The limiter talks to the cache synchronously
+        limited, retry_after = await sync_to_async(self._is_rate_limited)(request, limit_type)
+        if limited:
+            return self._limited_response(request, limit_type, retry_after)
+
+        return await self.get_response(request)
+
+    def _limited_response(self, request, limit_type, retry_after):
+        logger.warning(
+            f"Rate limit exceeded for IP {self._get_client_ip(request)} "
+            f"on path {request.path} (type: {limit_type})"
+        )
+        return create_rate_limit_response(retry_after=retry_after)
     
     def _should_skip_rate_limit(self, request):
         """Skip rate limiting for certain conditions"""
-        skip_paths = [
-            '/admin/', 
-            '/static/', 
-            '/media/',
-            '/logout/',     # Skip rate limiting for logout
-            '/accounts/logout/',
-        ]
-        return any(request.path.startswith(path) for path in skip_paths)
+        return self.skip_pattern.match(request.path) is not None
     
     def _is_auth_operation(self, request):
         """Check if this is an authentication-related operation"""
-        auth_keywords = ['login', 'logout', 'register', 'password']
-        return any(keyword in request.path.lower() for keyword in auth_keywords)
+        return self.auth_pattern.search(request.path) is not None
     
     def _get_limit_type(self, request):
         """Determine which rate limit to apply"""
+        path = request.path
         # Logout operations - more lenient
-        if 'logout' in request.path.lower():
+        if self.logout_pattern.search(path):
             return 'logout'
-        # Login operations - moderate limits
-        elif request.path.startswith('/admin/login/') or 'login' in request.path.lower():
+        # Login operations - moderate limits (covers /admin/login/)
+        elif self.login_pattern.search(path):
             return 'auth'
         # API operations
-        elif request.path.startswith('/api/'):
+        elif path.startswith('/api/'):
             return 'api'
         # Default for everything else
         else:
@@ -166,46 +284,129 @@ class RateLimitMiddleware:
         return request.META.get('REMOTE_ADDR', 'unknown')
     
     def _is_rate_limited(self, request, limit_type):
-        """Check if request should be rate limited"""
+        """
+        Check if request should be rate limited.
+        Returns a tuple (limited, retry_after_seconds).
+        """
         ip = self._get_client_ip(request)
-        limits = self.RATE_LIMITS.get(limit_type, self.RATE_LIMITS['default'])
-        
-        # Create cache key
-        cache_key = f"rate_limit:{limit_type}:{ip}"
-        
-        # Get current count
-        current_count = cache.get(cache_key, 0)
-        
-        # Check limit
-        if current_count >= limits['requests']:
-            return True
-        
-        # Increment counter
-        cache.set(cache_key, current_count + 1, limits['window'])
-        return False
+        limiter = self.limiters.get(limit_type, self.limiters['default'])
+        allowed, retry_after = limiter.hit(ip)
+        return not allowed, retry_after
+
+
+class SessionRefreshMiddleware:
+    """
+    Renews session expiry every SESSION_REFRESH_FRACTION of the cookie age
+    instead of on every request. Must come after SessionMiddleware, and needs
+    a session engine with ``refresh_if_due`` (agrimIT.sessions).
+    """
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        self.fraction = getattr(settings, 'SESSION_REFRESH_FRACTION', 0.1)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.get_response(request)
+        session = getattr(request, 'session', None)
+        if session is not None and hasattr(session, 'refresh_if_due'):
+            session.refresh_if_due(self.fraction)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        session = getattr(request, 'session', None)
+        if session is not None and hasattr(session, 'refresh_if_due'):
+            # Reading the session may hit the cache or the database
+            await sync_to_async(session.refresh_if_due)(self.fraction)
+        return response
+
+
+class ReplicaStickinessMiddleware:
+    """
+    Read-your-writes for the read replica (apps.utils.replica). A request
+    that writes to the primary sets a cookie that keeps that browser's
+    replica reads on the primary for REPLICA_STICKY_SECONDS, long enough for
+    the replica to replay the write. Nothing happens without REPLICA_DATABASE.
+    """
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        self.seconds = getattr(settings, 'REPLICA_STICKY_SECONDS', 10)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not replica_alias():
+            return self.get_response(request)
+        with track_writes(pinned=PIN_COOKIE in request.COOKIES) as writes:
+            response = self.get_response(request)
+        return self._pin(response, writes)
+
+    async def __acall__(self, request):
+        if not replica_alias():
+            return await self.get_response(request)
+        # Sync views run in a copy of this context and share the tracker
+        with track_writes(pinned=PIN_COOKIE in request.COOKIES) as writes:
+            response = await self.get_response(request)
+        return self._pin(response, writes)
+
+    def _pin(self, response, writes):
+        if writes.wrote:
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=self.seconds, httponly=True,
+                secure=settings.SESSION_COOKIE_SECURE, samesite='Lax',
+            )
+        return response
 
 
 class IPWhitelistMiddleware:
     """
     Optional IP whitelist middleware for admin access
     """
+    async_capable = True
     
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
         
         # IP whitelist for admin access (configure via environment)
         self.ADMIN_WHITELIST = getattr(settings, 'ADMIN_IP_WHITELIST', [])
         
         # Paths that require IP whitelist
         self.PROTECTED_PATHS = ['/admin/']
+        self.protected_pattern = compile_prefixes(self.PROTECTED_PATHS)
 
     def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        denied = self._deny(request)
+        if denied is not None:
+            return denied
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        denied = self._deny(request)
+        if denied is not None:
+            return denied
+        return await self.get_response(request)
+
+    def _deny(self, request):
+        """Forbidden response for a non-whitelisted admin request, else None"""
         # Skip if no whitelist configured
         if not self.ADMIN_WHITELIST:
-            return self.get_response(request)
+            return None
         
         # Check if path requires IP whitelist
-        if any(request.path.startswith(path) for path in self.PROTECTED_PATHS):
+        if self.protected_pattern.match(request.path):
             client_ip = self._get_client_ip(request)
             
             if client_ip not in self.ADMIN_WHITELIST:
@@ -217,7 +418,7 @@ class IPWhitelistMiddleware:
                     "Access denied. Your IP address is not authorized."
                 )
         
-        return self.get_response(request)
+        return None
     
     def _get_client_ip(self, request):
         """Get client IP address"""
@@ -231,14 +432,32 @@ class RequestSizeLimitMiddleware:
     """
     Middleware to limit request body size
     """
+    async_capable = True
     
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
         
         # Default max size: 10MB
         self.MAX_REQUEST_SIZE = getattr(settings, 'MAX_REQUEST_SIZE', 10 * 1024 * 1024)
 
     def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        too_large = self._reject(request)
+        if too_large is not None:
+            return too_large
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        too_large = self._reject(request)
+        if too_large is not None:
+            return too_large
+        return await self.get_response(request)
+
+    def _reject(self, request):
+        """Forbidden response when the body is over the limit, else None"""
         # Check request size
         content_length = request.META.get('CONTENT_LENGTH')
         
@@ -251,4 +470,42 @@ class RequestSizeLimitMiddleware:
                 "Request too large. Maximum size allowed is 10MB."
             )
         
-        return self.get_response(request)
\ No newline at end of file
+        return None
+
+
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoiseMiddleware that also runs in async mode (WhiteNoise 6 is sync
+    only), so under ASGI it does not force every request through a thread.
+    Static files are served exactly as WhiteNoise does; their content is
+    handed to Django as an async iterator.
+    """
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is None:
+            return await self.get_response(request)
+        response = self.serve(static_file, request)
+        if response.streaming:
+            response.streaming_content = _iterate_async(response.streaming_content)
+        return response
+
+
+async def _iterate_async(chunks):
+    # Static files are small and read from local disk
+    for chunk in chunks:
+        yield chunk
@@ -0,0 +1,70 @@
+"""
+Sliding-window rate limiter for AgrimIT project
+"""
+
+import math
+import time
+
+
+class SlidingWindowRateLimiter:
+    """
+    Sliding-window counter rate limiter.
+
+    Each identity uses two integer counters: the current fixed window and the
+    previous one. A request is allowed when
+
+        previous_count * (1 - elapsed_fraction) + current_count <= limit
+
+    which approximates a true sliding window with O(1) memory per key.
+    Counters are only touched through ``cache.add`` and ``cache.incr``, so on
+    a shared backend with atomic increments (Redis, ``agrimIT.cache.SQLiteCache``)
+    the limit holds across every worker process. Rejected requests are counted
+    too, so a client that keeps hammering stays limited.
+    """
+
+    def __init__(self, cache, limit, window, prefix='rate_limit'):
+        self.cache = cache
+        self.limit = limit
+        self.window = window
+        self.prefix = prefix
+
+    def _key(self, identity, window_index):
+        return f"{self.prefix}:{identity}:{window_index}"
+
+    def _increment(self, key):
+        # Counters live for two windows so they can act as "previous" once
+        self.cache.add(key, 0, timeout=self.window * 2)
+        try:
+            return self.cache.incr(key)
+        except ValueError:
+            # Expired between add() and incr()
+            self.cache.add(key, 0, timeout=self.window * 2)
+            return self.cache.incr(key)
+
+    def hit(self, identity, now=None):
+        """
+        Register a request for ``identity``.
+
+        Returns:
+            A tuple (allowed, retry_after) where retry_after is the number of
+            seconds the client should wait when the request is not allowed.
+        """
+        now = time.time() if now is None else now
+        window_index = int(now // self.window)
+        elapsed_fraction = (now % self.window) / self.window
+
+        current = self._increment(self._key(identity, window_index))
+        previous = self.cache.get(self._key(identity, window_index - 1), 0)
+
+        weighted = previous * (1 - elapsed_fraction) + current
+        if weighted <= self.limit:
+            return True, 0
+
+        # Wait until the previous window has decayed enough to fit one more
+        # request, or until the next window if the current one alone is full.
+        if current <= self.limit and previous:
+            needed_fraction = 1 - (self.limit - current) / previous
+            retry_after = (needed_fraction - elapsed_fraction) * self.window
+        else:
+            retry_after = (1 - elapsed_fraction) * self.window
+        return False, max(1, math.ceil(retry_after))
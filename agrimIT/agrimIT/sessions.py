@@ -0,0 +1,55 @@
+"""
+Session engine for AgrimIT project
+
+Sessions are read from the shared cache and only fall back to the database on
+a miss. Together with SessionRefreshMiddleware and
+SESSION_SAVE_EVERY_REQUEST = False, a session is only written when its data
+changes (login, logout, messages...) or when its expiry is due for renewal,
+instead of on every request.
+
+Usage in settings:
+    SESSION_ENGINE = 'agrimIT.sessions'
+    SESSION_CACHE_ALIAS = 'default'
+    SESSION_REFRESH_FRACTION = 0.1
+"""
+
+import time
+
+from django.conf import settings
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+
+
+class SessionStore(CachedDBStore):
+    """
+    Cached database session that renews its expiry in steps.
+
+    The last renewal time is kept in the session itself. A session is only
+    marked as modified (and therefore saved) once SESSION_REFRESH_FRACTION of
+    SESSION_COOKIE_AGE has passed since then.
+    """
+    cache_key_prefix = 'agrimit.sessions:'
+    REFRESH_KEY = '_refreshed_at'
+
+    def refresh_if_due(self, fraction=None, now=None):
+        """
+        Stamp the session for saving when its expiry should be renewed.
+
+        Returns:
+            True when the session will be saved at the end of the request.
+        """
+        now = int(time.time()) if now is None else now
+        if self.modified:
+            # Saved anyway: stamp it unless it was just flushed (logout)
+            if self._session:
+                self[self.REFRESH_KEY] = now
+            return True
+        if self.session_key is None or not self._session:
+            # Anonymous visitor, or a cookie whose session is gone
+            return False
+        if fraction is None:
+            fraction = getattr(settings, 'SESSION_REFRESH_FRACTION', 0.1)
+        last_refresh = self.get(self.REFRESH_KEY)
+        if last_refresh is None or now - last_refresh >= self.get_session_cookie_age() * fraction:
+            self[self.REFRESH_KEY] = now
+            return True
+        return False
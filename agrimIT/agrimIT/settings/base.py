@@ -69,6 +69,8 @@ INSTALLED_APPS = [
     'apps.clients',
     'apps.users',
     'apps.teams',
+    'apps.monitoring',
+    'apps.jobs',
 ]
 
 MIDDLEWARE = [
@@ -77,6 +79,9 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'agrimIT.middleware.ReplicaStickinessMiddleware',
+    'apps.monitoring.middleware.PerformanceMiddleware',
+    'apps.monitoring.middleware.TrafficCaptureMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -98,6 +103,70 @@ SUPABASE_URL = os.getenv('SUPABASE_URL')
 SUPABASE_KEY = os.getenv('SUPABASE_KEY') 
 SUPABASE_BUCKET = os.getenv('SUPABASE_BUCKET')
 
+# PostgreSQL connections (prod, or dev with a postgres DATABASE_URL): a
+# psycopg 3 pool per worker process instead of one persistent connection per
+# thread, and a ceiling for every statement below gunicorn's 60s timeout.
+DB_POOL = os.getenv('DB_POOL', 'True').lower() in ('true', '1', 'yes')
+DB_POOL_MIN_SIZE = int(os.getenv('DB_POOL_MIN_SIZE', '2'))
+DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', '10'))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '10'))
+DB_STATEMENT_TIMEOUT = int(os.getenv('DB_STATEMENT_TIMEOUT', '30000'))
+
+
+def postgres_options():
+    """
+    OPTIONS of a PostgreSQL database entry. The pool needs CONN_MAX_AGE=0;
+    CONN_HEALTH_CHECKS then makes it check connections before handing them out.
+    """
+    options = {'options': f"-c statement_timeout={DB_STATEMENT_TIMEOUT}"}
+    if DB_POOL:
+        options['pool'] = {
+            'min_size': DB_POOL_MIN_SIZE,
+            'max_size': DB_POOL_MAX_SIZE,
+            'timeout': DB_POOL_TIMEOUT,
+        }
+    return options
+
+
+# Tighter per-view budgets in ms (apps.utils.db.statement_timeout)
+STATEMENT_TIMEOUTS = {
+    'search': int(os.getenv('SEARCH_STATEMENT_TIMEOUT', '500')),
+    'reports': int(os.getenv('REPORTS_STATEMENT_TIMEOUT', '5000')),
+}
+
+# Read replica for the reports and dashboards marked with @read_replica
+# (apps.utils.replica): the DATABASES alias they read from, None to read
+# everything from the primary. After a write, a browser keeps reading from
+# the primary for REPLICA_STICKY_SECONDS (ReplicaStickinessMiddleware).
+REPLICA_DATABASE = None
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', '10'))
+DATABASE_ROUTERS = ['apps.utils.replica.ReplicaRouter']
+
+# Background jobs (apps.jobs), run by `manage.py runworker`
+JOB_WORKER_CONCURRENCY = int(os.getenv('JOB_WORKER_CONCURRENCY', '2'))
+JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', '1'))
+JOB_RETRY_BACKOFF = 30  # seconds before the first retry, doubling per attempt
+JOB_RETRY_BACKOFF_MAX = 3600
+JOB_LOCK_TIMEOUT = 1800  # a job running longer is assumed lost with its worker
+JOB_RETENTION_DAYS = 7  # finished jobs are deleted after this
+# Tasks the workers queue periodically: task name -> seconds between runs
+JOB_SCHEDULE = {
+    # Freezes closed months and creates the summary rows of the new month
+    'apps.accounting.jobs.month_rollover': 60 * 60,
+}
+
+# Storage client pool (apps.project_admin.storage)
+STORAGE_MAX_CONNECTIONS = int(os.getenv('STORAGE_MAX_CONNECTIONS', '20'))
+STORAGE_CONCURRENCY = int(os.getenv('STORAGE_CONCURRENCY', '8'))
+STORAGE_TIMEOUT = float(os.getenv('STORAGE_TIMEOUT', '30'))
+
+# Warm up every gunicorn worker before it takes traffic (gunicorn.conf.py)
+WARMUP_ON_BOOT = os.getenv('WARMUP_ON_BOOT', 'True').lower() in ('true', '1', 'yes')
+
+# Opt-in traffic capture for manage.py replay_traffic (sanitized, no values)
+TRAFFIC_CAPTURE_FILE = os.getenv('TRAFFIC_CAPTURE_FILE')
+TRAFFIC_CAPTURE_SAMPLE_RATE = float(os.getenv('TRAFFIC_CAPTURE_SAMPLE_RATE', '1.0'))
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -54,19 +54,21 @@ globals().update({
 })
 
 # Add security and performance middleware for production
-MIDDLEWARE.insert(1, 'whitenoise.middleware.WhiteNoiseMiddleware')
+MIDDLEWARE.insert(1, 'agrimIT.middleware.AsyncWhiteNoiseMiddleware')
 
 # Security middleware configuration - enhanced
 MIDDLEWARE += [
     # Custom security middleware (will be created)
     'agrimIT.middleware.SecurityHeadersMiddleware',
     'agrimIT.middleware.RateLimitMiddleware',
+    'agrimIT.middleware.SessionRefreshMiddleware',
 ]
 
 # Templates configuration for production - SECURE (no debug context processor)
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates that also times renders for PerformanceMiddleware
+        'BACKEND': 'apps.monitoring.template_backend.InstrumentedDjangoTemplates',
         'DIRS': [
             BASE_DIR.parent / 'templates',
         ],
@@ -124,15 +126,28 @@ railway_logger.info(f"ALLOWED_HOSTS configured: {ALLOWED_HOSTS}")
 DATABASES = {
     'default': dj_database_url.config(
         default=DATABASE_URL,
-        conn_max_age=600,
+        conn_max_age=0 if DB_POOL else 600,
         conn_health_checks=True,
     )
 }
+DATABASES['default'].setdefault('OPTIONS', {}).update(postgres_options())
 
 # Validate database configuration
 if not DATABASES['default'].get('NAME'):
     raise ValueError("Database configuration is invalid. Check DATABASE_URL format.")
 
+# Optional streaming replica of the same database for the reporting views
+DATABASE_REPLICA_URL = get_optional_env('DATABASE_REPLICA_URL')
+if DATABASE_REPLICA_URL:
+    DATABASES['replica'] = dj_database_url.parse(
+        DATABASE_REPLICA_URL,
+        conn_max_age=0 if DB_POOL else 600,
+        conn_health_checks=True,
+    )
+    DATABASES['replica'].setdefault('OPTIONS', {}).update(postgres_options())
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+    REPLICA_DATABASE = 'replica'
+
 # Security settings for production - enhanced
 SECURE_BROWSER_XSS_FILTER = True
 SECURE_CONTENT_TYPE_NOSNIFF = True
@@ -157,6 +172,38 @@ MAX_REQUEST_SIZE = 10 * 1024 * 1024  # 10MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = MAX_REQUEST_SIZE
 FILE_UPLOAD_MAX_MEMORY_SIZE = MAX_REQUEST_SIZE
 
+# Per-route overrides of the headers added by SecurityHeadersMiddleware
+# (a value of None drops the header for those paths)
+SECURITY_HEADER_PROFILES = {
+    # JSON endpoints never render HTML, so they get a locked-down CSP
+    'json': {
+        'paths': [
+            '/api/',
+            '/accounting/chart-data/',
+            '/accounting/balance-info/',
+        ],
+        'headers': {
+            'Content-Security-Policy': "default-src 'none'; frame-ancestors 'none'",
+            'Permissions-Policy': None,
+        },
+    },
+}
+
+# Share of requests measured by PerformanceMiddleware, per URL name
+PERF_SAMPLE_RATES = {
+    'default': 0.05,
+    'balance': 1.0,
+    'projectview': 0.5,
+}
+# Sampled queries are aggregated per SQL fingerprint and merged into the
+# QueryStat table every QUERY_STATS_FLUSH_INTERVAL seconds (/monitoreo/consultas/)
+QUERY_STATS_ENABLED = True
+QUERY_STATS_FLUSH_INTERVAL = 60
+
+# Check @query_budget on a sample of requests and log violations
+QUERY_BUDGET_MODE = 'log'
+QUERY_BUDGET_SAMPLE_RATE = 0.05
+
 # Admin IP whitelist (configure if needed)
 # ADMIN_IP_WHITELIST = ['192.168.1.100', '10.0.0.50']  # Uncomment and configure IPs
 
@@ -167,7 +214,10 @@ SESSION_COOKIE_SECURE = True   # ✅ HTTPS only cookies (Railway forwards HTTPS
 SESSION_COOKIE_HTTPONLY = True
 SESSION_COOKIE_AGE = 31536000  # 1 año (365 días * 24 horas * 60 minutos * 60 segundos)
 SESSION_EXPIRE_AT_BROWSER_CLOSE = False  # La sesión persiste aunque se cierre el navegador
-SESSION_SAVE_EVERY_REQUEST = True  # Renueva la sesión en cada request
+SESSION_SAVE_EVERY_REQUEST = False  # SessionRefreshMiddleware renueva la sesión por tramos
+SESSION_REFRESH_FRACTION = 0.1  # Renovar tras ~36 días (10% de la edad) sin guardar en cada request
+SESSION_ENGINE = 'agrimIT.sessions'  # Lectura desde caché compartida, base de datos como respaldo
+SESSION_CACHE_ALIAS = 'default'
 SESSION_COOKIE_SAMESITE = 'Lax'  # Protección adicional CSRF
 
 # CSRF security - secure for Railway production
@@ -273,13 +323,56 @@ LOGGING = {
             'level': 'INFO',
             'propagate': False,
         },
+        'apps.monitoring': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+        'apps.jobs': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
     },
 }
 
-# Cache settings for production - disable Redis for now
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake',
+# Cache settings for production
+# Every cache must be shared by all gunicorn workers (and survive restarts):
+# Redis when REDIS_URL is set, otherwise a SQLite file on the container.
+# Values are stored as JSON, so cache JSON-friendly data only.
+REDIS_URL = get_optional_env('REDIS_URL')
+CACHE_SQLITE_DIR = get_optional_env('CACHE_SQLITE_DIR', '/tmp/agrimit-cache')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'agrimIT.cache.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'agrimit',
+            'TIMEOUT': 300,
+        },
+        'ratelimit': {
+            'BACKEND': 'agrimIT.cache.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'agrimit-rl',
+            'TIMEOUT': 3600 * 2,
+        },
     }
-}
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'agrimIT.cache.SQLiteCache',
+            'LOCATION': os.path.join(CACHE_SQLITE_DIR, 'default.sqlite3'),
+            'KEY_PREFIX': 'agrimit',
+            'TIMEOUT': 300,
+            'OPTIONS': {'MAX_ENTRIES': 50000},
+        },
+        # Separate file so rate limit writes never contend with page caches
+        'ratelimit': {
+            'BACKEND': 'agrimIT.cache.SQLiteCache',
+            'LOCATION': os.path.join(CACHE_SQLITE_DIR, 'ratelimit.sqlite3'),
+            'KEY_PREFIX': 'agrimit-rl',
+            'TIMEOUT': 3600 * 2,
+        },
+    }
+RATE_LIMIT_CACHE = 'ratelimit'
@@ -0,0 +1,590 @@
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.sessions.backends.db import SessionStore
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
+from django.http import HttpResponse, QueryDict
+from django.core.cache import cache
+from django.db import connection, connections, transaction
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from django.utils import timezone
+
+from agrimIT.cache import JSONSerializer, RedisCache, SQLiteCache
+from agrimIT import sessions
+from agrimIT.middleware import ReplicaStickinessMiddleware, SecurityHeadersMiddleware, SessionRefreshMiddleware
+from agrimIT.ratelimit import SlidingWindowRateLimiter
+from apps.monitoring import capture, querystats, warmup
+from apps.monitoring.middleware import TrafficCaptureMiddleware
+from apps.monitoring.models import QueryStat
+from apps.monitoring.startup import parse_importtime, probe_startup
+from apps.users.models import User
+from apps.utils.db import QueryTimeout, cached_on_timeout, statement_timeout
+from apps.utils.replica import PIN_COOKIE, read_replica, track_writes
+
+
+def _sqlite_cache(path, **options):
+    return SQLiteCache(path, {'TIMEOUT': 300, 'OPTIONS': options})
+
+
+def _hammer_limiter(args):
+    """Run in a separate process: hit the limiter and count allowed requests"""
+    path, attempts, limit, now = args
+    limiter = SlidingWindowRateLimiter(_sqlite_cache(path), limit=limit, window=60)
+    return sum(1 for _ in range(attempts) if limiter.hit('203.0.113.7', now=now)[0])
+
+
+class SQLiteCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cache = _sqlite_cache(os.path.join(self.tmpdir.name, 'cache.sqlite3'))
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_add_only_sets_missing_keys(self):
+        self.assertTrue(self.cache.add('key', 1))
+        self.assertFalse(self.cache.add('key', 2))
+        self.assertEqual(self.cache.get('key'), 1)
+
+    def test_incr_is_numeric_and_requires_existing_key(self):
+        self.cache.set('counter', 5)
+        self.assertEqual(self.cache.incr('counter', 3), 8)
+        self.assertEqual(self.cache.decr('counter'), 7)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_expired_entries_are_invisible(self):
+        self.cache.set('gone', 'value', timeout=-1)
+        self.assertIsNone(self.cache.get('gone'))
+        self.assertTrue(self.cache.add('gone', 'new'))
+        self.assertEqual(self.cache.get('gone'), 'new')
+
+    def test_json_values_round_trip(self):
+        value = {'name': 'Mensura', 'items': [1, 2.5, None, True]}
+        self.cache.set('data', value)
+        self.assertEqual(self.cache.get('data'), value)
+        self.assertEqual(self.cache.get_many(['data', 'missing']), {'data': value})
+
+    def test_entries_are_shared_between_instances(self):
+        other = _sqlite_cache(self.cache._path)
+        self.cache.set('shared', [1, 2])
+        self.assertEqual(other.get('shared'), [1, 2])
+
+    def test_hit_miss_counters(self):
+        self.cache.set('key', 'value')
+        self.cache.get('key')
+        self.cache.get('missing')
+        self.cache.get_many(['key', 'missing'])
+        self.assertEqual(self.cache.stats(), {'hits': 2, 'misses': 2, 'hit_rate': 0.5})
+
+    def test_shared_counters_merge_processes(self):
+        other = _sqlite_cache(self.cache._path, STATS_FLUSH_EVERY=1)
+        other.get('missing')
+        self.cache.get('missing')
+        self.assertEqual(self.cache.stats(shared=True)['misses'], 2)
+
+
+class JSONSerializerTests(SimpleTestCase):
+
+    def test_integers_stay_raw_for_atomic_incr(self):
+        serializer = JSONSerializer()
+        self.assertEqual(serializer.dumps(3), 3)
+        self.assertEqual(serializer.loads(b'3'), 3)
+
+    def test_values_round_trip_without_pickle(self):
+        serializer = JSONSerializer()
+        for value in ['texto', 2.5, True, None, {'a': [1, 'b']}]:
+            data = serializer.dumps(value)
+            self.assertIsInstance(data, str)
+            self.assertEqual(serializer.loads(data.encode()), value)
+
+
+class RedisCacheTests(SimpleTestCase):
+
+    def test_own_options_are_not_passed_to_redis(self):
+        params = {'OPTIONS': {'STATS_FLUSH_EVERY': 10, 'db': 2}}
+        backend = RedisCache('redis://127.0.0.1:6379/0', params)
+        client = backend._cache
+        self.assertEqual(backend._stats_flush_every, 10)
+        self.assertNotIn('STATS_FLUSH_EVERY', client._pool_options)
+        self.assertEqual(client._pool_options['db'], 2)
+        self.assertIsInstance(client._serializer, JSONSerializer)
+        self.assertEqual(params, {'OPTIONS': {'STATS_FLUSH_EVERY': 10, 'db': 2}})
+
+
+class SlidingWindowRateLimiterTests(SimpleTestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'ratelimit.sqlite3')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_previous_window_is_weighted(self):
+        limiter = SlidingWindowRateLimiter(_sqlite_cache(self.path), limit=10, window=60)
+        for _ in range(10):
+            self.assertTrue(limiter.hit('ip', now=59)[0])
+        # 15s into the next window, 75% of the previous 10 requests still count
+        allowed = sum(1 for _ in range(10) if limiter.hit('ip', now=75)[0])
+        self.assertEqual(allowed, 2)
+        allowed, retry_after = limiter.hit('ip', now=75)
+        self.assertFalse(allowed)
+        self.assertGreater(retry_after, 0)
+
+    def test_limit_holds_exactly_across_processes(self):
+        limit, workers, attempts = 150, 4, 100
+        context = multiprocessing.get_context('fork')
+        with context.Pool(workers) as pool:
+            results = pool.map(
+                _hammer_limiter,
+                [(self.path, attempts, limit, 1_000_000.0)] * workers
+            )
+        self.assertEqual(sum(results), limit)
+
+
+@override_settings(SECURE_SSL_REDIRECT=True, SECURITY_HEADER_PROFILES={
+    'json': {
+        'paths': ['/api/', '/accounting/chart-data/'],
+        'headers': {'Content-Security-Policy': "default-src 'none'", 'Permissions-Policy': None},
+    },
+})
+class SecurityHeadersMiddlewareTests(SimpleTestCase):
+
+    def setUp(self):
+        self.middleware = SecurityHeadersMiddleware(lambda request: HttpResponse('ok'))
+        self.factory = RequestFactory()
+
+    def test_default_headers(self):
+        response = self.middleware(self.factory.get('/projects/'))
+        self.assertEqual(response['X-Frame-Options'], 'DENY')
+        self.assertIn("default-src 'self'", response['Content-Security-Policy'])
+        self.assertIn('Permissions-Policy', response)
+        self.assertIn('Strict-Transport-Security', response)
+
+    def test_route_profile_overrides_headers(self):
+        response = self.middleware(self.factory.get('/accounting/chart-data/?year=2024'))
+        self.assertEqual(response['Content-Security-Policy'], "default-src 'none'")
+        self.assertNotIn('Permissions-Policy', response)
+        self.assertEqual(response['X-Content-Type-Options'], 'nosniff')
+
+
+class StartupBudgetTests(SimpleTestCase):
+    """Worker startup stays cheap: heavy clients are only imported on first use"""
+
+    # Generous, so a slow CI machine does not fail it; the cold start before
+    # the lazy imports was about 600ms on a laptop
+    BUDGET_MS = 2000
+    HEAVY_MODULES = ['supabase', 'gotrue', 'postgrest', 'realtime', 'storage3', 'websockets', 'httpx']
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.startup = probe_startup(runs=2)
+
+    def test_setup_and_urlconf_within_budget(self):
+        total_ms = self.startup['setup_ms'] + self.startup['urls_ms']
+        self.assertLess(total_ms, self.BUDGET_MS)
+
+    def test_heavy_clients_not_imported_at_startup(self):
+        imported = set(self.startup['modules'])
+        self.assertEqual([module for module in self.HEAVY_MODULES if module in imported], [])
+
+    def test_parse_importtime(self):
+        rows = parse_importtime(
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       120 |        120 |   json.decoder\n"
+            "import time:       300 |        420 | json\n"
+        )
+        self.assertEqual(rows, [
+            {'module': 'json.decoder', 'self_ms': 0.12, 'cumulative_ms': 0.12, 'depth': 1},
+            {'module': 'json', 'self_ms': 0.3, 'cumulative_ms': 0.42, 'depth': 0},
+        ])
+
+
+@override_settings(SESSION_COOKIE_AGE=100 * 24 * 3600, SESSION_REFRESH_FRACTION=0.1)
+class SessionRefreshTests(TestCase):
+    """Session expiry renewed in steps instead of on every request"""
+
+    AGE = 100 * 24 * 3600
+
+    def setUp(self):
+        cache.clear()
+        session = sessions.SessionStore()
+        session['user'] = 'agrimensor'
+        session.save()
+        self.key = session.session_key
+
+    def load(self):
+        return sessions.SessionStore(self.key)
+
+    def test_refresh_only_after_the_interval(self):
+        now = 1_000_000_000
+        session = self.load()
+        self.assertTrue(session.refresh_if_due(now=now))  # never stamped
+        session.save()
+
+        session = self.load()
+        self.assertFalse(session.refresh_if_due(now=now + self.AGE // 10 - 1))
+        self.assertFalse(session.modified)
+        self.assertTrue(session.refresh_if_due(now=now + self.AGE // 10))
+        self.assertTrue(session.modified)
+        self.assertEqual(session[sessions.SessionStore.REFRESH_KEY], now + self.AGE // 10)
+
+    def test_modified_sessions_are_stamped_and_anonymous_ones_ignored(self):
+        session = self.load()
+        session['cart'] = 1
+        self.assertTrue(session.refresh_if_due(now=5))
+        self.assertEqual(session[sessions.SessionStore.REFRESH_KEY], 5)
+        self.assertFalse(sessions.SessionStore().refresh_if_due(now=5))
+
+    def test_refresh_moves_the_expiry_forward(self):
+        session = self.load()
+        session.refresh_if_due(now=int(timezone.now().timestamp()))
+        session.save()
+        first_expiry = Session.objects.get(session_key=self.key).expire_date
+
+        later = timezone.now() + timedelta(days=20)
+        with mock.patch('django.utils.timezone.now', return_value=later):
+            session = self.load()
+            self.assertTrue(session.refresh_if_due(now=int(later.timestamp())))
+            session.save()
+        expiry = Session.objects.get(session_key=self.key).expire_date
+        self.assertGreater(expiry, first_expiry + timedelta(days=19))
+        self.assertEqual(expiry, later + timedelta(seconds=self.AGE))
+
+    def test_middleware_marks_due_sessions_only(self):
+        session = self.load()
+        session.refresh_if_due()
+        session.save()
+
+        def view(request):
+            return HttpResponse('ok')
+
+        middleware = SessionRefreshMiddleware(view)
+        request = RequestFactory().get('/')
+        request.session = self.load()
+        middleware(request)
+        self.assertFalse(request.session.modified)
+
+        request.session = self.load()
+        with mock.patch('agrimIT.sessions.time.time', return_value=time.time() + self.AGE):
+            middleware(request)
+        self.assertTrue(request.session.modified)
+
+
+class CleanupSessionsTests(TestCase):
+    def test_only_expired_sessions_are_deleted(self):
+        now = timezone.now()
+        Session.objects.bulk_create(
+            [Session(session_key=f"expired{index}", session_data='', expire_date=now - timedelta(days=1, minutes=index))
+             for index in range(5)]
+            + [Session(session_key=f"live{index}", session_data='', expire_date=now + timedelta(days=1))
+               for index in range(3)]
+        )
+        output = StringIO()
+        call_command('cleanup_sessions', chunk_size=2, sleep=0, stdout=output)
+        self.assertIn('Deleted 5 expired sessions in 3 chunks', output.getvalue())
+        self.assertEqual(
+            sorted(Session.objects.values_list('session_key', flat=True)),
+            ['live0', 'live1', 'live2'],
+        )
+
+
+@override_settings(SUPABASE_URL=None, SUPABASE_KEY=None)
+class WarmupTests(TestCase):
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        warmup._report = None
+        self.addCleanup(setattr, warmup, '_report', None)
+
+    def test_every_step_succeeds(self):
+        report = warmup.warm_up()
+        self.assertEqual(list(report), list(warmup.STEPS))
+        self.assertEqual({name: step['error'] for name, step in report.items()},
+                         dict.fromkeys(warmup.STEPS))
+        self.assertEqual(report['storage']['detail'], 'not configured')
+
+    def test_failing_step_is_reported_not_raised(self):
+        with self.settings(ROOT_URLCONF='agrimIT.missing_urls'):
+            report = warmup.warm_up(['urls'])
+        self.assertIn('ModuleNotFoundError', report['urls']['error'])
+
+    def test_readiness_warms_the_worker(self):
+        response = self.client.get('/monitoreo/listo/')
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body['status'], 'ready')
+        self.assertEqual(set(body['warmup']), set(warmup.STEPS))
+        self.assertIs(warmup.ensure_warm(), warmup._report)
+
+
+class PerformanceMiddlewareTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('medido', password='clave-segura-123')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    @override_settings(PERF_SAMPLE_RATES={'default': 1.0}, PERF_SERVER_TIMING=True)
+    def test_sampled_request_gets_server_timing(self):
+        response = self.client.get('/grupos/')
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(
+            response['Server-Timing'],
+            r'^sql;dur=[\d.]+;desc="\d+ calls", .*'
+            r'cache;desc="\d+ hits, \d+ misses", total;dur=[\d.]+$',
+        )
+
+    @override_settings(PERF_SAMPLE_RATES={'default': 0.0, 'team_list': 1.0})
+    def test_rates_per_url_name(self):
+        self.assertIn('Server-Timing', self.client.get('/grupos/'))
+        self.assertNotIn('Server-Timing', self.client.get('/history'))
+
+    @override_settings(PERF_SAMPLE_RATES={'default': 1.0}, PERF_SERVER_TIMING=False)
+    def test_server_timing_can_be_disabled(self):
+        self.assertNotIn('Server-Timing', self.client.get('/grupos/'))
+
+
+class QueryStatsTests(TestCase):
+    def test_fingerprint_normalizes_literals_and_lists(self):
+        self.assertEqual(
+            querystats.fingerprint(
+                "SELECT t1.a FROM t1 WHERE b = 'it''s' AND c = -2.5 AND d IN (1, 2, 3)\n  AND e = %s"
+            ),
+            'SELECT t1.a FROM t1 WHERE b = ? AND c = ? AND d IN (...) AND e = ?',
+        )
+        self.assertEqual(
+            querystats.fingerprint('SELECT a FROM t WHERE id IN (%s, %s, %s) LIMIT 21'),
+            querystats.fingerprint('SELECT a FROM t WHERE id IN (%s) LIMIT 5'),
+        )
+        self.assertEqual(
+            querystats.fingerprint('INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s)'),
+            'INSERT INTO t (a, b) VALUES (...)',
+        )
+
+    def test_flush_merges_into_existing_rows(self):
+        sql = 'SELECT a FROM t WHERE id = %s'
+        normalized = querystats.fingerprint(sql)
+        existing = QueryStat.objects.create(
+            fingerprint_hash=querystats.fingerprint_hash(normalized), view='team_list',
+            fingerprint=normalized, calls=2, total_ms=3.0, max_ms=2.0, rows=4,
+            histogram=querystats.empty_histogram(),
+        )
+        collector = querystats.QueryStatsCollector()
+        collector.record(sql, 0.004, rows=1, view='team_list')
+        collector.record('SELECT a FROM t WHERE id = 7', 0.001, rows=1, view='team_list')
+        collector.record(sql, 0.001, rows=1, view='history')
+
+        self.assertEqual(collector.flush(), 2)
+        self.assertEqual(collector.flush(), 0)
+        existing.refresh_from_db()
+        self.assertEqual((existing.calls, existing.rows), (4, 6))
+        self.assertAlmostEqual(existing.total_ms, 8.0)
+        self.assertAlmostEqual(existing.max_ms, 4.0)
+        self.assertEqual(sum(existing.histogram), 2)
+        other = QueryStat.objects.get(view='history')
+        self.assertEqual((other.fingerprint, other.calls), (normalized, 1))
+        self.assertEqual(QueryStat.objects.count(), 2)
+
+    def test_stats_page_is_staff_only(self):
+        url = reverse('query_stats')
+        user = User.objects.create_user('usuario', password='clave-segura-123')
+        self.client.force_login(user)
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        user.is_staff = True
+        user.save()
+        QueryStat.objects.create(fingerprint_hash='x', view='team_list', fingerprint='SELECT ?', calls=1, total_ms=1.0)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'SELECT ?')
+
+
+class TrafficCaptureTests(SimpleTestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.path = os.path.join(self.tmpdir.name, 'trace.jsonl')
+
+    def test_record_holds_no_secrets(self):
+        secrets = ['Clave-Muy-Secreta-1', 'csrf-form-token-2', 'sessionid-value-3', 'csrf-cookie-4', 'bearer-token-5']
+        factory = RequestFactory()
+        factory.cookies['sessionid'] = secrets[2]
+        factory.cookies['csrftoken'] = secrets[3]
+        url = reverse('login')
+        request = factory.post(
+            url,
+            {'username': 'medido', 'password': secrets[0], 'csrfmiddlewaretoken': secrets[1]},
+            HTTP_AUTHORIZATION=f"Bearer {secrets[4]}",
+        )
+        request.resolver_match = resolve(url)
+        request.user = User(pk=7, username='medido')
+
+        with self.settings(TRAFFIC_CAPTURE_FILE=self.path, TRAFFIC_CAPTURE_SAMPLE_RATE=1.0):
+            middleware = TrafficCaptureMiddleware(lambda request: HttpResponse(status=302))
+        middleware(request)
+        middleware.writer.flush()
+
+        with open(self.path) as fh:
+            trace = fh.read()
+        for secret in [*secrets, 'medido', 'Bearer', 'sessionid', 'csrftoken', 'csrfmiddlewaretoken']:
+            self.assertNotIn(secret, trace)
+        record = json.loads(trace)
+        self.assertEqual((record['m'], record['r'], record['s']), ('POST', 'login', 302))
+        # Only the names of the fields; not even the length of the password
+        self.assertEqual(record['f'], {'username': 'str:6', 'password': 'secret'})
+        self.assertIn(record['u'], range(16))
+
+    def test_credential_fields_have_no_length(self):
+        form = QueryDict(mutable=True)
+        for name in ['password1', 'password2', 'old_password', 'new_password1', 'token', 'api_secret']:
+            form[name] = 'x' * 23
+        form['nombre'] = 'x' * 23
+        shape = capture.params_shape(form)
+        self.assertEqual(shape.pop('nombre'), 'str:23')
+        self.assertEqual(set(shape.values()), {'secret'})
+
+
+def _count_to(limit):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'WITH RECURSIVE n(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM n WHERE x < %s) SELECT count(*) FROM n',
+            [limit],
+        )
+        return cursor.fetchone()[0]
+
+
+@override_settings(STATEMENT_TIMEOUTS={'test': 50})
+class StatementTimeoutTests(TestCase):
+    """statement_timeout on SQLite (a progress handler standing in for PostgreSQL's setting)"""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_runaway_statement_is_cancelled(self):
+        # atomic: on PostgreSQL a cancelled statement aborts the test's transaction
+        with self.assertRaises(QueryTimeout), transaction.atomic():
+            with statement_timeout('test'):
+                _count_to(10 ** 9)
+        # The connection is still usable and no longer limited
+        self.assertEqual(_count_to(10), 10)
+        self.assertFalse(getattr(connection, 'statement_deadlines', []))
+
+    def test_budget_is_per_statement(self):
+        with statement_timeout(200):
+            self.assertEqual([_count_to(10000) for _ in range(3)], [10000] * 3)
+
+    def test_cached_on_timeout_falls_back_to_last_result(self):
+        self.assertEqual(cached_on_timeout('count', 'test', _count_to, 100), (100, False))
+        with transaction.atomic():
+            self.assertEqual(cached_on_timeout('count', 'test', _count_to, 10 ** 9), (100, True))
+            transaction.set_rollback(True)
+        with self.assertRaises(QueryTimeout), transaction.atomic():
+            cached_on_timeout('other', 'test', _count_to, 10 ** 9)
+
+
+@override_settings(REPLICA_DATABASE='replica', REPLICA_STICKY_SECONDS=10)
+class ReplicaRouterTests(TransactionTestCase):
+    """
+    ReplicaRouter with the 'replica' test alias: the same database over a
+    second connection, so a TransactionTestCase sees the data from both.
+    """
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='replica', password='replica-password')
+
+    def queries(self):
+        return CaptureQueriesContext(connections['default']), CaptureQueriesContext(connections['replica'])
+
+    def test_reads_in_read_replica_go_to_the_replica(self):
+        primary, replica = self.queries()
+        with primary, replica:
+            with read_replica():
+                user = User.objects.get(pk=self.user.pk)
+            User.objects.get(pk=self.user.pk)
+        self.assertEqual((len(primary), len(replica)), (1, 1))
+        self.assertEqual(user._state.db, 'replica')
+
+    def test_without_replica_everything_reads_from_the_primary(self):
+        primary, replica = self.queries()
+        with self.settings(REPLICA_DATABASE=None), primary, replica, read_replica():
+            User.objects.get(pk=self.user.pk)
+        self.assertEqual((len(primary), len(replica)), (1, 0))
+
+    def test_objects_read_from_the_replica_are_saved_to_the_primary(self):
+        with read_replica():
+            user = User.objects.get(pk=self.user.pk)
+            user.first_name = 'Ana'
+            user.save()
+        self.assertEqual(user._state.db, 'default')
+        self.assertEqual(User.objects.get(pk=self.user.pk).first_name, 'Ana')
+
+    def test_a_write_sends_later_reads_to_the_primary(self):
+        primary, replica = self.queries()
+        with track_writes() as writes, read_replica():
+            SessionStore().create()  # untracked
+            User.objects.get(pk=self.user.pk)
+            self.assertFalse(writes.wrote)
+            User.objects.filter(pk=self.user.pk).update(first_name='Ana')
+            with primary, replica:
+                User.objects.get(pk=self.user.pk)
+        self.assertTrue(writes.wrote)
+        self.assertEqual((len(primary), len(replica)), (1, 0))
+
+    def test_writing_request_pins_the_browser_to_the_primary(self):
+        def write(request):
+            User.objects.filter(pk=self.user.pk).update(first_name='Ana')
+            return HttpResponse()
+
+        @read_replica
+        def read(request):
+            return HttpResponse(User.objects.get(pk=self.user.pk).first_name)
+
+        factory = RequestFactory()
+        response = ReplicaStickinessMiddleware(write)(factory.post('/'))
+        self.assertEqual(response.cookies[PIN_COOKIE]['max-age'], 10)
+        self.assertNotIn(PIN_COOKIE, ReplicaStickinessMiddleware(read)(factory.get('/')).cookies)
+
+        pinned = factory.get('/')
+        pinned.COOKIES[PIN_COOKIE] = '1'
+        primary, replica = self.queries()
+        with primary, replica:
+            self.assertEqual(ReplicaStickinessMiddleware(read)(pinned).content, b'Ana')
+        self.assertEqual((len(primary), len(replica)), (1, 0))
+
+    def test_async_request_sees_writes_of_sync_to_async_threads(self):
+        async def write(request):
+            await sync_to_async(User.objects.filter(pk=self.user.pk).update)(first_name='Ana')
+            return HttpResponse()
+
+        middleware = ReplicaStickinessMiddleware(write)
+        response = async_to_sync(middleware)(RequestFactory().post('/'))
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+    def test_reporting_views_read_from_the_replica(self):
+        self.client.force_login(self.user)
+        for url in ('/accounting/balance/', '/history', '/grupos/'):
+            with self.subTest(url=url):
+                primary, replica = self.queries()
+                with primary, replica:
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(replica.captured_queries)
+                self.assertNotIn(PIN_COOKIE, response.cookies)
@@ -24,4 +24,5 @@ urlpatterns = [
     path('accounting/', include('apps.accounting.urls')),
     path('', include('apps.clients.urls')),
     path('grupos/', include('apps.teams.urls')),
+    path('monitoreo/', include('apps.monitoring.urls')),
 ]
@@ -5,5 +5,35 @@ from .models import * # Import all models from the current app
 
 # Register each model
 
-admin.site.register(Account)
-admin.site.register(MonthlyFinancialSummary)
+@admin.register(Account)
+class AccountAdmin(admin.ModelAdmin):
+    # __str__ reads the related project
+    list_select_related = ['project']
+
+
+@admin.register(MonthlyFinancialSummary)
+class MonthlyFinancialSummaryAdmin(admin.ModelAdmin):
+    # __str__ reads the user
+    list_select_related = ['user']
+
+
+@admin.register(MonthlySnapshot)
+class MonthlySnapshotAdmin(admin.ModelAdmin):
+    list_display = ['user', 'year', 'month', 'total_advance', 'total_expenses', 'project_count', 'frozen_at']
+    list_filter = ['year']
+    list_select_related = ['user']
+
+    # Frozen by the month rollover job, never edited
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(StatementLine)
+class StatementLineAdmin(admin.ModelAdmin):
+    list_display = ['date', 'description', 'amount', 'movement_type', 'status', 'project', 'user']
+    list_filter = ['status', 'movement_type']
+    list_select_related = ['user', 'project']
+    search_fields = ['description', 'reference']
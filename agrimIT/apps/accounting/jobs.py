@@ -0,0 +1,168 @@
+"""
+Month rollover, queued every hour by the job workers (JOB_SCHEDULE).
+
+Closed months never change, so each run freezes the months that closed
+since the last one into MonthlySnapshot rows: the balance of a closed month
+becomes a single-row read. It also creates the MonthlyFinancialSummary row
+of the current month (and of the next one during the last day of a month)
+for every user with accounts, so the movements of a new month find their
+row instead of racing to create it.
+
+Every step skips what already exists, so running it twice is harmless.
+"""
+
+import logging
+from datetime import datetime, timedelta
+
+from django.db.models import Count, Exists, F, Max, Min, OuterRef, Q, Sum
+from django.db.models.functions import ExtractMonth, ExtractYear
+from django.utils import timezone
+
+from apps.accounting.models import Account, MonthlyFinancialSummary, MonthlySnapshot
+from apps.jobs.tasks import task
+from apps.project_admin.models import Project
+from apps.users.models import User
+
+logger = logging.getLogger(__name__)
+
+# Users whose months are frozen per round of queries
+FREEZE_BATCH_SIZE = 100
+
+SUMMARY_FIELDS = [
+    'total_advance', 'total_expenses',
+    'income_mensura', 'income_est_parc', 'income_leg', 'income_amoj', 'income_relev',
+]
+
+
+def period(year: int, month: int) -> int:
+    """Months since year 0, so consecutive months are consecutive numbers"""
+    return year * 12 + month - 1
+
+
+def period_start(number: int) -> datetime:
+    return datetime(number // 12, number % 12 + 1, 1, tzinfo=timezone.get_current_timezone())
+
+
+def freeze_closed_months(now=None) -> int:
+    """
+    Create the missing snapshots of the closed months of every user with
+    accounting data: from January of the year of their first summary or
+    project up to last month, so that every one of those years is complete
+    and read from snapshots alone. Returns the snapshots created.
+    """
+    now = timezone.localtime(now or timezone.now())
+    current = period(now.year, now.month)
+    users = User.objects.filter(
+        Exists(MonthlyFinancialSummary.objects.filter(user=OuterRef('pk')))
+        | Exists(Project.objects.filter(user=OuterRef('pk')))
+    ).order_by('pk').values_list('pk', flat=True)
+
+    frozen = 0
+    user_ids = list(users)
+    for index in range(0, len(user_ids), FREEZE_BATCH_SIZE):
+        frozen += _freeze_users(user_ids[index:index + FREEZE_BATCH_SIZE], current)
+    if frozen:
+        logger.info("Froze %s closed months", frozen)
+    return frozen
+
+
+def _freeze_users(user_ids: list, current: int) -> int:
+    by_period = F('year') * 12 + F('month') - 1
+    # First month to freeze per user: the one after their last snapshot...
+    start = {
+        row['user_id']: row['last'] + 1
+        for row in MonthlySnapshot.objects.filter(user_id__in=user_ids)
+        .values('user_id').annotate(last=Max(by_period))
+    }
+    # ...or January of the year their data starts
+    fresh = [pk for pk in user_ids if pk not in start]
+    if fresh:
+        first = {}
+        for row in MonthlyFinancialSummary.objects.filter(user_id__in=fresh).values('user_id').annotate(first=Min(by_period)):
+            first[row['user_id']] = row['first'] // 12
+        for row in Project.objects.filter(user_id__in=fresh).values('user_id').annotate(first=Min('created')):
+            year = timezone.localtime(row['first']).year
+            first[row['user_id']] = min(year, first.get(row['user_id'], year))
+        start.update({pk: year * 12 for pk, year in first.items()})
+
+    start = {pk: number for pk, number in start.items() if number < current}
+    if not start:
+        return 0
+    since = min(start.values())
+    since_date, until_date = period_start(since), period_start(current)
+    batch = list(start)
+
+    summaries = {
+        (summary.user_id, period(summary.year, summary.month)): summary
+        for summary in MonthlyFinancialSummary.objects.filter(user_id__in=batch)
+        .annotate(number=by_period).filter(number__gte=since, number__lt=current)
+    }
+    projects = {
+        (row['user_id'], period(row['year'], row['month'])): row
+        for row in Project.objects.filter(user_id__in=batch, created__gte=since_date, created__lt=until_date)
+        .annotate(year=ExtractYear('created'), month=ExtractMonth('created'))
+        .values('user_id', 'year', 'month')
+        .annotate(count=Count('id'), open=Count('id', filter=Q(closed=False)))
+    }
+    estimated = {
+        (row['user_id'], period(row['year'], row['month'])): row['estimated']
+        for row in Account.objects.filter(
+            user_id__in=batch, project__created__gte=since_date, project__created__lt=until_date,
+        )
+        .annotate(year=ExtractYear('project__created'), month=ExtractMonth('project__created'))
+        .values('user_id', 'year', 'month')
+        .annotate(estimated=Sum('estimated'))
+    }
+    open_total = dict(
+        Project.objects.filter(user_id__in=batch, closed=False)
+        .values('user_id').annotate(open=Count('id')).values_list('user_id', 'open')
+    )
+
+    snapshots = []
+    for user_id, first in start.items():
+        for number in range(first, current):
+            summary = summaries.get((user_id, number))
+            month_projects = projects.get((user_id, number), {'count': 0, 'open': 0})
+            snapshots.append(MonthlySnapshot(
+                user_id=user_id,
+                year=number // 12,
+                month=number % 12 + 1,
+                has_summary=summary is not None,
+                estimated=estimated.get((user_id, number)) or 0,
+                project_count=month_projects['count'],
+                open_previous=open_total.get(user_id, 0) - month_projects['open'],
+                **{field: getattr(summary, field) for field in SUMMARY_FIELDS if summary is not None},
+            ))
+    MonthlySnapshot.objects.bulk_create(snapshots, batch_size=500, ignore_conflicts=True)
+    return len(snapshots)
+
+
+def create_month_summaries(year: int, month: int) -> int:
+    """
+    Create the (empty) summary of ``year``/``month`` for every active user
+    with accounts that does not have it yet. Returns the users covered.
+    """
+    user_ids = list(
+        User.objects.filter(is_active=True)
+        .filter(Exists(Account.objects.filter(user=OuterRef('pk'))))
+        .values_list('pk', flat=True)
+    )
+    MonthlyFinancialSummary.objects.bulk_create(
+        [MonthlyFinancialSummary(user_id=pk, year=year, month=month) for pk in user_ids],
+        batch_size=500, ignore_conflicts=True,
+    )
+    return len(user_ids)
+
+
+@task(priority=-1)
+def month_rollover() -> dict:
+    """Freeze the closed months and prepare the summaries of the new one"""
+    now = timezone.localtime()
+    frozen = freeze_closed_months(now)
+    prepared = [f"{now.year}-{now.month:02d}"]
+    create_month_summaries(now.year, now.month)
+    tomorrow = now + timedelta(days=1)
+    if tomorrow.month != now.month:
+        create_month_summaries(tomorrow.year, tomorrow.month)
+        prepared.append(f"{tomorrow.year}-{tomorrow.month:02d}")
+    return {'frozen': frozen, 'prepared': prepared}
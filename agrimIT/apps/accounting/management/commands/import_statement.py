@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.accounting.statements import ImportFileError, import_statement
+from apps.users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Import a bank statement (CSV or XLSX) for a user: lines matched to a '
+        'single project are posted as advances or expenses, ambiguous and '
+        'unmatched ones are left in the review queue'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', help='CSV or .xlsx file')
+        parser.add_argument('--user', required=True, help='Username whose projects the lines belong to')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['user']} does not exist")
+
+        started = time.perf_counter()
+        try:
+            with open(options['file'], 'rb') as file:
+                report = import_statement(file, options['file'], user)
+        except OSError as e:
+            raise CommandError(f"Cannot read {options['file']}: {e}")
+        except ImportFileError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Posted {report['posted']} lines in {time.perf_counter() - started:.1f}s"
+        ))
+        self.stdout.write(
+            f"🔎 To review: {report['pending']} ambiguous, {report['unmatched']} unmatched "
+            f"({report['duplicates']} already imported)"
+        )
+        for error in report['errors']:
+            details = '; '.join(f"{column}: {' '.join(messages)}" for column, messages in error['errors'].items())
+            self.stdout.write(self.style.WARNING(f"  row {error['row']}: {details}"))
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.3 on 2026-10-19 05:11
+
+from django.conf import settings
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0004_accountmovement_accounting__user_id_afcb86_idx_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='monthlyfinancialsummary',
+            unique_together={('user', 'year', 'month')},
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.3 on 2026-10-19 06:09
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0005_monthlyfinancialsummary_unique_per_user'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlySnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField(verbose_name='Año')),
+                ('month', models.IntegerField(verbose_name='Mes')),
+                ('has_summary', models.BooleanField(default=True, verbose_name='Con resumen')),
+                ('total_advance', models.DecimalField(decimal_places=2, default=0.0, max_digits=20, verbose_name='Cobros Total')),
+                ('total_expenses', models.DecimalField(decimal_places=2, default=0.0, max_digits=20, verbose_name='Gastos Total')),
+                ('income_mensura', models.DecimalField(decimal_places=2, default=0.0, max_digits=20, verbose_name='Ganancia Neta Mensura')),
+                ('income_est_parc', models.DecimalField(decimal_places=2, default=0.0, max_digits=20, verbose_name='Ganancia Neta Est Parcelario')),
+                ('income_leg', models.DecimalField(decimal_places=2, default=0.0, max_digits=20, verbose_name='Ganancia Neta Legajos')),
+                ('income_amoj', models.DecimalField(decimal_places=2, default=0.0, max_digits=20, verbose_name='Ganancia Neta Amojonamiento')),
+                ('income_relev', models.DecimalField(decimal_places=2, default=0.0, max_digits=20, verbose_name='Ganancia Neta Relevamiento')),
+                ('estimated', models.DecimalField(decimal_places=2, default=0.0, max_digits=20, verbose_name='Presupuestado')),
+                ('project_count', models.IntegerField(default=0, verbose_name='Proyectos del mes')),
+                ('open_previous', models.IntegerField(default=0, verbose_name='Proyectos abiertos de otros meses')),
+                ('frozen_at', models.DateTimeField(auto_now_add=True, verbose_name='Cerrado')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_snapshots', to=settings.AUTH_USER_MODEL, verbose_name='Propietario')),
+            ],
+            options={
+                'verbose_name': 'Cierre Mensual',
+                'verbose_name_plural': 'Cierres Mensuales',
+                'ordering': ['-year', '-month'],
+                'unique_together': {('user', 'year', 'month')},
+            },
+        ),
+    ]
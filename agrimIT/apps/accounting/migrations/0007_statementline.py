@@ -0,0 +1,42 @@
+# Generated by Django 5.2.3 on 2026-10-19 06:30
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0006_monthlysnapshot'),
+        ('project_admin', '0006_project_project_adm_client__2fdc8c_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatementLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(blank=True, null=True, verbose_name='Fecha')),
+                ('description', models.CharField(blank=True, max_length=255, verbose_name='Descripción')),
+                ('reference', models.CharField(blank=True, max_length=100, verbose_name='Referencia')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=20, verbose_name='Monto')),
+                ('movement_type', models.CharField(choices=[('ADV', 'Anticipo'), ('EXP', 'Gasto'), ('EST', 'Presupuesto')], max_length=3, verbose_name='Tipo de Movimiento')),
+                ('status', models.CharField(choices=[('pending', 'Ambiguo'), ('unmatched', 'Sin coincidencias'), ('posted', 'Registrado'), ('discarded', 'Descartado')], max_length=10, verbose_name='Estado')),
+                ('candidates', models.JSONField(blank=True, default=list, verbose_name='Proyectos posibles')),
+                ('fingerprint', models.CharField(max_length=40)),
+                ('imported_at', models.DateTimeField(auto_now_add=True, verbose_name='Importado')),
+                ('movement', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='statement_line', to='accounting.accountmovement', verbose_name='Movimiento')),
+                ('project', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='statement_lines', to='project_admin.project', verbose_name='Proyecto')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='statement_lines', to=settings.AUTH_USER_MODEL, verbose_name='Propietario')),
+            ],
+            options={
+                'verbose_name': 'Línea de Extracto',
+                'verbose_name_plural': 'Líneas de Extracto',
+                'ordering': ['date', 'pk'],
+                'indexes': [models.Index(fields=['user', 'status'], name='accounting__user_id_034178_idx')],
+                'unique_together': {('user', 'fingerprint')},
+            },
+        ),
+    ]
@@ -78,7 +78,7 @@ class MonthlyFinancialSummary(models.Model):
     class Meta:
         verbose_name = "Resumen Mensual"
         verbose_name_plural = "Resumenes Mensuales"
-        unique_together = ['year', 'month']  # Ensure only one record per month
+        unique_together = ['user', 'year', 'month']  # Ensure only one record per user and month
         ordering = ['-year', '-month']  # Default ordering, newest first
         indexes = [
             models.Index(fields=['year', 'month']),  # For efficient lookups by year/month
@@ -119,3 +119,91 @@ class MonthlyFinancialSummary(models.Model):
         return summary
 
 
+
+
+class MonthlySnapshot(models.Model):
+    """
+    Immutable copy of a closed month: its MonthlyFinancialSummary figures plus
+    the project counts and estimated total the balance computes, frozen by the
+    month rollover job (apps.accounting.jobs). Reports of closed months read
+    this single row instead of aggregating projects and accounts again.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='monthly_snapshots', verbose_name="Propietario")
+    year = models.IntegerField(verbose_name="Año")
+    month = models.IntegerField(verbose_name="Mes")
+    # False for a month without a summary, frozen so the year has no gaps
+    has_summary = models.BooleanField(default=True, verbose_name="Con resumen")
+    total_advance = models.DecimalField(max_digits=20, decimal_places=2, default=0.00, verbose_name="Cobros Total")
+    total_expenses = models.DecimalField(max_digits=20, decimal_places=2, default=0.00, verbose_name="Gastos Total")
+    income_mensura = models.DecimalField(max_digits=20, decimal_places=2, default=0.00, verbose_name="Ganancia Neta Mensura")
+    income_est_parc = models.DecimalField(max_digits=20, decimal_places=2, default=0.00, verbose_name="Ganancia Neta Est Parcelario")
+    income_leg = models.DecimalField(max_digits=20, decimal_places=2, default=0.00, verbose_name="Ganancia Neta Legajos")
+    income_amoj = models.DecimalField(max_digits=20, decimal_places=2, default=0.00, verbose_name="Ganancia Neta Amojonamiento")
+    income_relev = models.DecimalField(max_digits=20, decimal_places=2, default=0.00, verbose_name="Ganancia Neta Relevamiento")
+    estimated = models.DecimalField(max_digits=20, decimal_places=2, default=0.00, verbose_name="Presupuestado")
+    project_count = models.IntegerField(default=0, verbose_name="Proyectos del mes")
+    open_previous = models.IntegerField(default=0, verbose_name="Proyectos abiertos de otros meses")
+    frozen_at = models.DateTimeField(auto_now_add=True, verbose_name="Cerrado")
+
+    class Meta:
+        verbose_name = "Cierre Mensual"
+        verbose_name_plural = "Cierres Mensuales"
+        unique_together = ['user', 'year', 'month']
+        ordering = ['-year', '-month']
+
+    def __str__(self):
+        return f"Cierre {self.month:02d}/{self.year} - {self.user.username}"
+
+    @property
+    def net_worth(self):
+        return self.total_advance - self.total_expenses
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Monthly snapshots are immutable")
+        super().save(*args, **kwargs)
+
+
+class StatementLine(models.Model):
+    """
+    A line of an imported bank statement (apps.accounting.statements). Lines
+    matched to a single project are posted as movements during the import;
+    the ambiguous and unmatched ones wait here, in the review queue, until the
+    user picks their project or discards them.
+    """
+    PENDING = 'pending'
+    UNMATCHED = 'unmatched'
+    POSTED = 'posted'
+    DISCARDED = 'discarded'
+    STATUS_CHOICES = (
+        (PENDING, 'Ambiguo'),
+        (UNMATCHED, 'Sin coincidencias'),
+        (POSTED, 'Registrado'),
+        (DISCARDED, 'Descartado'),
+    )
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='statement_lines', verbose_name="Propietario")
+    date = models.DateField(null=True, blank=True, verbose_name="Fecha")
+    description = models.CharField(max_length=255, blank=True, verbose_name="Descripción")
+    reference = models.CharField(max_length=100, blank=True, verbose_name="Referencia")
+    amount = models.DecimalField(max_digits=20, decimal_places=2, verbose_name="Monto")
+    movement_type = models.CharField(max_length=3, choices=AccountMovement.MOVEMENT_TYPES, verbose_name="Tipo de Movimiento")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, verbose_name="Estado")
+    # Ids of the projects an ambiguous line may belong to
+    candidates = models.JSONField(default=list, blank=True, verbose_name="Proyectos posibles")
+    project = models.ForeignKey('project_admin.Project', on_delete=models.SET_NULL, null=True, blank=True, related_name='statement_lines', verbose_name="Proyecto")
+    movement = models.OneToOneField(AccountMovement, on_delete=models.SET_NULL, null=True, blank=True, related_name='statement_line', verbose_name="Movimiento")
+    # Hash of the line's content, so importing a statement again skips it
+    fingerprint = models.CharField(max_length=40)
+    imported_at = models.DateTimeField(auto_now_add=True, verbose_name="Importado")
+
+    class Meta:
+        verbose_name = "Línea de Extracto"
+        verbose_name_plural = "Líneas de Extracto"
+        unique_together = ['user', 'fingerprint']
+        ordering = ['date', 'pk']
+        indexes = [
+            models.Index(fields=['user', 'status']),
+        ]
+
+    def __str__(self):
+        return f"{self.date} - {self.description} - {self.amount}"
@@ -0,0 +1,405 @@
+"""
+Bank statement import: the lines of a CSV or XLSX statement are matched to
+the user's projects and posted as advances (credits) and expenses (debits).
+
+The projects are read once per import, in a single query, into a MatchIndex:
+dictionaries from partida, N° tramite (process_num) and client tax ID
+(Client.id_number) to projects, and from client names to projects. Matching
+a line is then a few dictionary lookups over the numbers and word sequences
+of its description and reference, without queries:
+
+- a partida or N° tramite names a project; a tax ID or a client name names
+  every project of that client;
+- when both kinds are found, only the projects named by both count;
+- among several candidates, closed projects only count if none is open.
+
+Lines with a single candidate are posted; those with several go to the
+review queue (StatementLine, status PENDING) with their candidates, and
+those with none as UNMATCHED. The import is one transaction, and the
+movements, account balances, month summary and history events are written
+with a few bulk queries whatever the number of lines.
+
+Every line is stored with a fingerprint of its content, so importing the
+same statement again (or one that overlaps) skips the lines already seen.
+"""
+
+import hashlib
+import logging
+import re
+from collections import Counter, defaultdict
+from datetime import date, datetime
+from decimal import Decimal
+from typing import NamedTuple, Optional
+
+from django.db import transaction
+
+from apps.project_admin.imports import ImportFileError, normalize, parse_amount, read_rows
+from apps.project_admin.models import Event, Project
+from apps.teams.cache import invalidate_team_dashboards
+from apps.teams.models import ProjectShare
+
+from .models import Account, AccountMovement, StatementLine
+from .views import add_to_monthly_summary
+
+logger = logging.getLogger(__name__)
+
+# Header names of the statement columns (normalized) per key
+STATEMENT_COLUMNS = {
+    'date': {'fecha', 'fecha operacion', 'fecha de operacion', 'fecha valor', 'date'},
+    'description': {'descripcion', 'concepto', 'detalle', 'movimiento', 'description'},
+    'reference': {'referencia', 'comprobante', 'nro comprobante', 'cuit', 'cuil', 'dni', 'documento', 'reference'},
+    'amount': {'importe', 'monto', 'amount'},
+    'credit': {'credito', 'creditos', 'haber', 'credit'},
+    'debit': {'debito', 'debitos', 'debe', 'debit'},
+}
+
+# Statements often start with a few rows about the account
+HEADER_SEARCH_ROWS = 20
+
+DATE_FORMATS = ['%d/%m/%Y', '%d/%m/%y', '%Y-%m-%d', '%d-%m-%Y']
+
+# Shorter numbers (days, street numbers) would match by chance
+MIN_NUMBER_LENGTH = 4
+# Client names are looked up by word sequences of up to this many words
+MAX_NAME_WORDS = 6
+
+REVIEW_STATUSES = [StatementLine.PENDING, StatementLine.UNMATCHED]
+
+NUMBER = re.compile(r'\d[\d./-]*\d|\d')
+WORD = re.compile(r'[a-z]+')
+
+
+class ProjectRef(NamedTuple):
+    """What posting a movement needs from a project"""
+    pk: int
+    account_id: int
+    type: str
+    closed: bool
+
+
+def project_refs(projects) -> dict:
+    """pk -> ProjectRef for a queryset of projects, in one query"""
+    return {
+        row[0]: ProjectRef(*row)
+        for row in projects.filter(account__isnull=False).values_list('pk', 'account_id', 'type', 'closed')
+    }
+
+
+def number_keys(value) -> set:
+    """
+    The numbers in ``value`` as lookup keys: digits only, without leading
+    zeros, so '20-12345678-9' and '20123456789' are the same. A CUIT/CUIL
+    also yields the DNI it contains.
+    """
+    keys = set()
+    for token in NUMBER.findall(str(value)):
+        number = re.sub(r'\D', '', token)
+        numbers = [number, number[2:10]] if len(number) == 11 else [number]
+        for number in numbers:
+            number = number.lstrip('0')
+            if len(number) >= MIN_NUMBER_LENGTH:
+                keys.add(number)
+    return keys
+
+
+def name_key(words) -> str:
+    """A name regardless of word order: banks often put the surname first"""
+    return ' '.join(sorted(words))
+
+
+class MatchIndex:
+    """The user's projects by the identifiers a statement line may carry"""
+
+    def __init__(self, user):
+        self.projects = {}
+        self.by_number = defaultdict(set)  # partida and N° tramite
+        self.by_client_number = defaultdict(set)  # client tax ID
+        self.by_name = defaultdict(set)  # client name, see name_key
+        rows = Project.objects.filter(user=user, account__isnull=False).order_by().values_list(
+            'pk', 'account_id', 'type', 'closed',
+            'partida', 'process_num', 'client__name', 'client__id_number',
+        )
+        for pk, account_id, project_type, closed, partida, process_num, client_name, id_number in rows:
+            self.projects[pk] = ProjectRef(pk, account_id, project_type, closed)
+            for key in number_keys(partida or '') | number_keys(process_num or ''):
+                self.by_number[key].add(pk)
+            for key in number_keys(id_number or ''):
+                self.by_client_number[key].add(pk)
+            words = WORD.findall(normalize(client_name or ''))
+            # A single word is too likely to be part of any description
+            if 2 <= len(words) <= MAX_NAME_WORDS:
+                self.by_name[name_key(words)].add(pk)
+
+    def match_names(self, text: str) -> set:
+        """Projects of the longest client names found in ``text``"""
+        words = WORD.findall(normalize(text))
+        found, longest = set(), 0
+        for size in range(min(MAX_NAME_WORDS, len(words)), 1, -1):
+            for start in range(len(words) - size + 1):
+                projects = self.by_name.get(name_key(words[start:start + size]))
+                if projects:
+                    found |= projects
+                    longest = size
+            if longest:
+                break
+        return found
+
+    def match(self, text: str) -> list:
+        """Ids of the projects a line with ``text`` may belong to"""
+        keys = number_keys(text)
+        direct = set().union(*(self.by_number.get(key, ()) for key in keys))
+        by_client = set().union(*(self.by_client_number.get(key, ()) for key in keys))
+        by_client |= self.match_names(text)
+        if direct and by_client:
+            candidates = (direct & by_client) or direct
+        else:
+            candidates = direct or by_client
+        if len(candidates) > 1:
+            open_projects = {pk for pk in candidates if not self.projects[pk].closed}
+            if open_projects:
+                candidates = open_projects
+        return sorted(candidates)
+
+
+def header_key(cell) -> str:
+    return ' '.join(re.sub(r'[^a-z0-9 ]', ' ', normalize(cell or '')).split())
+
+
+def parse_date(value) -> Optional[date]:
+    """A date from a cell: dates as they are, text as dd/mm/yyyy or yyyy-mm-dd. Raises ValueError."""
+    if value in (None, ''):
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    text = str(value).strip().split(' ')[0]
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            pass
+    raise ValueError(value)
+
+
+def movement_description(line: StatementLine) -> str:
+    if line.movement_type == 'ADV':
+        text = f"Se cobraron ${line.amount}"
+    else:
+        text = f"Se ingreso el gasto de ${line.amount}"
+    day = f" {line.date:%d/%m/%Y}" if line.date else ''
+    return f"{text} (extracto{day}: {line.description})"[:255]
+
+
+def post_lines(user, lines: list, projects: dict) -> None:
+    """
+    Post ``lines`` (StatementLines with their project set) as movements of
+    the accounts of ``projects`` (pk -> ProjectRef): one bulk insert of
+    movements and events, one locked read and bulk update of the accounts,
+    one summary update per project type and one query for the team
+    dashboards to invalidate. Sets the status and movement of the lines;
+    saving them is up to the caller. Run inside a transaction.
+    """
+    if not lines:
+        return
+    movements = AccountMovement.objects.bulk_create([
+        AccountMovement(
+            user_id=user.pk, account_id=projects[line.project_id].account_id,
+            amount=line.amount, movement_type=line.movement_type,
+            description=movement_description(line), created_by_id=user.pk,
+        )
+        for line in lines
+    ])
+
+    balances = defaultdict(lambda: {'advance': Decimal('0'), 'expense': Decimal('0')})
+    totals = defaultdict(lambda: {'advance': Decimal('0'), 'expense': Decimal('0')})
+    for line, movement in zip(lines, movements):
+        line.movement = movement
+        line.status = StatementLine.POSTED
+        line.candidates = []
+        project = projects[line.project_id]
+        field = 'advance' if line.movement_type == 'ADV' else 'expense'
+        balances[project.account_id][field] += line.amount
+        totals[project.type][field] += line.amount
+
+    # Locked in pk order, like concurrent imports would, to avoid deadlocks
+    accounts = list(Account.objects.select_for_update().filter(pk__in=balances).order_by('pk'))
+    for account in accounts:
+        account.advance += balances[account.pk]['advance']
+        account.expense += balances[account.pk]['expense']
+    Account.objects.bulk_update(accounts, ['advance', 'expense'], batch_size=500)
+    # Bulk writes skip the teams signals: drop the dashboards of the teams
+    # the posted projects are shared with
+    invalidate_team_dashboards(
+        ProjectShare.objects.filter(
+            project_id__in={line.project_id for line in lines},
+            is_active=True,
+        ).values_list('team_id', flat=True)
+    )
+
+    # Like create_acc_entry, the money of the movements goes to this month
+    for project_type, total in totals.items():
+        if total['advance']:
+            add_to_monthly_summary(user.pk, project_type, 'total_advance', total['advance'], total['advance'])
+        if total['expense']:
+            add_to_monthly_summary(user.pk, project_type, 'total_expenses', total['expense'], -total['expense'])
+
+    Event.objects.bulk_create([
+        Event(
+            project_id=line.project_id, project_pk=line.project_id, type='modp', user_id=user.pk,
+            msg=(f"Se cobraron ${line.amount}" if line.movement_type == 'ADV'
+                 else f"Se ingreso el gasto de ${line.amount}") + " (extracto bancario)",
+        )
+        for line in lines
+    ])
+
+
+class StatementImporter:
+    """Imports the lines of one statement for ``user``; see the module docstring"""
+
+    def __init__(self, user):
+        self.user = user
+        self.counts = Counter()
+        self.errors = []
+
+    def run(self, rows) -> dict:
+        lines = self.read_lines(rows)
+        index = MatchIndex(self.user)
+        with transaction.atomic():
+            seen = set()
+            fingerprints = [line.fingerprint for line in lines]
+            for start in range(0, len(fingerprints), 1000):
+                seen.update(StatementLine.objects.filter(
+                    user=self.user, fingerprint__in=fingerprints[start:start + 1000],
+                ).order_by().values_list('fingerprint', flat=True))
+            new = [line for line in lines if line.fingerprint not in seen]
+            self.counts['duplicates'] = len(lines) - len(new)
+
+            for line in new:
+                candidates = index.match(f"{line.description} {line.reference}")
+                if len(candidates) == 1:
+                    line.project_id = candidates[0]
+                elif candidates:
+                    line.status = StatementLine.PENDING
+                    line.candidates = candidates
+                else:
+                    line.status = StatementLine.UNMATCHED
+            post_lines(self.user, [line for line in new if line.project_id], index.projects)
+            StatementLine.objects.bulk_create(new, batch_size=1000)
+        self.counts.update(line.status for line in new)
+        return self.report()
+
+    def find_header(self, rows) -> list:
+        """The key of every column of the header row, None to skip it"""
+        aliases = {name: key for key, names in STATEMENT_COLUMNS.items() for name in names}
+        for _, row in zip(range(HEADER_SEARCH_ROWS), rows):
+            keys = [aliases.get(header_key(cell)) for cell in row]
+            if 'description' in keys and ('amount' in keys or 'credit' in keys or 'debit' in keys):
+                return keys
+        raise ImportFileError('No se encontraron las columnas Descripción e Importe (o Crédito y Débito)')
+
+    def read_lines(self, rows) -> list:
+        """Unsaved StatementLines of the rows with an amount"""
+        rows = enumerate(rows, start=1)
+        keys = self.find_header(row for _, row in rows)
+        lines = []
+        occurrences = Counter()
+        for number, row in rows:
+            values = defaultdict(list)
+            for key, cell in zip(keys, row):
+                if key and cell not in (None, ''):
+                    values[key].append(cell)
+            if not values:
+                continue
+            line, errors = self.parse_line(values)
+            if errors:
+                self.errors.append({'row': number, 'errors': errors})
+            elif line is not None:
+                # The same payment twice in one statement are two lines
+                content = f"{line.date}|{line.amount}|{line.movement_type}|{line.description}|{line.reference}"
+                occurrences[content] += 1
+                line.fingerprint = hashlib.sha1(f"{content}|{occurrences[content]}".encode()).hexdigest()
+                lines.append(line)
+        return lines
+
+    def parse_line(self, values: dict) -> tuple[Optional[StatementLine], dict]:
+        """(line, errors per column) of a row; no line for rows without money, like balances"""
+        errors = {}
+        try:
+            line_date = parse_date(values['date'][0] if values['date'] else None)
+        except ValueError:
+            errors['Fecha'] = ['Fecha no válida']
+        try:
+            if values['amount']:
+                amount = parse_amount(values['amount'][0])
+            else:
+                amount = (
+                    sum((parse_amount(value) for value in values['credit']), Decimal('0'))
+                    - sum((abs(parse_amount(value)) for value in values['debit']), Decimal('0'))
+                )
+        except ValueError:
+            errors['Importe'] = ['Importe no válido']
+        if errors:
+            return None, errors
+        if not amount:
+            return None, {}
+        return StatementLine(
+            user=self.user,
+            date=line_date,
+            description=' '.join(' '.join(str(value) for value in values['description']).split())[:255],
+            reference=' '.join(' '.join(str(value) for value in values['reference']).split())[:100],
+            amount=abs(amount),
+            movement_type='ADV' if amount > 0 else 'EXP',
+            status=StatementLine.POSTED,
+        ), {}
+
+    def report(self) -> dict:
+        return {
+            'posted': self.counts[StatementLine.POSTED],
+            'pending': self.counts[StatementLine.PENDING],
+            'unmatched': self.counts[StatementLine.UNMATCHED],
+            'duplicates': self.counts['duplicates'],
+            'errors': self.errors,
+        }
+
+
+def import_statement(file, filename: str, user) -> dict:
+    """
+    Import the lines of a CSV or XLSX bank statement ``file`` (binary) for
+    ``user``. Returns {'posted', 'pending', 'unmatched', 'duplicates',
+    'errors': [{'row', 'errors'}]}. Raises ImportFileError if the file
+    cannot be read.
+    """
+    report = StatementImporter(user).run(read_rows(file, filename))
+    logger.info(
+        "Imported statement %s: %s posted, %s to review, %s unmatched, %s already imported, %s invalid",
+        filename, report['posted'], report['pending'], report['unmatched'], report['duplicates'],
+        len(report['errors']),
+    )
+    return report
+
+
+def review_line(user, line_id: int, project_id: Optional[int] = None) -> StatementLine:
+    """
+    Post a line of the review queue to the project ``project_id`` (any
+    project of the user, not only the candidates), or discard it without
+    ``project_id``. Raises ValueError with a message for the user.
+    """
+    with transaction.atomic():
+        line = (
+            StatementLine.objects.select_for_update()
+            .filter(user=user, status__in=REVIEW_STATUSES, pk=line_id).first()
+        )
+        if line is None:
+            raise ValueError('La línea ya fue revisada o no existe')
+        if project_id is None:
+            line.status = StatementLine.DISCARDED
+            line.save(update_fields=['status'])
+            return line
+        projects = project_refs(Project.objects.filter(user=user, pk=project_id))
+        if not projects:
+            raise ValueError(f"No existe el proyecto N° {project_id}")
+        line.project_id = project_id
+        post_lines(user, [line], projects)
+        line.save(update_fields=['status', 'project', 'movement', 'candidates'])
+    return line
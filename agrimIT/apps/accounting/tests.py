@@ -1,3 +1,293 @@
+from decimal import Decimal
+from io import BytesIO
+from unittest import skipUnless
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.db.models import F
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.clients.models import Client
+from apps.monitoring.seeding import seed_dataset
+from apps.monitoring.testing import PerformanceTestCase
+from apps.project_admin.models import Project
+from apps.teams.models import ProjectShare, Team
+from apps.teams.views import get_team_dashboard_data
+from apps.users.models import User
+from apps.utils import db
+
+from .jobs import month_rollover
+from .models import Account, AccountMovement, MonthlyFinancialSummary, MonthlySnapshot, StatementLine
+from .statements import import_statement
+from .views import balance_anual, create_acc_entry, financial_report, get_monthly_networth_data
+
+
+class AccountingViewsPerformanceTests(PerformanceTestCase):
+    """Query counts and latency of the accounting views over a seeded dataset"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('agrimensor', password='clave-segura-123')
+        cls.data = seed_dataset(cls.user, projects=60)
+        cls.project = cls.data['projects'][1]
+        cls.month = timezone.now().strftime('%Y-%m')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_balance(self):
+        self.assertPerformance('balance', reverse('balance'), queries=10, max_ms=200)
+
+    def test_chart_data(self):
+        self.assertPerformance(
+            'chart_data', reverse('chartdata'), queries=4, max_ms=100,
+            method='post', data={'date': self.month}, ajax=True,
+        )
+
+    def test_balance_info(self):
+        self.assertPerformance(
+            'balance_info', reverse('balance_info'), queries=8, max_ms=100,
+            method='post', data={'date': self.month}, ajax=True,
+        )
+
+    def test_accounting_history(self):
+        self.assertPerformance('accounting_history', reverse('accounting_display'), queries=3, max_ms=200)
+
+    def test_accounting_history_for_project(self):
+        url = reverse('accounting_display', args=[self.project.pk])
+        self.assertPerformance('accounting_history_project', url, queries=3, max_ms=100)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'forces timeouts through the SQLite emulation')
+class BalanceTimeoutTests(TestCase):
+    """A balance report past its statement timeout is served from the last one computed"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('agrimensor', password='clave-segura-123')
+        seed_dataset(cls.user, projects=20)
+        cls.month = timezone.now().strftime('%Y-%m')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        cache.clear()
+
+    def balance_info(self):
+        return self.client.post(reverse('balance_info'), {'date': self.month})
+
+    def time_out_every_statement(self):
+        self.addCleanup(setattr, db, 'SQLITE_PROGRESS_STEPS', db.SQLITE_PROGRESS_STEPS)
+        db.SQLITE_PROGRESS_STEPS = 1
+        overrides = self.settings(STATEMENT_TIMEOUTS={'reports': 0})
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def test_stale_report_after_timeout(self):
+        fresh = self.balance_info().json()
+        self.assertFalse(fresh['stale'])
+        page = self.client.get(reverse('balance'))
+        self.time_out_every_statement()
+
+        stale = self.balance_info().json()
+        self.assertTrue(stale['stale'])
+        self.assertEqual(stale['balance_info'], fresh['balance_info'])
+        response = self.client.get(reverse('balance'))
+        self.assertContains(response, 'se muestran los últimos datos guardados')
+        self.assertEqual(response.context['neto_anual'], page.context['neto_anual'])
+
+
+class MonthRolloverTests(TestCase):
+    """Closed months frozen into snapshots and summaries created ahead of time"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('agrimensor', password='clave-segura-123')
+        cls.year = timezone.now().year - 1
+        cls.data = seed_dataset(cls.user, projects=36, year=cls.year)
+
+    def test_snapshots_match_the_live_reports(self):
+        live = [financial_report(self.year, month, self.user) for month in (1, 6, 12)]
+        live_year = balance_anual(self.year, self.user)
+        result = month_rollover()
+
+        now = timezone.now()
+        self.assertEqual(result['frozen'], 12 + now.month - 1)
+        for report, month in zip(live, (1, 6, 12)):
+            with self.assertNumQueries(2):  # snapshot + net worth of the year
+                self.assertEqual(financial_report(self.year, month, self.user), report)
+        with self.assertNumQueries(1):
+            self.assertEqual(balance_anual(self.year, self.user), live_year)
+
+    def test_chart_series_reads_closed_months_from_snapshots(self):
+        month_rollover()
+        _, frozen = get_monthly_networth_data(self.year, self.user)
+        self.client.force_login(self.user)
+        chart = self.client.post(reverse('chartdata'), {'date': f"{self.year}-03"}).json()
+        self.assertEqual(chart['values1'], frozen)
+
+        # Late changes to the live summaries of closed months are not shown
+        MonthlyFinancialSummary.objects.filter(user=self.user, year=self.year).update(total_advance=F('total_advance') + 1000)
+        with self.assertNumQueries(1):
+            self.assertEqual(get_monthly_networth_data(self.year, self.user)[1], frozen)
+        self.assertEqual(self.client.post(reverse('chartdata'), {'date': f"{self.year}-03"}).json(), chart)
+        self.assertEqual(financial_report(self.year, 3, self.user)['raw']['monthly_data']['values'], frozen)
+
+    def test_rollover_is_idempotent_and_snapshots_immutable(self):
+        month_rollover()
+        count = MonthlySnapshot.objects.count()
+        self.assertEqual(month_rollover()['frozen'], 0)
+        self.assertEqual(MonthlySnapshot.objects.count(), count)
+
+        snapshot = MonthlySnapshot.objects.first()
+        snapshot.total_advance = 0
+        with self.assertRaises(ValueError):
+            snapshot.save()
+
+    def test_later_movements_do_not_change_a_closed_month(self):
+        month_rollover()
+        before = financial_report(self.year, 3, self.user)
+        project = Project.objects.get(pk=self.data['projects'][2].pk)  # created in March
+        create_acc_entry(project, 'est', new_value=Decimal('999999.00'))
+        self.assertEqual(financial_report(self.year, 3, self.user), before)
+
+    def test_movements_update_the_summary_created_by_the_rollover(self):
+        MonthlyFinancialSummary.objects.filter(user=self.user).delete()
+        month_rollover()
+        now = timezone.now()
+        summary = MonthlyFinancialSummary.objects.get(user=self.user, year=now.year, month=now.month)
+        project = Project.objects.filter(user=self.user, type='Mensura').first()
+
+        create_acc_entry(project, 'adv', new_value=Decimal('100.00'))
+        create_acc_entry(project, 'exp', new_value=Decimal('30.00'))
+        self.assertEqual(MonthlyFinancialSummary.objects.filter(user=self.user, year=now.year).count(), 1)
+        summary.refresh_from_db()
+        self.assertEqual((summary.total_advance, summary.total_expenses), (Decimal('100.00'), Decimal('30.00')))
+        self.assertEqual(summary.income_mensura, Decimal('70.00'))
+
+    def test_movement_before_the_rollover_creates_the_summary(self):
+        now = timezone.now()
+        create_acc_entry(self.data['projects'][0], 'adv', new_value=Decimal('50.00'))
+        summary = MonthlyFinancialSummary.objects.get(user=self.user, year=now.year, month=now.month)
+        self.assertEqual(summary.total_advance, Decimal('50.00'))
+
+
+class StatementImportTests(TestCase):
+    """Bank statement lines matched to projects, posted or queued for review"""
+
+    CSV = (
+        'Banco Ejemplo - Cuenta corriente 0123/45\n'
+        '\n'
+        'Fecha;Concepto;Referencia;Crédito;Débito\n'
+        '01/10/2026;TRANSFERENCIA DE PEREZ JUAN CARLOS;;150.000,00;\n'
+        '02/10/2026;PAGO TASA TRAMITE 98765;;;2.500,50\n'
+        '03/10/2026;TRANSF GOMEZ MARIA;CUIT 27-23456789-4;50000;\n'
+        '04/10/2026;DEPOSITO EFECTIVO;;1000;\n'
+        '04/10/2026;DEPOSITO EFECTIVO;;1000;\n'
+        '05/10/2026;SALDO;;;\n'
+        '06/10/2026;COMISION;;;abc\n'
+        '31/02/2026;PAGO PARTIDA 12.345;;700;\n'
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('agrimensor', password='clave-segura-123')
+        perez = Client.objects.create(user=cls.user, name='Juan Carlos Pérez', id_number='20123456789', phone='1')
+        gomez = Client.objects.create(user=cls.user, name='Maria Gomez', id_number='23456789', phone='2')
+        cls.perez = cls.project(client=perez, partida='12345')
+        cls.gomez = [cls.project(client=gomez), cls.project(client=gomez, type='Amojonamiento')]
+        cls.gomez_closed = cls.project(client=gomez, closed=True)
+        cls.tramite = cls.project(process_num=98765)
+
+    @classmethod
+    def project(cls, type='Mensura', **fields):
+        account = Account.objects.create(user=cls.user)
+        return Project.objects.create(user=cls.user, type=type, titular_phone='1', account=account, **fields)
+
+    def import_csv(self, content):
+        return import_statement(BytesIO(content.encode('utf-8')), 'extracto.csv', self.user)
+
+    def test_matched_lines_are_posted_and_the_rest_queued(self):
+        # Index, savepoint, fingerprints, movements, accounts (lock and update),
+        # shared teams, summary (created here) and its updates, events, lines
+        with self.assertNumQueries(17):
+            report = self.import_csv(self.CSV)
+        self.assertEqual(
+            {key: report[key] for key in ('posted', 'pending', 'unmatched', 'duplicates')},
+            {'posted': 2, 'pending': 1, 'unmatched': 2, 'duplicates': 0},
+        )
+        self.assertEqual([error['row'] for error in report['errors']], [10, 11])
+
+        self.assertEqual(Account.objects.get(project=self.perez).advance, Decimal('150000.00'))
+        self.assertEqual(Account.objects.get(project=self.tramite).expense, Decimal('2500.50'))
+        movement = AccountMovement.objects.get(account__project=self.tramite)
+        self.assertEqual((movement.movement_type, movement.amount), ('EXP', Decimal('2500.50')))
+        self.assertEqual(StatementLine.objects.get(movement=movement).project, self.tramite)
+        summary = MonthlyFinancialSummary.objects.get(user=self.user)
+        self.assertEqual(
+            (summary.total_advance, summary.total_expenses, summary.income_mensura),
+            (Decimal('150000.00'), Decimal('2500.50'), Decimal('147499.50')),
+        )
+
+        # Both open projects of the client, not the closed one
+        pending = StatementLine.objects.get(status=StatementLine.PENDING)
+        self.assertEqual(pending.candidates, [project.pk for project in self.gomez])
+        # The same deposit twice is two lines
+        self.assertEqual(StatementLine.objects.filter(status=StatementLine.UNMATCHED).count(), 2)
+
+    def test_posted_lines_update_the_team_dashboards(self):
+        team = Team.objects.create(name='Grupo', owner=self.user)
+        ProjectShare.objects.create(project=self.perez, team=team, shared_by=self.user)
+        ProjectShare.objects.create(project=self.gomez[0], team=team, shared_by=self.user)
+        cache.clear()
+        self.assertEqual(get_team_dashboard_data(team)['totals']['advance'], '0,00')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.import_csv(self.CSV)
+        totals = get_team_dashboard_data(team)['totals']
+        self.assertEqual((totals['projects'], totals['advance'], totals['expense']), (2, '150.000,00', '0,00'))
+
+    def test_importing_again_skips_the_lines_already_imported(self):
+        self.import_csv(self.CSV)
+        report = self.import_csv(self.CSV)
+        self.assertEqual((report['posted'], report['duplicates']), (0, 5))
+        self.assertEqual(AccountMovement.objects.count(), 2)
+        self.assertEqual(StatementLine.objects.count(), 5)
+
+    def test_review_queue(self):
+        self.import_csv(self.CSV)
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('statement_review'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['lines']), 3)
+
+        pending = StatementLine.objects.get(status=StatementLine.PENDING)
+        chosen = self.gomez[1]
+        response = self.client.post(reverse('statement_review'), {'line': pending.pk, 'action': 'post', 'project': chosen.pk})
+        self.assertRedirects(response, reverse('statement_review'))
+        pending.refresh_from_db()
+        self.assertEqual((pending.status, pending.project, pending.movement.account_id), (StatementLine.POSTED, chosen, chosen.account_id))
+        self.assertEqual(Account.objects.get(project=chosen).advance, Decimal('50000.00'))
+
+        unmatched = StatementLine.objects.filter(status=StatementLine.UNMATCHED).first()
+        other = User.objects.create_user('otro', password='clave-segura-123')
+        foreign = Project.objects.create(user=other, type='Mensura', titular_phone='1', account=Account.objects.create(user=other))
+        response = self.client.post(reverse('statement_review'), {'line': unmatched.pk, 'action': 'post', 'project': foreign.pk})
+        self.assertContains(response, f"No existe el proyecto N° {foreign.pk}")
+        self.client.post(reverse('statement_review'), {'line': unmatched.pk, 'action': 'discard'})
+        unmatched.refresh_from_db()
+        self.assertEqual(unmatched.status, StatementLine.DISCARDED)
+
+    def test_upload(self):
+        self.client.force_login(self.user)
+        upload = SimpleUploadedFile('extracto.csv', self.CSV.encode('utf-8'))
+        response = self.client.post(reverse('import_statement'), {'file': upload})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['report']['posted'], 2)
+        self.assertEqual(response.context['to_review'], 3)
 
-# Create your tests here.
+        upload = SimpleUploadedFile('extracto.csv', b'Fecha;Monto\n01/10/2026;10\n')
+        response = self.client.post(reverse('import_statement'), {'file': upload})
+        self.assertContains(response, 'No se encontraron las columnas')
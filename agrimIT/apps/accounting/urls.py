@@ -5,6 +5,9 @@ urlpatterns = [
   path('', views.accounting_mov_display, name='accounting_display'),
   path('<int:pk>/', views.accounting_mov_display, name='accounting_display'),
   path('balance/', views.balance, name='balance'),
+  path('export/', views.export_movements, name='export_movements'),
+  path('statements/import/', views.import_statement_view, name='import_statement'),
+  path('statements/review/', views.statement_review, name='statement_review'),
   path('chart-data/', views.chart_data, name='chartdata'),
   path('balance-info/', views.balance_info, name='balance_info'),
   path('createacc/<int:pk>/', views.create_manual_acc_entry, name='accform'),
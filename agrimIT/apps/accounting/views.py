@@ -2,20 +2,28 @@ from datetime import datetime, timedelta
 from decimal import Decimal
 from django.utils import timezone
 from typing import Optional
+from asgiref.sync import sync_to_async
 import logging
 logger = logging.getLogger(__name__)
 from django.http import HttpRequest, HttpResponse, JsonResponse
 from django.shortcuts import redirect, render, get_object_or_404
-from django.db.models import Q, Sum, Count
+from django.db.models import Q, Sum, Count, BooleanField, IntegerField, Value
 from django.db.models.functions import ExtractMonth
-from apps.accounting.models import Account, AccountMovement, MonthlyFinancialSummary
+from apps.accounting.models import Account, AccountMovement, MonthlyFinancialSummary, MonthlySnapshot, StatementLine
 from apps.project_admin.models import Project
 from apps.users.models import User
 from django.contrib.auth.decorators import login_required
+from apps.monitoring.budget import query_budget
+from apps.utils.db import cached_on_timeout
+from apps.utils.export import date_range, export_response
+from apps.utils.replica import read_replica
 from django.db.models import F
 from django.db import transaction
 from .forms import ManualAccountEntryForm
 
+# Reports are only read from the cache when computing them times out
+REPORT_CACHE_TIMEOUT = 60 * 60 * 24 * 7
+
 
 def get_or_create_account(project: Project) -> tuple[Account, bool]:
     """
@@ -134,30 +142,6 @@ def create_acc_entry(project: Project,
             account, created = get_or_create_account(project)
             logger.info(f"{'Created new' if created else 'Using existing'} account for project {project.id}")
             
-            # Get or create the monthly summary
-            current_year = int(timezone.now().year)
-            current_month = int(timezone.now().month)
-            
-            monthly_summary, createdm = MonthlyFinancialSummary.objects.get_or_create(
-                user=project.user,
-                year=current_year,
-                month=current_month,
-                defaults={
-                    'total_advance': Decimal('0.00'),
-                    'total_expenses': Decimal('0.00'),
-                    'income_mensura': Decimal('0.00'),
-                    'income_est_parc': Decimal('0.00'),
-                    'income_leg': Decimal('0.00'),
-                    'income_amoj': Decimal('0.00'),
-                    'income_relev': Decimal('0.00'),
-                }
-            )
-            
-            if createdm:
-                logger.info(f"Monthly summary created for {current_year}-{current_month}")
-            else:
-                logger.debug(f"Using existing monthly summary for {current_year}-{current_month}")
-            
             # Process based on field type
             if field == 'adv':
                 if created:
@@ -167,22 +151,13 @@ def create_acc_entry(project: Project,
                     # For existing accounts, add to current value
                     Account.objects.filter(id=account.id).update(advance=F('advance') + new_value)
                 
-                if createdm:
-                    # For new monthly summaries, set the initial value directly
-                    MonthlyFinancialSummary.objects.filter(id=monthly_summary.id).update(total_advance=new_value)
-                else:
-                    # For existing summaries, add to current value
-                    MonthlyFinancialSummary.objects.filter(id=monthly_summary.id).update(total_advance=F('total_advance') + new_value)
-                
-                define_type_for_summary(monthly_summary, project.type, new_value)
+                add_to_monthly_summary(project.user_id, project.type, 'total_advance', new_value, new_value)
                 if new_value < 0:
                     acc_mov_description = f"Se devolvieron ${abs(new_value)}"
                 else:
                     acc_mov_description = f"Se cobraron ${new_value}"
                     
             elif field == 'exp':
-                logger.debug(f"Monthly expenses before update: {monthly_summary.total_expenses}")
-                
                 if created:
                     # For new accounts, set the initial value directly
                     Account.objects.filter(id=account.id).update(expense=new_value)
@@ -190,22 +165,11 @@ def create_acc_entry(project: Project,
                     # For existing accounts, add to current value
                     Account.objects.filter(id=account.id).update(expense=F('expense') + new_value)
 
-                if createdm:
-                    # For new monthly summaries, set the initial value directly
-                    MonthlyFinancialSummary.objects.filter(id=monthly_summary.id).update(total_expenses=new_value)
-                else:
-                    # For existing summaries, add to current value
-                    MonthlyFinancialSummary.objects.filter(id=monthly_summary.id).update(total_expenses=F('total_expenses') + new_value)
-                
-                define_type_for_summary(monthly_summary, project.type, -new_value)
+                add_to_monthly_summary(project.user_id, project.type, 'total_expenses', new_value, -new_value)
                 if new_value < 0:
                     acc_mov_description = f"Se redujo el gasto en ${abs(new_value)}"
                 else:
                     acc_mov_description = f"Se ingreso el gasto de ${new_value}"  
-                    
-                # Refresh to see actual values after update
-                monthly_summary.refresh_from_db()
-                logger.debug(f"Monthly expenses after update: {monthly_summary.total_expenses}") 
                 
             elif field == 'est':
                 Account.objects.filter(id=account.id).update(estimated=new_value)
@@ -247,6 +211,7 @@ def create_acc_entry(project: Project,
         return None
 
 @login_required
+@query_budget(15)
 def create_manual_acc_entry (request, pk): 
     """ 
                      
@@ -289,6 +254,7 @@ def create_manual_acc_entry (request, pk):
     return render(request, 'accounting/account_form.html', {'form': form})
 
 @login_required
+@query_budget(5)
 def accounting_mov_display(request: HttpRequest, 
                            pk: Optional[int] = None
                            ) -> HttpResponse:
@@ -345,6 +311,114 @@ def accounting_mov_display(request: HttpRequest,
     
     return render(request, 'accounting/accounting_history.html', context)
 
+MOVEMENT_TYPE_NAMES = dict(AccountMovement.MOVEMENT_TYPES)
+
+# Columns of the movements export: (header, field[, format])
+MOVEMENT_EXPORT_COLUMNS = [
+    ('Fecha', 'created_at'),
+    ('Tipo', 'movement_type', MOVEMENT_TYPE_NAMES.get),
+    ('Monto', 'amount'),
+    ('Descripcion', 'description'),
+    ('Proyecto', 'account__project__id'),
+    ('Tipo de proyecto', 'account__project__type'),
+    ('Titular', 'account__project__titular_name'),
+    ('Cliente', 'account__project__client__name'),
+    ('Creado por', 'created_by__username'),
+]
+
+
+@login_required
+@query_budget(4)
+@read_replica
+def export_movements(request: HttpRequest) -> HttpResponse:
+    """
+    Account movements of the user as CSV or XLSX (?format=), optionally
+    between 'start-date' and 'end-date' (the history's filter), oldest first.
+    Streamed at constant memory (apps.utils.export).
+    """
+    movements = AccountMovement.objects.filter(
+        user=request.user, **date_range(request, 'created_at')
+    ).order_by('created_at', 'pk')
+    return export_response(request, movements, MOVEMENT_EXPORT_COLUMNS, 'movimientos')
+
+
+# Rejected rows and queued lines listed on a page
+STATEMENT_ERRORS_SHOWN = 500
+REVIEW_LINES_SHOWN = 200
+
+
+# No query budget: the lines already imported are looked up and the new ones
+# inserted in chunks of 1000, so the number of queries grows with the file
+@login_required
+def import_statement_view(request: HttpRequest) -> HttpResponse:
+    """
+    Import a bank statement (CSV or XLSX): the lines matched to a project are
+    posted as movements, the rest go to the review queue
+    (apps.accounting.statements).
+    """
+    from .statements import ImportFileError, import_statement
+
+    context = {'errors_shown': STATEMENT_ERRORS_SHOWN}
+    upload = request.FILES.get('file') if request.method == 'POST' else None
+    if request.method == 'POST' and upload is None:
+        context['error'] = 'Seleccione un archivo CSV o Excel (.xlsx)'
+    elif upload is not None:
+        try:
+            report = import_statement(upload.file, upload.name, request.user)
+        except ImportFileError as e:
+            context['error'] = str(e)
+        else:
+            context['report'] = report
+            context['errors'] = report['errors'][:STATEMENT_ERRORS_SHOWN]
+    context['to_review'] = StatementLine.objects.filter(
+        user=request.user, status__in=[StatementLine.PENDING, StatementLine.UNMATCHED]
+    ).count()
+    return render(request, 'accounting/statement_import.html', context)
+
+
+@login_required
+@query_budget(12)
+def statement_review(request: HttpRequest) -> HttpResponse:
+    """
+    The review queue of imported statement lines: post an ambiguous or
+    unmatched line to the project chosen, or discard it.
+    """
+    from .statements import REVIEW_STATUSES, review_line
+
+    context = {}
+    if request.method == 'POST':
+        post = request.POST.get('action') == 'post'
+        line_id, project_id = request.POST.get('line', ''), request.POST.get('project', '')
+        if not line_id.isdigit() or (post and not project_id.isdigit()):
+            context['error'] = 'Seleccione un proyecto'
+        else:
+            try:
+                review_line(request.user, int(line_id), int(project_id) if post else None)
+            except ValueError as e:
+                context['error'] = str(e)
+            else:
+                return redirect('statement_review')
+
+    queue = StatementLine.objects.filter(user=request.user, status__in=REVIEW_STATUSES)
+    lines = list(queue[:REVIEW_LINES_SHOWN])
+    candidates = Project.objects.filter(
+        user=request.user, pk__in={pk for line in lines for pk in line.candidates}
+    ).select_related('client').in_bulk()
+    for line in lines:
+        line.candidate_projects = [candidates[pk] for pk in line.candidates if pk in candidates]
+    context.update({'lines': lines, 'total': queue.count(), 'shown': REVIEW_LINES_SHOWN})
+    return render(request, 'accounting/statement_review.html', context)
+
+# Summary column holding the net income of each project type
+SUMMARY_TYPE_FIELDS = {
+    'Mensura': 'income_mensura',
+    'Estado Parcelario': 'income_est_parc',
+    'Amojonamiento': 'income_amoj',
+    'Relevamiento': 'income_relev',
+    'Legajo Parcelario': 'income_leg',
+}
+
+
 def define_type_for_summary(summary: MonthlyFinancialSummary, 
                             project_type: str, 
                             amount: Decimal
@@ -353,38 +427,43 @@ def define_type_for_summary(summary: MonthlyFinancialSummary,
     Helper function to define the project type and update the summary using F() expressions.
     This ensures atomic database updates and prevents race conditions.
     """
-    summary_id = summary.id
-    
-    if project_type == 'Mensura':
-        MonthlyFinancialSummary.objects.filter(id=summary_id).update(
-            income_mensura=F('income_mensura') + amount
-        )
-      
-    elif project_type == 'Estado Parcelario':
-        MonthlyFinancialSummary.objects.filter(id=summary_id).update(
-            income_est_parc=F('income_est_parc') + amount
-        )
-    elif project_type == 'Amojonamiento':
-        MonthlyFinancialSummary.objects.filter(id=summary_id).update(
-            income_amoj=F('income_amoj') + amount
-        )
-    elif project_type == 'Relevamiento':
-        MonthlyFinancialSummary.objects.filter(id=summary_id).update(
-            income_relev=F('income_relev') + amount
-        )
-    elif project_type == 'Legajo Parcelario':
-        MonthlyFinancialSummary.objects.filter(id=summary_id).update(
-            income_leg=F('income_leg') + amount
-        )
+    field = SUMMARY_TYPE_FIELDS.get(project_type)
+    if field is None:
+        logger.error(f"Unknown project type: {project_type}. Cannot update summary.")
+        return
+    MonthlyFinancialSummary.objects.filter(id=summary.id).update(**{field: F(field) + amount})
+
+
+def add_to_monthly_summary(user_id: int, project_type: str, total_field: str,
+                           amount: Decimal, type_amount: Decimal) -> None:
+    """
+    Add a movement to the summary of the current month of a user: ``amount`` to
+    ``total_field`` and ``type_amount`` to the column of the project type, in
+    a single UPDATE. The month rollover job creates the row in advance; it is
+    only created here if the job has not run yet.
+    """
+    now = timezone.now()
+    changes = {total_field: F(total_field) + amount}
+    type_field = SUMMARY_TYPE_FIELDS.get(project_type)
+    if type_field is not None:
+        changes[type_field] = F(type_field) + type_amount
     else:
         logger.error(f"Unknown project type: {project_type}. Cannot update summary.")
 
+    summary = MonthlyFinancialSummary.objects.filter(user_id=user_id, year=now.year, month=now.month)
+    if not summary.update(**changes):
+        _, created = MonthlyFinancialSummary.objects.get_or_create(user_id=user_id, year=now.year, month=now.month)
+        if created:
+            logger.info(f"Monthly summary created for {now.year}-{now.month}")
+        summary.update(**changes)
+
 
 
 def get_monthly_networth_data(year: int, user: User) -> tuple[list, list]:
     """
     Get monthly net worth data for chart visualization.
     OPTIMIZED: Uses single query with annotate for calculated net worth.
+    Closed months are read from their snapshot.
     
     Args:
         year: The year to get monthly data for.
@@ -393,22 +472,34 @@ def get_monthly_networth_data(year: int, user: User) -> tuple[list, list]:
     Returns:
         A tuple containing (month_labels, networth_values) for the specified year.
     """
-    # OPTIMIZATION 1: Single query with annotate to calculate net_worth in database
-    # Instead of accessing summary.net_worth (which may trigger additional queries),
-    # we calculate it directly in the database using F() expressions
-    year_summaries = MonthlyFinancialSummary.objects.filter(
+    # OPTIMIZATION 1: Single query with annotate to calculate net_worth in database.
+    # Closed months come from their snapshot and the rest from the summaries,
+    # like balance_anual: one UNION, snapshot rows flagged as frozen
+    frozen = MonthlySnapshot.objects.filter(
+        year=year,
+        user=user
+    ).annotate(
+        calculated_net_worth=F('total_advance') - F('total_expenses'),
+        frozen=Value(True, output_field=BooleanField()),
+    ).values_list('month', 'calculated_net_worth', 'frozen').order_by()
+    live = MonthlyFinancialSummary.objects.filter(
         year=year,
         user=user  # Filter by user
     ).annotate(
-        calculated_net_worth=F('total_advance') - F('total_expenses')
-    ).values('month', 'calculated_net_worth').order_by('month')
+        calculated_net_worth=F('total_advance') - F('total_expenses'),
+        frozen=Value(False, output_field=BooleanField()),
+    ).values_list('month', 'calculated_net_worth', 'frozen').order_by()
     
     # OPTIMIZATION 2: Create lookup dictionary in single pass
     # Convert QuerySet to dict for O(1) lookup instead of O(n) iteration
-    summary_by_month = {
-        item['month']: float(item['calculated_net_worth'] or 0)
-        for item in year_summaries
-    }
+    summary_by_month = {}
+    frozen_months = set()
+    for month_num, net_worth, is_frozen in frozen.union(live, all=True):
+        if is_frozen:
+            summary_by_month[month_num] = float(net_worth or 0)
+            frozen_months.add(month_num)
+        elif month_num not in frozen_months:
+            summary_by_month[month_num] = float(net_worth or 0)
     
     # OPTIMIZATION 3: Use list comprehension for better performance
     # Generate month labels and values in single pass instead of separate loops
@@ -500,7 +591,10 @@ def chart_data_format(data: dict) -> dict:
 
 # charts/views.py
 @login_required
-def chart_data(request: HttpRequest) -> JsonResponse:
+@query_budget(6)
+@read_replica
+async def chart_data(request: HttpRequest) -> JsonResponse:
+    user = await request.auser()
     try:
         if request.method == 'POST':
             # Try to get date from POST data
@@ -525,22 +619,20 @@ def chart_data(request: HttpRequest) -> JsonResponse:
             year = datetime.now().year
 
         # Get monthly net worth data for the year - FILTERED BY USER
-        month_labels, networth_values = get_monthly_networth_data(year, request.user)
-            
-        month_summary = MonthlyFinancialSummary.objects.filter(
-            year=year, 
-            month=month, 
-            user=request.user  # Filter by user
-        ).first()
-        total_estimated = 0
-        sums = Account.objects.filter(
-            project__created__month=month, 
-            project__created__year=year,
-            user=request.user  # Filter by user
-        ).aggregate(
-            total_estimated=Sum('estimated')
-        )
-        total_estimated = sums['total_estimated'] or 0
+        month_labels, networth_values = await sync_to_async(get_monthly_networth_data)(year, user)
+
+        # A closed month is a single snapshot row
+        month_summary = None
+        if is_closed_month(year, month):
+            month_summary = await MonthlySnapshot.objects.filter(
+                year=year, month=month, user=user, has_summary=True,
+            ).afirst()
+        if month_summary is None:
+            month_summary = await MonthlyFinancialSummary.objects.filter(
+                year=year, 
+                month=month, 
+                user=user  # Filter by user
+            ).afirst()
     
         
         if month_summary:
@@ -611,61 +703,129 @@ def generate_month_data(months: list, year: list) -> tuple[list, list]:
 
     return months, year
 
+def empty_financial_data() -> dict:
+    """ get_financial_data for a month without a summary """
+    return {
+        'raw': {
+            'advance': 0,
+            'expenses': 0,
+            'networth': 0,
+            'estimated': 0,
+            'pending': 0,
+            'net_by_type': {
+                'estado_parcelario': 0,
+                'mensura': 0,
+                'amojonamiento': 0,
+                'relevamiento': 0,
+                'legajo_parcelario': 0,
+            }
+        },
+        'formatted': {
+            'total': '$0.00',
+            'adv': '$0.00',
+            'exp': '$0.00',
+            'net': '$0.00',
+            'pending': '$0.00',
+        },
+        'counts': {
+            'total': 0,
+            'current_month': 0,
+            'previous_months': 0,
+        },
+        'objects': {
+            'monthly_summary': None,
+            'snapshot': None,
+            'projects': Project.objects.none(),
+            'accounts': Account.objects.none(),
+        }
+    }
+
+
+def is_closed_month(year: int, month: int) -> bool:
+    now = timezone.now()
+    return (year, month) < (now.year, now.month)
+
+
+def get_month_snapshot(year: int, month: int, user: User) -> Optional[MonthlySnapshot]:
+    """ The snapshot of a closed month, or None if the month is open or not frozen yet """
+    if not is_closed_month(year, month):
+        return None
+    return MonthlySnapshot.objects.filter(year=year, month=month, user=user).first()
+
+
+def summary_financial_data(summary, total_estimated, counts: dict, year: int, user: User) -> dict:
+    """
+    The 'raw', 'formatted' and 'counts' parts of get_financial_data from a
+    MonthlyFinancialSummary or a MonthlySnapshot (same field names).
+    """
+    adv = summary.total_advance or 0
+    exp = summary.total_expenses or 0
+
+    # Get monthly net worth data for the year - FILTERED BY USER
+    month_labels, networth_values = get_monthly_networth_data(year, user)
+
+    return {
+        'raw': {
+            'advance': adv,
+            'expenses': exp,
+            'networth': adv - exp,
+            'estimated': total_estimated,
+            'pending': total_estimated - adv - exp,
+            'net_by_type': {
+                'estado_parcelario': summary.income_est_parc or 0,
+                'mensura': summary.income_mensura or 0,
+                'amojonamiento': summary.income_amoj or 0,
+                'relevamiento': summary.income_relev or 0,
+                'legajo_parcelario': summary.income_leg or 0,
+            },
+            'monthly_data': {
+                'labels': month_labels,
+                'values': networth_values,
+            }
+        },
+        'formatted': {
+            'adv': format_currency(adv),
+            'exp': format_currency(exp),
+            'net': format_currency(adv-exp),
+            'total': format_currency(total_estimated),
+            'pending': format_currency(total_estimated - adv - exp),
+        },
+        'counts': counts,
+    }
+
+
 def get_financial_data(year: int, month: int, user: User) -> dict:
     """
     Single function to retrieve all financial data needed for both
-    balance and chart displays.
+    balance and chart displays. Closed months are read from their snapshot.
     """
-    data = {
-        'raw': {},
-        'formatted': {},
-        'counts': {},
-        'objects': {},
-    }
-    
+    snapshot = get_month_snapshot(year, month, user)
+    if snapshot is not None:
+        if not snapshot.has_summary:
+            return empty_financial_data()
+        data = summary_financial_data(snapshot, snapshot.estimated, {
+            'total': snapshot.project_count,
+            'current_month': snapshot.project_count,
+            'previous_months': snapshot.open_previous,
+        }, year, user)
+        data['objects'] = {
+            'monthly_summary': None,
+            'snapshot': snapshot,
+            'projects': Project.objects.filter(created__month=month, created__year=year, user=user),
+            'accounts': Account.objects.filter(project__created__month=month, project__created__year=year, user=user),
+        }
+        return data
+
     # 1. Get monthly summary (single query) - FILTERED BY USER
     monthly_summary = MonthlyFinancialSummary.objects.filter(
         year=year, 
         month=month, 
         user=user  # Filter by user
     ).first()
-    data['objects']['monthly_summary'] = monthly_summary
     
     # If no monthly summary exists, return empty data structure instead of False
     if not monthly_summary:
-        return {
-            'raw': {
-                'advance': 0,
-                'expenses': 0,
-                'networth': 0,
-                'estimated': 0,
-                'pending': 0,
-                'net_by_type': {
-                    'estado_parcelario': 0,
-                    'mensura': 0,
-                    'amojonamiento': 0,
-                    'relevamiento': 0,
-                    'legajo_parcelario': 0,
-                }
-            },
-            'formatted': {
-                'total': '$0.00',
-                'adv': '$0.00',
-                'exp': '$0.00',
-                'net': '$0.00',
-                'pending': '$0.00',
-            },
-            'counts': {
-                'total': 0,
-                'current_month': 0,
-                'previous_months': 0,
-            },
-            'objects': {
-                'monthly_summary': None,
-                'projects': Project.objects.none(),
-                'accounts': Account.objects.none(),
-            }
-        }
+        return empty_financial_data()
     
     # 2. Get projects (single query) - FILTERED BY USER
     projects = Project.objects.filter(
@@ -673,7 +833,6 @@ def get_financial_data(year: int, month: int, user: User) -> dict:
         created__year=year, 
         user=user  # Filter by user
     )
-    data['objects']['projects'] = projects
     
     # 3. Get accounts (single query) - FILTERED BY USER
     accounts = Account.objects.filter(
@@ -681,59 +840,13 @@ def get_financial_data(year: int, month: int, user: User) -> dict:
         project__created__year=year,
         user=user  # Filter by user
     )
-    data['objects']['accounts'] = accounts
-    # 4. Calculate all values once
-    if monthly_summary:
-        adv = monthly_summary.total_advance or 0
-        exp = monthly_summary.total_expenses or 0
-        net_estado_parcelario = monthly_summary.income_est_parc or 0
-        net_mensura = monthly_summary.income_mensura or 0
-        net_amojonamiento = monthly_summary.income_amoj or 0
-        net_relevamiento = monthly_summary.income_relev or 0
-        net_legajo_parcelario = monthly_summary.income_leg or 0
-    else:
-        adv = exp = 0
-        net_estado_parcelario = net_mensura = net_amojonamiento = 0
-        net_relevamiento = net_legajo_parcelario = 0
     
-    # 5. Calculate estimated amount (single aggregation)
+    # 4. Calculate estimated amount (single aggregation)
     sums = accounts.aggregate(total=Sum('estimated'))
     total_estimated = sums['total'] or 0
     
-    # 6. Get monthly net worth data for the year - FILTERED BY USER
-    month_labels, networth_values = get_monthly_networth_data(year, user)
-    
-    # Store raw values
-    data['raw'] = {
-        'advance': adv,
-        'expenses': exp,
-        'networth': adv - exp,
-        'estimated': total_estimated,
-        'pending': total_estimated - adv - exp,
-        'net_by_type': {
-            'estado_parcelario': net_estado_parcelario,
-            'mensura': net_mensura,
-            'amojonamiento': net_amojonamiento,
-            'relevamiento': net_relevamiento,
-            'legajo_parcelario': net_legajo_parcelario,
-        },
-        'monthly_data': {
-            'labels': month_labels,
-            'values': networth_values,
-        }
-    }
-    
-    # Store formatted values
-    data['formatted'] = {
-        'adv': format_currency(adv),
-        'exp': format_currency(exp),
-        'net': format_currency(adv-exp),
-        'total': format_currency(total_estimated),
-        'pending': format_currency(total_estimated - adv - exp),
-    }
-    
-    # Store counts - FILTERED BY USER
-    data['counts'] = {
+    # 5. Counts - FILTERED BY USER
+    counts = {
         'total': projects.count(),
         'current_month': projects.filter(created__month=month).count(),
         
@@ -745,55 +858,102 @@ def get_financial_data(year: int, month: int, user: User) -> dict:
         ).count(),
     }
     
+    data = summary_financial_data(monthly_summary, total_estimated, counts, year, user)
+    data['objects'] = {
+        'monthly_summary': monthly_summary,
+        'snapshot': None,
+        'projects': projects,
+        'accounts': accounts,
+    }
     return data
 
+def balance_report_cache_key(user_id: int, year: int, month: Optional[int] = None) -> str:
+    period = f"{year}-{month:02d}" if month else str(year)
+    return f"balance_report:{user_id}:{period}"
+
+
+def financial_report(year: int, month: int, user: User) -> dict:
+    """
+    The JSON-friendly part of get_financial_data (no model instances), which
+    the balance pages cache to show when the report times out.
+    """
+    data = get_financial_data(year, month, user)
+    return {
+        'raw': data['raw'],
+        'formatted': data['formatted'],
+        'counts': data['counts'],
+        'has_summary': data['objects']['monthly_summary'] is not None or data['objects']['snapshot'] is not None,
+    }
+
+
+def get_balance_report(year: int, month: int, user: User) -> tuple[dict, bool]:
+    """
+    financial_report under the 'reports' statement timeout: (report, stale),
+    with the last cached report (stale=True) if the queries take too long.
+    """
+    return cached_on_timeout(
+        balance_report_cache_key(user.pk, year, month), 'reports',
+        financial_report, year, month, user, cache_timeout=REPORT_CACHE_TIMEOUT,
+    )
+
+
 #Funcion usada dentro de balance, para mostrar el balance anual
 def balance_anual(year: int, user: User) -> tuple[list, list]:
-    # Annotate each project with its month
-    
-    year_summary = MonthlyFinancialSummary.objects.filter(
+    # Closed months come from their snapshot and the rest from the summaries,
+    # in one query: snapshot rows carry their project count, summary rows None
+    frozen = MonthlySnapshot.objects.filter(
+        year=year,
+        user=user
+    ).annotate(
+        networth=F('total_advance') - F('total_expenses')
+    ).values_list('month', 'networth', 'project_count').order_by()
+    live = MonthlyFinancialSummary.objects.filter(
         year=year, 
         user=user  # Filter by user
-    ).order_by('month')
-    # Create a dictionary to easily look up summaries by month
-    summary_by_month = {summary.month: summary for summary in year_summary}
-    
-    # Pre-fetch all project counts for the year to avoid multiple queries - FILTERED BY USER
-    project_counts = {}
-    for month_data in Project.objects.filter(
-        created__year=year, 
-        user=user  # Filter by user
     ).annotate(
-        month=ExtractMonth('created')
-    ).values('month').annotate(count=Count('id')):
-        project_counts[month_data['month']] = month_data['count']
-    
+        networth=F('total_advance') - F('total_expenses'),
+        no_count=Value(None, output_field=IntegerField()),
+    ).values_list('month', 'networth', 'no_count').order_by()
+
+    networth_by_month = {}
+    project_counts = {}
+    for month_num, networth, count in frozen.union(live, all=True):
+        if count is not None:
+            networth_by_month[month_num] = networth
+            project_counts[month_num] = count
+        elif month_num not in project_counts:
+            networth_by_month[month_num] = networth
+
+    # Count the projects of the months without snapshot - FILTERED BY USER
+    live_months = [month_num for month_num in range(1, 13) if month_num not in project_counts]
+    if live_months:
+        for month_data in Project.objects.filter(
+            created__year=year, 
+            created__month__gte=live_months[0],
+            user=user  # Filter by user
+        ).annotate(
+            month=ExtractMonth('created')
+        ).values('month').annotate(count=Count('id')):
+            if month_data['month'] in live_months:
+                project_counts[month_data['month']] = month_data['count']
+
     monthly_totals = []
     year_networth = 0
     for month_num in range(1, 13):
-        # Get the summary for the current month, or create a default one if it doesn't exist
-        month_name = month_str(month_num)
-        if month_num in summary_by_month:
-            #Find data for month, because it exists
-            summary = summary_by_month[month_num]
-            
-            monthly_totals.append({
-                'month': month_str(summary.month),
-                'total_networth': format_currency(summary.net_worth),
-                'project_count': project_counts.get(month_num, 0)
-            })
-            year_networth += summary.net_worth
-        else:
-            # If no summary exists for this month, create a default one
-            monthly_totals.append({
-                'month': month_name,
-                'total_networth': format_currency(0),
-                'project_count': project_counts.get(month_num, 0)
-            })
+        # A month without summary shows zero
+        networth = networth_by_month.get(month_num) or 0
+        monthly_totals.append({
+            'month': month_str(month_num),
+            'total_networth': format_currency(networth),
+            'project_count': project_counts.get(month_num, 0)
+        })
+        year_networth += networth
     return monthly_totals, format_currency(year_networth)
 
 #Balance
 @login_required
+@query_budget(12)
+@read_replica
 def balance(request: HttpRequest) -> HttpResponse:
     method_post = False
     non_exist = False
@@ -811,10 +971,15 @@ def balance(request: HttpRequest) -> HttpResponse:
         month = datetime.now().month
         year = datetime.now().year
         #Obtengo los proyectos del mes y año actual, pero solo los que no estan cerrados
+    stale = False
     try:
-        balance_data = get_financial_data(year, month, request.user)
-        data, year_total = balance_anual(year, request.user)
-        if balance_data['objects']['monthly_summary'] is None:
+        balance_data, stale = get_balance_report(year, month, request.user)
+        (data, year_total), stale_year = cached_on_timeout(
+            balance_report_cache_key(request.user.pk, year), 'reports',
+            balance_anual, year, request.user, cache_timeout=REPORT_CACHE_TIMEOUT,
+        )
+        stale = stale or stale_year
+        if not balance_data['has_summary']:
             non_exist = True
             chart_data = None
         else:
@@ -824,6 +989,8 @@ def balance(request: HttpRequest) -> HttpResponse:
         # Manejo de errores
         logger.error(f"Error al sdsaobtener datos financieros: {e}")
         non_exist = True
+        balance_data = empty_financial_data()
+        data, year_total, chart_data = [], format_currency(0), None
         
 
     return render (request, 'accounting/balance.html', {
@@ -842,12 +1009,15 @@ def balance(request: HttpRequest) -> HttpResponse:
         'monthly_totals': data,
         'neto_anual': year_total,
         'chart_data': chart_data,
-        'non_exist': non_exist
+        'non_exist': non_exist,
+        'stale': stale,
         })
     
     
 @login_required
-def balance_info(request: HttpRequest) -> JsonResponse:
+@query_budget(10)
+@read_replica
+async def balance_info(request: HttpRequest) -> JsonResponse:
     """
     Return balance information for AJAX requests.
     
@@ -879,9 +1049,9 @@ def balance_info(request: HttpRequest) -> JsonResponse:
             year = datetime.now().year
         
         # Use the existing function to get financial data - FILTERED BY USER
-        balance_data = get_financial_data(year, month, request.user)
-        if balance_data is False:
-            return JsonResponse({'error': 'No financial data found for the specified month and year.'}, status=404)
+        # One thread hop for all of its queries
+        user = await request.auser()
+        balance_data, stale = await sync_to_async(get_balance_report)(year, month, user)
         # Format the data for the response
         response_data = {
             'balance_info': {
@@ -894,7 +1064,8 @@ def balance_info(request: HttpRequest) -> JsonResponse:
                 'cant_previus_months': balance_data['counts']['previous_months'],
                 'gastos': balance_data['formatted']['exp'],
                 'net': balance_data['formatted']['net']
-            }
+            },
+            'stale': stale,
         }
         
         return JsonResponse(response_data)
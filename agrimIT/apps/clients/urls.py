@@ -5,6 +5,7 @@ urlpatterns = [
     path('users/', include ('apps.users.urls')), 
     path('clients/', views.clients_view, name='clients'),
     path('clients/create', views.create_client_view, name='clientcreate'),
+    path('clients/export/', views.export_clients, name='export_clients'),
     path('clients/projectcreate/<int:pk>', views.create_for_client, name='clientprojectcreate'),
     path('create/clientedislist/<int:pk>', views.clientedislist, name='clientedislist'),
     path('create/deleteclient/<int:pk>', views.deleteclient, name='deleteclient'),
@@ -5,10 +5,14 @@ from django.shortcuts import redirect, render
 import logging
 logger = logging.getLogger(__name__)
 from apps.clients.models import Client
-from apps.project_admin.models import Event, Project
+from apps.project_admin.models import Event, Project, ProjectFiles
+from apps.project_admin.jobs import remove_files
 from apps.accounting.views import create_account
 from apps.project_admin.forms import ProjectForm
 from django.contrib.auth.decorators import login_required
+from apps.monitoring.budget import query_budget
+from apps.utils.export import export_response
+from apps.utils.replica import read_replica
 
 from .forms import ClientForm
 
@@ -171,9 +175,35 @@ def deleteclient(request: HttpRequest, pk: int) -> HttpResponse:
     try:
         client = Client.objects.get(pk=pk, user=request.user)
         msg = f"Cliente {client.name} eliminado"
-        client.delete()
+        file_names = list(ProjectFiles.objects.filter(project__client=client).values_list('name', flat=True))
+        with transaction.atomic():
+            client.delete()
+            if file_names:
+                # The client's projects and file records go now, the objects in the background
+                remove_files.enqueue(file_names)
         save_client_history(pk, 'deletec', msg, request.user)
         return redirect('clients')
     except Client.DoesNotExist:
         logger.error(f"User {request.user.id} tried to delete client {pk} which doesn't exist or doesn't belong to them")
         return render(request, 'clients/clients_template.html', {'error': 'Client not found or access denied.'})
+
+
+# Columns of the clients export: (header, field)
+CLIENT_EXPORT_COLUMNS = [
+    ('N°', 'pk'),
+    ('Nombre', 'name'),
+    ('Tipo de Documento', 'id_type'),
+    ('Documento', 'id_number'),
+    ('Telefono', 'phone'),
+    ('Email', 'email'),
+    ('Activo', 'flag'),
+]
+
+
+@login_required
+@query_budget(4)
+@read_replica
+def export_clients(request: HttpRequest) -> HttpResponse:
+    """ Clients of the user as CSV or XLSX (?format=), streamed at constant memory """
+    clients = Client.objects.filter(user=request.user).order_by('name', 'pk')
+    return export_response(request, clients, CLIENT_EXPORT_COLUMNS, 'clientes')
@@ -0,0 +1,26 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'task', 'status', 'priority', 'attempts', 'max_attempts', 'run_at', 'finished_at']
+    list_filter = ['status', 'task']
+    search_fields = ['task', 'last_error']
+    readonly_fields = [
+        'task', 'args', 'kwargs', 'attempts', 'locked_by', 'locked_at',
+        'last_error', 'result', 'created', 'finished_at',
+    ]
+    actions = ['retry']
+
+    @admin.action(description='Volver a encolar')
+    def retry(self, request, queryset):
+        updated = queryset.exclude(status=Job.RUNNING).update(
+            status=Job.QUEUED, attempts=0, run_at=timezone.now(), locked_by='', locked_at=None,
+        )
+        self.message_user(request, f"{updated} tareas encoladas de nuevo")
+
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,60 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, Min
+from django.utils import timezone
+
+from apps.jobs.models import Job
+from apps.jobs.worker import Worker
+
+
+class Command(BaseCommand):
+    help = (
+        'Run background jobs from the database queue (apps.jobs) until stopped '
+        'with SIGTERM/Ctrl-C. Jobs in progress are finished before exiting'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=getattr(settings, 'JOB_WORKER_CONCURRENCY', 2),
+                            help='Jobs run at the same time (default: JOB_WORKER_CONCURRENCY)')
+        parser.add_argument('--mode', choices=['threads', 'processes'], default='threads',
+                            help='Run them in threads or in separate processes (default: threads)')
+        parser.add_argument('--poll-interval', type=float,
+                            help='Seconds between polls of an empty queue (default: JOB_POLL_INTERVAL)')
+        parser.add_argument('--burst', action='store_true',
+                            help='Exit once the queue has no due jobs instead of waiting for more')
+        parser.add_argument('--status', action='store_true',
+                            help='Only report the jobs per task and status')
+
+    def handle(self, *args, **options):
+        if options['status']:
+            return self.report()
+        if options['concurrency'] < 1:
+            raise CommandError('--concurrency must be at least 1')
+
+        self.stdout.write(
+            f"🚀 Worker started: {options['concurrency']} {options['mode']}"
+            + (' (burst)' if options['burst'] else '')
+        )
+        worker = Worker(
+            concurrency=options['concurrency'],
+            mode=options['mode'],
+            poll_interval=options['poll_interval'],
+            burst=options['burst'],
+        )
+        processed = worker.run()
+        if processed is None:
+            self.stdout.write(self.style.SUCCESS('✅ Worker stopped'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"✅ Worker stopped after {processed} jobs"))
+
+    def report(self):
+        rows = Job.objects.values('task', 'status').annotate(jobs=Count('id')).order_by('task', 'status')
+        if not rows:
+            self.stdout.write('📭 No jobs')
+            return
+        self.stdout.write(f"{'Task':<60} {'Status':<8} {'Jobs':>6}")
+        for row in rows:
+            self.stdout.write(f"{row['task']:<60} {row['status']:<8} {row['jobs']:>6}")
+        oldest = Job.objects.filter(status=Job.QUEUED, run_at__lte=timezone.now()).aggregate(oldest=Min('run_at'))['oldest']
+        if oldest:
+            self.stdout.write(f"⏳ Oldest due job waiting for {(timezone.now() - oldest).total_seconds():.0f}s")
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.3 on 2026-10-19 06:01
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task', models.CharField(max_length=200, verbose_name='Tarea')),
+                ('args', models.JSONField(blank=True, default=list, verbose_name='Argumentos')),
+                ('kwargs', models.JSONField(blank=True, default=dict, verbose_name='Argumentos con nombre')),
+                ('priority', models.SmallIntegerField(default=0, verbose_name='Prioridad')),
+                ('status', models.CharField(choices=[('queued', 'En cola'), ('running', 'En ejecución'), ('done', 'Terminada'), ('failed', 'Fallida')], default='queued', max_length=10, verbose_name='Estado')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Intentos')),
+                ('max_attempts', models.PositiveSmallIntegerField(default=3, verbose_name='Máximo de intentos')),
+                ('run_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Ejecutar desde')),
+                ('locked_by', models.CharField(blank=True, max_length=100, verbose_name='Worker')),
+                ('locked_at', models.DateTimeField(blank=True, null=True, verbose_name='Tomada')),
+                ('last_error', models.TextField(blank=True, verbose_name='Último error')),
+                ('result', models.JSONField(blank=True, null=True, verbose_name='Resultado')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Creada')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Terminada')),
+            ],
+            options={
+                'verbose_name': 'Tarea',
+                'verbose_name_plural': 'Tareas',
+                'ordering': ['-created'],
+                'indexes': [models.Index(condition=models.Q(('status', 'queued')), fields=['-priority', 'run_at', 'id'], name='jobs_job_ready_idx'), models.Index(fields=['status', 'locked_at'], name='jobs_job_status_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,52 @@
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """
+    Tarea en segundo plano, encolada en la base de datos y ejecutada por
+    ``manage.py runworker`` (apps.jobs.worker)
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'En cola'),
+        (RUNNING, 'En ejecución'),
+        (DONE, 'Terminada'),
+        (FAILED, 'Fallida'),
+    ]
+
+    task = models.CharField(max_length=200, verbose_name='Tarea')
+    args = models.JSONField(default=list, blank=True, verbose_name='Argumentos')
+    kwargs = models.JSONField(default=dict, blank=True, verbose_name='Argumentos con nombre')
+    priority = models.SmallIntegerField(default=0, verbose_name='Prioridad')  # Higher runs first
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED, verbose_name='Estado')
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name='Intentos')
+    max_attempts = models.PositiveSmallIntegerField(default=3, verbose_name='Máximo de intentos')
+    run_at = models.DateTimeField(default=timezone.now, verbose_name='Ejecutar desde')
+    locked_by = models.CharField(max_length=100, blank=True, verbose_name='Worker')
+    locked_at = models.DateTimeField(null=True, blank=True, verbose_name='Tomada')
+    last_error = models.TextField(blank=True, verbose_name='Último error')
+    result = models.JSONField(null=True, blank=True, verbose_name='Resultado')
+    created = models.DateTimeField(auto_now_add=True, verbose_name='Creada')
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name='Terminada')
+
+    class Meta:
+        verbose_name = 'Tarea'
+        verbose_name_plural = 'Tareas'
+        ordering = ['-created']
+        indexes = [
+            # What workers poll: only the (few) queued rows, in claim order
+            models.Index(
+                fields=['-priority', 'run_at', 'id'],
+                condition=Q(status='queued'),
+                name='jobs_job_ready_idx',
+            ),
+            models.Index(fields=['status', 'locked_at'], name='jobs_job_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.task} #{self.pk} ({self.status})"
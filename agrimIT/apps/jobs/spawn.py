@@ -0,0 +1,14 @@
+"""
+Entry point of the worker processes of ``runworker --mode processes``.
+Spawned interpreters import it before Django is set up, so it imports
+nothing that needs the app registry until it has set it up.
+"""
+
+
+def process_main(poll_interval, burst):
+    import django
+
+    django.setup()
+    from .worker import Worker
+
+    Worker(1, 'threads', poll_interval, burst).run()
@@ -0,0 +1,95 @@
+"""
+Background tasks, queued in the database and run by ``manage.py runworker``.
+
+    from apps.jobs.tasks import task
+
+    @task(max_attempts=5)
+    def remove_files(names):
+        ...
+
+    remove_files.enqueue(names)
+
+Arguments and return values are stored as JSON, so pass ids rather than
+model instances. The job row is inserted in the caller's transaction: a job
+queued inside ``transaction.atomic`` only becomes visible to workers when it
+commits, and disappears if it rolls back.
+
+A failing task is retried with exponential backoff (JOB_RETRY_BACKOFF
+seconds, doubling per attempt) until it has run ``max_attempts`` times, so
+tasks must be safe to run more than once.
+"""
+
+import functools
+from datetime import timedelta
+from importlib import import_module
+
+from django.utils import timezone
+
+from .models import Job
+
+_registry = {}
+
+
+class Task:
+    """A function registered with @task, with its queueing defaults"""
+
+    def __init__(self, func, priority=0, max_attempts=3):
+        self.func = func
+        self.name = f"{func.__module__}.{func.__qualname__}"
+        self.priority = priority
+        self.max_attempts = max_attempts
+        functools.update_wrapper(self, func)
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def enqueue(self, *args, **kwargs):
+        """Queue a run of the task with these arguments and return its Job"""
+        return enqueue(self, args, kwargs)
+
+
+def task(func=None, *, priority=0, max_attempts=3):
+    """
+    Register a function as a background task. ``priority``: higher runs
+    first; ``max_attempts``: runs before the job is marked as failed.
+    """
+    def register(func):
+        registered = Task(func, priority, max_attempts)
+        _registry[registered.name] = registered
+        return registered
+
+    return register(func) if func is not None else register
+
+
+def get_task(name):
+    """The Task registered under ``name``, importing its module if needed"""
+    if name not in _registry:
+        module, _, _ = name.rpartition('.')
+        try:
+            import_module(module)
+        except ImportError:
+            pass
+    try:
+        return _registry[name]
+    except KeyError:
+        raise LookupError(f"Unknown task {name}") from None
+
+
+def enqueue(task, args=(), kwargs=None, *, priority=None, delay=None, max_attempts=None):
+    """
+    Queue a run of ``task`` (a Task or its name) and return the Job.
+    ``delay`` (seconds or timedelta) postpones it.
+    """
+    if not isinstance(task, Task):
+        task = get_task(task)
+    run_at = timezone.now()
+    if delay:
+        run_at += delay if isinstance(delay, timedelta) else timedelta(seconds=delay)
+    return Job.objects.create(
+        task=task.name,
+        args=list(args),
+        kwargs=kwargs or {},
+        priority=task.priority if priority is None else priority,
+        max_attempts=task.max_attempts if max_attempts is None else max_attempts,
+        run_at=run_at,
+    )
@@ -0,0 +1,180 @@
+import threading
+from datetime import timedelta
+from io import StringIO
+from unittest import skipUnless
+
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from .models import Job
+from .tasks import enqueue, task
+from .worker import Worker, claim, prune, release_stale, run_job, schedule_periodic, work_off
+
+calls = []
+
+
+@task
+def add(a, b):
+    calls.append((a, b))
+    return a + b
+
+
+@task(priority=5)
+def urgent():
+    calls.append('urgent')
+
+
+@task(max_attempts=2)
+def broken():
+    raise ValueError('storage unavailable')
+
+
+@override_settings(JOB_RETRY_BACKOFF=30)
+class JobQueueTests(TestCase):
+
+    def setUp(self):
+        calls.clear()
+
+    def test_enqueue_uses_the_task_defaults(self):
+        job = add.enqueue(1, b=2)
+        self.assertEqual((job.task, job.args, job.kwargs), ('apps.jobs.tests.add', [1], {'b': 2}))
+        self.assertEqual((job.status, job.priority, job.max_attempts), (Job.QUEUED, 0, 3))
+        self.assertEqual(urgent.enqueue().priority, 5)
+        self.assertEqual(enqueue('apps.jobs.tests.add', [1, 2], priority=9).priority, 9)
+
+    def test_claims_by_priority_then_age_and_skips_future_jobs(self):
+        first = add.enqueue(1, 1)
+        add.enqueue(2, 2)
+        later = enqueue(urgent, delay=60)
+        high = urgent.enqueue()
+
+        job = claim('test')
+        self.assertEqual(job.pk, high.pk)
+        self.assertEqual((job.status, job.attempts, job.locked_by), (Job.RUNNING, 1, 'test'))
+        self.assertEqual(claim('test').pk, first.pk)
+        claim('test')
+        self.assertIsNone(claim('test'))
+        self.assertEqual(Job.objects.get(pk=later.pk).status, Job.QUEUED)
+
+    def test_successful_job_stores_its_result(self):
+        job = add.enqueue(2, 3)
+        self.assertEqual(work_off(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result, job.last_error), (Job.DONE, 5, ''))
+        self.assertIsNotNone(job.finished_at)
+        self.assertEqual(calls, [(2, 3)])
+
+    def test_failing_job_is_retried_with_backoff_then_failed(self):
+        job = broken.enqueue()
+        self.assertEqual(run_job(claim('test')), Job.QUEUED)
+        job.refresh_from_db()
+        self.assertIn('storage unavailable', job.last_error)
+        self.assertGreaterEqual(job.run_at, timezone.now() + timedelta(seconds=25))
+        self.assertIsNone(claim('test'))
+
+        self.assertEqual(run_job(claim('test', now=job.run_at)), Job.FAILED)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+
+    def test_unknown_task_fails_without_retrying(self):
+        job = Job.objects.create(task='apps.jobs.tests.missing')
+        self.assertEqual(run_job(claim('test')), Job.FAILED)
+        job.refresh_from_db()
+        self.assertEqual((job.attempts, job.last_error), (1, 'Unknown task apps.jobs.tests.missing'))
+
+    def test_job_queued_in_a_rolled_back_transaction_disappears(self):
+        with transaction.atomic():
+            add.enqueue(1, 2)
+            transaction.set_rollback(True)
+        self.assertFalse(Job.objects.exists())
+
+    @override_settings(JOB_LOCK_TIMEOUT=60)
+    def test_jobs_of_a_lost_worker_are_released(self):
+        lost = add.enqueue(1, 2)
+        exhausted = Job.objects.create(task=add.name, max_attempts=1)
+        claim('lost')
+        claim('lost')
+        self.assertEqual(release_stale(), 0)
+
+        self.assertEqual(release_stale(now=timezone.now() + timedelta(seconds=61)), 2)
+        self.assertEqual(Job.objects.get(pk=lost.pk).status, Job.QUEUED)
+        self.assertEqual(Job.objects.get(pk=exhausted.pk).status, Job.FAILED)
+
+    @override_settings(JOB_RETENTION_DAYS=7)
+    def test_prune_deletes_old_finished_jobs(self):
+        add.enqueue(1, 2)
+        queued = add.enqueue(3, 4)
+        work_off(limit=1)
+        self.assertEqual(prune(), 0)
+        self.assertEqual(prune(now=timezone.now() + timedelta(days=8)), 1)
+        self.assertEqual(list(Job.objects.values_list('pk', flat=True)), [queued.pk])
+
+    @override_settings(JOB_SCHEDULE={'apps.jobs.tests.urgent': 60})
+    def test_scheduled_tasks_are_queued_once_per_interval(self):
+        self.assertEqual([job.task for job in schedule_periodic()], ['apps.jobs.tests.urgent'])
+        self.assertEqual(schedule_periodic(), [])
+        work_off()
+        self.assertEqual(schedule_periodic(), [])
+        self.assertEqual(len(schedule_periodic(now=timezone.now() + timedelta(seconds=61))), 1)
+
+    def test_status_report(self):
+        add.enqueue(1, 2)
+        out = StringIO()
+        call_command('runworker', status=True, stdout=out)
+        self.assertIn('apps.jobs.tests.add', out.getvalue())
+        self.assertIn('queued', out.getvalue())
+
+
+@override_settings(JOB_SCHEDULE={})
+class WorkerTests(TransactionTestCase):
+    """The worker loop in its own threads and database connections"""
+
+    def setUp(self):
+        calls.clear()
+
+    def test_burst_worker_runs_the_queue_and_exits(self):
+        for number in range(5):
+            add.enqueue(number, number)
+        out = StringIO()
+        call_command('runworker', burst=True, concurrency=1, stdout=out)
+        self.assertIn('after 5 jobs', out.getvalue())
+        self.assertEqual(Job.objects.filter(status=Job.DONE).count(), 5)
+        self.assertEqual(sorted(calls), [(number, number) for number in range(5)])
+
+    def test_stop_finishes_the_current_job(self):
+        worker = Worker(concurrency=1, poll_interval=0.01)
+        thread = threading.Thread(target=worker.loop, args=('test',))
+        thread.start()
+        add.enqueue(1, 1)
+        while not calls:
+            thread.join(0.01)
+        worker.stop()
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(Job.objects.get().status, Job.DONE)
+
+    @skipUnless(connection.vendor == 'postgresql', 'SKIP LOCKED needs PostgreSQL')
+    def test_locked_jobs_are_skipped_not_waited_for(self):
+        first = add.enqueue(1, 1)
+        second = add.enqueue(2, 2)
+        locked, release = threading.Event(), threading.Event()
+
+        def hold_first():
+            try:
+                with transaction.atomic():
+                    Job.objects.select_for_update().get(pk=first.pk)
+                    locked.set()
+                    release.wait(5)
+            finally:
+                connection.close()
+
+        holder = threading.Thread(target=hold_first)
+        holder.start()
+        locked.wait(5)
+        try:
+            self.assertEqual(claim('test').pk, second.pk)
+        finally:
+            release.set()
+            holder.join()
@@ -0,0 +1,285 @@
+"""
+The job worker behind ``manage.py runworker``.
+
+Each worker thread (or process) polls the queue every JOB_POLL_INTERVAL
+seconds and claims the next due job, highest priority first, with
+``SELECT ... FOR UPDATE SKIP LOCKED``: any number of workers can poll the
+same table without handing a job to two of them or waiting on each other's
+locks. On SQLite (development, tests) FOR UPDATE does not exist; the claim
+transaction takes the database write lock instead (transaction_mode
+IMMEDIATE), which serializes claims just as well.
+
+A job that raises goes back to the queue with a backoff, or is marked as
+failed after its last attempt. Jobs left running by a worker that died are
+queued again once their lock is older than JOB_LOCK_TIMEOUT seconds.
+
+Tasks listed in JOB_SCHEDULE (task name: seconds) are queued by the
+workers themselves, every that many seconds, during their maintenance pass.
+"""
+
+import logging
+import multiprocessing
+import os
+import random
+import signal
+import socket
+import threading
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+from .spawn import process_main
+from .tasks import enqueue, get_task
+
+logger = logging.getLogger(__name__)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def claim(worker_id, now=None):
+    """Lock the next due job for ``worker_id`` and return it, or None"""
+    now = now or timezone.now()
+    with transaction.atomic():
+        job = (
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status=Job.QUEUED, run_at__lte=now)
+            .order_by('-priority', 'run_at', 'id')
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = Job.RUNNING
+        job.attempts += 1
+        job.locked_by = worker_id
+        job.locked_at = now
+        job.save(update_fields=['status', 'attempts', 'locked_by', 'locked_at'])
+    return job
+
+
+def retry_delay(attempts):
+    """Seconds before the next attempt of a job that failed ``attempts`` times"""
+    base = _setting('JOB_RETRY_BACKOFF', 30)
+    delay = min(base * 2 ** (attempts - 1), _setting('JOB_RETRY_BACKOFF_MAX', 3600))
+    # Jitter, so jobs that failed together do not all retry together
+    return delay * random.uniform(1, 1.1)
+
+
+def run_job(job):
+    """Run a claimed job and record its outcome. Returns the final status."""
+    try:
+        task = get_task(job.task)
+    except LookupError as exc:
+        # Retrying will not make it appear
+        return _finish(job, Job.FAILED, error=str(exc))
+    started = time.perf_counter()
+    try:
+        result = task.func(*job.args, **job.kwargs)
+    except Exception:
+        error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            delay = retry_delay(job.attempts)
+            logger.warning(
+                "Job %s (%s) failed, attempt %s of %s, retrying in %.0fs",
+                job.pk, job.task, job.attempts, job.max_attempts, delay,
+            )
+            return _finish(job, Job.QUEUED, error=error, run_at=timezone.now() + timedelta(seconds=delay))
+        logger.error("Job %s (%s) failed after %s attempts:\n%s", job.pk, job.task, job.attempts, error)
+        return _finish(job, Job.FAILED, error=error)
+    logger.info("Job %s (%s) done in %.0fms", job.pk, job.task, (time.perf_counter() - started) * 1000)
+    return _finish(job, Job.DONE, result=result)
+
+
+def _finish(job, status, error='', result=None, run_at=None):
+    job.status = status
+    job.last_error = error
+    job.result = result
+    job.locked_by = ''
+    job.locked_at = None
+    fields = ['status', 'last_error', 'result', 'locked_by', 'locked_at']
+    if run_at is not None:
+        job.run_at = run_at
+        fields.append('run_at')
+    if status in (Job.DONE, Job.FAILED):
+        job.finished_at = timezone.now()
+        fields.append('finished_at')
+    job.save(update_fields=fields)
+    return status
+
+
+def release_stale(now=None):
+    """
+    Queue again the jobs whose worker died while running them (locked for
+    longer than JOB_LOCK_TIMEOUT), or fail them if they had no attempts left.
+    Returns the number of jobs released.
+    """
+    now = now or timezone.now()
+    stale = Q(status=Job.RUNNING, locked_at__lt=now - timedelta(seconds=_setting('JOB_LOCK_TIMEOUT', 1800)))
+    failed = Job.objects.filter(stale, attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED, last_error='Worker lost while running the job', finished_at=now,
+        locked_by='', locked_at=None,
+    )
+    requeued = Job.objects.filter(stale).update(
+        status=Job.QUEUED, last_error='Worker lost while running the job', run_at=now,
+        locked_by='', locked_at=None,
+    )
+    if failed or requeued:
+        logger.warning("Released %s stale jobs (%s failed)", failed + requeued, failed)
+    return failed + requeued
+
+
+def prune(now=None):
+    """Delete finished jobs older than JOB_RETENTION_DAYS"""
+    now = now or timezone.now()
+    cutoff = now - timedelta(days=_setting('JOB_RETENTION_DAYS', 7))
+    deleted, _ = Job.objects.filter(status__in=[Job.DONE, Job.FAILED], finished_at__lt=cutoff).delete()
+    return deleted
+
+
+def schedule_periodic(now=None):
+    """
+    Queue a run of each JOB_SCHEDULE task whose last run is older than its
+    interval and not still pending. Returns the jobs queued.
+
+    Two workers may both queue a run at the same moment; scheduled tasks,
+    like all tasks, must be safe to run twice.
+    """
+    now = now or timezone.now()
+    queued = []
+    for name, every in _setting('JOB_SCHEDULE', {}).items():
+        last = Job.objects.filter(task=name).order_by('-run_at').values('status', 'run_at').first()
+        if last is not None and (
+            last['status'] in (Job.QUEUED, Job.RUNNING) or last['run_at'] > now - timedelta(seconds=every)
+        ):
+            continue
+        try:
+            queued.append(enqueue(name))
+        except LookupError:
+            logger.error("Scheduled task %s does not exist", name)
+    return queued
+
+
+def work_off(worker_id='inline', limit=None):
+    """
+    Run the due jobs in this thread until the queue is empty (or ``limit``
+    jobs ran) and return how many ran. For tests and one-off commands.
+    """
+    done = 0
+    while limit is None or done < limit:
+        job = claim(worker_id)
+        if job is None:
+            break
+        run_job(job)
+        done += 1
+    return done
+
+
+class Worker:
+    """
+    ``concurrency`` threads (mode 'threads') or processes of one thread each
+    (mode 'processes') claiming and running jobs until stopped. With
+    ``burst`` each one stops as soon as it finds the queue empty.
+    """
+
+    # Seconds between two sweeps for stale jobs and old finished ones (and
+    # checks of JOB_SCHEDULE)
+    MAINTENANCE_INTERVAL = 60
+
+    def __init__(self, concurrency=1, mode='threads', poll_interval=None, burst=False):
+        self.concurrency = concurrency
+        self.mode = mode
+        self.poll_interval = _setting('JOB_POLL_INTERVAL', 1.0) if poll_interval is None else poll_interval
+        self.burst = burst
+        self.stopping = threading.Event()
+        self.processed = 0
+        self._lock = threading.Lock()
+        self._next_maintenance = 0
+
+    def stop(self, *args):
+        self.stopping.set()
+
+    def run(self):
+        """Run until stopped (or the queue is empty with ``burst``)"""
+        if threading.current_thread() is not threading.main_thread():
+            return self._run()
+        handlers = {signum: signal.signal(signum, self.stop) for signum in (signal.SIGTERM, signal.SIGINT)}
+        try:
+            return self._run()
+        finally:
+            for signum, handler in handlers.items():
+                signal.signal(signum, handler)
+
+    def _run(self):
+        if self.mode == 'processes':
+            return self._run_processes()
+        threads = [
+            threading.Thread(target=self.loop, args=(f"{socket.gethostname()}:{os.getpid()}:{index}",), daemon=True)
+            for index in range(self.concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        # join() with a timeout, so the main thread keeps handling signals
+        while any(thread.is_alive() for thread in threads):
+            for thread in threads:
+                thread.join(0.5)
+        return self.processed
+
+    def _run_processes(self):
+        # Fresh interpreters: nothing (database pools, threads) is inherited
+        context = multiprocessing.get_context('spawn')
+        processes = [
+            context.Process(target=process_main, args=(self.poll_interval, self.burst))
+            for _ in range(self.concurrency)
+        ]
+        connections.close_all()
+        for process in processes:
+            process.start()
+        while any(process.is_alive() for process in processes):
+            if self.stopping.is_set():
+                for process in processes:
+                    if process.is_alive():
+                        process.terminate()
+            for process in processes:
+                process.join(0.5)
+        for process in processes:
+            if process.exitcode:
+                logger.error("Worker process %s exited with code %s", process.pid, process.exitcode)
+        return None
+
+    def loop(self, worker_id):
+        try:
+            while not self.stopping.is_set():
+                self._maintain()
+                job = claim(worker_id)
+                if job is not None:
+                    run_job(job)
+                    with self._lock:
+                        self.processed += 1
+                # Give the connection back (or to the pool) like a finished request
+                close_old_connections()
+                if job is None:
+                    if self.burst:
+                        break
+                    self.stopping.wait(self.poll_interval)
+        finally:
+            connections.close_all()
+
+    def _maintain(self):
+        with self._lock:
+            if time.monotonic() < self._next_maintenance:
+                return
+            self._next_maintenance = time.monotonic() + self.MAINTENANCE_INTERVAL
+        try:
+            release_stale()
+            prune()
+            schedule_periodic()
+        except Exception:
+            logger.exception('Job queue maintenance failed')
+
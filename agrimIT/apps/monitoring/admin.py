@@ -0,0 +1,20 @@
+from django.contrib import admin
+from .models import QueryStat
+
+
+@admin.register(QueryStat)
+class QueryStatAdmin(admin.ModelAdmin):
+    list_display = ['view', 'short_fingerprint', 'calls', 'total_ms', 'max_ms', 'last_seen']
+    list_filter = ['view']
+    search_fields = ['fingerprint', 'view']
+    readonly_fields = [
+        'fingerprint_hash', 'view', 'fingerprint', 'calls', 'total_ms', 'max_ms',
+        'rows', 'histogram', 'first_seen', 'last_seen',
+    ]
+
+    @admin.display(description='Consulta')
+    def short_fingerprint(self, obj):
+        return obj.fingerprint[:100]
+
+    def has_add_permission(self, request):
+        return False
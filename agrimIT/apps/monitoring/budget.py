@@ -0,0 +1,144 @@
+"""
+Query budgets: a maximum number of SQL queries per view, plus detection of
+the same query shape repeating (the usual sign of an N+1).
+
+    from apps.monitoring.budget import query_budget
+
+    @login_required
+    @query_budget(8)
+    def project_view(request, pk):
+        ...
+
+Async views are supported too; their budget covers the queries the async
+ORM runs in the request's sync thread.
+
+What happens on a violation depends on QUERY_BUDGET_MODE:
+    'raise'  raise QueryBudgetExceeded (tests)
+    'log'    log a warning (dev, and prod together with QUERY_BUDGET_SAMPLE_RATE)
+    'off'    do not count at all
+"""
+
+import functools
+import logging
+import random
+from collections import Counter
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+from .querystats import fingerprint
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    """A view ran more queries than its budget, or repeated a query shape"""
+
+
+class QueryBudget:
+    """
+    Context manager that counts the queries run inside it on every database
+    connection and checks them against the budget on exit.
+    """
+
+    def __init__(self, name, max_queries, max_repeats=None, mode=None):
+        self.name = name
+        self.max_queries = max_queries
+        if max_repeats is None:
+            max_repeats = getattr(settings, 'QUERY_BUDGET_MAX_REPEATS', 5)
+        self.max_repeats = max_repeats
+        self.mode = mode or getattr(settings, 'QUERY_BUDGET_MODE', 'log')
+        self.count = 0
+        self.shapes = Counter()
+        self._stack = None
+
+    def _wrapper(self, execute, sql, params, many, context):
+        self.count += 1
+        self.shapes[fingerprint(sql)] += 1
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self._wrapper))
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._stack.close()
+        if exc_type is None:
+            self.check()
+        return False
+
+    async def __aenter__(self):
+        # The async ORM runs queries in the request's thread-sensitive sync
+        # thread, whose connections are not the event loop thread's
+        await sync_to_async(self.__enter__)()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        return self.__exit__(exc_type, exc_value, traceback)
+
+    def violations(self):
+        """Human readable list of what went over budget"""
+        problems = []
+        if self.max_queries is not None and self.count > self.max_queries:
+            problems.append(f"{self.count} queries (budget {self.max_queries})")
+        for shape, repeats in self.shapes.most_common():
+            if repeats <= self.max_repeats:
+                break
+            problems.append(f"query repeated {repeats} times (possible N+1): {shape[:200]}")
+        return problems
+
+    def check(self):
+        problems = self.violations()
+        if not problems:
+            return
+        message = f"Query budget exceeded in {self.name}: " + "; ".join(problems)
+        if self.mode == 'raise':
+            raise QueryBudgetExceeded(message)
+        logger.warning(message, extra={
+            'view': self.name,
+            'query_count': self.count,
+            'query_budget': self.max_queries,
+        })
+
+
+def budget_sampled():
+    mode = getattr(settings, 'QUERY_BUDGET_MODE', 'log')
+    if mode == 'off':
+        return False
+    rate = getattr(settings, 'QUERY_BUDGET_SAMPLE_RATE', 1.0)
+    return rate >= 1 or random.random() < rate
+
+
+def query_budget(max_queries, max_repeats=None):
+    """
+    Declare the maximum number of queries a view may run.
+
+    Args:
+        max_queries: Budget for the whole view, or None to only check repeats.
+        max_repeats: How many times one query shape may run before it is
+            reported as an N+1 (defaults to QUERY_BUDGET_MAX_REPEATS).
+    """
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            @functools.wraps(view_func)
+            async def async_wrapper(request, *args, **kwargs):
+                if not budget_sampled():
+                    return await view_func(request, *args, **kwargs)
+                async with QueryBudget(view_func.__qualname__, max_queries, max_repeats):
+                    return await view_func(request, *args, **kwargs)
+            async_wrapper.query_budget = max_queries
+            return async_wrapper
+
+        @functools.wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if not budget_sampled():
+                return view_func(request, *args, **kwargs)
+            with QueryBudget(view_func.__qualname__, max_queries, max_repeats):
+                return view_func(request, *args, **kwargs)
+        wrapper.query_budget = max_queries
+        return wrapper
+    return decorator
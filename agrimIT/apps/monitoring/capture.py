@@ -0,0 +1,157 @@
+"""
+Sanitized traffic traces.
+
+A trace is a JSON Lines file with one compact record per request:
+
+    {"ts": 1760000000.123, "m": "GET", "r": "projectview", "k": {"pk": "int@9f2c1a"},
+     "q": {"page": "int"}, "f": {}, "u": 3, "x": 0, "s": 200, "ms": 41.2}
+
+ts: arrival time, m: method, r: URL name, k: URL kwargs shape, q: query
+string shape, f: POST body shape, u: user bucket (None when anonymous),
+x: AJAX request, s: status code, ms: server-side duration.
+
+No values are ever stored: only parameter names and a shape (``int``,
+``date``, ``month``, ``empty``, ``str:<length>``, ``file:<KB>``). Fields
+named like credentials (password, old_password, new_password1, token,
+secret...) get the constant shape ``secret``, without even a length. Users
+are reduced to one of TRAFFIC_CAPTURE_USER_BUCKETS anonymous buckets. Ids
+in the URL carry a salted hash (``int@<token>``) so the replay can tell that
+two requests touched the same object (upload then download of a project's
+file) without knowing which one. That is enough for ``replay_traffic`` to
+rebuild equivalent requests.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+INT_RE = re.compile(r'^-?\d+$')
+DATE_RE = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+MONTH_RE = re.compile(r'^\d{4}-\d{2}$')
+NAME_RE = re.compile(r'^[\w.\-\[\]]{1,64}$')
+
+# Never recorded, not even their shape
+IGNORED_FIELDS = {'csrfmiddlewaretoken'}
+
+# Recorded with the constant shape SECRET_SHAPE
+SECRET_FIELD_RE = re.compile(r'password|token|secret', re.IGNORECASE)
+SECRET_SHAPE = 'secret'
+
+
+def value_shape(value):
+    """Shape of one parameter value, without the value itself"""
+    if value == '':
+        return 'empty'
+    if INT_RE.match(value):
+        return 'int'
+    if MONTH_RE.match(value):
+        return 'month'
+    if DATE_RE.match(value):
+        return 'date'
+    return f"str:{min(len(value), 999)}"
+
+
+def params_shape(params, files=None):
+    """
+    Shape of a QueryDict (and uploaded files): {name: shape}. Repeated
+    names keep the shape of their last value; names that do not look like
+    field names are dropped, credentials are SECRET_SHAPE.
+    """
+    shape = {}
+    for name in params:
+        if name in IGNORED_FIELDS or not NAME_RE.match(name):
+            continue
+        if SECRET_FIELD_RE.search(name):
+            shape[name] = SECRET_SHAPE
+        else:
+            shape[name] = value_shape(params.get(name, ''))
+    for name, upload in (files or {}).items():
+        if NAME_RE.match(name):
+            shape[name] = f"file:{max(round(upload.size / 1024), 1)}"
+    return shape
+
+
+def id_token(value, salt=''):
+    """Short salted hash of an object id, equal for equal ids"""
+    return hashlib.blake2b(f"{salt}:id:{value}".encode(), digest_size=3).hexdigest()
+
+
+def user_bucket(user, buckets, salt=''):
+    """Stable anonymous bucket for an authenticated user, None otherwise"""
+    if not user.is_authenticated:
+        return None
+    digest = hashlib.blake2b(f"{salt}:{user.pk}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') % buckets
+
+
+class TraceWriter:
+    """
+    Buffered, process-safe appender for a trace file.
+
+    Records are buffered and written with a single ``os.write`` on an
+    O_APPEND descriptor, so lines from several gunicorn workers never
+    interleave. Writing stops once the file reaches ``max_bytes``.
+    """
+
+    def __init__(self, path, flush_every=50, flush_interval=5.0, max_bytes=None):
+        self.path = path
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._fd = None
+        self.full = False
+
+    def write(self, record):
+        if self.full:
+            return
+        line = json.dumps(record, separators=(',', ':')) + '\n'
+        with self._lock:
+            self._buffer.append(line)
+            due = (
+                len(self._buffer) >= self.flush_every
+                or time.monotonic() - self._last_flush >= self.flush_interval
+            )
+            if not due:
+                return
+            lines, self._buffer = self._buffer, []
+            self._last_flush = time.monotonic()
+        self._write(lines)
+
+    def flush(self):
+        with self._lock:
+            lines, self._buffer = self._buffer, []
+            self._last_flush = time.monotonic()
+        if lines:
+            self._write(lines)
+
+    def _write(self, lines):
+        if self._fd is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o640)
+        if self.max_bytes and os.fstat(self._fd).st_size >= self.max_bytes:
+            self.full = True
+            return
+        os.write(self._fd, ''.join(lines).encode())
+
+
+def read_trace(path):
+    """Records of a trace file sorted by arrival time, skipping broken lines"""
+    records = []
+    with open(path) as fh:
+        for line in fh:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(record, dict) and 'ts' in record and 'r' in record:
+                records.append(record)
+    records.sort(key=lambda record: record['ts'])
+    return records
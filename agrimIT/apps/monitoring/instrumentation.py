@@ -0,0 +1,94 @@
+"""
+Per-request performance counters.
+
+The metrics of the request being served live in a context variable, so any
+code can add to them without passing the request around:
+
+    from apps.monitoring.instrumentation import timed
+
+    with timed('storage'):
+        supabase.storage.from_(bucket).upload(name, content)
+
+Outside a sampled request every helper here is a no-op.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+
+_current = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    """Counters collected while serving one request"""
+
+    __slots__ = ('view', 'started', 'counts', 'durations')
+
+    def __init__(self, view=''):
+        self.view = view
+        self.started = time.perf_counter()
+        # Number of calls and total seconds, per kind ('sql', 'storage'...)
+        self.counts = {}
+        self.durations = {}
+
+    def add(self, kind, duration, count=1):
+        self.counts[kind] = self.counts.get(kind, 0) + count
+        self.durations[kind] = self.durations.get(kind, 0.0) + duration
+
+    def wall_time(self):
+        return time.perf_counter() - self.started
+
+    def as_dict(self):
+        """Flat, log-friendly representation (milliseconds, rounded)"""
+        data = {'view': self.view, 'wall_ms': round(self.wall_time() * 1000, 2)}
+        for kind in sorted(self.counts):
+            data[f'{kind}_count'] = self.counts[kind]
+            data[f'{kind}_ms'] = round(self.durations[kind] * 1000, 2)
+        return data
+
+
+def start(view=''):
+    """Begin collecting metrics for the current request; returns a reset token"""
+    return _current.set(RequestMetrics(view))
+
+
+def stop(token):
+    """Stop collecting and return the metrics collected since ``start``"""
+    metrics = _current.get()
+    _current.reset(token)
+    return metrics
+
+
+def current():
+    """Metrics of the request being served, or None when not sampled"""
+    return _current.get()
+
+
+def record(kind, duration, count=1):
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.add(kind, duration, count)
+
+
+@contextmanager
+def timed(kind):
+    """Add the time spent in the block to ``kind`` for the current request"""
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.add(kind, time.perf_counter() - started)
+
+
+def sql_wrapper(execute, sql, params, many, context):
+    """``connection.execute_wrapper`` hook that times every query"""
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        record('sql', time.perf_counter() - started)
@@ -0,0 +1,424 @@
+"""
+HTTP load generator for the main user journeys.
+
+Each virtual user logs in with its own session and keeps picking a journey
+(weighted by JOURNEYS) until the deadline: browsing the dashboard and lists,
+typeahead search bursts, creating and modifying projects, posting advances
+and expenses, browsing the balance pages and uploading/downloading files.
+Every request is timed and recorded under an endpoint name (the URL pattern,
+not the concrete URL) so the report can give RPS, latency percentiles and
+error rates per endpoint, and reports from two runs can be compared.
+"""
+
+import io
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import date
+
+import httpx
+from django.conf import settings
+
+from apps.project_admin.models import Project
+from apps.users.models import User
+
+
+# gunicorn worker class of the ASGI deployment (see the Procfile)
+ASGI_WORKER = 'uvicorn_worker.UvicornWorker'
+SEARCH_TERMS = ['González', 'Rodríguez', 'Fernández', 'La Plata', 'Mensura', 'Berisso', '4512']
+PERCENTILES = (50, 90, 95, 99)
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(pct / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+class Recorder:
+    """Latencies and failures per endpoint"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self._lock = threading.Lock()
+
+    def add(self, name, elapsed_ms, status):
+        with self._lock:
+            self.latencies[name].append(elapsed_ms)
+            self.statuses[name][status] += 1
+            if status == 'error' or status >= 400:
+                self.errors[name] += 1
+
+    def merge(self, other):
+        for name, values in other.latencies.items():
+            self.latencies[name].extend(values)
+        for name, count in other.errors.items():
+            self.errors[name] += count
+        for name, statuses in other.statuses.items():
+            for status, count in statuses.items():
+                self.statuses[name][status] += count
+
+
+class VirtualUser:
+    """
+    One logged-in browser session running journeys against ``base_url``.
+
+    Args:
+        base_url: Root URL of the server under test.
+        username, password: Credentials of a seeded user.
+        project_ids: Primary keys of projects owned by that user.
+        rng: random.Random driving every choice, for reproducible runs.
+        think_time: Mean pause in seconds between journeys.
+    """
+
+    def __init__(self, base_url, username, password, project_ids, rng, think_time=0.5):
+        self.base_url = base_url.rstrip('/')
+        self.username = username
+        self.password = password
+        self.project_ids = list(project_ids)
+        self.own_projects = []
+        self.rng = rng
+        self.think_time = think_time
+        self.recorder = Recorder()
+        self.client = httpx.Client(base_url=self.base_url, follow_redirects=False, timeout=60)
+
+    def close(self):
+        self.client.close()
+
+    # HTTP helpers --------------------------------------------------------
+
+    def request(self, name, method, url, ajax=False, referer=None, **kwargs):
+        headers = kwargs.pop('headers', {})
+        if method != 'GET':
+            headers['X-CSRFToken'] = self.client.cookies.get('csrftoken', '')
+            headers.setdefault('Referer', f"{self.base_url}{referer or url}")
+        elif referer:
+            headers['Referer'] = f"{self.base_url}{referer}"
+        if ajax:
+            headers['X-Requested-With'] = 'XMLHttpRequest'
+        started = time.perf_counter()
+        try:
+            response = self.client.request(method, url, headers=headers, **kwargs)
+            response.read()
+        except httpx.HTTPError:
+            self.recorder.add(name, (time.perf_counter() - started) * 1000, 'error')
+            return None
+        self.recorder.add(name, (time.perf_counter() - started) * 1000, response.status_code)
+        return response
+
+    def pick_project(self):
+        return self.rng.choice(self.own_projects or self.project_ids)
+
+    def pause(self, seconds):
+        if seconds:
+            time.sleep(self.rng.expovariate(1 / seconds))
+
+    # Journeys ------------------------------------------------------------
+
+    def login(self):
+        self.request('GET /users/login/', 'GET', '/users/login/')
+        response = self.request('POST /users/login/', 'POST', '/users/login/', data={
+            'username': self.username,
+            'password': self.password,
+            'csrfmiddlewaretoken': self.client.cookies.get('csrftoken', ''),
+        })
+        return response is not None and response.status_code == 302
+
+    def browse(self):
+        self.request('GET /', 'GET', '/')
+        self.request('GET /projects/', 'GET', '/projects/')
+        self.request('GET /projects/?page=', 'GET', '/projects/', params={'page': self.rng.randint(2, 5)})
+        self.request('GET /project/<pk>', 'GET', f"/project/{self.pick_project()}")
+        self.request('GET /history', 'GET', '/history')
+
+    def search(self):
+        # Typeahead: one request per keystroke, a few tens of ms apart
+        term = self.rng.choice(SEARCH_TERMS)
+        for length in range(2, len(term) + 1):
+            self.request('GET /search/', 'GET', '/search/', ajax=True, params={'query': term[:length]})
+            time.sleep(self.rng.uniform(0.03, 0.12))
+
+    def create_project(self):
+        self.request('GET /create/', 'GET', '/create/')
+        response = self.request('POST /create/', 'POST', '/create/', data={
+            'type': self.rng.choice(['Mensura', 'Estado Parcelario', 'Relevamiento']),
+            'titular_name': f"Carga {self.rng.randint(1, 10**6)}",
+            'titular_phone': '221-5550000',
+            'partido': 'La Plata',
+            'partida': str(self.rng.randint(100000, 999999)),
+            'street': 'Calle 7',
+            'street_num': str(self.rng.randint(1, 3000)),
+            'client-name': f"Cliente carga {self.username}",
+            'client-phone': '221-5550001',
+            'save_and_backhome': '1',
+        })
+        if response is not None and response.status_code == 302:
+            pk = response.headers['Location'].rstrip('/').rsplit('/', 1)[-1]
+            if pk.isdigit():
+                self.own_projects.append(int(pk))
+                self.request('GET /project/<pk>', 'GET', f"/project/{pk}")
+
+    def modify_project(self):
+        pk = self.pick_project()
+        page = f"/project/{pk}"
+        self.request('GET /project/<pk>', 'GET', page)
+        self.request('POST /project/mod/<pk>', 'POST', f"/project/mod/{pk}", referer=page, data={
+            'titular': f"Titular {self.rng.randint(1, 10**6)}",
+            'proc': self.rng.choice(['Visado', 'Catastro', 'Geodesia']),
+        })
+
+    def post_movements(self):
+        pk = self.pick_project()
+        for kind in self.rng.sample(['ADV', 'EXP'], 2):
+            self.request('POST /accounting/createacc/<pk>/', 'POST', f"/accounting/createacc/{pk}/", data={
+                'movement_type': kind,
+                'amount': str(self.rng.randrange(5000, 200000, 500)),
+                'description': 'Movimiento de carga',
+            })
+        self.request('GET /accounting/<pk>/', 'GET', f"/accounting/{pk}/")
+
+    def browse_balance(self):
+        today = date.today()
+        self.request('GET /accounting/balance/', 'GET', '/accounting/balance/')
+        for _ in range(2):
+            months_back = self.rng.randint(0, 23)
+            year, month = divmod(today.year * 12 + today.month - 1 - months_back, 12)
+            period = f"{year}-{month + 1:02d}"
+            self.request('POST /accounting/balance/', 'POST', '/accounting/balance/', data={'date': period})
+            self.request('POST /accounting/chart-data/', 'POST', '/accounting/chart-data/',
+                         ajax=True, data={'date': period})
+            self.request('POST /accounting/balance-info/', 'POST', '/accounting/balance-info/',
+                         ajax=True, data={'date': period})
+
+    def files(self):
+        # Each session works on a project it created, so a project never
+        # ends up with two files from concurrent uploads
+        if not self.own_projects:
+            self.create_project()
+            if not self.own_projects:
+                return
+        pk = self.rng.choice(self.own_projects)
+        page = f"/project/{pk}"
+        content = self.rng.randbytes(self.rng.randint(20, 200) * 1024)
+        self.request('POST /upload/<pk>', 'POST', f"/upload/{pk}", referer=page, files={
+            'file_field': ('plano.pdf', io.BytesIO(content), 'application/pdf'),
+        })
+        self.request('GET /filesview/<pk>', 'GET', f"/filesview/{pk}")
+        self.request('GET /download/<pk>/', 'GET', f"/download/{pk}/")
+        self.request('GET /deletefile/<pk>', 'GET', f"/deletefile/{pk}", referer=page)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_gunicorn(storage_url, workers=2, worker_class=ASGI_WORKER, threads=1, timeout=30, app=None,
+                   env=None, wait=True):
+    """
+    Start gunicorn on a free local port, with storage pointed at
+    ``storage_url`` and ``env`` added to the environment, and wait until it
+    answers (unless ``wait`` is false). ``app`` defaults to the ASGI
+    application for uvicorn workers and to the WSGI one otherwise.
+
+    Returns:
+        (process, base_url). Raises RuntimeError if it does not come up.
+    """
+    if app is None:
+        app = 'agrimIT.asgi:application' if 'uvicorn' in worker_class.lower() else 'agrimIT.wsgi:application'
+    port = free_port()
+    env = dict(
+        os.environ,
+        SUPABASE_URL=storage_url,
+        SUPABASE_KEY='loadtest',
+        SUPABASE_BUCKET='loadtest',
+        DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'agrimIT.settings.dev'),
+        **(env or {}),
+    )
+    process = subprocess.Popen(
+        [
+            sys.executable, '-m', 'gunicorn',
+            '--bind', f"127.0.0.1:{port}",
+            '--workers', str(workers),
+            '--worker-class', worker_class,
+            '--threads', str(threads),
+            '--timeout', '60',
+            '--log-level', 'warning',
+            app,
+        ],
+        cwd=settings.BASE_DIR.parent,
+        env=env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    if not wait:
+        return process, base_url
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with code {process.returncode}")
+        try:
+            httpx.get(f"{base_url}/users/login/", timeout=2)
+            return process, base_url
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"gunicorn did not start within {timeout} seconds")
+
+
+def load_accounts(prefix, password, limit=None):
+    """
+    (username, password, project_ids) of the seeded load-test users, for
+    ``run_load``. Users without projects are left out.
+    """
+    users = User.objects.filter(username__startswith=prefix).order_by('username')
+    accounts = []
+    for user in users[:limit] if limit else users:
+        project_ids = list(Project.objects.filter(user=user).values_list('pk', flat=True)[:500])
+        if project_ids:
+            accounts.append((user.username, password, project_ids))
+    return accounts
+
+
+# name: (weight, VirtualUser method)
+JOURNEYS = {
+    'browse': (30, VirtualUser.browse),
+    'search': (20, VirtualUser.search),
+    'create': (8, VirtualUser.create_project),
+    'modify': (12, VirtualUser.modify_project),
+    'movements': (12, VirtualUser.post_movements),
+    'balance': (12, VirtualUser.browse_balance),
+    'files': (6, VirtualUser.files),
+}
+
+
+def run_load(base_url, accounts, users=10, duration=60, journeys=None, think_time=0.5,
+             ramp_up=5, seed=0):
+    """
+    Run ``users`` virtual users for ``duration`` seconds.
+
+    Args:
+        base_url: Root URL of the server under test.
+        accounts: List of (username, password, project_ids), assigned to the
+            virtual users round-robin.
+        journeys: Names from JOURNEYS to run (all of them by default).
+        ramp_up: Seconds over which the virtual users are started.
+
+    Returns:
+        Report dict (see ``build_report``).
+    """
+    selected = {name: JOURNEYS[name] for name in (journeys or JOURNEYS)}
+    names = list(selected)
+    weights = [selected[name][0] for name in names]
+    recorders = []
+    login_failures = []
+    lock = threading.Lock()
+    started = time.perf_counter()
+    deadline = started + ramp_up + duration
+
+    def worker(index):
+        username, password, project_ids = accounts[index % len(accounts)]
+        user = VirtualUser(base_url, username, password, project_ids,
+                           random.Random(seed * 1000 + index), think_time)
+        try:
+            time.sleep(ramp_up * index / max(users, 1))
+            if not user.login():
+                login_failures.append(username)
+                return
+            while time.perf_counter() < deadline:
+                name = user.rng.choices(names, weights)[0]
+                selected[name][1](user)
+                user.pause(think_time)
+        finally:
+            user.close()
+            with lock:
+                recorders.append(user.recorder)
+
+    threads = [threading.Thread(target=worker, args=(index,), daemon=True) for index in range(users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    recorder = Recorder()
+    for other in recorders:
+        recorder.merge(other)
+    return build_report(recorder, time.perf_counter() - started, {
+        'base_url': base_url,
+        'users': users,
+        'duration': duration,
+        'ramp_up': ramp_up,
+        'think_time': think_time,
+        'journeys': names,
+        'login_failures': len(login_failures),
+    })
+
+
+def build_report(recorder, elapsed, config):
+    """
+    Summarize a run:
+
+        {'config': {...}, 'elapsed': s, 'total': {...},
+         'endpoints': {name: {'requests', 'rps', 'errors', 'error_rate',
+                              'p50', 'p90', 'p95', 'p99', 'max', 'statuses'}}}
+    """
+    def summary(values, errors):
+        values = sorted(values)
+        result = {
+            'requests': len(values),
+            'rps': round(len(values) / elapsed, 2) if elapsed else 0.0,
+            'errors': errors,
+            'error_rate': round(errors / len(values), 4) if values else 0.0,
+            'max': round(values[-1], 2) if values else 0.0,
+        }
+        for pct in PERCENTILES:
+            result[f"p{pct}"] = round(percentile(values, pct), 2)
+        return result
+
+    endpoints = {}
+    for name in sorted(recorder.latencies):
+        endpoints[name] = summary(recorder.latencies[name], recorder.errors[name])
+        endpoints[name]['statuses'] = {str(status): count for status, count in recorder.statuses[name].items()}
+    everything = [value for values in recorder.latencies.values() for value in values]
+    return {
+        'config': config,
+        'elapsed': round(elapsed, 2),
+        'total': summary(everything, sum(recorder.errors.values())),
+        'endpoints': endpoints,
+    }
+
+
+def format_report(report, baseline=None):
+    """Report as text table lines; with a baseline, adds RPS and p95 deltas"""
+    header = f"{'Endpoint':<36} {'Reqs':>6} {'RPS':>7} {'Err%':>6} {'p50':>8} {'p90':>8} {'p95':>8} {'p99':>8}"
+    if baseline:
+        header += f" {'ΔRPS':>8} {'Δp95':>8}"
+    lines = [header, '-' * len(header)]
+    rows = list(report['endpoints'].items()) + [('TOTAL', report['total'])]
+    for name, row in rows:
+        line = (
+            f"{name:<36} {row['requests']:>6} {row['rps']:>7.1f} {row['error_rate'] * 100:>5.1f}% "
+            f"{row['p50']:>6.0f}ms {row['p90']:>6.0f}ms {row['p95']:>6.0f}ms {row['p99']:>6.0f}ms"
+        )
+        if baseline:
+            before = baseline['total'] if name == 'TOTAL' else baseline['endpoints'].get(name)
+            if before:
+                line += f" {_delta(row['rps'], before['rps']):>8} {_delta(row['p95'], before['p95']):>8}"
+        lines.append(line)
+    return lines
+
+
+def _delta(value, before):
+    if not before:
+        return 'n/a'
+    return f"{(value - before) / before * 100:+.0f}%"
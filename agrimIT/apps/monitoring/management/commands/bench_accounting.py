@@ -0,0 +1,211 @@
+import io
+import json
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, reset_queries
+from django.test.utils import CaptureQueriesContext, setup_databases, teardown_databases
+
+from apps.accounting.models import MonthlyFinancialSummary
+from apps.accounting.views import (
+    balance_anual,
+    create_acc_entry,
+    define_type_for_summary,
+    format_currency,
+    get_financial_data,
+    get_monthly_networth_data,
+)
+from apps.project_admin.models import Project
+from apps.users.models import User
+
+
+# Scale name: AccountMovement rows in the dataset
+SCALES = {'1k': 1_000, '100k': 100_000, '1m': 1_000_000}
+MOVEMENTS_PER_PROJECT = 10
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the accounting and reporting hot paths at 1k, 100k and 1M '
+        'movement rows in a throwaway test database (SQLite, or the database '
+        'in DATABASE_URL), recording time, queries and peak memory, and '
+        'compare them with a stored baseline'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', action='append', dest='scales', choices=list(SCALES),
+                            help='Dataset size to run (repeatable, default: all)')
+        parser.add_argument('--repeat', type=int, default=5,
+                            help='Timed runs per benchmark, the median is reported (default: 5)')
+        parser.add_argument('--baseline', default=os.path.join(settings.BASE_DIR.parent, 'bench-baseline.json'),
+                            help='Baseline JSON file (default: bench-baseline.json next to manage.py)')
+        parser.add_argument('--save-baseline', action='store_true',
+                            help='Store these results in the baseline file instead of comparing')
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help='Allowed slowdown/memory growth over the baseline (default: 0.2 = 20%%)')
+        parser.add_argument('--output', help='Also write the results as JSON to this file')
+
+    def handle(self, *args, **options):
+        scales = options['scales'] or list(SCALES)
+        self.repeat = options['repeat']
+        vendor = connection.vendor
+        results = {}
+
+        for scale in scales:
+            self.stdout.write(f"📦 {vendor} {scale}: building {SCALES[scale]:,} movements")
+            with self.throwaway_database():
+                started = time.perf_counter()
+                user = self.seed(SCALES[scale])
+                self.stdout.write(f"   seeded in {time.perf_counter() - started:.1f}s")
+                results[f"{vendor}:{scale}"] = self.run_benchmarks(user)
+
+        self.report(results)
+        if options['output']:
+            self.write_json(options['output'], results)
+
+        if options['save_baseline']:
+            baseline = self.read_json(options['baseline']) or {}
+            baseline.update(results)
+            self.write_json(options['baseline'], baseline)
+            self.stdout.write(self.style.SUCCESS(f"💾 Baseline saved to {options['baseline']}"))
+            return
+
+        baseline = self.read_json(options['baseline'])
+        if baseline is None:
+            self.stdout.write(f"No baseline at {options['baseline']}, run with --save-baseline to create one")
+            return
+        regressions = self.compare(results, baseline, options['threshold'])
+        if regressions:
+            for line in regressions:
+                self.stdout.write(self.style.ERROR(f"❌ {line}"))
+            raise CommandError(f"{len(regressions)} benchmark regressions over {options['threshold']:.0%}")
+        self.stdout.write(self.style.SUCCESS('✅ No regressions against the baseline'))
+
+    # Database and data -------------------------------------------------------
+
+    @contextmanager
+    def throwaway_database(self):
+        """
+        Test database that is destroyed afterwards. On SQLite it is a
+        temporary file rather than memory, so timings include real I/O.
+        """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            if connection.vendor == 'sqlite':
+                connection.settings_dict.setdefault('TEST', {})['NAME'] = os.path.join(tmpdir, 'bench.sqlite3')
+            config = setup_databases(verbosity=0, interactive=False, aliases={'default'})
+            try:
+                yield
+            finally:
+                teardown_databases(config, verbosity=0)
+
+    def seed(self, movements):
+        projects = max(movements // MOVEMENTS_PER_PROJECT, 1)
+        call_command(
+            'generate_scale_data', users=1, clients=max(projects // 20, 10), projects=projects,
+            movements=MOVEMENTS_PER_PROJECT, years=3, teams=0, prefix='bench',
+            batch_size=10_000, stdout=io.StringIO(),
+        )
+        return User.objects.get(username__startswith='bench')
+
+    # Measuring -------------------------------------------------------------
+
+    def measure(self, func, number=1):
+        """
+        Median seconds per call over ``self.repeat`` runs of ``number`` calls,
+        queries per call, and peak traced memory of one call (measured in a
+        separate run, tracemalloc slows everything down).
+        """
+        func()  # warm caches and lazy imports
+        # A full query log (seeding logs thousands) would make the count 0
+        reset_queries()
+        with CaptureQueriesContext(connection) as captured:
+            func()
+        queries = len(captured.captured_queries)
+
+        timings = []
+        for _ in range(self.repeat):
+            started = time.perf_counter()
+            for _ in range(number):
+                func()
+            timings.append((time.perf_counter() - started) / number)
+
+        tracemalloc.start()
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        return {
+            'ms': round(statistics.median(timings) * 1000, 4),
+            'queries': queries,
+            'peak_kb': round(peak / 1024, 1),
+        }
+
+    def run_benchmarks(self, user):
+        latest = MonthlyFinancialSummary.objects.filter(user=user).order_by('-year', '-month').first()
+        year, month = latest.year, latest.month
+        project = Project.objects.filter(user=user).select_related('account').order_by('-created').first()
+
+        benchmarks = {
+            'create_acc_entry': lambda: create_acc_entry(project, 'adv', None, Decimal('1500.00')),
+            'define_type_for_summary': lambda: define_type_for_summary(latest, project.type, Decimal('10.00')),
+            'get_financial_data': lambda: get_financial_data(year, month, user),
+            'balance_anual': lambda: balance_anual(year, user),
+            'get_monthly_networth_data': lambda: get_monthly_networth_data(year, user),
+            'format_currency': lambda: format_currency(Decimal('1234567.891')),
+        }
+        results = {}
+        for name, func in benchmarks.items():
+            number = 10_000 if name == 'format_currency' else 1
+            results[name] = self.measure(func, number)
+            self.stdout.write(
+                f"   {name:<28} {results[name]['ms']:>10.4f} ms {results[name]['queries']:>4} queries "
+                f"{results[name]['peak_kb']:>10.1f} KB"
+            )
+        return results
+
+    # Baseline --------------------------------------------------------------
+
+    def compare(self, results, baseline, threshold):
+        regressions = []
+        for key, benchmarks in results.items():
+            for name, current in benchmarks.items():
+                before = baseline.get(key, {}).get(name)
+                if not before:
+                    continue
+                if current['queries'] > before['queries']:
+                    regressions.append(f"{key} {name}: {current['queries']} queries (was {before['queries']})")
+                if current['ms'] > before['ms'] * (1 + threshold):
+                    regressions.append(f"{key} {name}: {current['ms']} ms (was {before['ms']})")
+                if current['peak_kb'] > before['peak_kb'] * (1 + threshold):
+                    regressions.append(f"{key} {name}: {current['peak_kb']} KB peak (was {before['peak_kb']})")
+        return regressions
+
+    def report(self, results):
+        self.stdout.write('')
+        self.stdout.write(f"{'Dataset':<18} {'Benchmark':<28} {'ms':>10} {'queries':>8} {'peak KB':>10}")
+        for key, benchmarks in results.items():
+            for name, result in benchmarks.items():
+                self.stdout.write(
+                    f"{key:<18} {name:<28} {result['ms']:>10.4f} {result['queries']:>8} {result['peak_kb']:>10.1f}"
+                )
+
+    @staticmethod
+    def read_json(path):
+        try:
+            with open(path) as fh:
+                return json.load(fh)
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    def write_json(path, data):
+        with open(path, 'w') as fh:
+            json.dump(data, fh, indent=2, sort_keys=True)
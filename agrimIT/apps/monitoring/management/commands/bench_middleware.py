@@ -0,0 +1,87 @@
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+from django.utils.module_loading import import_string
+
+
+DEFAULT_MIDDLEWARE = [
+    'agrimIT.middleware.SecurityHeadersMiddleware',
+    'agrimIT.middleware.RateLimitMiddleware',
+    'agrimIT.middleware.IPWhitelistMiddleware',
+    'agrimIT.middleware.RequestSizeLimitMiddleware',
+]
+
+DEFAULT_PATHS = [
+    '/',
+    '/projects/',
+    '/project/123',
+    '/accounting/chart-data/',
+    '/static/css/styles.css',
+    '/admin/',
+]
+
+
+class BenchUser:
+    """Logged-in user stand-in, so RateLimitMiddleware takes its common path"""
+    is_authenticated = True
+
+
+class Command(BaseCommand):
+    help = 'Measure the per-request overhead of the custom middleware'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50000,
+                            help='Requests per middleware (default: 50000)')
+        parser.add_argument('--middleware', action='append', dest='middleware',
+                            help='Dotted path of a middleware to measure (repeatable)')
+        parser.add_argument('--path', action='append', dest='paths',
+                            help='Request path to cycle through (repeatable)')
+        parser.add_argument('--anonymous', action='store_true',
+                            help='Send anonymous requests (rate limiter hits the cache)')
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        paths = options['paths'] or DEFAULT_PATHS
+        requests = self._build_requests(paths, options['anonymous'])
+
+        # One shared response keeps the view cost out of the numbers
+        response = HttpResponse('ok')
+
+        def view(request):
+            return response
+
+        baseline = self._measure(view, requests, iterations)
+        self.stdout.write(f"Baseline (no middleware): {baseline:,.0f} ns/request")
+
+        # Measure with the production switches on, so nothing is skipped for DEBUG
+        with override_settings(DEBUG=False):
+            for dotted_path in options['middleware'] or DEFAULT_MIDDLEWARE:
+                middleware = import_string(dotted_path)(view)
+                elapsed = self._measure(middleware, requests, iterations)
+                self.stdout.write(
+                    f"{dotted_path}: {elapsed:,.0f} ns/request "
+                    f"(+{elapsed - baseline:,.0f} ns over baseline)"
+                )
+
+    def _build_requests(self, paths, anonymous):
+        factory = RequestFactory()
+        requests = []
+        for path in paths:
+            request = factory.get(path)
+            request.user = AnonymousUser() if anonymous else BenchUser()
+            requests.append(request)
+        return requests
+
+    def _measure(self, handler, requests, iterations):
+        """Average nanoseconds per call of ``handler`` over ``iterations`` requests"""
+        count = len(requests)
+        # Warm-up so one-time costs do not count
+        for request in requests:
+            handler(request)
+        start = time.perf_counter_ns()
+        for i in range(iterations):
+            handler(requests[i % count])
+        return (time.perf_counter_ns() - start) / iterations
@@ -0,0 +1,111 @@
+import json
+import threading
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.monitoring.loadtest import ASGI_WORKER, load_accounts, run_load, start_gunicorn
+from apps.monitoring.storage_stub import StorageStub
+
+
+# Deployment mode: gunicorn worker class
+MODES = {'wsgi': 'sync', 'asgi': ASGI_WORKER}
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the WSGI (sync workers) and ASGI (uvicorn workers) deployments '
+        'while storage is slow: some virtual users keep uploading, downloading '
+        'and deleting files against a storage stand-in with high latency while '
+        'others browse, and the throughput and latency of both groups are '
+        'reported per mode. Uses the load-test users (loadtest --seed-data)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mode', action='append', dest='modes', choices=list(MODES),
+                            help='Deployment to run (repeatable, default: both)')
+        parser.add_argument('--workers', type=int, default=2, help='gunicorn workers (default: 2)')
+        parser.add_argument('--storage-latency', type=float, default=1.0,
+                            help='Seconds added to every storage call (default: 1.0)')
+        parser.add_argument('--file-users', type=int, default=8,
+                            help='Virtual users running the files journey (default: 8)')
+        parser.add_argument('--browse-users', type=int, default=4,
+                            help='Virtual users browsing at the same time (default: 4)')
+        parser.add_argument('--duration', type=int, default=30, help='Seconds of load per mode (default: 30)')
+        parser.add_argument('--think-time', type=float, default=0.1,
+                            help='Mean pause between journeys, in seconds (default: 0.1)')
+        parser.add_argument('--prefix', default='loadtest', help='Username prefix (default: loadtest)')
+        parser.add_argument('--password', default='loadtest-password', help='Password of the seeded users')
+        parser.add_argument('--output', help='Write the JSON results to this file')
+
+    def handle(self, *args, **options):
+        accounts = load_accounts(options['prefix'], options['password'])
+        if not accounts:
+            raise CommandError(
+                f"No users with prefix '{options['prefix']}' and projects found, "
+                f"create them with: manage.py loadtest --seed-data"
+            )
+
+        results = {}
+        for mode in options['modes'] or list(MODES):
+            self.stdout.write(
+                f"🐢 {mode}: {options['file_users']} file users + {options['browse_users']} browsing users, "
+                f"storage latency {options['storage_latency']}s, {options['workers']} x {MODES[mode]} workers"
+            )
+            results[mode] = self.run_mode(mode, accounts, options)
+
+        self.report(results)
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump(results, fh, indent=2)
+            self.stdout.write(f"📄 Results written to {options['output']}")
+
+    def run_mode(self, mode, accounts, options):
+        storage = StorageStub(latency=options['storage_latency']).start()
+        try:
+            try:
+                server, base_url = start_gunicorn(storage.url, options['workers'], MODES[mode])
+            except RuntimeError as exc:
+                raise CommandError(str(exc))
+            try:
+                groups = {'files': options['file_users'], 'browse': options['browse_users']}
+                reports = {}
+
+                def run(journey, users):
+                    reports[journey] = run_load(
+                        base_url, accounts, users=users, duration=options['duration'],
+                        journeys=[journey], think_time=options['think_time'], ramp_up=1,
+                    )
+
+                threads = [
+                    threading.Thread(target=run, args=(journey, users))
+                    for journey, users in groups.items() if users
+                ]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+            finally:
+                server.terminate()
+                server.wait(timeout=30)
+        finally:
+            storage.stop()
+        return {journey: report['total'] for journey, report in reports.items()}
+
+    def report(self, results):
+        self.stdout.write('')
+        header = f"{'Mode':<6} {'Group':<8} {'Reqs':>6} {'RPS':>7} {'Err%':>6} {'p50':>8} {'p95':>8} {'max':>8}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for mode, groups in results.items():
+            for group, row in groups.items():
+                self.stdout.write(
+                    f"{mode:<6} {group:<8} {row['requests']:>6} {row['rps']:>7.1f} "
+                    f"{row['error_rate'] * 100:>5.1f}% {row['p50']:>6.0f}ms {row['p95']:>6.0f}ms {row['max']:>6.0f}ms"
+                )
+        if {'wsgi', 'asgi'} <= set(results) and 'browse' in results['wsgi'] and 'browse' in results['asgi']:
+            before, after = results['wsgi']['browse']['p95'], results['asgi']['browse']['p95']
+            if after:
+                self.stdout.write(self.style.SUCCESS(
+                    f"Browsing p95 under slow storage: {before:.0f}ms (wsgi) vs {after:.0f}ms (asgi), "
+                    f"{before / after:.1f}x"
+                ))
@@ -0,0 +1,121 @@
+import json
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.monitoring.loadtest import (
+    ASGI_WORKER,
+    JOURNEYS,
+    format_report,
+    load_accounts,
+    run_load,
+    start_gunicorn,
+)
+from apps.monitoring.storage_stub import StorageStub
+
+
+class Command(BaseCommand):
+    help = (
+        'Load-test the main user journeys over HTTP and report RPS, latency '
+        'percentiles and error rates per endpoint. By default it starts '
+        'gunicorn (as deployed: 2 uvicorn workers, 60s timeout) against the configured '
+        'database with a local in-memory storage server in place of Supabase'
+    )
+
+    def add_arguments(self, parser):
+        server = parser.add_argument_group('server')
+        server.add_argument('--url', help='Test an already running server instead of starting gunicorn')
+        server.add_argument('--workers', type=int, default=2, help='gunicorn workers (default: 2)')
+        server.add_argument('--worker-class', default=ASGI_WORKER,
+                            help=f"gunicorn worker class, 'sync' serves the WSGI app (default: {ASGI_WORKER})")
+        server.add_argument('--threads', type=int, default=1, help='gunicorn threads per worker (default: 1)')
+        server.add_argument('--storage-latency', type=float, default=0.02,
+                            help='Seconds added to every storage call (default: 0.02)')
+
+        data = parser.add_argument_group('data')
+        data.add_argument('--seed-data', action='store_true',
+                          help='(Re)create the load-test users and their data with generate_scale_data')
+        data.add_argument('--accounts', type=int, default=5, help='Seeded users to log in as (default: 5)')
+        data.add_argument('--projects', type=int, default=1000,
+                          help='Projects per seeded user with --seed-data (default: 1000)')
+        data.add_argument('--prefix', default='loadtest', help='Username prefix (default: loadtest)')
+        data.add_argument('--password', default='loadtest-password', help='Password of the seeded users')
+
+        load = parser.add_argument_group('load')
+        load.add_argument('--users', type=int, default=10, help='Concurrent virtual users (default: 10)')
+        load.add_argument('--duration', type=int, default=60, help='Seconds of load after ramp-up (default: 60)')
+        load.add_argument('--ramp-up', type=float, default=5, help='Seconds to start every user (default: 5)')
+        load.add_argument('--think-time', type=float, default=0.5,
+                          help='Mean pause between journeys, in seconds (default: 0.5)')
+        load.add_argument('--journey', action='append', dest='journeys', choices=sorted(JOURNEYS),
+                          help='Journey to run (repeatable, default: all)')
+        load.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+
+        report = parser.add_argument_group('report')
+        report.add_argument('--output', help='Write the JSON report to this file')
+        report.add_argument('--baseline', help='JSON report of a previous run to compare with')
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as fh:
+                baseline = json.load(fh)
+
+        if options['seed_data']:
+            self.stdout.write(f"🌱 Seeding {options['accounts']} users with prefix '{options['prefix']}'")
+            call_command(
+                'generate_scale_data', users=options['accounts'], projects=options['projects'],
+                prefix=options['prefix'], password=options['password'], clear=True,
+                stdout=self.stdout,
+            )
+        accounts = load_accounts(options['prefix'], options['password'], options['accounts'])
+        if not accounts:
+            raise CommandError(
+                f"No users with prefix '{options['prefix']}' and projects found, run with --seed-data"
+            )
+
+        storage = server = None
+        try:
+            if options['url']:
+                base_url = options['url']
+            else:
+                storage = StorageStub(latency=options['storage_latency']).start()
+                try:
+                    server, base_url = start_gunicorn(
+                        storage.url, options['workers'], options['worker_class'], options['threads'],
+                    )
+                except RuntimeError as exc:
+                    raise CommandError(str(exc))
+            self.stdout.write(
+                f"🚀 {options['users']} users for {options['duration']}s against {base_url} "
+                f"({options['workers']} x {options['worker_class']} workers)" if server else
+                f"🚀 {options['users']} users for {options['duration']}s against {base_url}"
+            )
+            report = run_load(
+                base_url, accounts, users=options['users'], duration=options['duration'],
+                journeys=options['journeys'], think_time=options['think_time'],
+                ramp_up=options['ramp_up'], seed=options['seed'],
+            )
+        finally:
+            if server:
+                server.terminate()
+                server.wait(timeout=30)
+            if storage:
+                storage.stop()
+
+        report['config'].update({
+            'workers': options['workers'] if server else None,
+            'worker_class': options['worker_class'] if server else None,
+            'threads': options['threads'] if server else None,
+            'storage_latency': options['storage_latency'] if server else None,
+        })
+        for line in format_report(report, baseline):
+            self.stdout.write(line)
+        if report['config']['login_failures']:
+            self.stdout.write(self.style.WARNING(
+                f"⚠️ {report['config']['login_failures']} virtual users could not log in"
+            ))
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump(report, fh, indent=2)
+            self.stdout.write(f"📄 Report written to {options['output']}")
@@ -0,0 +1,78 @@
+import json
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.monitoring.startup import probe_startup
+
+
+class Command(BaseCommand):
+    help = (
+        'Report what worker startup costs: django.setup() and URLconf time in '
+        'a fresh interpreter, the slowest imports (python -X importtime) and '
+        'the import time per top-level package'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=25, help='Slowest imports to list (default: 25)')
+        parser.add_argument('--runs', type=int, default=3,
+                            help='Fresh interpreters to time, the best run is reported (default: 3)')
+        parser.add_argument('--no-urls', action='store_true',
+                            help='Only measure django.setup(), not the URLconf and views')
+        parser.add_argument('--module', action='append', dest='modules', default=[],
+                            help='Fail if this module is imported at startup (repeatable, e.g. supabase)')
+        parser.add_argument('--budget-ms', type=float,
+                            help='Fail if django.setup() plus the URLconf take longer than this')
+        parser.add_argument('--output', help='Write the report as JSON to this file')
+
+    def handle(self, *args, **options):
+        urls = not options['no_urls']
+        try:
+            timing = probe_startup(urls=urls, runs=options['runs'])
+            profile = probe_startup(urls=urls, importtime=True)
+        except RuntimeError as exc:
+            raise CommandError(str(exc))
+
+        total_ms = timing['setup_ms'] + timing['urls_ms']
+        self.stdout.write(
+            f"⏱️ django.setup() {timing['setup_ms']:.0f}ms"
+            + (f", URLconf {timing['urls_ms']:.0f}ms" if urls else '')
+            + f", {len(timing['modules'])} modules (best of {options['runs']})"
+        )
+
+        imports = profile['imports']
+        self.stdout.write('')
+        self.stdout.write(f"{'cumulative':>11} {'self':>8}  module")
+        for row in sorted(imports, key=lambda row: row['cumulative_ms'], reverse=True)[:options['top']]:
+            self.stdout.write(
+                f"{row['cumulative_ms']:>9.1f}ms {row['self_ms']:>6.1f}ms  {'  ' * row['depth']}{row['module']}"
+            )
+
+        packages = defaultdict(float)
+        for row in imports:
+            packages[row['module'].split('.')[0]] += row['self_ms']
+        ranked = sorted(packages.items(), key=lambda item: item[1], reverse=True)
+        self.stdout.write('')
+        self.stdout.write('Import time per package (self time, under -X importtime):')
+        for package, ms in ranked[:15]:
+            self.stdout.write(f"{ms:>9.1f}ms  {package}")
+
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump({
+                    'setup_ms': timing['setup_ms'],
+                    'urls_ms': timing['urls_ms'],
+                    'modules': len(timing['modules']),
+                    'packages': dict(ranked),
+                    'imports': imports,
+                }, fh, indent=2)
+            self.stdout.write(f"📄 Report written to {options['output']}")
+
+        problems = [
+            f"{module} is imported at startup" for module in options['modules']
+            if module in timing['modules']
+        ]
+        if options['budget_ms'] is not None and total_ms > options['budget_ms']:
+            problems.append(f"startup took {total_ms:.0f}ms (budget {options['budget_ms']:.0f}ms)")
+        if problems:
+            raise CommandError('; '.join(problems))
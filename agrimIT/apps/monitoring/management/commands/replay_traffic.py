@@ -0,0 +1,138 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.clients.models import Client
+from apps.monitoring.capture import read_trace
+from apps.monitoring.loadtest import ASGI_WORKER, format_report, start_gunicorn
+from apps.monitoring.replay import replay
+from apps.monitoring.storage_stub import StorageStub
+from apps.project_admin.models import Project
+from apps.teams.models import Team
+from apps.users.models import User
+
+
+def parse_speed(value):
+    """'1x', '10x', '0.5' or '0' (as fast as possible)"""
+    try:
+        speed = float(value.lower().rstrip('x'))
+    except ValueError:
+        raise CommandError(f"Invalid speed '{value}', use e.g. 1x or 10x")
+    if speed < 0:
+        raise CommandError('Speed must not be negative')
+    return speed
+
+
+class Command(BaseCommand):
+    help = (
+        'Replay a traffic trace recorded by TrafficCaptureMiddleware against a '
+        'local instance at 1x/Nx speed and report latency per route. By '
+        'default it starts gunicorn with a local storage stand-in, like loadtest'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('trace', help='Trace file (TRAFFIC_CAPTURE_FILE)')
+        parser.add_argument('--speed', default='1x',
+                            help='Replay speed: 1x keeps the recorded pacing, 10x is ten times faster, '
+                                 '0 is as fast as possible (default: 1x)')
+        parser.add_argument('--concurrency', type=int, default=32,
+                            help='Maximum requests in flight (default: 32)')
+        parser.add_argument('--limit', type=int, help='Replay only the first N records')
+        parser.add_argument('--route', action='append', dest='routes',
+                            help='Replay only this URL name (repeatable)')
+        parser.add_argument('--seed', type=int, default=0, help='Seed for the synthesized values (default: 0)')
+
+        server = parser.add_argument_group('server')
+        server.add_argument('--url', help='Replay against an already running server instead of starting gunicorn')
+        server.add_argument('--workers', type=int, default=2, help='gunicorn workers (default: 2)')
+        server.add_argument('--worker-class', default=ASGI_WORKER,
+                            help=f"gunicorn worker class, 'sync' serves the WSGI app (default: {ASGI_WORKER})")
+        server.add_argument('--threads', type=int, default=1, help='gunicorn threads per worker (default: 1)')
+        server.add_argument('--storage-latency', type=float, default=0.02,
+                            help='Seconds added to every storage call (default: 0.02)')
+
+        data = parser.add_argument_group('data')
+        data.add_argument('--prefix', default='loadtest',
+                          help='Username prefix of the replay users (default: loadtest)')
+        data.add_argument('--password', default='loadtest-password', help='Password of the replay users')
+
+        report = parser.add_argument_group('report')
+        report.add_argument('--output', help='Write the JSON report to this file')
+        report.add_argument('--baseline', help='JSON report of a previous replay to compare with')
+
+    def handle(self, *args, **options):
+        speed = parse_speed(options['speed'])
+        try:
+            records = read_trace(options['trace'])
+        except OSError as exc:
+            raise CommandError(f"Cannot read trace: {exc}")
+        if options['routes']:
+            records = [record for record in records if record['r'] in options['routes']]
+        if options['limit']:
+            records = records[:options['limit']]
+        if not records:
+            raise CommandError('The trace has no records to replay')
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as fh:
+                baseline = json.load(fh)
+        accounts = self.load_accounts(options)
+
+        storage = server = None
+        try:
+            if options['url']:
+                base_url = options['url']
+            else:
+                storage = StorageStub(latency=options['storage_latency']).start()
+                try:
+                    server, base_url = start_gunicorn(
+                        storage.url, options['workers'], options['worker_class'], options['threads'],
+                    )
+                except RuntimeError as exc:
+                    raise CommandError(str(exc))
+            span = records[-1]['ts'] - records[0]['ts']
+            self.stdout.write(
+                f"▶️ Replaying {len(records)} requests ({span:.0f}s of traffic) at "
+                f"{options['speed']} against {base_url}"
+            )
+            report = replay(
+                records, base_url, accounts, speed=speed,
+                concurrency=options['concurrency'], seed=options['seed'],
+            )
+        finally:
+            if server:
+                server.terminate()
+                server.wait(timeout=30)
+            if storage:
+                storage.stop()
+
+        for line in format_report(report, baseline):
+            self.stdout.write(line)
+        config = report['config']
+        self.stdout.write(
+            f"Schedule lag p50 {config['lag_p50_ms']}ms, p95 {config['lag_p95_ms']}ms, "
+            f"max {config['lag_max_ms']}ms; {config['skipped']} records skipped"
+        )
+        if config['login_failures']:
+            self.stdout.write(self.style.WARNING(f"⚠️ {config['login_failures']} sessions could not log in"))
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump(report, fh, indent=2)
+            self.stdout.write(f"📄 Report written to {options['output']}")
+
+    def load_accounts(self, options):
+        accounts = []
+        for user in User.objects.filter(username__startswith=options['prefix']).order_by('username'):
+            ids = {
+                'projects': list(Project.objects.filter(user=user).values_list('pk', flat=True)[:500]),
+                'clients': list(Client.objects.filter(user=user).values_list('pk', flat=True)[:200]),
+                'teams': list(Team.objects.filter(owner=user).values_list('pk', flat=True)),
+            }
+            if ids['projects']:
+                accounts.append((user.username, options['password'], ids))
+        if not accounts:
+            raise CommandError(
+                f"No users with prefix '{options['prefix']}' and projects found, "
+                f"create them with: manage.py loadtest --seed-data (or generate_scale_data --prefix {options['prefix']})"
+            )
+        return accounts
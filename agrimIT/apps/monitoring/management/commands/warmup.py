@@ -0,0 +1,154 @@
+import json
+import random
+import time
+
+import httpx
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.monitoring.loadtest import ASGI_WORKER, VirtualUser, load_accounts, start_gunicorn
+from apps.monitoring.storage_stub import StorageStub
+from apps.monitoring.warmup import STEPS, warm_up
+
+
+# Pages timed on a fresh worker, each requested twice: first hit and warm
+PAGES = ['/', '/projects/', '/history', '/accounting/balance/', '/grupos/']
+
+
+class Command(BaseCommand):
+    help = (
+        'Warm up this process (URL resolver, templates, database connections, '
+        'storage client) and report the time of each step. With --url, wait for '
+        'the readiness endpoint of a running deployment instead. With --measure, '
+        'start gunicorn with and without the boot warm-up and report the time to '
+        'the first response and the first hit of the main pages'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--step', action='append', dest='steps', choices=list(STEPS),
+                            help='Warm-up step to run (repeatable, default: all)')
+        parser.add_argument('--url', help='Readiness URL of a running deployment, e.g. https://host/monitoreo/listo/')
+        parser.add_argument('--timeout', type=float, default=120,
+                            help='Seconds to wait for --url to be ready (default: 120)')
+        parser.add_argument('--measure', action='store_true',
+                            help='Compare time to first request of a fresh gunicorn worker without and with warm-up')
+        parser.add_argument('--worker-class', default=ASGI_WORKER,
+                            help=f"gunicorn worker class for --measure (default: {ASGI_WORKER})")
+        parser.add_argument('--settle', type=float, default=5,
+                            help='Seconds the worker gets to boot before the first request (default: 5)')
+        parser.add_argument('--prefix', default='loadtest', help='Username prefix (default: loadtest)')
+        parser.add_argument('--password', default='loadtest-password', help='Password of the seeded users')
+        parser.add_argument('--output', help='Write the JSON results to this file')
+
+    def handle(self, *args, **options):
+        if options['url']:
+            results = self.wait_ready(options['url'], options['timeout'])
+        elif options['measure']:
+            results = self.measure(options)
+        else:
+            results = warm_up(options['steps'])
+            for name, step in results.items():
+                line = f"{name:<10} {step['ms']:>8.1f}ms  {step['error'] or step['detail']}"
+                self.stdout.write(self.style.ERROR(line) if step['error'] else line)
+            if any(step['error'] for step in results.values()):
+                raise CommandError('Warm-up failed')
+
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump(results, fh, indent=2)
+            self.stdout.write(f"📄 Results written to {options['output']}")
+
+    def wait_ready(self, url, timeout):
+        started = time.monotonic()
+        attempts = 0
+        while True:
+            attempts += 1
+            try:
+                response = httpx.get(url, timeout=30)
+                if response.status_code == 200:
+                    break
+                reason = f"status {response.status_code}"
+            except httpx.HTTPError as exc:
+                reason = str(exc)
+            if time.monotonic() - started > timeout:
+                raise CommandError(f"{url} not ready after {timeout:.0f}s ({reason})")
+            time.sleep(1)
+        elapsed = (time.monotonic() - started) * 1000
+        self.stdout.write(self.style.SUCCESS(f"✅ Ready after {elapsed:.0f}ms ({attempts} attempts)"))
+        return {'ready_ms': elapsed, 'attempts': attempts, 'readiness': response.json()}
+
+    def measure(self, options):
+        accounts = load_accounts(options['prefix'], options['password'], limit=1)
+        if not accounts:
+            self.stdout.write(
+                f"⚠️ No users with prefix '{options['prefix']}', only the login page is timed "
+                f"(create them with: manage.py loadtest --seed-data)"
+            )
+        results = {}
+        for mode, enabled in (('cold', 'False'), ('warm', 'True')):
+            self.stdout.write(f"🚀 Fresh worker, WARMUP_ON_BOOT={enabled}")
+            results[mode] = self.first_requests(accounts, options['worker_class'], enabled, options['settle'])
+        self.report(results)
+        return results
+
+    def first_requests(self, accounts, worker_class, enabled, settle):
+        """
+        Start one gunicorn worker, give it ``settle`` seconds to boot and
+        time the first and second hit of the login page and of each page.
+        """
+        username, password, project_ids = accounts[0] if accounts else ('', '', [0])
+        storage = StorageStub().start()
+        try:
+            server, base_url = start_gunicorn(
+                storage.url, workers=1, worker_class=worker_class,
+                env={'WARMUP_ON_BOOT': enabled}, wait=False,
+            )
+            user = VirtualUser(base_url, username, password, project_ids, random.Random(0))
+            try:
+                time.sleep(settle)
+                if server.poll() is not None:
+                    raise CommandError(f"gunicorn exited with code {server.returncode}")
+                user.request('GET /users/login/', 'GET', '/users/login/')
+                if accounts and user.login():
+                    for page in PAGES:
+                        for _ in range(2):
+                            user.request(f"GET {page}", 'GET', page)
+                else:
+                    user.request('GET /users/login/', 'GET', '/users/login/')
+            finally:
+                user.close()
+                server.terminate()
+                server.wait(timeout=30)
+        finally:
+            storage.stop()
+
+        pages = {}
+        for name, latencies in user.recorder.latencies.items():
+            pages[name] = {'first': latencies[0], 'warm': latencies[-1] if len(latencies) > 1 else None}
+        return {
+            'pages': pages,
+            'errors': sum(user.recorder.errors.values()),
+        }
+
+    def report(self, results):
+        cold, warm = results['cold'], results['warm']
+        self.stdout.write('')
+        header = f"{'Request':<32} {'cold 1st':>9} {'warm-up 1st':>12} {'steady':>8}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for name, row in cold['pages'].items():
+            warmed = warm['pages'].get(name, {})
+            steady = row['warm'] if row['warm'] is not None else warmed.get('warm')
+            self.stdout.write(
+                f"{name:<32} {row['first']:>7.0f}ms {warmed.get('first', 0):>10.0f}ms "
+                + (f"{steady:>6.0f}ms" if steady is not None else f"{'-':>8}")
+            )
+        first = 'GET /users/login/'
+        if first in cold['pages'] and first in warm['pages']:
+            self.stdout.write(self.style.SUCCESS(
+                f"Time to first request: {cold['pages'][first]['first']:.0f}ms cold vs "
+                f"{warm['pages'][first]['first']:.0f}ms with warm-up on boot"
+            ))
+        if cold['errors'] or warm['errors']:
+            self.stdout.write(self.style.WARNING(
+                f"⚠️ {cold['errors'] + warm['errors']} requests failed, see the gunicorn output"
+            ))
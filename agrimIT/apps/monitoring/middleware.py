@@ -0,0 +1,272 @@
+"""
+Performance instrumentation middleware for AgrimIT project
+"""
+
+import atexit
+import logging
+import random
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http.multipartparser import MultiPartParserError
+from django.http.request import RawPostDataException
+
+from . import capture, instrumentation, querystats
+
+logger = logging.getLogger(__name__)
+
+
+class PerformanceMiddleware:
+    """
+    Measures where the time of a request goes: wall time, SQL queries, cache
+    hits/misses, storage calls and template rendering.
+
+    Results are added to the response as a ``Server-Timing`` header (visible
+    in the browser dev tools) and logged as structured fields. Requests are
+    sampled per URL name through the PERF_SAMPLE_RATES setting:
+
+        PERF_SAMPLE_RATES = {
+            'default': 0.1,      # 10% of every other view
+            'balance': 1.0,      # always measure the balance page
+            'index': 0,          # never
+        }
+
+    SQL seen in sampled requests also feeds the fingerprint statistics
+    (apps.monitoring.querystats) unless QUERY_STATS_ENABLED is False.
+
+    Place it right after SessionMiddleware/AuthenticationMiddleware so most
+    of the request is covered. Template times need the
+    ``apps.monitoring.template_backend.InstrumentedDjangoTemplates`` backend.
+
+    Works in sync and async mode. In async mode the SQL wrappers go on the
+    connections of the request's sync thread, where the async ORM and the
+    sync views run their queries.
+    """
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+            # Django awaits an async process_view in the request's own
+            # context, so the metrics token can be reset in __acall__
+            self.process_view = self._aprocess_view
+        rates = dict(getattr(settings, 'PERF_SAMPLE_RATES', {}))
+        self.default_rate = rates.pop('default', 0.0)
+        self.rates = rates
+        self.server_timing = getattr(settings, 'PERF_SERVER_TIMING', True)
+        if getattr(settings, 'QUERY_STATS_ENABLED', True):
+            self.sql_wrapper = querystats.sql_wrapper
+        else:
+            self.sql_wrapper = instrumentation.sql_wrapper
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        request._perf = None
+        request._perf_started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            sample = request._perf
+            if sample is not None:
+                metrics, cache_counts = self._stop(sample)
+        if sample is not None:
+            self._emit(request, response, metrics, cache_counts)
+            querystats.collector.maybe_flush()
+        return response
+
+    async def __acall__(self, request):
+        request._perf = None
+        request._perf_started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            sample = request._perf
+            if sample is not None:
+                metrics, cache_counts = self._stop(sample)
+        if sample is not None:
+            self._emit(request, response, metrics, cache_counts)
+            # A due flush writes to the database
+            await sync_to_async(querystats.collector.maybe_flush)()
+        return response
+
+    def _view_name(self, request, view_func):
+        """URL name of the view when this request is sampled, else None"""
+        match = request.resolver_match
+        view_name = (match.url_name or match.view_name) if match else view_func.__name__
+        rate = self.rates.get(view_name, self.default_rate)
+        if not rate or random.random() >= rate:
+            return None
+        return view_name
+
+    def _wrap_connections(self):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(self.sql_wrapper))
+        return stack
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_name = self._view_name(request, view_func)
+        if view_name is None:
+            return None
+        self._start(request, view_name, self._wrap_connections())
+        return None
+
+    async def _aprocess_view(self, request, view_func, view_args, view_kwargs):
+        view_name = self._view_name(request, view_func)
+        if view_name is None:
+            return None
+        self._start(request, view_name, await sync_to_async(self._wrap_connections)())
+        return None
+
+    def _start(self, request, view_name, stack):
+        token = instrumentation.start(view_name)
+        # Wall time also covers the middleware that ran before the view
+        instrumentation.current().started = request._perf_started
+        request._perf = (
+            token,
+            stack,
+            self._cache_snapshot(),
+        )
+
+    def _cache_snapshot(self):
+        """Per-alias hit/miss counters of the backends that keep them"""
+        snapshot = {}
+        for alias in settings.CACHES:
+            cache = caches[alias]
+            if hasattr(cache, 'stats'):
+                snapshot[alias] = cache.stats()
+        return snapshot
+
+    def _stop(self, sample):
+        token, stack, before = sample
+        stack.close()
+        metrics = instrumentation.stop(token)
+        after = self._cache_snapshot()
+        hits = sum(after[alias]['hits'] - before[alias]['hits'] for alias in before)
+        misses = sum(after[alias]['misses'] - before[alias]['misses'] for alias in before)
+        return metrics, (hits, misses)
+
+    def _emit(self, request, response, metrics, cache_counts):
+        data = metrics.as_dict()
+        data['status'] = response.status_code
+        data['cache_hits'], data['cache_misses'] = cache_counts
+
+        if self.server_timing:
+            response['Server-Timing'] = self._server_timing(metrics, data)
+
+        logger.info(
+            "Request timing " + " ".join(f"{key}={value}" for key, value in data.items()),
+            extra={'perf': data, 'path': request.path, 'method': request.method},
+        )
+
+    def _server_timing(self, metrics, data):
+        entries = []
+        for kind in ('sql', 'storage', 'template'):
+            if kind in metrics.durations:
+                entries.append(
+                    f'{kind};dur={data[f"{kind}_ms"]};desc="{metrics.counts[kind]} calls"'
+                )
+        entries.append(
+            f'cache;desc="{data["cache_hits"]} hits, {data["cache_misses"]} misses"'
+        )
+        entries.append(f'total;dur={data["wall_ms"]}')
+        return ', '.join(entries)
+
+
+class TrafficCaptureMiddleware:
+    """
+    Records sanitized request metadata (see apps.monitoring.capture) to
+    TRAFFIC_CAPTURE_FILE, for ``manage.py replay_traffic``. Off unless that
+    setting is set. Other settings:
+
+        TRAFFIC_CAPTURE_SAMPLE_RATE = 1.0       # share of requests recorded
+        TRAFFIC_CAPTURE_USER_BUCKETS = 16       # anonymous user buckets
+        TRAFFIC_CAPTURE_MAX_BYTES = 50 * 2**20  # stop recording past this size
+        TRAFFIC_CAPTURE_SKIP = ['admin', 'static']  # URL namespaces/prefixes
+
+    Only requests that resolved to a named URL are recorded. Place it after
+    AuthenticationMiddleware so requests can be bucketed by user.
+    """
+    async_capable = True
+
+    def __init__(self, get_response):
+        path = getattr(settings, 'TRAFFIC_CAPTURE_FILE', None)
+        if not path:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        self.sample_rate = getattr(settings, 'TRAFFIC_CAPTURE_SAMPLE_RATE', 1.0)
+        self.buckets = getattr(settings, 'TRAFFIC_CAPTURE_USER_BUCKETS', 16)
+        self.skip = tuple(f"/{prefix.strip('/')}/" for prefix in getattr(
+            settings, 'TRAFFIC_CAPTURE_SKIP', ['admin', 'static', 'monitoreo']
+        ))
+        self.writer = capture.TraceWriter(
+            path, max_bytes=getattr(settings, 'TRAFFIC_CAPTURE_MAX_BYTES', 50 * 2**20),
+        )
+        atexit.register(self.writer.flush)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        arrived = time.time()
+        started = time.perf_counter()
+        response = self.get_response(request)
+        if self._recorded(request):
+            self._write(request, response, request.user, arrived, started)
+        return response
+
+    async def __acall__(self, request):
+        arrived = time.time()
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        if self._recorded(request):
+            self._write(request, response, await request.auser(), arrived, started)
+        return response
+
+    def _recorded(self, request):
+        if self.writer.full or request.path.startswith(self.skip):
+            return False
+        match = request.resolver_match
+        if match is None or not match.url_name:
+            return False
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def _write(self, request, response, user, arrived, started):
+        match = request.resolver_match
+        self.writer.write({
+            'ts': round(arrived, 3),
+            'm': request.method,
+            'r': match.url_name,
+            'k': self._kwargs_shape(match.kwargs),
+            'q': capture.params_shape(request.GET),
+            'f': self._form_shape(request),
+            'u': capture.user_bucket(user, self.buckets, settings.SECRET_KEY),
+            'x': int(request.headers.get('X-Requested-With') == 'XMLHttpRequest'),
+            's': response.status_code,
+            'ms': round((time.perf_counter() - started) * 1000, 1),
+        })
+
+    def _kwargs_shape(self, kwargs):
+        shape = {}
+        for name, value in kwargs.items():
+            shape[name] = capture.value_shape(str(value))
+            if shape[name] == 'int':
+                shape[name] += '@' + capture.id_token(value, settings.SECRET_KEY)
+        return shape
+
+    def _form_shape(self, request):
+        if request.method != 'POST':
+            return {}
+        try:
+            return capture.params_shape(request.POST, request.FILES)
+        except (RawPostDataException, MultiPartParserError):
+            # The view consumed the body as a stream
+            return {}
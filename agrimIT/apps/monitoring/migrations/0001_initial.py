@@ -0,0 +1,38 @@
+# Generated by Django 5.2.3 on 2026-10-19 05:05
+
+import apps.monitoring.querystats
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QueryStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fingerprint_hash', models.CharField(max_length=40, verbose_name='Hash')),
+                ('view', models.CharField(blank=True, max_length=200, verbose_name='Vista')),
+                ('fingerprint', models.TextField(verbose_name='Consulta normalizada')),
+                ('calls', models.BigIntegerField(default=0, verbose_name='Ejecuciones')),
+                ('total_ms', models.FloatField(default=0, verbose_name='Tiempo total (ms)')),
+                ('max_ms', models.FloatField(default=0, verbose_name='Tiempo máximo (ms)')),
+                ('rows', models.BigIntegerField(default=0, verbose_name='Filas')),
+                ('histogram', models.JSONField(default=apps.monitoring.querystats.empty_histogram, verbose_name='Histograma')),
+                ('first_seen', models.DateTimeField(auto_now_add=True, verbose_name='Primera vez')),
+                ('last_seen', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Última vez')),
+            ],
+            options={
+                'verbose_name': 'Estadística de consulta',
+                'verbose_name_plural': 'Estadísticas de consultas',
+                'ordering': ['-total_ms'],
+                'unique_together': {('fingerprint_hash', 'view')},
+            },
+        ),
+    ]
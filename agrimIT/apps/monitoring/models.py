@@ -0,0 +1,53 @@
+from django.db import models
+from django.utils import timezone
+
+from .querystats import empty_histogram, histogram_percentile
+
+
+class QueryStat(models.Model):
+    """
+    Estadísticas acumuladas de una consulta SQL normalizada por vista
+    """
+    fingerprint_hash = models.CharField(max_length=40, verbose_name='Hash')
+    view = models.CharField(max_length=200, blank=True, verbose_name='Vista')
+    fingerprint = models.TextField(verbose_name='Consulta normalizada')
+    calls = models.BigIntegerField(default=0, verbose_name='Ejecuciones')
+    total_ms = models.FloatField(default=0, verbose_name='Tiempo total (ms)')
+    max_ms = models.FloatField(default=0, verbose_name='Tiempo máximo (ms)')
+    rows = models.BigIntegerField(default=0, verbose_name='Filas')
+    histogram = models.JSONField(default=empty_histogram, verbose_name='Histograma')
+    first_seen = models.DateTimeField(auto_now_add=True, verbose_name='Primera vez')
+    last_seen = models.DateTimeField(default=timezone.now, verbose_name='Última vez')
+
+    class Meta:
+        verbose_name = 'Estadística de consulta'
+        verbose_name_plural = 'Estadísticas de consultas'
+        unique_together = ['fingerprint_hash', 'view']
+        ordering = ['-total_ms']
+
+    def __str__(self):
+        return f"{self.view or '-'}: {self.fingerprint[:80]}"
+
+    def merge(self, aggregate):
+        """Add the counters of an in-memory Aggregate"""
+        self.calls += aggregate.calls
+        self.total_ms += aggregate.total_ms
+        self.max_ms = max(self.max_ms, aggregate.max_ms)
+        self.rows += aggregate.rows
+        histogram = self.histogram or []
+        if len(histogram) != len(aggregate.histogram):
+            histogram = [0] * len(aggregate.histogram)
+        self.histogram = [a + b for a, b in zip(histogram, aggregate.histogram)]
+        self.last_seen = timezone.now()
+
+    @property
+    def mean_ms(self):
+        return self.total_ms / self.calls if self.calls else 0.0
+
+    @property
+    def p50_ms(self):
+        return histogram_percentile(self.histogram, 0.5, self.max_ms)
+
+    @property
+    def p95_ms(self):
+        return histogram_percentile(self.histogram, 0.95, self.max_ms)
@@ -0,0 +1,183 @@
+"""
+SQL fingerprint statistics, in the spirit of pg_stat_statements.
+
+Queries seen during sampled requests are normalized into fingerprints
+(literals and placeholder lists removed) and aggregated per fingerprint and
+originating view: calls, total time, rows and a latency histogram. Each
+worker keeps its aggregates in memory and periodically merges them into the
+QueryStat table, so the numbers cover every gunicorn worker.
+"""
+
+import bisect
+import hashlib
+import logging
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+
+from . import instrumentation
+
+logger = logging.getLogger(__name__)
+
+
+# Upper bounds (ms) of the latency histogram buckets; the last one is open
+HISTOGRAM_BOUNDS = [0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+
+_STRING = re.compile(r"'(?:''|[^'])*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%s|\?")
+_IN_LIST = re.compile(r"\bIN \(\?(?:, ?\?)*\)", re.IGNORECASE)
+_VALUES_LIST = re.compile(r"\bVALUES \(.*\)", re.IGNORECASE | re.DOTALL)
+_SPACES = re.compile(r"\s+")
+
+
+def fingerprint(sql):
+    """Normalize a SQL statement so queries differing only in values match"""
+    sql = _STRING.sub('?', sql)
+    sql = _PLACEHOLDER.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    sql = _VALUES_LIST.sub('VALUES (...)', sql)
+    return _SPACES.sub(' ', sql).strip()
+
+
+def fingerprint_hash(normalized):
+    return hashlib.sha1(normalized.encode()).hexdigest()
+
+
+def empty_histogram():
+    return [0] * (len(HISTOGRAM_BOUNDS) + 1)
+
+
+def histogram_percentile(histogram, fraction, max_ms=None):
+    """
+    Approximate percentile from a bucket histogram: the upper bound of the
+    bucket holding it (``max_ms`` for the open-ended last bucket).
+    """
+    total = sum(histogram)
+    if not total:
+        return 0.0
+    threshold = fraction * total
+    cumulative = 0
+    for index, count in enumerate(histogram):
+        cumulative += count
+        if cumulative >= threshold:
+            if index < len(HISTOGRAM_BOUNDS):
+                return float(HISTOGRAM_BOUNDS[index])
+            return float(max_ms or HISTOGRAM_BOUNDS[-1])
+    return float(max_ms or HISTOGRAM_BOUNDS[-1])
+
+
+class Aggregate:
+    """In-memory counters for one (fingerprint, view) pair"""
+
+    __slots__ = ('sql', 'calls', 'total_ms', 'max_ms', 'rows', 'histogram')
+
+    def __init__(self, sql):
+        self.sql = sql
+        self.calls = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.histogram = empty_histogram()
+
+    def add(self, duration_ms, rows):
+        self.calls += 1
+        self.total_ms += duration_ms
+        self.max_ms = max(self.max_ms, duration_ms)
+        self.rows += rows
+        self.histogram[bisect.bisect_left(HISTOGRAM_BOUNDS, duration_ms)] += 1
+
+
+class QueryStatsCollector:
+    """Per-process aggregates, merged into QueryStat every ``flush_interval`` seconds"""
+
+    def __init__(self, flush_interval=60):
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._last_flush = time.monotonic()
+
+    def record(self, sql, duration, rows=0, view=''):
+        normalized = fingerprint(sql)
+        key = (fingerprint_hash(normalized), view)
+        with self._lock:
+            aggregate = self._pending.get(key)
+            if aggregate is None:
+                aggregate = self._pending[key] = Aggregate(normalized)
+            aggregate.add(duration * 1000, rows)
+
+    def drain(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+        return pending
+
+    def maybe_flush(self):
+        """Flush when the interval has passed; never raises"""
+        if time.monotonic() - self._last_flush < self.flush_interval:
+            return
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"Error flushing query stats: {str(e)}")
+
+    def flush(self):
+        """
+        Merge the pending aggregates into QueryStat.
+
+        Missing rows are created first (ignoring conflicts with other workers),
+        then every row is locked in primary-key order and merged, so
+        concurrent flushes from several workers add up instead of overwriting.
+        """
+        from .models import QueryStat
+
+        pending = self.drain()
+        if not pending:
+            return 0
+
+        with transaction.atomic():
+            QueryStat.objects.bulk_create(
+                [
+                    QueryStat(fingerprint_hash=key[0], view=key[1], fingerprint=aggregate.sql)
+                    for key, aggregate in pending.items()
+                ],
+                ignore_conflicts=True,
+            )
+            stats = QueryStat.objects.select_for_update().filter(
+                fingerprint_hash__in={key[0] for key in pending}
+            ).order_by('pk')
+
+            updated = []
+            for stat in stats:
+                aggregate = pending.get((stat.fingerprint_hash, stat.view))
+                if aggregate is None:
+                    continue
+                stat.merge(aggregate)
+                updated.append(stat)
+            QueryStat.objects.bulk_update(
+                updated, ['calls', 'total_ms', 'max_ms', 'rows', 'histogram', 'last_seen']
+            )
+        return len(updated)
+
+
+collector = QueryStatsCollector(getattr(settings, 'QUERY_STATS_FLUSH_INTERVAL', 60))
+
+
+def sql_wrapper(execute, sql, params, many, context):
+    """
+    ``connection.execute_wrapper`` hook that times every query for the
+    request metrics and adds it to the fingerprint statistics.
+    """
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - started
+        instrumentation.record('sql', duration)
+        metrics = instrumentation.current()
+        rows = getattr(context.get('cursor'), 'rowcount', -1)
+        collector.record(sql, duration, max(rows, 0), metrics.view if metrics else '')
@@ -0,0 +1,184 @@
+"""
+Deterministic replay of traffic traces (see apps.monitoring.capture).
+
+Every record is turned back into a concrete request: URL kwargs and
+parameters are synthesized from their recorded shape with a random generator
+seeded per record, so the same trace and seed always produce the same
+requests. Ids are drawn from the replay account's own projects, clients and
+teams (the same recorded id always becomes the same replay id), search
+queries keep their length and files their size. Records are sent at their
+original inter-arrival times divided by ``speed``, each user bucket through
+its own logged-in session.
+"""
+
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from django.urls import NoReverseMatch, reverse
+
+from .loadtest import SEARCH_TERMS, Recorder, VirtualUser, build_report, percentile
+
+# Routes that would log the session out or destroy the replay data
+SKIPPED_ROUTES = {
+    'login', 'logout', 'delete', 'deleteclient', 'team_delete', 'team_remove_member',
+    'generate_test_data', 'generate_monthly_summaries',
+}
+CLIENT_ROUTES = {'projectslist', 'clientprojectcreate', 'clientedislist'}
+TEAM_ROUTES = {'team_detail', 'team_dashboard', 'team_edit', 'team_add_member'}
+FIELD_SOURCES = {
+    'client-pk': 'clients', 'client-list': 'clients', 'client': 'clients',
+    'team': 'teams', 'teams': 'teams', 'projects': 'projects', 'project_ids': 'projects',
+}
+CHOICES = {
+    'type': ['Mensura', 'Estado Parcelario', 'Relevamiento', 'Amojonamiento', 'Legajo Parcelario'],
+    'type_mens': ['PH', 'Usucapion', 'Division'],
+    'movement_type': ['ADV', 'EXP'],
+    'inscription_type': ['Folio', 'Matricula'],
+    'insctype': ['Folio', 'Matricula'],
+    'id_type': ['DNI', 'CUIT', 'CUIL'],
+    'role': ['member', 'viewer'],
+}
+
+
+def synthesize(name, shape, ids, rng):
+    """A value of the recorded ``shape`` for parameter ``name``"""
+    kind, _, size = shape.partition(':')
+    if kind == 'empty':
+        return ''
+    if kind == 'int':
+        source = FIELD_SOURCES.get(name)
+        if source and ids.get(source):
+            return str(rng.choice(ids[source]))
+        if name == 'page':
+            return str(rng.randint(1, 5))
+        return str(rng.randrange(1000, 200000, 500))
+    if kind in ('month', 'date'):
+        day = date.today() - timedelta(days=rng.randint(0, 730))
+        return day.strftime('%Y-%m') if kind == 'month' else day.isoformat()
+    if kind == 'secret':
+        return ''.join(rng.choice('abcdefghijklmnopqrstuvwxyz0123456789') for _ in range(16))
+    if kind == 'file':
+        return ('trace.bin', rng.randbytes(int(size or 1) * 1024), 'application/octet-stream')
+    length = int(size or 1)
+    if name in CHOICES:
+        return rng.choice(CHOICES[name])
+    if name in ('query', 'q', 'search'):
+        term = rng.choice(SEARCH_TERMS)
+        return (term * (length // len(term) + 1))[:length]
+    return ''.join(rng.choice('abcdefghijklmnopqrstuvwxyz ') for _ in range(length)).strip() or 'x'
+
+
+def build_request(record, ids, rng):
+    """
+    Concrete (method, url, params, data, files) for a trace record, or None
+    when the route is skipped or no longer exists.
+    """
+    route = record['r']
+    if route in SKIPPED_ROUTES:
+        return None
+    kwargs = {}
+    for name, shape in record.get('k', {}).items():
+        shape, _, token = shape.partition('@')
+        if shape != 'int':
+            kwargs[name] = synthesize(name, shape, ids, rng)
+        elif name == 'type':
+            kwargs[name] = rng.randint(1, 5)
+        else:
+            source = 'clients' if route in CLIENT_ROUTES else 'teams' if route in TEAM_ROUTES else 'projects'
+            if not ids.get(source):
+                return None
+            # The same recorded object always maps to the same replay object
+            picker = random.Random(f"{source}:{token}") if token else rng
+            kwargs[name] = picker.choice(ids[source])
+    try:
+        url = reverse(route, kwargs=kwargs)
+    except NoReverseMatch:
+        return None
+    params = {name: synthesize(name, shape, ids, rng) for name, shape in record.get('q', {}).items()}
+    data, files = {}, {}
+    for name, shape in record.get('f', {}).items():
+        value = synthesize(name, shape, ids, rng)
+        if isinstance(value, tuple):
+            files[name] = value
+        else:
+            data[name] = value
+    return record['m'], url, params, data, files
+
+
+def replay(records, base_url, accounts, speed=1.0, concurrency=32, seed=0):
+    """
+    Send ``records`` against ``base_url``.
+
+    Args:
+        accounts: List of (username, password, ids) where ids maps 'projects',
+            'clients' and 'teams' to primary keys owned by that user. User
+            buckets are assigned to accounts round-robin; anonymous records
+            use a session that never logs in.
+        speed: Time compression, 1 keeps the recorded pacing, 10 sends ten
+            times faster, 0 sends as fast as ``concurrency`` allows.
+
+    Returns:
+        Report dict (see ``loadtest.build_report``) with the schedule lag
+        (how late requests left compared with the scaled trace) in config.
+    """
+    buckets = sorted({record.get('u') for record in records}, key=lambda bucket: (bucket is None, bucket))
+    sessions = {}
+    login_failures = 0
+    for index, bucket in enumerate(buckets):
+        username, password, ids = accounts[index % len(accounts)]
+        session = VirtualUser(base_url, username, password, ids.get('projects', []), random.Random(seed))
+        if bucket is not None and not session.login():
+            login_failures += 1
+        session.recorder = Recorder()  # keep the logins out of the report
+        sessions[bucket] = (session, ids)
+
+    lags = []
+    skipped = [0]
+    lock = threading.Lock()
+    origin = records[0]['ts'] if records else 0
+    started = time.perf_counter()
+
+    def send(index, record, due):
+        with lock:
+            lags.append(max(time.perf_counter() - due, 0) * 1000)
+        session, ids = sessions[record.get('u')]
+        request = build_request(record, ids, random.Random(f"{seed}:{index}"))
+        if request is None:
+            with lock:
+                skipped[0] += 1
+            return
+        method, url, params, data, files = request
+        session.request(
+            f"{method} {record['r']}", method, url, ajax=bool(record.get('x')), referer='/',
+            params=params or None, data=data or None, files=files or None,
+        )
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for index, record in enumerate(records):
+            due = started + (record['ts'] - origin) / speed if speed else time.perf_counter()
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(send, index, record, due)
+
+    recorder = Recorder()
+    for session, _ in sessions.values():
+        recorder.merge(session.recorder)
+        session.close()
+    lags.sort()
+    return build_report(recorder, time.perf_counter() - started, {
+        'base_url': base_url,
+        'records': len(records),
+        'skipped': skipped[0],
+        'speed': speed,
+        'concurrency': concurrency,
+        'user_buckets': len(buckets),
+        'login_failures': login_failures,
+        'trace_seconds': round(records[-1]['ts'] - origin, 2) if records else 0,
+        'lag_p50_ms': round(percentile(lags, 50), 1),
+        'lag_p95_ms': round(percentile(lags, 95), 1),
+        'lag_max_ms': round(lags[-1], 1) if lags else 0.0,
+    })
@@ -0,0 +1,167 @@
+"""
+Bulk seeding of realistic data, for the performance tests and the data
+generating commands.
+
+``seed_dataset`` builds a dataset for one user (clients, projects spread
+over the year, accounts, movements, history and monthly summaries) with
+bulk inserts; ``backdate`` and ``explicit_dates`` give bulk inserted rows
+dates other than the current time.
+"""
+
+import random
+from contextlib import contextmanager
+from datetime import datetime
+from decimal import Decimal
+
+from django.utils import timezone
+
+from apps.accounting.models import Account, AccountMovement, MonthlyFinancialSummary
+from apps.clients.models import Client
+from apps.project_admin.models import Event, Project
+
+
+PROJECT_TYPES = [choice for choice, _ in Project.TYPE_CHOICES]
+PARTIDOS = ['La Plata', 'Berisso', 'Ensenada', 'Brandsen', 'Magdalena']
+
+
+def backdate(model, dates, field='created'):
+    """
+    Overwrite an auto_now_add field after a bulk insert.
+
+    Args:
+        model: Model class whose rows are updated.
+        dates: Mapping of primary key to the datetime to store.
+        field: Name of the date field.
+
+    Returns:
+        Number of UPDATE statements issued (one per distinct date).
+    """
+    by_date = {}
+    for pk, value in dates.items():
+        by_date.setdefault(value, []).append(pk)
+    for value, pks in by_date.items():
+        model.objects.filter(pk__in=pks).update(**{field: value})
+    return len(by_date)
+
+
+@contextmanager
+def explicit_dates(*fields):
+    """
+    Let bulk inserts keep the dates set on the instances instead of the
+    current time, by turning off auto_now_add on the given fields:
+
+        with explicit_dates((Project, 'created'), (Event, 'time')):
+            Project.objects.bulk_create(projects)
+
+    Cheaper than ``backdate`` for large inserts (no extra UPDATEs).
+    """
+    model_fields = [model._meta.get_field(name) for model, name in fields]
+    previous = [field.auto_now_add for field in model_fields]
+    for field in model_fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, value in zip(model_fields, previous):
+            field.auto_now_add = value
+
+
+def seed_dataset(user, projects=60, clients=12, movements_per_project=3, year=None, seed=0):
+    """
+    Create a realistic dataset for ``user`` using bulk inserts.
+
+    Projects are spread evenly over the twelve months of ``year`` (current
+    year by default); every project gets an account with an estimate, an
+    advance and expenses, ``movements_per_project`` movements, a history
+    event, and every month gets a MonthlyFinancialSummary.
+
+    Returns:
+        dict with the created 'clients', 'projects' and 'accounts'.
+    """
+    rng = random.Random(seed)
+    year = year or timezone.now().year
+    tz = timezone.get_current_timezone()
+
+    client_objs = Client.objects.bulk_create([
+        Client(
+            user=user,
+            name=f"Cliente {index:03d}",
+            id_number=f"{20000000 + index}",
+            phone=f"221-{rng.randint(1000000, 9999999)}",
+            email=f"cliente{index}@example.com",
+        )
+        for index in range(clients)
+    ])
+
+    accounts = []
+    for index in range(projects):
+        estimated = Decimal(rng.randrange(100000, 2000000, 1000))
+        accounts.append(Account(
+            user=user,
+            estimated=estimated,
+            advance=(estimated * Decimal('0.4')).quantize(Decimal('1')),
+            expense=(estimated * Decimal('0.1')).quantize(Decimal('1')),
+        ))
+    accounts = Account.objects.bulk_create(accounts)
+
+    project_objs = Project.objects.bulk_create([
+        Project(
+            user=user,
+            client=client_objs[index % clients],
+            account=accounts[index],
+            type=PROJECT_TYPES[index % len(PROJECT_TYPES)],
+            titular_name=f"Titular {index:04d}",
+            titular_phone='221-5550000',
+            partido=PARTIDOS[index % len(PARTIDOS)],
+            partida=f"{rng.randint(10000, 99999)}",
+            street='Calle 7',
+            street_num=str(rng.randint(1, 2000)),
+            closed=index % 5 == 0,
+        )
+        for index in range(projects)
+    ])
+
+    # Spread projects (and their movements) over the months of the year
+    created = {
+        project.pk: datetime(year, index % 12 + 1, rng.randint(1, 28), 12, tzinfo=tz)
+        for index, project in enumerate(project_objs)
+    }
+    backdate(Project, created)
+
+    movements = []
+    movement_dates = []
+    for project, account in zip(project_objs, accounts):
+        kinds = ['EST', 'ADV', 'EXP']
+        for index in range(movements_per_project):
+            kind = kinds[index % len(kinds)]
+            amount = {'EST': account.estimated, 'ADV': account.advance, 'EXP': account.expense}[kind]
+            movements.append(AccountMovement(
+                user=user, account=account, amount=amount, movement_type=kind,
+                description=f"Movimiento {kind}", created_by=user,
+            ))
+            movement_dates.append(created[project.pk])
+    movements = AccountMovement.objects.bulk_create(movements)
+    backdate(
+        AccountMovement,
+        {movement.pk: date for movement, date in zip(movements, movement_dates)},
+        field='created_at',
+    )
+
+    Event.objects.bulk_create([
+        Event(
+            user=user, project=project, project_pk=project.pk, type='newp',
+            msg=f"Se creó un proyecto {project.type}",
+        )
+        for project in project_objs
+    ])
+
+    MonthlyFinancialSummary.objects.bulk_create([
+        MonthlyFinancialSummary(
+            user=user, year=year, month=month,
+            total_advance=Decimal(rng.randrange(500000, 3000000, 1000)),
+            total_expenses=Decimal(rng.randrange(50000, 500000, 1000)),
+        )
+        for month in range(1, 13)
+    ])
+
+    return {'clients': client_objs, 'projects': project_objs, 'accounts': accounts}
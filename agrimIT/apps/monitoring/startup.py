@@ -0,0 +1,85 @@
+"""
+Worker startup measurements.
+
+A fresh interpreter is started with the project's settings, runs
+``django.setup()`` and loads the URLconf (which imports every view module),
+and reports how long each step took and which modules ended up imported.
+With ``importtime`` the per-module costs from ``python -X importtime`` are
+parsed as well. This is what a gunicorn worker or a management command pays
+before doing any work.
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import django
+django.setup()
+setup_done = time.perf_counter()
+if {urls}:
+    from django.urls import get_resolver
+    get_resolver().url_patterns
+urls_done = time.perf_counter()
+print(json.dumps({{
+    'setup_ms': round((setup_done - started) * 1000, 1),
+    'urls_ms': round((urls_done - setup_done) * 1000, 1),
+    'modules': sorted(sys.modules),
+}}))
+"""
+
+
+def parse_importtime(output):
+    """
+    Rows of ``-X importtime`` output as dicts with module, self_ms,
+    cumulative_ms and depth (0 for imports not nested in another one).
+    """
+    rows = []
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # header
+        name = fields[2].rstrip()
+        rows.append({
+            'module': name.strip(),
+            'self_ms': int(fields[0]) / 1000,
+            'cumulative_ms': int(fields[1]) / 1000,
+            'depth': (len(name) - len(name.lstrip())) // 2,
+        })
+    return rows
+
+
+def probe_startup(urls=True, importtime=False, runs=1, settings_module=None):
+    """
+    Measure startup in ``runs`` fresh interpreters.
+
+    Returns:
+        {'setup_ms', 'urls_ms', 'modules', 'imports'}: the best times of the
+        runs, the modules loaded and, with ``importtime``, the parsed import
+        rows of the fastest run. Raises RuntimeError if the probe fails.
+    """
+    command = [sys.executable]
+    if importtime:
+        command += ['-X', 'importtime']
+    command += ['-c', PROBE.format(urls=bool(urls))]
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings_module or settings.SETTINGS_MODULE)
+
+    best = None
+    for _ in range(runs):
+        result = subprocess.run(
+            command, cwd=settings.BASE_DIR.parent, env=env, capture_output=True, text=True,
+        )
+        if result.returncode:
+            raise RuntimeError(f"Startup probe failed:\n{result.stderr[-2000:]}")
+        measured = json.loads(result.stdout.strip().splitlines()[-1])
+        measured['imports'] = parse_importtime(result.stderr) if importtime else []
+        if best is None or measured['setup_ms'] + measured['urls_ms'] < best['setup_ms'] + best['urls_ms']:
+            best = measured
+    return best
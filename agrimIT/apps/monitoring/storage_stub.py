@@ -0,0 +1,156 @@
+"""
+Local stand-in for the Supabase Storage HTTP API.
+
+Implements the few endpoints the app uses (upload, public download,
+metadata and remove) against an in-memory dict, with an optional artificial latency, so
+load tests exercise the real storage client code path without a network
+dependency:
+
+    server = StorageStub(latency=0.02).start()
+    os.environ['SUPABASE_URL'] = server.url
+"""
+
+import json
+import threading
+import time
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+
+
+OBJECT_PREFIX = '/storage/v1/object/'
+PUBLIC_PREFIX = OBJECT_PREFIX + 'public/'
+
+
+class StorageStubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _path(self):
+        return unquote(urlsplit(self.path).path)
+
+    def _body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def _content(self, body):
+        """File bytes of an upload, sent either raw or as multipart form data"""
+        content_type = self.headers.get('Content-Type', '')
+        if not content_type.startswith('multipart/'):
+            return body
+        message = BytesParser(policy=HTTP).parsebytes(
+            f"Content-Type: {content_type}\r\n\r\n".encode() + body
+        )
+        for part in message.iter_parts():
+            if part.get_filename():
+                return part.get_payload(decode=True)
+        return body
+
+    def _reply(self, status, body=b'', content_type='application/json'):
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _delay(self):
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+    def do_POST(self):
+        # Upload: POST /storage/v1/object/<bucket>/<name>
+        path = self._path()
+        body = self._body()
+        self._delay()
+        if not path.startswith(OBJECT_PREFIX):
+            return self._reply(404, {'error': 'not_found'})
+        key = path[len(OBJECT_PREFIX):]
+        with self.server.lock:
+            self.server.objects[key] = self._content(body)
+        self._reply(200, {'Key': key, 'Id': key})
+
+    do_PUT = do_POST
+
+    def do_GET(self):
+        # Public download: GET /storage/v1/object/public/<bucket>/<name>
+        path = self._path()
+        self._delay()
+        if path == '/health':
+            return self._reply(200, {'objects': len(self.server.objects)})
+        if not path.startswith(PUBLIC_PREFIX):
+            return self._reply(404, {'error': 'not_found'})
+        content = self.server.objects.get(path[len(PUBLIC_PREFIX):])
+        if content is None:
+            return self._reply(404, {'error': 'not_found', 'message': 'Object not found'})
+        self._reply(200, content, content_type='application/octet-stream')
+
+    def do_HEAD(self):
+        # Metadata: HEAD /storage/v1/object/<bucket>/<name>
+        path = self._path()
+        self._delay()
+        key = path[len(PUBLIC_PREFIX if path.startswith(PUBLIC_PREFIX) else OBJECT_PREFIX):]
+        content = self.server.objects.get(key) if path.startswith(OBJECT_PREFIX) else None
+        if content is None:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+        else:
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/octet-stream')
+            self.send_header('Content-Length', str(len(content)))
+            self.send_header('ETag', f'"{hash(content) & 0xffffffff:08x}"')
+        self.end_headers()
+
+    def do_DELETE(self):
+        # Remove: DELETE /storage/v1/object/<bucket> with {"prefixes": [...]}
+        path = self._path()
+        body = self._body()
+        self._delay()
+        if not path.startswith(OBJECT_PREFIX):
+            return self._reply(404, {'error': 'not_found'})
+        bucket = path[len(OBJECT_PREFIX):].strip('/')
+        names = json.loads(body or b'{}').get('prefixes', [])
+        removed = []
+        with self.server.lock:
+            for name in names:
+                if self.server.objects.pop(f"{bucket}/{name}", None) is not None:
+                    removed.append({'name': name, 'bucket_id': bucket})
+        self._reply(200, removed)
+
+
+class StorageStub(ThreadingHTTPServer):
+    """
+    Threaded in-memory storage server.
+
+    Args:
+        host: Interface to bind.
+        port: Port to bind, 0 picks a free one.
+        latency: Seconds to sleep in every request, to mimic a remote store.
+    """
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0):
+        super().__init__((host, port), StorageStubHandler)
+        self.latency = latency
+        self.objects = {}
+        self.lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Serve from a daemon thread and return self"""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
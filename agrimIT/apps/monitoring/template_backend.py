@@ -0,0 +1,33 @@
+"""
+Template backend that times every render for the request metrics.
+
+Usage in settings (drop-in for DjangoTemplates):
+    'BACKEND': 'apps.monitoring.template_backend.InstrumentedDjangoTemplates',
+"""
+
+from django.template.backends.django import DjangoTemplates
+
+from .instrumentation import timed
+
+
+class InstrumentedTemplate:
+    """Wraps a backend template so ``render`` is timed as 'template'"""
+
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        with timed('template'):
+            return self.template.render(context, request)
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+
+    def from_string(self, template_code):
+        return InstrumentedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return InstrumentedTemplate(super().get_template(template_name))
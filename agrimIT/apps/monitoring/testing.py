@@ -0,0 +1,98 @@
+"""
+Helpers for the performance regression tests.
+
+``PerformanceTestCase`` asserts exact query counts and latency upper bounds
+per view, collecting the numbers into a JSON artifact (PERF_RESULTS_FILE,
+default ``perf-results.json`` next to manage.py) so runs can be compared
+over time. Test data is built with ``apps.monitoring.seeding``.
+"""
+
+import json
+import os
+import statistics
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+
+def _results_path():
+    default = os.path.join(settings.BASE_DIR.parent, 'perf-results.json')
+    return os.environ.get('PERF_RESULTS_FILE', getattr(settings, 'PERF_RESULTS_FILE', default))
+
+
+# Results of this test run, shared by every PerformanceTestCase
+_RUN = {'started': timezone.now().isoformat(), 'results': {}}
+
+
+@override_settings(PERF_SAMPLE_RATES={}, QUERY_BUDGET_MODE='raise')
+class PerformanceTestCase(TestCase):
+    """
+    TestCase with ``assertPerformance``: exact query count on the first
+    (cold) request and an upper bound on the median latency of the next
+    ``repeat`` requests. Bounds can be scaled for slow machines with the
+    PERF_TIME_SCALE environment variable.
+    """
+    repeat = 5
+
+    def assertPerformance(self, name, url, queries, max_ms, method='get', data=None, ajax=False):
+        headers = {'HTTP_X_REQUESTED_WITH': 'XMLHttpRequest'} if ajax else {}
+        send = getattr(self.client, method)
+
+        with CaptureQueriesContext(connection) as captured:
+            response = send(url, data, **headers)
+        # Read now: the next requests reset the connection's query log
+        executed = [query['sql'] for query in captured.captured_queries]
+        self.assertLess(response.status_code, 400, f"{name} returned {response.status_code}")
+
+        timings = []
+        for _ in range(self.repeat):
+            started = time.perf_counter()
+            send(url, data, **headers)
+            timings.append((time.perf_counter() - started) * 1000)
+        median_ms = statistics.median(timings)
+        limit_ms = max_ms * float(os.environ.get('PERF_TIME_SCALE', 1))
+
+        _RUN['results'][name] = {
+            'url': url,
+            'method': method.upper(),
+            'status': response.status_code,
+            'queries': len(executed),
+            'expected_queries': queries,
+            'median_ms': round(median_ms, 2),
+            'max_ms': limit_ms,
+        }
+
+        self.assertEqual(
+            len(executed), queries,
+            f"{name}: {len(executed)} queries, expected {queries}:\n" + "\n".join(executed),
+        )
+        self.assertLessEqual(median_ms, limit_ms, f"{name}: median {median_ms:.1f}ms > {limit_ms}ms")
+        return response
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.write_results()
+
+    @staticmethod
+    def write_results():
+        """Add (or refresh) this run in the JSON artifact, keeping the last 50 runs"""
+        if not _RUN['results']:
+            return
+        path = _results_path()
+        try:
+            with open(path) as fh:
+                history = json.load(fh)
+        except (OSError, ValueError):
+            history = {'runs': []}
+        runs = [run for run in history.get('runs', []) if run.get('started') != _RUN['started']]
+        runs.append(_RUN)
+        history['runs'] = runs[-50:]
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as fh:
+            json.dump(history, fh, indent=2, sort_keys=True)
+        os.replace(tmp_path, path)
@@ -0,0 +1,7 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('consultas/', views.query_stats_view, name='query_stats'),
+    path('listo/', views.readiness_view, name='readiness'),
+]
@@ -0,0 +1,73 @@
+import os
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.decorators import login_required, user_passes_test
+from django.db import DatabaseError, connection
+from django.db.models import F, FloatField, ExpressionWrapper
+from django.http import HttpRequest, HttpResponse, JsonResponse
+from django.shortcuts import render
+
+from .models import QueryStat
+from .warmup import ensure_warm
+
+
+QUERY_STATS_ORDERINGS = {
+    'total': '-total_ms',
+    'calls': '-calls',
+    'mean': '-mean',
+    'max': '-max_ms',
+    'rows': '-rows',
+}
+
+
+@login_required
+@user_passes_test(lambda user: user.is_staff)
+def query_stats_view(request: HttpRequest) -> HttpResponse:
+    """ Ranking de consultas SQL por tiempo total, llamadas o latencia (solo staff) """
+    ordering = request.GET.get('orden', 'total')
+    if ordering not in QUERY_STATS_ORDERINGS:
+        ordering = 'total'
+    view_filter = request.GET.get('vista', '')
+
+    stats = QueryStat.objects.annotate(
+        mean=ExpressionWrapper(F('total_ms') / F('calls'), output_field=FloatField())
+    ).filter(calls__gt=0)
+    if view_filter:
+        stats = stats.filter(view=view_filter)
+    stats = list(stats.order_by(QUERY_STATS_ORDERINGS[ordering])[:100])
+
+    grand_total = sum(stat.total_ms for stat in stats) or 1
+    for stat in stats:
+        stat.share = round(stat.total_ms * 100 / grand_total, 1)
+
+    context = {
+        'stats': stats,
+        'ordering': ordering,
+        'orderings': list(QUERY_STATS_ORDERINGS),
+        'view_filter': view_filter,
+        'views': QueryStat.objects.order_by('view').values_list('view', flat=True).distinct(),
+    }
+    return render(request, 'monitoring/query_stats.html', context)
+
+
+def _database_ready():
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+    except DatabaseError:
+        return False
+    return True
+
+
+async def readiness_view(request: HttpRequest) -> JsonResponse:
+    """
+    Listo para recibir tráfico: el worker está precalentado (lo precalienta si
+    hace falta) y la base de datos responde. 503 si no.
+    """
+    warmup = await sync_to_async(ensure_warm)()
+    ready = await sync_to_async(_database_ready)()
+    return JsonResponse({
+        'status': 'ready' if ready else 'unavailable',
+        'pid': os.getpid(),
+        'warmup': {name: {'ms': step['ms'], 'ok': step['error'] is None} for name, step in warmup.items()},
+    }, status=200 if ready else 503)
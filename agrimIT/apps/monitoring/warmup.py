@@ -0,0 +1,142 @@
+"""
+Worker warm-up.
+
+A fresh worker pays for a lot on its first requests: building the URL
+resolver, loading and parsing base_template.html and the app templates, the
+translation catalog, the first database connection and creating the storage
+client. ``warm_up()`` does all of it before the worker takes traffic. It runs
+from gunicorn's ``post_worker_init`` hook (gunicorn.conf.py), after the app is
+loaded, so it works the same with or without ``preload_app``, and is also
+available as ``manage.py warmup``. The readiness endpoint (/monitoreo/listo/)
+warms the worker itself if nothing did.
+
+A failing step is logged and reported, never raised: a worker whose database
+is not reachable yet still boots, and readiness answers 503 until it is.
+"""
+
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.template import engines
+from django.template.backends.django import DjangoTemplates
+from django.urls import get_resolver
+from django.utils import translation
+
+logger = logging.getLogger(__name__)
+
+_report = None
+_lock = threading.Lock()
+
+
+def warm_urls():
+    resolver = get_resolver()
+    # Imports every view module and compiles the patterns for reverse()
+    resolver.reverse_dict
+    resolver.resolve('/')
+    return f"{len(resolver.reverse_dict)} names"
+
+
+def warm_templates():
+    """
+    Compile the project's own templates into the cached loader, plus the
+    translation catalog they render with. Templates of third-party apps
+    (admin) are left alone.
+    """
+    root = str(settings.BASE_DIR.parent)
+    loaded = 0
+    for engine in engines.all():
+        if not isinstance(engine, DjangoTemplates):
+            continue
+        for directory in engine.template_dirs:
+            directory = str(directory)
+            if not directory.startswith(root) or not os.path.isdir(directory):
+                continue
+            for folder, _, files in os.walk(directory):
+                for file in files:
+                    if file.endswith('.html'):
+                        engine.get_template(os.path.relpath(os.path.join(folder, file), directory))
+                        loaded += 1
+    with translation.override(settings.LANGUAGE_CODE):
+        translation.gettext('')
+    return f"{loaded} templates"
+
+
+def warm_database():
+    """
+    Open (and check) a connection per database. With a connection pool the
+    connections opened here stay in it; without one this still pays for the
+    driver import, DNS and TLS setup once.
+    """
+    aliases = list(connections)
+    for alias in aliases:
+        connection = connections[alias]
+        connection.ensure_connection()
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        # Requests run in other threads: give the connection back (or let
+        # the pool keep it) instead of holding it for this one
+        if not connection.in_atomic_block:
+            connection.close()
+    return f"{len(aliases)} databases"
+
+
+def warm_storage():
+    if not settings.SUPABASE_URL or not settings.SUPABASE_KEY:
+        return 'not configured'
+    from apps.project_admin.storage import sync_storage
+    sync_storage.prepare()
+    return 'client ready'
+
+
+STEPS = {
+    'urls': warm_urls,
+    'templates': warm_templates,
+    'database': warm_database,
+    'storage': warm_storage,
+}
+
+
+def warm_up(steps=None):
+    """
+    Run the warm-up steps (all of STEPS by default) and return
+    {step: {'ms', 'detail', 'error'}}.
+    """
+    global _report
+    report = {}
+    for name in steps or STEPS:
+        started = time.perf_counter()
+        detail = error = None
+        try:
+            detail = STEPS[name]()
+        except Exception as exc:
+            error = f"{type(exc).__name__}: {exc}"
+            logger.warning("Warm-up step %s failed: %s", name, error)
+        report[name] = {'ms': round((time.perf_counter() - started) * 1000, 1), 'detail': detail, 'error': error}
+    if steps is None:
+        _report = report
+    return report
+
+
+def ensure_warm():
+    """Report of this process' warm-up, running it first if it has not run"""
+    if _report is None:
+        with _lock:
+            if _report is None:
+                warm_up()
+    return _report
+
+
+def warm_up_worker(log=logger):
+    """Entry point of the gunicorn hook, disabled with WARMUP_ON_BOOT=False"""
+    if not getattr(settings, 'WARMUP_ON_BOOT', True):
+        return
+    started = time.perf_counter()
+    report = ensure_warm()
+    log.info(
+        "Worker %s warmed up in %.0fms (%s)", os.getpid(), (time.perf_counter() - started) * 1000,
+        ', '.join(f"{name} {step['ms']:.0f}ms" + (' FAILED' if step['error'] else '') for name, step in report.items()),
+    )
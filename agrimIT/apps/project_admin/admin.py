@@ -2,4 +2,9 @@ from django.contrib import admin
 from .models import *
 
 admin.site.register(Project)
-admin.site.register(Event)
+
+
+@admin.register(Event)
+class EventAdmin(admin.ModelAdmin):
+    # __str__ reads the related project
+    list_select_related = ['project']
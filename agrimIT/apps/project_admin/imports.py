@@ -0,0 +1,355 @@
+"""
+Bulk import of projects from a CSV or XLSX file, for offices moving their
+spreadsheets in (the import view and ``manage.py import_projects``).
+
+The columns are those of the projects export (apps.project_admin.views), so
+an export imports back; model field names work too. Rows are read one at a
+time (csv.reader, or openpyxl in read-only mode) and handled in batches of
+IMPORT_BATCH_SIZE:
+
+- every row is checked with the fields of one ProjectForm, the same rules
+  as ``create_view``, without building a form per row;
+- the clients of the batch are looked up by name in a single query, and
+  the missing ones created with one bulk insert;
+- accounts, projects, their initial movements (Presupuesto, Anticipos,
+  Gastos) and history events are inserted with ``bulk_create``, and the
+  month's summary is updated once per project type.
+
+Each batch is its own transaction. Invalid rows are skipped and reported
+with their line number and the errors of each column.
+"""
+
+import csv
+import io
+import logging
+import unicodedata
+from collections import defaultdict
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from apps.accounting.models import Account, AccountMovement
+from apps.accounting.views import add_to_monthly_summary
+from apps.clients.models import Client
+
+from .forms import ProjectForm
+from .models import Event, Project
+from .views import PROJECT_EXPORT_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+IMPORT_BATCH_SIZE = 1000
+
+# Columns that are not project fields: (header, key)
+EXTRA_COLUMNS = [
+    ('Cliente', 'client_name'),
+    ('Documento del cliente', 'client_id_number'),
+    ('Telefono del cliente', 'client_phone'),
+    ('Email del cliente', 'client_email'),
+    ('Presupuesto', 'estimated'),
+    ('Anticipos', 'advance'),
+    ('Gastos', 'expense'),
+]
+
+# Exported, but set by the application
+IGNORED_FIELDS = {'pk', 'created'}
+
+# Initial movements: (key, movement type, description)
+MOVEMENTS = [
+    ('estimated', 'EST', "Se ingreso costo final de ${}"),
+    ('advance', 'ADV', "Se cobraron ${}"),
+    ('expense', 'EXP', "Se ingreso el gasto de ${}"),
+]
+
+TRUE_VALUES = {'si', 'true', '1', 'x', 'cerrado'}
+
+
+class ImportFileError(Exception):
+    """The file cannot be imported at all (format, missing columns)"""
+
+
+def normalize(text) -> str:
+    """Lowercase, without accents or repeated spaces, to compare headers and choices"""
+    text = unicodedata.normalize('NFKD', str(text)).encode('ascii', 'ignore').decode()
+    return ' '.join(text.lower().replace('_', ' ').split())
+
+
+def parse_amount(value) -> Decimal:
+    """
+    An amount from a cell: numbers as they are, text as '1234.56',
+    '1.234,56' or '$ 1,234.56'. Raises ValueError.
+    """
+    if value in (None, ''):
+        return Decimal('0')
+    if isinstance(value, (int, float, Decimal)):
+        return Decimal(str(value))
+    text = str(value).replace('$', '').replace(' ', '').strip()
+    if ',' in text and '.' in text:
+        # The last separator is the decimal one
+        thousands = '.' if text.rfind(',') > text.rfind('.') else ','
+        text = text.replace(thousands, '')
+    elif text.count('.') > 1:
+        text = text.replace('.', '')
+    text = text.replace(',', '.')
+    try:
+        amount = Decimal(text)
+    except InvalidOperation:
+        raise ValueError(value) from None
+    if not amount.is_finite() or abs(amount) >= 10 ** 18:
+        raise ValueError(value)
+    return amount.quantize(Decimal('0.01'))
+
+
+def read_rows(file, filename: str):
+    """The rows of a CSV or XLSX file as lists of cells, header first"""
+    if filename.lower().endswith('.xlsx'):
+        from openpyxl import load_workbook
+
+        try:
+            workbook = load_workbook(file, read_only=True, data_only=True)
+        except Exception as exc:
+            raise ImportFileError(f"No se pudo leer el archivo Excel: {exc}") from exc
+        try:
+            for row in workbook.active.iter_rows(values_only=True):
+                yield list(row)
+        finally:
+            workbook.close()
+        return
+
+    # Excel saves CSV with ';' in locales with a decimal comma
+    text = io.TextIOWrapper(file, encoding='utf-8-sig', errors='replace', newline='')
+    sample = text.read(4096)
+    text.seek(0)
+    options = {}
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+    except csv.Error:
+        # The sniffer gives up on preambles (bank statements) and rows with
+        # different numbers of cells: take the most frequent delimiter
+        dialect = csv.excel
+        options['delimiter'] = max(',;\t', key=sample.count)
+    try:
+        yield from csv.reader(text, dialect, **options)
+    finally:
+        # Leave the file open for its owner
+        text.detach()
+
+
+class RowValidator:
+    """
+    Cleans rows with the fields of a single ProjectForm: the form's rules
+    without the cost of building a form for every row.
+    """
+
+    def __init__(self):
+        form = ProjectForm()
+        self.fields = {name: field for name, field in form.fields.items() if name != 'account'}
+        self.choices = {
+            name: {normalize(value): value for value, _ in field.choices if value}
+            for name, field in self.fields.items() if hasattr(field, 'choices')
+        }
+
+    def clean(self, values: dict) -> tuple[dict, dict]:
+        """(cleaned data, errors per field) of the project fields of a row"""
+        cleaned, errors = {}, {}
+        for name, field in self.fields.items():
+            value = values.get(name)
+            if value is None:
+                value = ''
+            elif name == 'closed':
+                value = normalize(value) in TRUE_VALUES
+            elif name in self.choices:
+                value = self.choices[name].get(normalize(value), value)
+            elif not isinstance(value, str):
+                value = str(int(value)) if isinstance(value, float) and value.is_integer() else str(value)
+            else:
+                value = value.strip()
+            try:
+                cleaned[name] = field.clean(value)
+            except ValidationError as exc:
+                errors[name] = exc.messages
+        return cleaned, errors
+
+
+class ProjectImporter:
+    """Imports the rows of one file for ``user``; see the module docstring"""
+
+    def __init__(self, user, batch_size: int = IMPORT_BATCH_SIZE):
+        self.user = user
+        self.batch_size = batch_size
+        self.validator = RowValidator()
+        self.headers = {}  # key -> header label, for the error report
+        self.created = 0
+        self.clients_created = 0
+        self.errors = []
+        self.ignored_columns = []
+
+    def run(self, rows) -> dict:
+        rows = iter(rows)
+        header = next(rows, None)
+        if header is None:
+            raise ImportFileError('El archivo está vacío')
+        keys = self.map_header(header)
+
+        batch = []
+        for line, row in enumerate(rows, start=2):
+            if not any(cell not in (None, '') for cell in row):
+                continue
+            batch.append((line, {key: value for key, value in zip(keys, row) if key}))
+            if len(batch) >= self.batch_size:
+                self.import_batch(batch)
+                batch = []
+        if batch:
+            self.import_batch(batch)
+        return self.report()
+
+    def map_header(self, header: list) -> list:
+        """The key (field name or EXTRA_COLUMNS key) of every column, None to skip it"""
+        known = {normalize(label): field for label, field, *_ in PROJECT_EXPORT_COLUMNS if field in IGNORED_FIELDS}
+        for label, field, *_ in PROJECT_EXPORT_COLUMNS:
+            # Only what ProjectForm accepts
+            if field in self.validator.fields:
+                known[normalize(label)] = field
+        for field in self.validator.fields:
+            known[normalize(field)] = field
+        for label, key in EXTRA_COLUMNS:
+            known[normalize(label)] = key
+            known[normalize(key)] = key
+
+        keys = []
+        for cell in header:
+            key = known.get(normalize(cell or ''))
+            if key in IGNORED_FIELDS:
+                key = None
+            elif key is None and cell not in (None, ''):
+                self.ignored_columns.append(str(cell))
+            elif key is not None:
+                self.headers[key] = str(cell)
+            keys.append(key)
+        if 'type' not in keys:
+            raise ImportFileError('Falta la columna Proyecto (tipo de proyecto)')
+        return keys
+
+    def clean_row(self, values: dict) -> tuple[dict, dict, dict]:
+        """(project fields, amounts, errors) of a row"""
+        cleaned, errors = self.validator.clean(values)
+        amounts = {}
+        for key, _, _ in MOVEMENTS:
+            try:
+                amounts[key] = parse_amount(values.get(key))
+            except ValueError:
+                errors[key] = ['Importe no válido']
+        return cleaned, amounts, errors
+
+    def import_batch(self, batch: list):
+        valid = []
+        for line, values in batch:
+            cleaned, amounts, errors = self.clean_row(values)
+            if errors:
+                self.errors.append({
+                    'row': line,
+                    'errors': {self.headers.get(key, key): messages for key, messages in errors.items()},
+                })
+            else:
+                valid.append((values, cleaned, amounts))
+        if not valid:
+            return
+
+        with transaction.atomic():
+            clients = self.resolve_clients(values for values, _, _ in valid)
+            # Foreign keys by id: cheaper than setting related objects per row
+            user_id = self.user.pk
+            accounts = Account.objects.bulk_create([
+                Account(user_id=user_id, **amounts) for _, _, amounts in valid
+            ])
+            projects = Project.objects.bulk_create([
+                Project(
+                    user_id=user_id,
+                    client_id=clients.get(self.client_name(values)),
+                    account_id=account.pk,
+                    **cleaned,
+                )
+                for (values, cleaned, _), account in zip(valid, accounts)
+            ])
+
+            movements = []
+            totals = defaultdict(lambda: {'advance': Decimal('0'), 'expense': Decimal('0')})
+            for project, account, (_, _, amounts) in zip(projects, accounts, valid):
+                for key, movement_type, description in MOVEMENTS:
+                    if amounts[key]:
+                        movements.append(AccountMovement(
+                            user_id=user_id, account_id=account.pk, amount=amounts[key],
+                            movement_type=movement_type, description=description.format(amounts[key]),
+                            created_by_id=user_id,
+                        ))
+                totals[project.type]['advance'] += amounts['advance']
+                totals[project.type]['expense'] += amounts['expense']
+            AccountMovement.objects.bulk_create(movements)
+            Event.objects.bulk_create([
+                Event(project_id=project.pk, project_pk=project.pk, type='newp',
+                      msg='Se importó el proyecto desde un archivo', user_id=user_id)
+                for project in projects
+            ])
+
+            # Like create_acc_entry, the money of the movements goes to this month
+            for project_type, total in totals.items():
+                if total['advance']:
+                    add_to_monthly_summary(self.user.pk, project_type, 'total_advance', total['advance'], total['advance'])
+                if total['expense']:
+                    add_to_monthly_summary(self.user.pk, project_type, 'total_expenses', total['expense'], -total['expense'])
+        self.created += len(projects)
+
+    @staticmethod
+    def client_name(values: dict) -> str:
+        return ' '.join(str(values.get('client_name') or '').split())[:100]
+
+    def resolve_clients(self, rows) -> dict:
+        """Name -> client id for the clients of a batch, creating the missing ones"""
+        details = {}
+        for values in rows:
+            name = self.client_name(values)
+            if name and name not in details:
+                details[name] = values
+        if not details:
+            return {}
+
+        clients = {}
+        for pk, name in Client.objects.filter(user=self.user, name__in=details).order_by('pk').values_list('pk', 'name'):
+            clients.setdefault(name, pk)
+        new = [
+            Client(
+                user=self.user,
+                name=name,
+                id_number=str(values.get('client_id_number') or '')[:13],
+                phone=str(values.get('client_phone') or '')[:20],
+                email=values.get('client_email') or None,
+            )
+            for name, values in details.items() if name not in clients
+        ]
+        for client in Client.objects.bulk_create(new):
+            clients[client.name] = client.pk
+        self.clients_created += len(new)
+        return clients
+
+    def report(self) -> dict:
+        return {
+            'created': self.created,
+            'clients_created': self.clients_created,
+            'errors': self.errors,
+            'ignored_columns': self.ignored_columns,
+        }
+
+
+def import_projects(file, filename: str, user, batch_size: int = IMPORT_BATCH_SIZE) -> dict:
+    """
+    Import the projects of a CSV or XLSX ``file`` (binary) for ``user``.
+    Returns {'created', 'clients_created', 'errors': [{'row', 'errors'}],
+    'ignored_columns'}. Raises ImportFileError if the file cannot be read.
+    """
+    report = ProjectImporter(user, batch_size).run(read_rows(file, filename))
+    logger.info(
+        "Imported %s projects (%s new clients, %s invalid rows) from %s",
+        report['created'], report['clients_created'], len(report['errors']), filename,
+    )
+    return report
@@ -0,0 +1,131 @@
+"""
+Background tasks of the projects app (apps.jobs): work that used to run
+inside the request that triggered it.
+"""
+
+import logging
+from decimal import Decimal as Dec
+
+from django.db import transaction
+
+from apps.accounting.models import MonthlyFinancialSummary, MonthlySnapshot
+from apps.jobs.tasks import task
+from apps.project_admin.models import Project
+
+logger = logging.getLogger(__name__)
+
+
+@task(max_attempts=5)
+def remove_files(names: list) -> int:
+    """
+    Remove objects from storage once their records are gone (project or
+    client deleted). A storage error fails the attempt and the job is retried.
+    """
+    from .storage import sync_storage
+
+    sync_storage.remove_many(names)
+    return len(names)
+
+
+@task(priority=-1)
+@transaction.atomic
+def rebuild_monthly_summaries(user_id: int) -> dict:
+    """
+    Regenerate the monthly financial summaries of a user by collecting all
+    accounting data and calculating totals per month.
+    """
+    # Get all projects for the user with their accounts
+    user_projects = Project.objects.select_related('account', 'client')\
+        .filter(
+            user_id=user_id,
+            account__isnull=False
+        )
+
+    # Dictionary to store monthly data
+    monthly_data = {}
+    created_summaries = []
+    processed = 0
+
+    # Process each project
+    for project in user_projects:
+        processed += 1
+        created_date = project.created
+        year = created_date.year
+        month = created_date.month
+
+        # Initialize month data if not exists
+        month_key = f"{year}-{month:02d}"
+        if month_key not in monthly_data:
+            monthly_data[month_key] = {
+                'year': year,
+                'month': month,
+                'total_advance': Dec('0.00'),
+                'total_expenses': Dec('0.00'),
+                'income_mensura': Dec('0.00'),
+                'income_est_parc': Dec('0.00'),
+                'income_leg': Dec('0.00'),
+                'income_amoj': Dec('0.00'),
+                'income_relev': Dec('0.00'),
+            }
+
+        # Add project's financial data to monthly totals
+        account = project.account
+
+        # Skip if project doesn't have an account
+        if not account:
+            logger.warning(f"Project {project.pk} doesn't have an account, skipping financial data")
+            continue
+
+        monthly_data[month_key]['total_advance'] += account.advance
+        monthly_data[month_key]['total_expenses'] += account.expense
+
+        # Calculate net income for this project and add to appropriate category
+        net_income = account.advance - account.expense
+
+        # Categorize by project type
+        project_type = project.type.lower()
+        if 'mensura' in project_type:
+            monthly_data[month_key]['income_mensura'] += net_income
+        elif 'estado parcelario' in project_type or 'parcelario' in project_type:
+            monthly_data[month_key]['income_est_parc'] += net_income
+        elif 'legajo' in project_type:
+            monthly_data[month_key]['income_leg'] += net_income
+        elif 'amojonamiento' in project_type:
+            monthly_data[month_key]['income_amoj'] += net_income
+        elif 'relevamiento' in project_type:
+            monthly_data[month_key]['income_relev'] += net_income
+
+    # Create or update MonthlyFinancialSummary records
+    for month_key, data in monthly_data.items():
+        summary, created = MonthlyFinancialSummary.objects.update_or_create(
+            user_id=user_id,
+            year=data['year'],
+            month=data['month'],
+            defaults={
+                'total_advance': data['total_advance'],
+                'total_expenses': data['total_expenses'],
+                'income_mensura': data['income_mensura'],
+                'income_est_parc': data['income_est_parc'],
+                'income_leg': data['income_leg'],
+                'income_amoj': data['income_amoj'],
+                'income_relev': data['income_relev'],
+            }
+        )
+
+        created_summaries.append({
+            'month': data['month'],
+            'year': data['year'],
+            'total_advance': float(data['total_advance']),
+            'total_expenses': float(data['total_expenses']),
+            'net_worth': float(data['total_advance'] - data['total_expenses']),
+            'created': created
+        })
+
+    # Snapshots froze the old figures; the next month rollover freezes the
+    # rebuilt ones
+    MonthlySnapshot.objects.filter(user_id=user_id).delete()
+
+    return {
+        'summaries': created_summaries,
+        'total_projects_processed': processed,
+    }
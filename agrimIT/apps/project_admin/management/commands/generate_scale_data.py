@@ -0,0 +1,305 @@
+import random
+import time
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from apps.accounting.models import Account, AccountMovement, MonthlyFinancialSummary
+from apps.accounting.views import SUMMARY_TYPE_FIELDS
+from apps.clients.models import Client
+from apps.monitoring.seeding import explicit_dates
+from apps.project_admin.models import Event, Project
+from apps.teams.models import ProjectShare, Team, TeamMembership
+from apps.users.models import User
+
+
+# Share of each project type in a typical surveying practice
+TYPE_WEIGHTS = {
+    'Mensura': 40,
+    'Estado Parcelario': 25,
+    'Relevamiento': 15,
+    'Amojonamiento': 10,
+    'Legajo Parcelario': 10,
+}
+MENS_TYPES = ['PH', 'Usucapion', 'Division', 'Anexion/Division', 'Unificacion']
+PARTIDOS = [
+    'La Plata', 'Berisso', 'Ensenada', 'Brandsen', 'Magdalena', 'Punta Indio',
+    'Chascomús', 'Cañuelas', 'San Vicente', 'Florencio Varela', 'Berazategui',
+]
+CIRCUNSCRIPCIONES = ['I', 'II', 'III', 'IV', 'V', 'VI', 'VII', 'VIII', 'IX', 'X']
+FIRST_NAMES = [
+    'Juan', 'María', 'Carlos', 'Ana', 'Luis', 'Carmen', 'Miguel', 'Laura',
+    'José', 'Elena', 'Francisco', 'Pilar', 'Jorge', 'Lucía', 'Pablo', 'Sofía',
+]
+LAST_NAMES = [
+    'Pérez', 'González', 'Rodríguez', 'Martín', 'García', 'López', 'Fernández',
+    'Sánchez', 'Díaz', 'Ruiz', 'Torres', 'Moreno', 'Romero', 'Álvarez', 'Suárez',
+]
+STREETS = ['Calle 7', 'Calle 12', 'Diagonal 74', 'Av. 13', 'Calle 50', 'Av. 44', 'Camino Centenario']
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate a large, reproducible synthetic dataset (users, clients, '
+        'projects, multi-year movements, events, teams and shares) with '
+        'batched bulk inserts, for load and scale testing'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10, help='Number of users (default: 10)')
+        parser.add_argument('--clients', type=int, default=50, help='Clients per user (default: 50)')
+        parser.add_argument('--projects', type=int, default=500, help='Projects per user (default: 500)')
+        parser.add_argument('--movements', type=int, default=10,
+                            help='Average movements per project (default: 10)')
+        parser.add_argument('--years', type=int, default=3, help='Years of history (default: 3)')
+        parser.add_argument('--teams', type=int, default=2, help='Teams per user (default: 2)')
+        parser.add_argument('--share-ratio', type=float, default=0.2,
+                            help='Share of projects shared with a team (default: 0.2)')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed (default: 42)')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per INSERT (default: 5000)')
+        parser.add_argument('--prefix', default='scale', help='Username prefix (default: scale)')
+        parser.add_argument('--password', default='scale-password', help='Password of every generated user')
+        parser.add_argument('--clear', action='store_true',
+                            help='Delete the users with this prefix (and their data) first')
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['clients'] < 1:
+            raise CommandError('--users and --clients must be at least 1')
+        if options['projects'] < 0 or options['movements'] < 1 or options['years'] < 1:
+            raise CommandError('--projects must be positive, --movements and --years at least 1')
+
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+        self.start = self.now - timedelta(days=365 * options['years'])
+        self.totals = defaultdict(int)
+        self.projects_by_user = {}
+        started = time.perf_counter()
+
+        if options['clear']:
+            deleted, _ = User.objects.filter(username__startswith=options['prefix']).delete()
+            self.stdout.write(f"🧹 Deleted {deleted} rows from a previous run")
+
+        users = self.create_users(options)
+        for index, user in enumerate(users, start=1):
+            with transaction.atomic():
+                self.create_user_data(user, options)
+            self.stdout.write(
+                f"👤 {index}/{len(users)} {user.username}: "
+                f"{self.totals['movements']:,} movements so far "
+                f"({time.perf_counter() - started:.1f}s)"
+            )
+
+        with transaction.atomic():
+            self.create_teams(users, options)
+
+        elapsed = time.perf_counter() - started
+        summary = ', '.join(f"{count:,} {name}" for name, count in self.totals.items())
+        self.stdout.write(self.style.SUCCESS(f"✅ Created {summary} in {elapsed:.1f}s"))
+
+    # Helpers ---------------------------------------------------------------
+
+    def bulk_create(self, model, objects):
+        return model.objects.bulk_create(objects, batch_size=self.batch_size)
+
+    def random_date(self, start, end=None):
+        end = end or self.now
+        span = max((end - start).total_seconds(), 1)
+        return start + timedelta(seconds=self.rng.uniform(0, span))
+
+    def person_name(self):
+        return f"{self.rng.choice(FIRST_NAMES)} {self.rng.choice(LAST_NAMES)}"
+
+    # Users and their data ----------------------------------------------------
+
+    def create_users(self, options):
+        # Hash once: hashing per user would dominate the run time
+        password = make_password(options['password'])
+        users = self.bulk_create(User, [
+            User(
+                username=f"{options['prefix']}{index:04d}",
+                email=f"{options['prefix']}{index:04d}@example.com",
+                first_name=self.rng.choice(FIRST_NAMES),
+                last_name=self.rng.choice(LAST_NAMES),
+                password=password,
+            )
+            for index in range(options['users'])
+        ])
+        self.totals['users'] += len(users)
+        return users
+
+    def create_user_data(self, user, options):
+        rng = self.rng
+        clients = self.bulk_create(Client, [
+            Client(
+                user=user,
+                name=self.person_name(),
+                id_type=rng.choice(['DNI', 'DNI', 'DNI', 'CUIT', 'CUIL']),
+                id_number=str(rng.randint(10000000, 45000000)),
+                phone=f"221-{rng.randint(4000000, 6999999)}",
+                email=f"cliente{rng.randint(1, 10**6)}@example.com",
+                flag=rng.random() > 0.05,
+            )
+            for _ in range(options['clients'])
+        ])
+        self.totals['clients'] += len(clients)
+
+        # Plan every project first so account totals match their movements
+        plans = [self.plan_project(options['movements']) for _ in range(options['projects'])]
+
+        labels = dict(AccountMovement.MOVEMENT_TYPES)
+        with explicit_dates(
+            (Account, 'created'), (Project, 'created'), (AccountMovement, 'created_at'), (Event, 'time'),
+        ):
+            accounts = self.bulk_create(Account, [
+                Account(
+                    user=user, estimated=plan['estimated'], advance=plan['advance'],
+                    expense=plan['expense'], created=plan['created'],
+                )
+                for plan in plans
+            ])
+            projects = self.bulk_create(Project, [
+                self.build_project(user, rng.choice(clients), account, plan)
+                for account, plan in zip(accounts, plans)
+            ])
+            self.totals['projects'] += len(projects)
+
+            movements = []
+            events = []
+            # Like add_to_monthly_summary: each movement counts in its month, and
+            # the type column gets the net income (advances less expenses)
+            monthly = defaultdict(lambda: defaultdict(Decimal))
+            for project, account, plan in zip(projects, accounts, plans):
+                type_field = SUMMARY_TYPE_FIELDS[project.type]
+                events.append(Event(
+                    user=user, project=project, project_pk=project.pk, client_pk=project.client_id,
+                    type='newp', msg=f"Se creó un proyecto {project.type}", time=plan['created'],
+                ))
+                if rng.random() < 0.3:
+                    events.append(Event(
+                        user=user, project=project, project_pk=project.pk, client_pk=project.client_id,
+                        type='modp', msg=f"Se modificó un proyecto {project.type}",
+                        time=self.random_date(plan['created']),
+                    ))
+                for kind, amount, date in plan['movements']:
+                    movements.append(AccountMovement(
+                        user=user, account=account, amount=amount, movement_type=kind,
+                        description=f"{labels[kind]} {project.titular_name}",
+                        created_at=date, created_by=user,
+                    ))
+                    if kind == 'ADV':
+                        monthly[(date.year, date.month)]['total_advance'] += amount
+                        monthly[(date.year, date.month)][type_field] += amount
+                    elif kind == 'EXP':
+                        monthly[(date.year, date.month)]['total_expenses'] += amount
+                        monthly[(date.year, date.month)][type_field] -= amount
+                if len(movements) >= self.batch_size:
+                    self.totals['movements'] += len(self.bulk_create(AccountMovement, movements))
+                    movements = []
+            self.totals['movements'] += len(self.bulk_create(AccountMovement, movements))
+            self.totals['events'] += len(self.bulk_create(Event, events))
+
+        self.totals['monthly summaries'] += len(self.bulk_create(MonthlyFinancialSummary, [
+            MonthlyFinancialSummary(user=user, year=year, month=month, **totals)
+            for (year, month), totals in sorted(monthly.items())
+        ]))
+        self.projects_by_user[user.pk] = projects
+
+    def plan_project(self, average_movements):
+        """Dates and amounts of one project and its movements"""
+        rng = self.rng
+        created = self.random_date(self.start)
+        estimated = Decimal(rng.randrange(150000, 5000000, 5000))
+        movements = [('EST', estimated, created)]
+        advance = expense = Decimal('0')
+        count = max(0, int(rng.gauss(average_movements, average_movements / 3)) - 1)
+        for _ in range(count):
+            date = self.random_date(created)
+            if rng.random() < 0.55:
+                amount = (estimated * Decimal(rng.uniform(0.05, 0.3))).quantize(Decimal('1'))
+                movements.append(('ADV', amount, date))
+                advance += amount
+            else:
+                amount = Decimal(rng.randrange(5000, 200000, 500))
+                movements.append(('EXP', amount, date))
+                expense += amount
+        return {
+            'created': created,
+            'estimated': estimated,
+            'advance': advance,
+            'expense': expense,
+            'movements': movements,
+        }
+
+    def build_project(self, user, client, account, plan):
+        rng = self.rng
+        project_type = rng.choices(list(TYPE_WEIGHTS), weights=list(TYPE_WEIGHTS.values()))[0]
+        # Urban lots have a quinta, rural ones a chacra, never both
+        rural = rng.random() < 0.3
+        titular = client.name if rng.random() < 0.7 else self.person_name()
+        return Project(
+            user=user,
+            client=client,
+            account=account,
+            type=project_type,
+            type_mens=rng.choice(MENS_TYPES) if project_type == 'Mensura' else None,
+            titular_name=titular,
+            titular_phone=client.phone,
+            partido=rng.choice(PARTIDOS),
+            partida=str(rng.randint(100000, 999999)),
+            circ=rng.choice(CIRCUNSCRIPCIONES),
+            sect=rng.choice('ABCDEFGHJK'),
+            chacra_num=str(rng.randint(1, 200)) if rural else '',
+            quinta_num='' if rural else str(rng.randint(1, 300)),
+            manzana_num=str(rng.randint(1, 400)),
+            manzana_let=rng.choice(['', '', 'a', 'b']),
+            parcela_num=str(rng.randint(1, 40)),
+            parcela_let=rng.choice(['', '', '', 'a', 'b', 'c']),
+            street=rng.choice(STREETS),
+            street_num=str(rng.randint(1, 3000)),
+            inscription_type=rng.choice(['Folio', 'Matricula']),
+            process_num=rng.randint(1000, 99999) if rng.random() < 0.6 else None,
+            closed=plan['created'] < self.now - timedelta(days=180) and rng.random() < 0.7,
+            created=plan['created'],
+        )
+
+    # Teams -----------------------------------------------------------------
+
+    def create_teams(self, users, options):
+        rng = self.rng
+        teams = self.bulk_create(Team, [
+            Team(name=f"Grupo {owner.username} {index + 1}", description='Grupo generado', owner=owner)
+            for owner in users
+            for index in range(options['teams'])
+        ])
+        self.totals['teams'] += len(teams)
+
+        memberships = []
+        for team in teams:
+            others = [user for user in users if user.pk != team.owner_id]
+            for member in rng.sample(others, min(len(others), rng.randint(1, 4))):
+                memberships.append(TeamMembership(
+                    team=team, user=member, role=rng.choice(['member', 'member', 'viewer']),
+                ))
+        self.totals['memberships'] += len(self.bulk_create(TeamMembership, memberships))
+
+        teams_by_owner = defaultdict(list)
+        for team in teams:
+            teams_by_owner[team.owner_id].append(team)
+        shares = []
+        for owner in users:
+            owner_teams = teams_by_owner[owner.pk]
+            if not owner_teams:
+                continue
+            for project in self.projects_by_user[owner.pk]:
+                if rng.random() < options['share_ratio']:
+                    shares.append(ProjectShare(project=project, team=rng.choice(owner_teams), shared_by=owner))
+            if len(shares) >= self.batch_size:
+                self.totals['shares'] += len(self.bulk_create(ProjectShare, shares))
+                shares = []
+        self.totals['shares'] += len(self.bulk_create(ProjectShare, shares))
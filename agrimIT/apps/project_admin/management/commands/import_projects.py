@@ -0,0 +1,61 @@
+import csv
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.project_admin.imports import IMPORT_BATCH_SIZE, ImportFileError, import_projects
+from apps.users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Import projects for a user from a CSV or XLSX file with the columns of '
+        'the projects export, in batched bulk inserts. Invalid rows are skipped '
+        'and reported'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', help='CSV or .xlsx file')
+        parser.add_argument('--user', required=True, help='Username that will own the projects')
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE,
+                            help=f'Rows per batch and transaction (default: {IMPORT_BATCH_SIZE})')
+        parser.add_argument('--errors', help='Write the rejected rows and their errors to this CSV file')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['user']} does not exist")
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        started = time.perf_counter()
+        try:
+            with open(options['file'], 'rb') as file:
+                report = import_projects(file, options['file'], user, options['batch_size'])
+        except OSError as e:
+            raise CommandError(f"Cannot read {options['file']}: {e}")
+        except ImportFileError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Imported {report['created']} projects in {time.perf_counter() - started:.1f}s "
+            f"({report['clients_created']} new clients)"
+        ))
+        if report['ignored_columns']:
+            self.stdout.write(f"⚠️ Ignored columns: {', '.join(report['ignored_columns'])}")
+        if not report['errors']:
+            return
+        self.stdout.write(self.style.WARNING(f"❌ {len(report['errors'])} rows rejected"))
+        if options['errors']:
+            with open(options['errors'], 'w', newline='', encoding='utf-8') as output:
+                writer = csv.writer(output)
+                writer.writerow(['row', 'column', 'errors'])
+                for error in report['errors']:
+                    for column, messages in error['errors'].items():
+                        writer.writerow([error['row'], column, ' '.join(messages)])
+            self.stdout.write(f"📄 Errors written to {options['errors']}")
+        else:
+            for error in report['errors']:
+                details = '; '.join(f"{column}: {' '.join(messages)}" for column, messages in error['errors'].items())
+                self.stdout.write(f"  row {error['row']}: {details}")
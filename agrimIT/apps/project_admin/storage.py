@@ -0,0 +1,375 @@
+"""
+Async client for Supabase Storage.
+
+It talks to the Storage REST API directly over httpx with a persistent,
+HTTP/2-capable connection pool, so calls reuse connections (no handshake per
+file) and a slow upload or download only keeps a coroutine waiting instead
+of a worker. httpx is only imported when the first client is created.
+
+The client lives on an event loop shared by the whole process, running in
+a daemon thread. Async code awaits its calls from any loop, including the
+short-lived loop async_to_sync creates for each async view under WSGI,
+which would otherwise leave a client open per request:
+
+    storage = get_storage()
+    await storage.upload(name, content)
+    content = await storage.download(name)
+    await storage.remove_many(names)
+
+Batch calls (upload_many, remove_many, stat_many) run at most
+STORAGE_CONCURRENCY requests at a time. Sync code uses ``sync_storage``,
+which blocks on the same calls:
+
+    sync_storage.remove_many(names)
+
+Settings: STORAGE_MAX_CONNECTIONS (pool size per process),
+STORAGE_CONCURRENCY and STORAGE_TIMEOUT (seconds).
+"""
+
+import asyncio
+import os
+import threading
+import weakref
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from apps.monitoring.instrumentation import timed
+
+# Objects per remove request accepted by the Storage API
+REMOVE_CHUNK_SIZE = 1000
+
+
+class StorageError(Exception):
+    """Storage answered with an error status, or could not be reached"""
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+class StorageBatchError(StorageError):
+    """
+    Some operations of a batch failed. ``results`` has the outcome of the
+    ones that succeeded and ``errors`` the StorageError of each failed name.
+    """
+
+    def __init__(self, results, errors):
+        super().__init__(f"{len(errors)} of {len(results) + len(errors)} storage operations failed: "
+                         + "; ".join(str(error) for error in list(errors.values())[:3]))
+        self.results = results
+        self.errors = errors
+
+
+class AsyncStorage:
+    """
+    Async Supabase Storage client for one bucket.
+
+    Args:
+        url: Supabase project URL.
+        key: API key, sent both as apikey and bearer token.
+        bucket: Bucket every object name refers to.
+        timeout: Seconds before a storage call gives up.
+        max_connections: Size of the connection pool.
+        concurrency: Default number of requests a batch call runs at once.
+    """
+
+    def __init__(self, url, key, bucket, timeout=30.0, max_connections=20, concurrency=8):
+        # Imported here: httpx is heavy and only needed once storage is used
+        import httpx
+
+        self._http_error = httpx.HTTPError
+        self.endpoint = f"{url.rstrip('/')}/storage/v1"
+        self.bucket = bucket
+        self.concurrency = concurrency
+        self.client = httpx.AsyncClient(
+            headers={'apikey': key, 'Authorization': f"Bearer {key}"},
+            timeout=timeout,
+            http2=True,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+
+    def public_url(self, name):
+        return f"{self.endpoint}/object/public/{self.bucket}/{name}"
+
+    async def _send(self, method, url, **kwargs):
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except self._http_error as exc:
+            raise StorageError(f"{method} {url} failed: {exc}") from exc
+        if response.is_error:
+            raise StorageError(
+                f"{method} {url} returned {response.status_code}: {response.text[:200]}",
+                status=response.status_code,
+            )
+        return response
+
+    # Single objects ----------------------------------------------------------
+
+    async def _upload(self, name, content, content_type='application/octet-stream'):
+        await self._send(
+            'POST', f"{self.endpoint}/object/{self.bucket}/{name}",
+            files={'file': (name, content, content_type)},
+        )
+        return self.public_url(name)
+
+    async def _remove(self, names):
+        response = await self._send(
+            'DELETE', f"{self.endpoint}/object/{self.bucket}", json={'prefixes': list(names)},
+        )
+        return [item.get('name') for item in response.json()]
+
+    async def _stat(self, name):
+        try:
+            response = await self._send('HEAD', f"{self.endpoint}/object/{self.bucket}/{name}")
+        except StorageError as exc:
+            if exc.status in (400, 404):
+                return None
+            raise
+        return {
+            'size': int(response.headers.get('content-length', 0)),
+            'content_type': response.headers.get('content-type'),
+            'etag': response.headers.get('etag'),
+            'last_modified': response.headers.get('last-modified'),
+        }
+
+    async def upload(self, name, content, content_type='application/octet-stream'):
+        """Store ``content`` (bytes) as ``name`` and return its public URL"""
+        with timed('storage'):
+            return await self._upload(name, content, content_type)
+
+    async def download(self, name):
+        """Bytes of object ``name``"""
+        with timed('storage'):
+            response = await self._send('GET', self.public_url(name))
+        return response.content
+
+    async def remove(self, names):
+        """Delete the objects in ``names`` (at most REMOVE_CHUNK_SIZE) and return the names removed"""
+        with timed('storage'):
+            return await self._remove(names)
+
+    async def stat(self, name):
+        """Size, content type, etag and last modified date of ``name``, or None if it does not exist"""
+        with timed('storage'):
+            return await self._stat(name)
+
+    # Batches ---------------------------------------------------------------
+
+    async def _run_batch(self, keys, calls, concurrency):
+        """
+        Await ``calls`` (coroutine functions) at most ``concurrency`` at a
+        time and return {key: result}, raising StorageBatchError if any
+        failed once all are done.
+        """
+        semaphore = asyncio.Semaphore(concurrency or self.concurrency)
+
+        async def bounded(call):
+            async with semaphore:
+                return await call()
+
+        with timed('storage'):
+            outcomes = await asyncio.gather(*(bounded(call) for call in calls), return_exceptions=True)
+        results, errors = {}, {}
+        for key, outcome in zip(keys, outcomes):
+            if isinstance(outcome, StorageError):
+                errors[key] = outcome
+            elif isinstance(outcome, BaseException):
+                raise outcome
+            else:
+                results[key] = outcome
+        if errors:
+            raise StorageBatchError(results, errors)
+        return results
+
+    async def upload_many(self, files, concurrency=None):
+        """
+        Upload ``files``, an iterable of (name, content) or (name, content,
+        content_type), and return {name: public URL}.
+        """
+        files = [tuple(item) for item in files]
+        return await self._run_batch(
+            [item[0] for item in files],
+            [lambda item=item: self._upload(*item) for item in files],
+            concurrency,
+        )
+
+    async def remove_many(self, names, concurrency=None):
+        """
+        Delete any number of objects, REMOVE_CHUNK_SIZE per request, and
+        return the names removed (missing objects are skipped).
+        """
+        names = list(names)
+        chunks = [names[start:start + REMOVE_CHUNK_SIZE] for start in range(0, len(names), REMOVE_CHUNK_SIZE)]
+        try:
+            results = await self._run_batch(
+                range(len(chunks)),
+                [lambda chunk=chunk: self._remove(chunk) for chunk in chunks],
+                concurrency,
+            )
+        except StorageBatchError as exc:
+            # Report failures per object name rather than per chunk
+            raise StorageBatchError(
+                {name: True for removed in exc.results.values() for name in removed},
+                {name: error for index, error in exc.errors.items() for name in chunks[index]},
+            ) from exc
+        return [name for index in range(len(chunks)) for name in results[index]]
+
+    async def stat_many(self, names, concurrency=None):
+        """{name: stat(name)} for every name, None for the missing ones"""
+        names = list(names)
+        return await self._run_batch(
+            names, [lambda name=name: self._stat(name) for name in names], concurrency,
+        )
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+_clients = weakref.WeakKeyDictionary()
+
+
+@receiver(setting_changed)
+def _reset_clients(setting, **kwargs):
+    # Tests point storage somewhere else with override_settings
+    if setting.startswith(('SUPABASE_', 'STORAGE_')):
+        _clients.clear()
+
+
+def loop_storage():
+    """Storage client of the running event loop, created on first use"""
+    loop = asyncio.get_running_loop()
+    storage = _clients.get(loop)
+    if storage is None:
+        if not settings.SUPABASE_URL or not settings.SUPABASE_KEY:
+            raise ValueError('SUPABASE_URL and SUPABASE_KEY are required. Please set them in environment variables.')
+        storage = _clients[loop] = AsyncStorage(
+            settings.SUPABASE_URL, settings.SUPABASE_KEY, settings.SUPABASE_BUCKET,
+            timeout=getattr(settings, 'STORAGE_TIMEOUT', 30.0),
+            max_connections=getattr(settings, 'STORAGE_MAX_CONNECTIONS', 20),
+            concurrency=getattr(settings, 'STORAGE_CONCURRENCY', 8),
+        )
+    return storage
+
+
+_shared_loop = None
+_shared_loop_pid = None
+_shared_loop_lock = threading.Lock()
+
+
+def shared_loop():
+    """
+    Event loop running in a daemon thread, shared by every sync caller in
+    the process (and restarted in forked workers, which do not inherit the
+    thread).
+    """
+    global _shared_loop, _shared_loop_pid
+    with _shared_loop_lock:
+        if _shared_loop is None or _shared_loop_pid != os.getpid():
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name='storage-loop', daemon=True).start()
+            _shared_loop, _shared_loop_pid = loop, os.getpid()
+        return _shared_loop
+
+
+def run_shared(method, *args, **kwargs):
+    """Concurrent future of the AsyncStorage ``method`` called on the shared loop"""
+    async def call():
+        return await getattr(loop_storage(), method)(*args, **kwargs)
+
+    return asyncio.run_coroutine_threadsafe(call(), shared_loop())
+
+
+class SharedStorage:
+    """
+    The AsyncStorage calls for coroutines on any event loop. Each call is
+    awaited on the shared loop, so the process has a single client and
+    connection pool, and no client is tied to a loop that goes away.
+    """
+
+    async def _run(self, method, *args, **kwargs):
+        if asyncio.get_running_loop() is shared_loop():
+            return await getattr(loop_storage(), method)(*args, **kwargs)
+        # The call runs in the loop's context, so it is timed here for the
+        # request being served
+        with timed('storage'):
+            return await asyncio.wrap_future(run_shared(method, *args, **kwargs))
+
+    async def upload(self, name, content, content_type='application/octet-stream'):
+        return await self._run('upload', name, content, content_type)
+
+    async def download(self, name):
+        return await self._run('download', name)
+
+    async def remove(self, names):
+        return await self._run('remove', names)
+
+    async def stat(self, name):
+        return await self._run('stat', name)
+
+    async def upload_many(self, files, concurrency=None):
+        return await self._run('upload_many', files, concurrency)
+
+    async def remove_many(self, names, concurrency=None):
+        return await self._run('remove_many', names, concurrency)
+
+    async def stat_many(self, names, concurrency=None):
+        return await self._run('stat_many', names, concurrency)
+
+
+shared_storage = SharedStorage()
+
+
+def get_storage():
+    """Storage client for async code, backed by the process' shared client"""
+    return shared_storage
+
+
+class SyncStorage:
+    """
+    Blocking version of the AsyncStorage calls for sync views and commands.
+    Every call runs on the shared loop, so all callers share one connection
+    pool; the caller's thread waits for the result.
+    """
+
+    def _run(self, method, *args, **kwargs):
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is shared_loop():
+            raise RuntimeError('sync_storage cannot be called from its own event loop, use get_storage()')
+        with timed('storage'):
+            return run_shared(method, *args, **kwargs).result()
+
+    def prepare(self):
+        """Start the shared loop and create its client ahead of the first call"""
+        async def create():
+            loop_storage()
+
+        asyncio.run_coroutine_threadsafe(create(), shared_loop()).result()
+
+    def upload(self, name, content, content_type='application/octet-stream'):
+        return self._run('upload', name, content, content_type)
+
+    def download(self, name):
+        return self._run('download', name)
+
+    def remove(self, names):
+        return self._run('remove', names)
+
+    def stat(self, name):
+        return self._run('stat', name)
+
+    def upload_many(self, files, concurrency=None):
+        return self._run('upload_many', files, concurrency)
+
+    def remove_many(self, names, concurrency=None):
+        return self._run('remove_many', names, concurrency)
+
+    def stat_many(self, names, concurrency=None):
+        return self._run('stat_many', names, concurrency)
+
+
+sync_storage = SyncStorage()
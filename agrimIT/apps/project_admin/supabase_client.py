@@ -1,18 +1,45 @@
-from supabase import create_client
+"""
+Supabase client, created on first use.
+
+Importing the supabase package pulls in gotrue, postgrest, realtime, storage3
+and websockets, so neither the import nor the client (nor the check of the
+credentials) happens until ``get_supabase()`` is called. File storage goes
+through ``apps.project_admin.storage``, which does not need it.
+"""
+
 import os
+import threading
+
 from django.conf import settings
 
-# Try to get from environment variables first, then fall back to Django settings
-SUPABASE_URL = os.environ.get("SUPABASE_URL") or getattr(settings, 'SUPABASE_URL', None)
-SUPABASE_KEY = os.environ.get("SUPABASE_KEY") or getattr(settings, 'SUPABASE_KEY', None)
+_client = None
+_lock = threading.Lock()
+
+
+def get_supabase():
+    """The shared Supabase client"""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = _create_client()
+    return _client
+
+
+def _create_client():
+    # Try to get from environment variables first, then fall back to Django settings
+    url = os.environ.get("SUPABASE_URL") or getattr(settings, 'SUPABASE_URL', None)
+    key = os.environ.get("SUPABASE_KEY") or getattr(settings, 'SUPABASE_KEY', None)
+
+    if not url:
+        raise ValueError("SUPABASE_URL is required. Please set it in environment variables or Django settings.")
 
-if not SUPABASE_URL:
-    raise ValueError("SUPABASE_URL is required. Please set it in environment variables or Django settings.")
+    if not key:
+        raise ValueError("SUPABASE_KEY is required. Please set it in environment variables or Django settings.")
 
-if not SUPABASE_KEY:
-    raise ValueError("SUPABASE_KEY is required. Please set it in environment variables or Django settings.")
+    from supabase import create_client
 
-try:
-    supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-except Exception as e:
-    raise RuntimeError(f"Failed to initialize Supabase client: {e}")
+    try:
+        return create_client(url, key)
+    except Exception as e:
+        raise RuntimeError(f"Failed to initialize Supabase client: {e}")
@@ -1,3 +1,478 @@
-from django.test import TestCase
+import csv
+import warnings
+from collections import defaultdict
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import skipUnless
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from apps.accounting.models import AccountMovement, MonthlyFinancialSummary
+from apps.accounting.views import SUMMARY_TYPE_FIELDS
+from apps.clients.models import Client
+from apps.jobs.models import Job
+from apps.jobs.worker import work_off
+from apps.monitoring.loadtest import free_port
+from apps.monitoring.seeding import seed_dataset
+from apps.monitoring.storage_stub import StorageStub
+from apps.monitoring.testing import PerformanceTestCase
+from apps.project_admin import storage
+from apps.project_admin.imports import import_projects
+from apps.project_admin.models import Event, Project, ProjectFiles
+from apps.project_admin.storage import StorageBatchError, get_storage, sync_storage
+from apps.teams.models import ProjectShare, Team
+from apps.users.models import User
+from apps.utils import db
+
+
+class ProjectViewsPerformanceTests(PerformanceTestCase):
+    """Query counts and latency of the project views over a seeded dataset"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('agrimensor', password='clave-segura-123')
+        cls.data = seed_dataset(cls.user, projects=60)
+        cls.project = cls.data['projects'][1]
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_index(self):
+        self.assertPerformance('index', reverse('index'), queries=6, max_ms=150)
+
+    def test_project_list(self):
+        self.assertPerformance('project_list', reverse('projects'), queries=4, max_ms=150)
+
+    def test_project_list_for_client(self):
+        url = reverse('projectslist', args=[self.project.client_id])
+        self.assertPerformance('project_list_client', url, queries=5, max_ms=150)
+
+    def test_project_list_for_type(self):
+        self.assertPerformance('project_list_type', reverse('projectslisttype', args=[1]), queries=5, max_ms=150)
+
+    def test_project_detail(self):
+        url = reverse('projectview', args=[self.project.pk])
+        self.assertPerformance('project_detail', url, queries=5, max_ms=150)
+
+    def test_history(self):
+        self.assertPerformance('history', reverse('history'), queries=3, max_ms=150)
+
+    def test_search(self):
+        response = self.assertPerformance(
+            'search', reverse('search'), queries=3, max_ms=50,
+            data={'query': 'Titular'}, ajax=True,
+        )
+        self.assertEqual(response.json()['count'], 5)
+
+
+class ExportTests(TestCase):
+    """CSV/XLSX exports of projects and movements"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('agrimensor', password='clave-segura-123')
+        cls.other = User.objects.create_user('otro', password='clave-segura-123')
+        seed_dataset(cls.user, projects=24, year=2025)
+        seed_dataset(cls.other, projects=3, year=2025)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def read_csv(self, response):
+        content = b''.join(response.streaming_content).decode('utf-8-sig')
+        return list(csv.reader(StringIO(content)))
+
+    def test_projects_csv_is_streamed_with_nomenclature(self):
+        response = self.client.get(reverse('export_projects'))
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        rows = self.read_csv(response)
+        self.assertIn('Partida', rows[0])
+        self.assertIn('Manzana numero', rows[0])
+        self.assertEqual(len(rows), 25)
+        first = Project.objects.filter(user=self.user).order_by('created', 'pk').select_related('client').first()
+        self.assertEqual(rows[1][rows[0].index('Cliente')], first.client.name)
+
+    def test_date_range_filters_the_movements(self):
+        response = self.client.get(reverse('export_movements'), {'start-date': '2025-03-01', 'end-date': '2025-03-31'})
+        rows = self.read_csv(response)
+        # 2 projects created in March, 3 movements each
+        self.assertEqual(len(rows), 7)
+        self.assertTrue(all(row[0].startswith('2025-03') for row in rows[1:]))
+        self.assertEqual({row[1] for row in rows[1:]}, {'Anticipo', 'Gasto', 'Presupuesto'})
+
+    def test_xlsx_export(self):
+        from openpyxl import load_workbook
+
+        response = self.client.get(reverse('export_projects'), {'format': 'xlsx', 'end-date': '2025-06-30'})
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="proyectos.xlsx"')
+        sheet = load_workbook(BytesIO(b''.join(response.streaming_content)), read_only=True).active
+        rows = list(sheet.values)
+        self.assertEqual(len(rows), 13)
+        self.assertEqual(rows[0][0], 'N°')
+
+    def test_unknown_format(self):
+        self.assertEqual(self.client.get(reverse('export_clients'), {'format': 'pdf'}).status_code, 400)
+
+    async def test_asgi_exports_are_async_iterators(self):
+        from openpyxl import load_workbook
+
+        await self.async_client.aforce_login(self.user)
+        contents = {}
+        for fmt in ('csv', 'xlsx'):
+            response = await self.async_client.get(reverse('export_projects'), {'format': fmt})
+            self.assertTrue(response.is_async)
+            # Read like ASGIHandler.send_response: a sync iterator would be
+            # collected into a list first, with a warning
+            with warnings.catch_warnings():
+                warnings.simplefilter('error')
+                contents[fmt] = b''.join([chunk async for chunk in response])
+        rows = list(csv.reader(StringIO(contents['csv'].decode('utf-8-sig'))))
+        self.assertEqual(len(rows), 25)
+        sheet = load_workbook(BytesIO(contents['xlsx']), read_only=True).active
+        self.assertEqual(len(list(sheet.values)), 25)
+
+
+class ImportTests(TestCase):
+    """Bulk import of projects from CSV/XLSX"""
+
+    CSV = (
+        'Proyecto;Cliente;Partido;Partida;Manzana numero;N° Tramite;Cerrado;Presupuesto;Anticipos;Gastos;Color\n'
+        'Mensura;Cliente Existente;La Plata;12345;10;77;No;1.500,50;500;100;rojo\n'
+        'estado parcelario;Cliente Nuevo;Berisso;555;;;Sí;;;;azul\n'
+        'Plano;Cliente Nuevo;Berisso;556;;abc;No;;;;verde\n'
+        ';;;;;;;;;;\n'
+        'Mensura;;Ensenada;557;;;No;;$ 1,000.25;mucho;\n'
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('agrimensor', password='clave-segura-123')
+        cls.existing = Client.objects.create(user=cls.user, name='Cliente Existente', id_number='1', phone='1')
+
+    def import_csv(self, content, **kwargs):
+        return import_projects(BytesIO(content.encode('utf-8')), 'proyectos.csv', self.user, **kwargs)
+
+    def test_valid_rows_are_imported_with_accounts_movements_and_events(self):
+        # Savepoint, client lookup and inserts, summary (created here) and its updates
+        with self.assertNumQueries(15):
+            report = self.import_csv(self.CSV)
+        self.assertEqual((report['created'], report['clients_created']), (2, 1))
+        self.assertEqual(report['ignored_columns'], ['Color'])
+
+        mensura = Project.objects.select_related('account', 'client').get(partida='12345')
+        self.assertEqual((mensura.client, mensura.manzana_num, mensura.process_num), (self.existing, '10', 77))
+        self.assertEqual(mensura.account.estimated, Decimal('1500.50'))
+        self.assertFalse(mensura.closed)
+        parcelario = Project.objects.get(partida='555')
+        self.assertEqual((parcelario.type, parcelario.client.name, parcelario.closed), ('Estado Parcelario', 'Cliente Nuevo', True))
+
+        self.assertEqual(
+            sorted(AccountMovement.objects.values_list('movement_type', 'amount')),
+            [('ADV', Decimal('500.00')), ('EST', Decimal('1500.50')), ('EXP', Decimal('100.00'))],
+        )
+        self.assertEqual(Event.objects.filter(type='newp').count(), 2)
+        summary = MonthlyFinancialSummary.objects.get(user=self.user)
+        self.assertEqual((summary.total_advance, summary.income_mensura), (Decimal('500.00'), Decimal('400.00')))
+
+    def test_invalid_rows_are_reported_by_line(self):
+        report = self.import_csv(self.CSV)
+        self.assertEqual([error['row'] for error in report['errors']], [4, 6])
+        self.assertEqual(set(report['errors'][0]['errors']), {'Proyecto', 'N° Tramite'})
+        self.assertEqual(report['errors'][1]['errors'], {'Gastos': ['Importe no válido']})
+        self.assertFalse(Project.objects.filter(partida__in=['556', '557']).exists())
+
+    def test_clients_are_looked_up_once_per_batch(self):
+        rows = ''.join(f"Mensura;Cliente {index % 3}\n" for index in range(9))
+        # Savepoints, client lookup, accounts, projects, events per batch; clients once
+        with self.assertNumQueries(3 * 6 + 1):
+            report = self.import_csv('Proyecto;Cliente\n' + rows, batch_size=3)
+        self.assertEqual((report['created'], report['clients_created']), (9, 3))
+
+    def test_missing_type_column(self):
+        from apps.project_admin.imports import ImportFileError
+
+        with self.assertRaises(ImportFileError):
+            self.import_csv('Cliente;Partida\nAlguien;1\n')
+
+    def test_export_imports_back(self):
+        seed_dataset(self.user, projects=12, year=2025)
+        self.client.force_login(self.user)
+        exported = b''.join(self.client.get(reverse('export_projects'), {'format': 'xlsx'}).streaming_content)
+        other = User.objects.create_user('otro', password='clave-segura-123')
+        self.client.force_login(other)
+
+        upload = SimpleUploadedFile('proyectos.xlsx', exported)
+        response = self.client.post(reverse('import_projects'), {'file': upload})
+        self.assertEqual(response.context['report']['created'], 12)
+        self.assertEqual(response.context['report']['errors'], [])
+        self.assertEqual(
+            sorted(Project.objects.filter(user=other).values_list('partida', 'account__estimated')),
+            sorted(Project.objects.filter(user=self.user).values_list('partida', 'account__estimated')),
+        )
+
+
+class MonthlySummariesJobTests(TestCase):
+    """Summary regeneration runs in the job worker, not in the request"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser('admin', password='clave-segura-123')
+        seed_dataset(cls.user, projects=24)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_view_queues_the_regeneration(self):
+        MonthlyFinancialSummary.objects.filter(user=self.user).delete()
+        response = self.client.get(reverse('generate_monthly_summaries'))
+        self.assertEqual(response.status_code, 202)
+        job = Job.objects.get(pk=response.json()['job'])
+        self.assertEqual((job.task, job.args), ('apps.project_admin.jobs.rebuild_monthly_summaries', [self.user.pk]))
+        self.assertFalse(MonthlyFinancialSummary.objects.filter(user=self.user).exists())
+
+        work_off()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
+        self.assertEqual(job.result['total_projects_processed'], 24)
+        self.assertEqual(MonthlyFinancialSummary.objects.filter(user=self.user).count(), 12)
+
+
+class GenerateTestDataTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser('admin', password='clave-segura-123')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_projects_movements_and_summary(self):
+        with self.settings(QUERY_BUDGET_MODE='raise'):
+            response = self.client.get(reverse('generate_test_data'))
+        self.assertEqual(response.status_code, 200)
+        created = response.json()['projects']
+        self.assertEqual(len(created), 24)
+        self.assertEqual(sorted({row['month'] for row in created}), list(range(1, 13)))
+
+        projects = Project.objects.filter(user=self.user).select_related('account')
+        self.assertEqual(projects.count(), 24)
+        self.assertEqual(Event.objects.filter(user=self.user, type='newp').count(), 24)
+        for project in projects:
+            movements = {
+                kind: sum(AccountMovement.objects.filter(account=project.account, movement_type=kind)
+                          .values_list('amount', flat=True))
+                for kind in ('EST', 'ADV', 'EXP')
+            }
+            account = project.account
+            self.assertEqual(movements, {'EST': account.estimated, 'ADV': account.advance, 'EXP': account.expense})
+
+        summary = MonthlyFinancialSummary.objects.get(user=self.user)
+        advance = sum(row['advance'] for row in created)
+        expenses = sum(row['expenses'] for row in created)
+        self.assertAlmostEqual(float(summary.total_advance), advance, places=2)
+        self.assertAlmostEqual(float(summary.total_expenses), expenses, places=2)
+
+    def test_superusers_only(self):
+        self.user.is_superuser = False
+        self.user.save()
+        self.assertEqual(self.client.get(reverse('generate_test_data')).status_code, 403)
+        self.assertFalse(Project.objects.exists())
+
+
+class GenerateScaleDataTests(TestCase):
+
+    def test_small_dataset(self):
+        output = StringIO()
+        call_command(
+            'generate_scale_data', users=2, clients=3, projects=12, movements=5, years=2,
+            teams=1, share_ratio=0.5, stdout=output,
+        )
+        self.assertIn('Created', output.getvalue())
+        users = User.objects.filter(username__startswith='scale')
+        self.assertEqual(users.count(), 2)
+        self.assertEqual(Client.objects.filter(user__in=users).count(), 6)
+        self.assertEqual(Project.objects.filter(user__in=users).count(), 24)
+        self.assertEqual(Event.objects.filter(user__in=users, type='newp').count(), 24)
+        self.assertEqual(Team.objects.filter(owner__in=users).count(), 2)
+        self.assertTrue(ProjectShare.objects.filter(team__owner__in=users).exists())
+
+        for user in users:
+            expected = defaultdict(lambda: defaultdict(Decimal))
+            movements = AccountMovement.objects.filter(user=user, movement_type__in=['ADV', 'EXP'])
+            for kind, amount, date, project_type in movements.values_list(
+                'movement_type', 'amount', 'created_at', 'account__project__type',
+            ):
+                month = expected[(date.year, date.month)]
+                sign = 1 if kind == 'ADV' else -1
+                month['total_advance' if kind == 'ADV' else 'total_expenses'] += amount
+                month[SUMMARY_TYPE_FIELDS[project_type]] += sign * amount
+
+            summaries = MonthlyFinancialSummary.objects.filter(user=user)
+            self.assertEqual(summaries.count(), len(expected))
+            for summary in summaries:
+                totals = expected[(summary.year, summary.month)]
+                for field in ['total_advance', 'total_expenses', *SUMMARY_TYPE_FIELDS.values()]:
+                    self.assertEqual(getattr(summary, field), totals[field], (summary.year, summary.month, field))
+
+
+@skipUnless(connection.vendor == 'sqlite', 'forces timeouts through the SQLite emulation')
+class SearchTimeoutTests(TestCase):
+    """A search past its statement timeout answers with what earlier keystrokes found"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('agrimensor', password='clave-segura-123')
+        seed_dataset(cls.user, projects=20)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        cache.clear()
+
+    def search(self, query):
+        return self.client.get(reverse('search'), {'query': query}).json()
+
+    def time_out_every_statement(self):
+        # Check the deadline on every SQLite instruction, with no budget left
+        self.addCleanup(setattr, db, 'SQLITE_PROGRESS_STEPS', db.SQLITE_PROGRESS_STEPS)
+        db.SQLITE_PROGRESS_STEPS = 1
+        overrides = self.settings(STATEMENT_TIMEOUTS={'search': 0})
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def test_timeout_narrows_previous_keystroke(self):
+        previous = self.search('Titu')
+        self.assertFalse(previous['partial'])
+        self.time_out_every_statement()
+
+        body = self.search('Titular 0')
+        self.assertTrue(body['partial'])
+        self.assertEqual(len(body['results']), 5)
+        self.assertEqual(body['results'], previous['results'])
+
+    def test_timeout_without_cached_results(self):
+        self.time_out_every_statement()
+        body = self.search('Titular')
+        self.assertEqual((body['partial'], body['results']), (True, []))
+
+
+class ProjectFileViewsTests(TestCase):
+    """Upload, download and removal of project files through the async views"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.storage = StorageStub().start()
+        cls.addClassCleanup(cls.storage.stop)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('agrimensor', password='clave-segura-123')
+        cls.other = User.objects.create_user('otro', password='clave-segura-123')
+        cls.project = seed_dataset(cls.user, projects=2)['projects'][0]
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        overrides = self.settings(SUPABASE_URL=self.storage.url, SUPABASE_KEY='test', SUPABASE_BUCKET='tests')
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.addCleanup(self.storage.objects.clear)
+
+    def upload(self, content=b'%PDF-1.4 plano'):
+        upload = SimpleUploadedFile('plano.pdf', content, content_type='application/pdf')
+        return self.client.post(
+            reverse('upload', args=[self.project.pk]), {'file_field': upload}, HTTP_REFERER='/',
+        )
+
+    def test_upload_download_and_delete(self):
+        self.assertEqual(self.upload().status_code, 302)
+        file = ProjectFiles.objects.get(project=self.project)
+        self.assertEqual(self.storage.objects[f"tests/{file.name}"], b'%PDF-1.4 plano')
+
+        response = self.client.get(reverse('download', args=[self.project.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'%PDF-1.4 plano')
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertIn('attachment', response['Content-Disposition'])
+
+        self.client.post(reverse('deletefile', args=[self.project.pk]), HTTP_REFERER='/')
+        self.assertFalse(ProjectFiles.objects.filter(project=self.project).exists())
+        self.assertEqual(self.storage.objects, {})
+
+    def test_download_of_another_users_project(self):
+        self.upload()
+        self.client.force_login(self.other)
+        response = self.client.get(reverse('download', args=[self.project.pk]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_delete_project_removes_its_file(self):
+        self.upload()
+        self.client.post(reverse('delete', args=[self.project.pk]))
+        self.assertFalse(ProjectFiles.objects.filter(project__pk=self.project.pk).exists())
+        # Storage is cleaned up by the queued job, not the request
+        self.assertEqual(len(self.storage.objects), 1)
+        self.assertEqual(work_off(), 1)
+        self.assertEqual(self.storage.objects, {})
+
+    def test_delete_client_removes_its_files(self):
+        self.upload()
+        self.client.get(reverse('deleteclient', args=[self.project.client_id]))
+        self.assertFalse(ProjectFiles.objects.filter(project__pk=self.project.pk).exists())
+        self.assertEqual(len(self.storage.objects), 1)
+        self.assertEqual(work_off(), 1)
+        self.assertEqual(self.storage.objects, {})
+
+
+class StorageClientTests(SimpleTestCase):
+    """Batch calls of the storage client, through the sync bridge"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.storage = StorageStub().start()
+        cls.addClassCleanup(cls.storage.stop)
+
+    def setUp(self):
+        overrides = self.settings(
+            SUPABASE_URL=self.storage.url, SUPABASE_KEY='test', SUPABASE_BUCKET='tests', STORAGE_CONCURRENCY=3,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.addCleanup(self.storage.objects.clear)
+
+    def test_upload_stat_and_remove_many(self):
+        files = [(f"lote/{index}.txt", b'x' * index, 'text/plain') for index in range(1, 11)]
+        urls = sync_storage.upload_many(files)
+        self.assertEqual(len(urls), 10)
+        self.assertTrue(urls['lote/3.txt'].endswith('/object/public/tests/lote/3.txt'))
+
+        stats = sync_storage.stat_many(['lote/3.txt', 'lote/missing.txt'])
+        self.assertEqual(stats['lote/3.txt']['size'], 3)
+        self.assertIsNone(stats['lote/missing.txt'])
+
+        removed = sync_storage.remove_many([name for name, _, _ in files] + ['lote/missing.txt'])
+        self.assertEqual(sorted(removed), sorted(name for name, _, _ in files))
+        self.assertEqual(self.storage.objects, {})
+
+    def test_failures_are_reported_per_name(self):
+        with self.settings(SUPABASE_URL=f"http://127.0.0.1:{free_port()}"):
+            with self.assertRaises(StorageBatchError) as raised:
+                sync_storage.upload_many([('a.txt', b'a'), ('b.txt', b'b')])
+        self.assertEqual(set(raised.exception.errors), {'a.txt', 'b.txt'})
+        self.assertEqual(raised.exception.results, {})
+
+    def test_async_callers_share_the_client_of_the_shared_loop(self):
+        async def upload(name):
+            return await get_storage().upload(name, b'x')
+
+        # As under WSGI: every async view runs on a loop of its own
+        for name in ['a.txt', 'b.txt']:
+            async_to_sync(upload)(name)
+        self.assertEqual(set(self.storage.objects), {'tests/a.txt', 'tests/b.txt'})
+        self.assertEqual(list(storage._clients), [storage.shared_loop()])
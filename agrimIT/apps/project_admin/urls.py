@@ -17,6 +17,8 @@ urlpatterns = [
   path('project/mod/<int:pk>', views.mod_view, name= 'modification',),
   path('project/modify/<int:pk>', views.full_mod_view, name='fullmodification'),
   path('history', views.history_view, name='history'),
+  path('projects/export/', views.export_projects, name='export_projects'),
+  path('projects/import/', views.import_projects_view, name='import_projects'),
   path('search/', views.search, name='search'),
   path('api/log-error/', views.log_frontend_error, name='log_frontend_error'),
   path('generate-test-data/', views.generate_test_data, name='generate_test_data'), 
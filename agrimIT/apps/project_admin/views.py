@@ -1,10 +1,12 @@
-import io
+import hashlib
+import mimetypes
 import time
+from asgiref.sync import sync_to_async
 from django.utils import timezone
-from urllib.error import URLError
-from urllib.request import urlopen
-from django.http import FileResponse, HttpRequest, HttpResponse, JsonResponse
+from django.utils.http import content_disposition_header
+from django.http import HttpRequest, HttpResponse, JsonResponse
 from django.shortcuts import redirect, render
+from django.core.cache import cache
 from django.core.paginator import Paginator, PageNotAnInteger
 from django.db import DatabaseError, transaction
 from django.views.decorators.csrf import csrf_exempt
@@ -12,17 +14,21 @@ from django.views.decorators.http import require_http_methods
 import json
 import logging
 logger = logging.getLogger(__name__)
-from django.conf import settings
-from apps.accounting.views import create_acc_entry, create_account, get_or_create_account
+from apps.accounting.views import add_to_monthly_summary, create_acc_entry, create_account
 from apps.clients.models import Client
 from apps.project_admin.forms import FileFieldForm, ProjectForm, ProjectFullForm
 from apps.project_admin.models import Event, Project, ProjectFiles
-from apps.accounting.models import Account, MonthlyFinancialSummary
+from apps.accounting.models import Account, AccountMovement, MonthlyFinancialSummary
 from django.db.models import Q
 from decimal import Decimal as Dec
 from django.contrib.auth.decorators import login_required
 from collections import defaultdict
-from .supabase_client import supabase
+from .jobs import rebuild_monthly_summaries, remove_files
+from .storage import StorageError, get_storage
+from apps.monitoring.budget import query_budget
+from apps.utils.db import QueryTimeout, statement_timeout
+from apps.utils.export import date_range, export_response
+from apps.utils.replica import read_replica
 import random
 from datetime import datetime, timedelta
 
@@ -63,9 +69,9 @@ def save_in_history(project_pk: int, event_type: str, msg: str, user=None):
         logger.error(f"Cannot save history: {e}")
 
 @login_required
+@query_budget(8)
 def index(request):
     projects = Project.objects.select_related('client')\
-        .prefetch_related('files')\
         .filter(user=request.user).order_by('-created')[:10]
     clients_count = Client.objects.filter(user=request.user, flag=True).count()
     project_count = Project.objects.filter(user=request.user, closed=False).count()
@@ -79,39 +85,41 @@ def index(request):
     return render (request, 'base/Index.html', {'projects': projects, 'clients_count': clients_count, 'project_count': project_count, 'net_income': net_income})
 
 #Eliminación de2 proyecto
-@login_required
 @transaction.atomic
-def delete_view(request: HttpRequest, pk: int) -> HttpResponse:
+def delete_project(project: Project, msg: str, user) -> None:
+    """
+    Delete a project and its account, recording it in the history first.
+    Its files are removed from storage by a background job once this commits.
+    """
+    names = list(ProjectFiles.objects.filter(project=project).values_list('name', flat=True))
+    if names:
+        remove_files.enqueue(names)
+
+    # Delete the associated account if exists
+    if project.account:
+        try:
+            project.account.delete()
+        except Exception as e:
+            logger.error(f"Error deleting account for project {project.pk}: {str(e)}")
+    
+    # Save history BEFORE deleting project
+    save_in_history(project.pk, 'deletep', msg, user)
+    
+    # Finally delete the project
+    project.delete()
+
+@login_required
+@query_budget(30)
+async def delete_view(request: HttpRequest, pk: int) -> HttpResponse:
     """ Delete a project and its associated files """
     try:
         if request.method == 'POST':
-            project = Project.objects.select_related('client').filter(
-                user=request.user  # Filter by current user
-            ).get(pk=pk)
+            user = await request.auser()
+            project = await Project.objects.select_related('client', 'account').filter(
+                user=user  # Filter by current user
+            ).aget(pk=pk)
             msg = f"Se ha eliminado un proyecto {project.type} de {project.client.name}"
-            
-            # Handle file deletion inline
-            file = ProjectFiles.objects.filter(project=project).first()
-            if file:
-                try:
-                    bucket_name = settings.SUPABASE_BUCKET
-                    supabase.storage.from_(bucket_name).remove([file.name])
-                    file.delete()
-                except Exception as e:
-                    logger.error(f"Error deleting file for project {pk}: {str(e)}")
-            
-            # Delete the associated account if exists
-            if project.account:
-                try:
-                    project.account.delete()
-                except Exception as e:
-                    logger.error(f"Error deleting account for project {pk}: {str(e)}")
-            
-            # Save history BEFORE deleting project
-            save_in_history(pk, 'deletep', msg, request.user)
-            
-            # Finally delete the project
-            project.delete()
+            await sync_to_async(delete_project)(project, msg, user)
         return redirect('index')
     except Project.DoesNotExist:
         logger.error(f"Project with pk {pk} does not exist for current user.")
@@ -120,6 +128,7 @@ def delete_view(request: HttpRequest, pk: int) -> HttpResponse:
 #Archivado de proyectos
 @login_required
 @transaction.atomic
+@query_budget(10)
 def close_view(request: HttpRequest, pk: int) -> HttpResponse:
     """ Close a project by setting its closed field to True """
     try:
@@ -135,13 +144,13 @@ def close_view(request: HttpRequest, pk: int) -> HttpResponse:
 
 #Todos los proyectos
 @login_required
+@query_budget(6)
 def projectlist_view(request: HttpRequest) -> HttpResponse:
     """ List all projects for the current user """
     if request.method == 'POST':
         if request.POST.get('search-input')!="":
             query = request.POST.get('search-input')
             projects = Project.objects.select_related('client')\
-                .prefetch_related('files')\
                 .filter(user=request.user)\
                 .filter(Q(client__name__icontains=query) | Q(partida__icontains=query))\
                 .order_by('-created')
@@ -154,7 +163,6 @@ def projectlist_view(request: HttpRequest) -> HttpResponse:
     else:
         actual_pag, pages = paginate_queryset(request, 
             Project.objects.select_related('client')
-            .prefetch_related('files', 'events')
             .filter(user=request.user, closed=False)
             .order_by('-created')
         )
@@ -162,10 +170,10 @@ def projectlist_view(request: HttpRequest) -> HttpResponse:
 
 #Proyectos por cliente
 @login_required
+@query_budget(6)
 def alt_projectlist_view(request: HttpRequest, pk: int) -> HttpResponse:
     """ List projects for a specific client """
     projects = Project.objects.select_related('client')\
-        .prefetch_related('files')\
         .filter(user=request.user, client__pk=pk).order_by('-created')
     if not projects.exists():
         return render (request, 'project_admin/project_list_template.html', {'no_projects':True})
@@ -174,6 +182,7 @@ def alt_projectlist_view(request: HttpRequest, pk: int) -> HttpResponse:
 
 #Proyectos por tipo
 @login_required
+@query_budget(6)
 def projectlistfortype_view(request: HttpRequest, type: int) -> HttpResponse:
     """ List projects for a specific type """
     #Mensuras
@@ -188,7 +197,6 @@ def projectlistfortype_view(request: HttpRequest, type: int) -> HttpResponse:
     if not project_type:
         return render(request, 'project__admin/project_list_template.html', {'no_projects': True})
     projects = Project.objects.select_related('client')\
-        .prefetch_related('files')\
         .filter(user=request.user, type=project_type, closed=False).order_by('-created')
     actual_pag, pages = paginate_queryset(request, projects)
     if not projects.exists():
@@ -197,6 +205,7 @@ def projectlistfortype_view(request: HttpRequest, type: int) -> HttpResponse:
 
 #Vista de un proyecto
 @login_required
+@query_budget(8)
 def project_view(request: HttpRequest, pk: int) -> HttpResponse:
     """ View a specific project """
     try:
@@ -245,6 +254,7 @@ def project_view(request: HttpRequest, pk: int) -> HttpResponse:
 
 #Vista formulario de creacion
 @login_required
+@query_budget(20)
 def create_view(request: HttpRequest) -> HttpResponse:
     """ Create a new project """
     if request.method == 'POST':
@@ -333,6 +343,7 @@ def create_view(request: HttpRequest) -> HttpResponse:
 #vista de modificacion
 @login_required
 @transaction.atomic
+@query_budget(15)
 def mod_view(request: HttpRequest, pk: int) -> HttpResponse:
     """ Modify an existing project """
     if request.method == 'POST':
@@ -404,6 +415,7 @@ def mod_view(request: HttpRequest, pk: int) -> HttpResponse:
 #Modificacion total del proyecto
 @login_required
 @transaction.atomic
+@query_budget(15)
 def full_mod_view(request: HttpRequest, pk: int) -> HttpResponse:
     """ Modify all fields of an existing project """
     if request.method == 'POST':
@@ -426,6 +438,8 @@ def full_mod_view(request: HttpRequest, pk: int) -> HttpResponse:
 
 #Vista de historial
 @login_required
+@query_budget(5)
+@read_replica
 def history_view(request: HttpRequest) -> HttpResponse:
     """ View the history of events for the current user """
     events = Event.objects.filter(user=request.user).order_by('-time')[:100]
@@ -448,7 +462,34 @@ def history_view(request: HttpRequest) -> HttpResponse:
     return render (request, 'project_admin/history_template.html', {'yearlist':grouped_objects})
 
 #Modulo de busqueda
+SEARCH_CACHE_TIMEOUT = 300
+SEARCH_FIELDS = ('client_name', 'titular_name', 'partida', 'type')
+
+
+def search_cache_key(user_id: int, query: str) -> str:
+    digest = hashlib.md5(query.casefold().encode()).hexdigest()
+    return f"search:{user_id}:{digest}"
+
+
+def search_fallback(user_id: int, query: str) -> list:
+    """
+    Results for a search that timed out: the cached results of the same
+    query or, failing that, those of the longest cached prefix (an earlier
+    keystroke) narrowed down to the rows matching the whole query.
+    """
+    needle = query.casefold()
+    for length in range(len(query), 1, -1):
+        cached = cache.get(search_cache_key(user_id, query[:length]))
+        if cached is not None:
+            return [
+                row for row in cached
+                if any(needle in str(row[field]).casefold() for field in SEARCH_FIELDS)
+            ]
+    return []
+
+
 @login_required
+@query_budget(5)
 def search(request: HttpRequest) -> JsonResponse:
     """ Search for projects based on a query string - OPTIMIZED """
     try:
@@ -472,26 +513,35 @@ def search(request: HttpRequest) -> JsonResponse:
                 .only('id', 'type', 'created', 'titular_name', 'partida', 'client__name', 'closed')\
                 .order_by('-created')[:5]
             
-            # Use list comprehension for better performance
-            results = [
-                {
-                    'id': obj.pk,
-                    'type': obj.type,
-                    'datecreated': obj.created.strftime('%d/%m/%Y'),
-                    'client_name': obj.client.name if obj.client else 'Sin cliente',
-                    'titular_name': obj.titular_name,
-                    'partida': obj.partida,
-                    'closed': obj.closed
-                }
-                for obj in objectc
-            ]
+            # A runaway icontains over a large tenant is cancelled and the
+            # user gets what the previous keystrokes found
+            try:
+                with statement_timeout('search'):
+                    # Use list comprehension for better performance
+                    results = [
+                        {
+                            'id': obj.pk,
+                            'type': obj.type,
+                            'datecreated': obj.created.strftime('%d/%m/%Y'),
+                            'client_name': obj.client.name if obj.client else 'Sin cliente',
+                            'titular_name': obj.titular_name,
+                            'partida': obj.partida,
+                            'closed': obj.closed
+                        }
+                        for obj in objectc
+                    ]
+                cache.set(search_cache_key(request.user.pk, query), results, SEARCH_CACHE_TIMEOUT)
+                partial = False
+            except QueryTimeout:
+                results, partial = search_fallback(request.user.pk, query), True
         else:
-            results = []
+            results, partial = [], False
     
         return JsonResponse({
             'results': results,
             'query': query,
-            'count': len(results)
+            'count': len(results),
+            'partial': partial,
         }, safe=False)
         
     except DatabaseError as e:
@@ -514,36 +564,45 @@ def search(request: HttpRequest) -> JsonResponse:
 
 #Modulo descargas
 @login_required
-def download_file(request: HttpRequest, pk: int) -> HttpResponse:
+@query_budget(5)
+async def download_file(request: HttpRequest, pk: int) -> HttpResponse:
     """ Download a file associated with a project """
     try:
         # First verify the project belongs to the current user
-        project = Project.objects.filter(user=request.user).get(pk=pk)
-        file = ProjectFiles.objects.get(project=project)
+        user = await request.auser()
+        project = await Project.objects.filter(user=user).aget(pk=pk)
+        file = await ProjectFiles.objects.aget(project=project)
         file_name = file.name
-        bucket_name = settings.SUPABASE_BUCKET
         
-        file_url = supabase.storage.from_(bucket_name).get_public_url(file_name)
-        response = urlopen(file_url)
-        file_content = io.BytesIO(response.read())
-        return FileResponse(file_content, as_attachment=True, filename=file_name)
+        file_content = await get_storage().download(file_name)
+        content_type = mimetypes.guess_type(file_name)[0] or 'application/octet-stream'
+        response = HttpResponse(file_content, content_type=content_type)
+        response['Content-Disposition'] = content_disposition_header(True, file_name)
+        return response
     except Project.DoesNotExist:
         logger.error(f"Project with pk {pk} does not exist for current user.")
         return JsonResponse({'error': 'Project not found'}, status=404)
     except ProjectFiles.DoesNotExist:
         logger.error(f"No file found for project {pk}.")
         return JsonResponse({'error': 'File not found'}, status=404)
-    except URLError as e:
+    except StorageError as e:
         logger.error(f"Error downloading file: {str(e)}")
         return JsonResponse({'error': 'Failed to download file'}, status=500)
 
 #Modulo de subida de archivos
-@login_required
 @transaction.atomic
-def upload_files(request: HttpRequest, pk: int) -> HttpResponse:
+def add_project_file(pk: int, file_name: str, file_url: str, user) -> None:
+    """ Register an uploaded file for a project and record it in the history """
+    ProjectFiles.objects.create(project=Project.objects.get(pk=pk), name=file_name, url=file_url)
+    save_in_history(pk, 'file_add', f"Se subió el archivo {file_name}", user)
+
+@login_required
+@query_budget(10)
+async def upload_files(request: HttpRequest, pk: int) -> HttpResponse:
     if request.method == 'POST':
+        user = await request.auser()
         logger.info("File upload started", extra={
-            'user_id': request.user.id,
+            'user_id': user.id,
             'project_id': pk
         })
         
@@ -556,38 +615,37 @@ def upload_files(request: HttpRequest, pk: int) -> HttpResponse:
                 file_size = file.size
                 
                 logger.info("File upload processing", extra={
-                    'user_id': request.user.id,
+                    'user_id': user.id,
                     'project_id': pk,
                     'original_filename': file.name,
                     'file_size': file_size,
                     'processed_filename': file_name
                 })
                 
-                bucket_name = settings.SUPABASE_BUCKET
                 file.seek(0)  # Reset file pointer to beginning
                 file_content = file.read()  # Read as bytes
-                supabase.storage.from_(bucket_name).upload(file_name, file_content)
-                file_url = supabase.storage.from_(bucket_name).get_public_url(file_name)
-                ProjectFiles.objects.create(project=Project.objects.get(pk=pk), name=file_name, url=file_url)
-                save_in_history(pk, 'file_add', f"Se subió el archivo {file_name}", request.user)
+                file_url = await get_storage().upload(
+                    file_name, file_content, file.content_type or 'application/octet-stream'
+                )
+                await sync_to_async(add_project_file)(pk, file_name, file_url, user)
                 
                 logger.info("File upload successful", extra={
-                    'user_id': request.user.id,
+                    'user_id': user.id,
                     'project_id': pk,
-                    'filename': file_name,
+                    'file_name': file_name,
                     'file_size': file_size
                 })
                 
             except Exception as e:
                 logger.error("File upload failed", extra={
-                    'user_id': request.user.id,
+                    'user_id': user.id,
                     'project_id': pk,
                     'error': str(e),
-                    'filename': file.name if 'file' in locals() else 'unknown'
+                    'file_name': file.name if 'file' in locals() else 'unknown'
                 })
         else:
             logger.warning("File upload form validation failed", extra={
-                'user_id': request.user.id,
+                'user_id': user.id,
                 'project_id': pk,
                 'form_errors': dict(form.errors)
             })
@@ -596,21 +654,23 @@ def upload_files(request: HttpRequest, pk: int) -> HttpResponse:
     return redirect(prev)
 
 #Modulo de eliminacion de archivos
-@login_required
 @transaction.atomic
-def delete_file(request: HttpRequest, pk: int) -> HttpResponse:
+def remove_project_file(file: ProjectFiles, pk: int, user) -> None:
+    """ Delete a file record and record it in the history """
+    file.delete()
+    save_in_history(pk, 'file_del', f"Se eliminó el archivo {file.name}", user)
+
+@login_required
+@query_budget(10)
+async def delete_file(request: HttpRequest, pk: int) -> HttpResponse:
     """ Delete a file associated with a project """
     try:
         # First verify the project belongs to the current user
-        project = Project.objects.filter(user=request.user).get(pk=pk)
-        file = ProjectFiles.objects.get(project=project)
-        bucket_name = settings.SUPABASE_BUCKET
-        supabase.storage.from_(bucket_name).remove([file.name])
-        file_name = file.name
-        file.delete()
-        
-        # Save event in history
-        save_in_history(pk, 'file_del', f"Se eliminó el archivo {file_name}", request.user)
+        user = await request.auser()
+        project = await Project.objects.filter(user=user).aget(pk=pk)
+        file = await ProjectFiles.objects.aget(project=project)
+        await get_storage().remove([file.name])
+        await sync_to_async(remove_project_file)(file, pk, user)
         
         prev = request.META.get('HTTP_REFERER')
         return redirect(prev)
@@ -626,6 +686,7 @@ def delete_file(request: HttpRequest, pk: int) -> HttpResponse:
         
 #Modulo de vista de archivos
 @login_required
+@query_budget(5)
 def file_view(request: HttpRequest, pk: int) -> HttpResponse:
     """ View files associated with a project """
     try:
@@ -640,6 +701,7 @@ def file_view(request: HttpRequest, pk: int) -> HttpResponse:
 # Test data generation function
 @login_required
 @transaction.atomic
+@query_budget(25)
 def generate_test_data(request: HttpRequest) -> HttpResponse:
     """
     Generate test projects with accounting data for each month of the current year.
@@ -659,28 +721,29 @@ def generate_test_data(request: HttpRequest) -> HttpResponse:
             'José Díaz', 'Elena Ruiz', 'Francisco Torres', 'Pilar Moreno'
         ]
         
-        created_projects = []
+        clients, accounts, projects, created_projects = [], [], [], []
+        expense_splits, target_dates = [], []
         
         for month in range(1, 13):  # Months 1-12
             for project_num in range(1, 3):  # 2 projects per month
-                # Create a test client
+                # Test client
                 client_name = f"{random.choice(client_names)} {month:02d}-{project_num}"
-                client = Client.objects.create(
+                client = Client(
                     user=request.user,
                     name=client_name,
                     phone=f"11-{random.randint(1000, 9999)}-{random.randint(1000, 9999)}",
                     email=f"test{month:02d}{project_num}@example.com",
                     flag=True
                 )
+                clients.append(client)
                 
-                # Create project with realistic data
+                # Project with realistic data
                 project_type = random.choice(project_types)
                 chacra_num = str(random.randint(1, 100)) if random.choice([True, False]) else ""
                 quinta_num = str(random.randint(1, 100)) if not chacra_num else ""
                 
-                project = Project.objects.create(
+                projects.append(Project(
                     user=request.user,
-                    client=client,
                     type=project_type,
                     titular_name=client_name,
                     titular_phone=client.phone,
@@ -697,10 +760,7 @@ def generate_test_data(request: HttpRequest) -> HttpResponse:
                     process_num=random.randint(10000, 99999),
                     procedure=f"Procedimiento {project_type}",
                     closed=random.choice([True, False]) if month < timezone.now().month else False
-                )
-                
-                # Create account for the project
-                account, created = get_or_create_account(project)
+                ))
                 
                 # Generate realistic financial data
                 base_budget = random.randint(50000, 500000)  # Between $50k and $500k
@@ -713,23 +773,10 @@ def generate_test_data(request: HttpRequest) -> HttpResponse:
                 # Expenses (usually 20-40% of budget)
                 expense_percentage = random.uniform(0.2, 0.4)
                 expenses = Dec(str(int(base_budget * expense_percentage)))
+                accounts.append(Account(user=request.user, estimated=budget, advance=advance, expense=expenses))
                 
-                # Update account with financial data
-                account.estimated = budget
-                account.advance = advance
-                account.expense = expenses
-                account.save()
-                
-                # Create accounting movements with backdated timestamps
-                target_date = timezone.make_aware(datetime(current_year, month, random.randint(1, 28)))
-                
-                # Budget entry
-                create_acc_entry(project, 'est', Dec('0'), budget)
-                
-                # Advance payment entry
-                create_acc_entry(project, 'adv', Dec('0'), advance)
-                
-                # Expense entries (split into 2-3 transactions)
+                # Expenses split into 2-3 movements
+                split = []
                 remaining_expenses = expenses
                 expense_count = random.randint(2, 3)
                 for i in range(expense_count):
@@ -739,26 +786,62 @@ def generate_test_data(request: HttpRequest) -> HttpResponse:
                         expense_amount = Dec(str(int(float(remaining_expenses) * random.uniform(0.3, 0.6))))
                     
                     if expense_amount > 0:
-                        create_acc_entry(project, 'exp', Dec('0'), expense_amount)
+                        split.append(expense_amount)
                         remaining_expenses -= expense_amount
+                expense_splits.append(split)
                 
-                # Create history entries
-                save_in_history(project.pk, 'newp', f"Proyecto de prueba creado - {project_type}", request.user)
-                
-                # Manually update created timestamp to spread across the year
-                project.created = target_date
-                project.save()
-                
-                created_projects.append({
-                    'id': project.pk,
-                    'type': project_type,
-                    'client': client_name,
-                    'month': month,
-                    'budget': float(budget),
-                    'advance': float(advance),
-                    'expenses': float(expenses),
-                    'net_worth': float(advance - expenses)
-                })
+                # Creation dates spread across the year
+                target_dates.append(timezone.make_aware(datetime(current_year, month, random.randint(1, 28))))
+        
+        # A fixed number of queries: one bulk insert per model instead of a
+        # create (and a summary update) per project and movement
+        Client.objects.bulk_create(clients)
+        Account.objects.bulk_create(accounts)
+        for project, client, account in zip(projects, clients, accounts):
+            project.client = client
+            project.account = account
+        Project.objects.bulk_create(projects)
+        # auto_now_add sets the creation date on insert
+        for project, target_date in zip(projects, target_dates):
+            project.created = target_date
+        Project.objects.bulk_update(projects, ['created'])
+        
+        movements = []
+        totals = defaultdict(lambda: {'advance': Dec('0'), 'expense': Dec('0')})
+        for project, account, split in zip(projects, accounts, expense_splits):
+            movements.append(AccountMovement(user=request.user, account=account, amount=account.estimated,
+                                             movement_type='EST', description=f"Se ingreso costo final de ${account.estimated}"))
+            movements.append(AccountMovement(user=request.user, account=account, amount=account.advance,
+                                             movement_type='ADV', description=f"Se cobraron ${account.advance}"))
+            movements.extend(
+                AccountMovement(user=request.user, account=account, amount=amount,
+                                movement_type='EXP', description=f"Se ingreso el gasto de ${amount}")
+                for amount in split
+            )
+            totals[project.type]['advance'] += account.advance
+            totals[project.type]['expense'] += account.expense
+            
+            created_projects.append({
+                'id': project.pk,
+                'type': project.type,
+                'client': project.client.name,
+                'month': project.created.month,
+                'budget': float(account.estimated),
+                'advance': float(account.advance),
+                'expenses': float(account.expense),
+                'net_worth': float(account.advance - account.expense)
+            })
+        AccountMovement.objects.bulk_create(movements)
+        Event.objects.bulk_create([
+            Event(project=project, project_pk=project.pk, type='newp',
+                  msg=f"Proyecto de prueba creado - {project.type}", user=request.user)
+            for project in projects
+        ])
+        
+        # Like create_acc_entry, the money of the movements goes to this month
+        for project_type, total in totals.items():
+            add_to_monthly_summary(request.user.pk, project_type, 'total_advance', total['advance'], total['advance'])
+            add_to_monthly_summary(request.user.pk, project_type, 'total_expenses', total['expense'], -total['expense'])
         
         return JsonResponse({
             'success': True,
@@ -772,119 +855,26 @@ def generate_test_data(request: HttpRequest) -> HttpResponse:
         return JsonResponse({'error': f'Error generating test data: {str(e)}'}, status=500)
 
 @login_required
-@transaction.atomic
+@query_budget(3)
 def generate_monthly_summaries(request: HttpRequest) -> HttpResponse:
     """
-    Generate monthly financial summaries by collecting all accounting data 
-    and calculating totals per month for the current user.
+    Queue the regeneration of the current user's monthly financial summaries
+    (apps.project_admin.jobs.rebuild_monthly_summaries).
     """
     if not request.user.is_superuser:
         return JsonResponse({'error': 'Only superusers can generate monthly summaries'}, status=403)
-    
-    try:
-        from django.db.models import Sum, Q
-        from apps.accounting.models import Account, AccountMovement
-        
-        # Get all projects for the user with their accounts
-        user_projects = Project.objects.select_related('account', 'client')\
-            .prefetch_related('account__movements')\
-            .filter(
-                user=request.user,
-                account__isnull=False
-            )
-        
-        # Dictionary to store monthly data
-        monthly_data = {}
-        created_summaries = []
-        
-        # Process each project
-        for project in user_projects:
-            created_date = project.created
-            year = created_date.year
-            month = created_date.month
-            
-            # Initialize month data if not exists
-            month_key = f"{year}-{month:02d}"
-            if month_key not in monthly_data:
-                monthly_data[month_key] = {
-                    'year': year,
-                    'month': month,
-                    'total_advance': Dec('0.00'),
-                    'total_expenses': Dec('0.00'),
-                    'income_mensura': Dec('0.00'),
-                    'income_est_parc': Dec('0.00'),
-                    'income_leg': Dec('0.00'),
-                    'income_amoj': Dec('0.00'),
-                    'income_relev': Dec('0.00'),
-                }
-            
-            # Add project's financial data to monthly totals
-            account = project.account
-            
-            # Skip if project doesn't have an account
-            if not account:
-                logger.warning(f"Project {project.pk} doesn't have an account, skipping financial data")
-                continue
-            
-            monthly_data[month_key]['total_advance'] += account.advance
-            monthly_data[month_key]['total_expenses'] += account.expense
-            
-            # Calculate net income for this project and add to appropriate category
-            net_income = account.advance - account.expense
-            
-            # Categorize by project type
-            project_type = project.type.lower()
-            if 'mensura' in project_type:
-                monthly_data[month_key]['income_mensura'] += net_income
-            elif 'estado parcelario' in project_type or 'parcelario' in project_type:
-                monthly_data[month_key]['income_est_parc'] += net_income
-            elif 'legajo' in project_type:
-                monthly_data[month_key]['income_leg'] += net_income
-            elif 'amojonamiento' in project_type:
-                monthly_data[month_key]['income_amoj'] += net_income
-            elif 'relevamiento' in project_type:
-                monthly_data[month_key]['income_relev'] += net_income
-        
-        # Create or update MonthlyFinancialSummary records
-        for month_key, data in monthly_data.items():
-            summary, created = MonthlyFinancialSummary.objects.update_or_create(
-                user=request.user,
-                year=data['year'],
-                month=data['month'],
-                defaults={
-                    'total_advance': data['total_advance'],
-                    'total_expenses': data['total_expenses'],
-                    'income_mensura': data['income_mensura'],
-                    'income_est_parc': data['income_est_parc'],
-                    'income_leg': data['income_leg'],
-                    'income_amoj': data['income_amoj'],
-                    'income_relev': data['income_relev'],
-                }
-            )
-            
-            created_summaries.append({
-                'month': data['month'],
-                'year': data['year'],
-                'total_advance': float(data['total_advance']),
-                'total_expenses': float(data['total_expenses']),
-                'net_worth': float(data['total_advance'] - data['total_expenses']),
-                'created': created
-            })
-        
-        return JsonResponse({
-            'success': True,
-            'message': f'Successfully processed {len(created_summaries)} monthly summaries',
-            'summaries': created_summaries,
-            'total_projects_processed': len(user_projects)
-        })
-        
-    except Exception as e:
-        logger.error(f"Error generating monthly summaries: {str(e)}")
-        return JsonResponse({'error': f'Error generating monthly summaries: {str(e)}'}, status=500)
+
+    job = rebuild_monthly_summaries.enqueue(request.user.pk)
+    return JsonResponse({
+        'success': True,
+        'message': 'Monthly summaries generation queued',
+        'job': job.pk,
+    }, status=202)
 
 
 @csrf_exempt
 @require_http_methods(["POST"])
+@query_budget(2)
 def log_frontend_error(request: HttpRequest) -> JsonResponse:
     """
     Log frontend JavaScript errors to Django logging system.
@@ -897,7 +887,7 @@ def log_frontend_error(request: HttpRequest) -> JsonResponse:
         logger.error("Frontend JavaScript error", extra={
             'user_id': request.user.id if request.user.is_authenticated else 'anonymous',
             'error_message': data.get('message', 'No message'),
-            'filename': data.get('filename', 'unknown'),
+            'source_file': data.get('filename', 'unknown'),
             'line_number': data.get('lineno', 'unknown'),
             'url': data.get('url', request.META.get('HTTP_REFERER', 'unknown')),
             'user_agent': request.META.get('HTTP_USER_AGENT', 'unknown'),
@@ -908,3 +898,87 @@ def log_frontend_error(request: HttpRequest) -> JsonResponse:
     except Exception as e:
         logger.error(f"Error logging frontend error: {str(e)}")
         return JsonResponse({'error': 'Failed to log error'}, status=500)
+
+
+# Columns of the projects export: (header, field)
+PROJECT_EXPORT_COLUMNS = [
+    ('N°', 'pk'),
+    ('Fecha', 'created'),
+    ('Proyecto', 'type'),
+    ('Mensura', 'type_mens'),
+    ('Cliente', 'client__name'),
+    ('Documento del cliente', 'client__id_number'),
+    ('Titular', 'titular_name'),
+    ('Telefono del titular', 'titular_phone'),
+    ('Partido', 'partido'),
+    ('Partida', 'partida'),
+    ('Circunscripcion', 'circ'),
+    ('Seccion', 'sect'),
+    ('Chacra numero', 'chacra_num'),
+    ('Chacra letra', 'chacra_let'),
+    ('Quinta numero', 'quinta_num'),
+    ('Quinta letra', 'quinta_let'),
+    ('Fraccion numero', 'fraccion_num'),
+    ('Fraccion letra', 'fraccion_let'),
+    ('Manzana numero', 'manzana_num'),
+    ('Manzana letra', 'manzana_let'),
+    ('Parcela numero', 'parcela_num'),
+    ('Parcela letra', 'parcela_let'),
+    ('Subparcela', 'subparcela'),
+    ('Calle', 'street'),
+    ('Numero', 'street_num'),
+    ('Piso', 'floor'),
+    ('Depto', 'dept'),
+    ('Inscripcion', 'inscription_type'),
+    ('N° Tramite', 'process_num'),
+    ('Procedimiento', 'procedure'),
+    ('Cerrado', 'closed'),
+    ('Presupuesto', 'account__estimated'),
+    ('Anticipos', 'account__advance'),
+    ('Gastos', 'account__expense'),
+]
+
+
+@login_required
+@query_budget(4)
+@read_replica
+def export_projects(request: HttpRequest) -> HttpResponse:
+    """
+    Projects of the user with their nomenclature, client and account as CSV
+    or XLSX (?format=), optionally created between 'start-date' and 'end-date'.
+    Streamed at constant memory (apps.utils.export).
+    """
+    projects = Project.objects.filter(
+        user=request.user, **date_range(request, 'created')
+    ).order_by('created', 'pk')
+    return export_response(request, projects, PROJECT_EXPORT_COLUMNS, 'proyectos')
+
+
+# Row errors listed on the import page; the command reports all of them
+IMPORT_ERRORS_SHOWN = 500
+
+
+# No query budget: the file is imported in batches of IMPORT_BATCH_SIZE rows,
+# each a fixed set of bulk statements, so the number of queries (and of
+# repeats of each statement) grows with the size of the file
+@login_required
+def import_projects_view(request: HttpRequest) -> HttpResponse:
+    """
+    Import projects from a CSV or XLSX file with the columns of the export
+    (apps.project_admin.imports), and show the rows that were rejected.
+    """
+    from .imports import ImportFileError, import_projects
+
+    context = {'errors_shown': IMPORT_ERRORS_SHOWN}
+    upload = request.FILES.get('file') if request.method == 'POST' else None
+    if request.method == 'POST' and upload is None:
+        context['error'] = 'Seleccione un archivo CSV o Excel (.xlsx)'
+    elif upload is not None:
+        try:
+            report = import_projects(upload.file, upload.name, request.user)
+        except ImportFileError as e:
+            context['error'] = str(e)
+        else:
+            context['report'] = report
+            context['errors'] = report['errors'][:IMPORT_ERRORS_SHOWN]
+    return render(request, 'project_admin/import_template.html', context)
@@ -1,11 +1,13 @@
 from django.contrib import admin
+from django.db.models import Count, Q
 from .models import Team, TeamMembership, ProjectShare
 
 
 @admin.register(Team)
 class TeamAdmin(admin.ModelAdmin):
-    list_display = ['name', 'owner', 'get_members_count', 'is_active', 'created']
+    list_display = ['name', 'owner', 'members', 'is_active', 'created']
     list_filter = ['is_active', 'created']
+    list_select_related = ['owner']
     search_fields = ['name', 'description', 'owner__username']
     readonly_fields = ['created', 'updated']
     
@@ -19,11 +21,22 @@ class TeamAdmin(admin.ModelAdmin):
         }),
     )
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            active_members=Count('memberships', filter=Q(memberships__is_active=True))
+        )
+
+    @admin.display(description='Miembros', ordering='active_members')
+    def members(self, obj):
+        # Same as get_members_count (owner included) without a query per row
+        return obj.active_members + 1
+
 
 @admin.register(TeamMembership)
 class TeamMembershipAdmin(admin.ModelAdmin):
     list_display = ['user', 'team', 'role', 'is_active', 'joined_at']
     list_filter = ['role', 'is_active', 'joined_at']
+    list_select_related = ['user', 'team__owner']
     search_fields = ['user__username', 'team__name']
     readonly_fields = ['joined_at']
 
@@ -32,5 +45,6 @@ class TeamMembershipAdmin(admin.ModelAdmin):
 class ProjectShareAdmin(admin.ModelAdmin):
     list_display = ['project', 'team', 'shared_by', 'is_active', 'shared_at']
     list_filter = ['is_active', 'shared_at']
+    list_select_related = ['project', 'team__owner', 'shared_by']
     search_fields = ['project__titular_name', 'team__name', 'shared_by__username']
     readonly_fields = ['shared_at']
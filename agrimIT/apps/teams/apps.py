@@ -5,3 +5,6 @@ class TeamsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.teams'
     verbose_name = 'Equipos de Trabajo'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,20 @@
+"""
+Cache keys of the team dashboards. Kept apart from ``views.py`` so the
+signal handlers, loaded by ``django.setup()``, do not import the views.
+"""
+from django.core.cache import cache
+from django.db import transaction
+
+
+def team_dashboard_cache_key(team_id: int) -> str:
+    return f"team_dashboard:{team_id}"
+
+
+def invalidate_team_dashboards(team_ids) -> None:
+    """
+    Drop the cached dashboards of the given teams once the current
+    transaction commits, so a concurrent request cannot re-cache stale totals.
+    """
+    keys = [team_dashboard_cache_key(team_id) for team_id in set(team_ids)]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
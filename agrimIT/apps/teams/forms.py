@@ -1,5 +1,8 @@
 from django import forms
 from django.contrib.auth import get_user_model
+from django.db.models import Q
+from apps.clients.models import Client
+from apps.project_admin.models import Project
 from .models import Team, TeamMembership, ProjectShare
 
 User = get_user_model()
@@ -206,3 +209,124 @@ class ShareProjectForm(forms.ModelForm):
                 )
         
         return team
+
+
+class BulkShareProjectForm(forms.Form):
+    """
+    Formulario para compartir o dejar de compartir muchos proyectos a la vez
+    """
+    ACTION_CHOICES = (
+        ('share', 'Compartir'),
+        ('unshare', 'Dejar de compartir'),
+    )
+
+    action = forms.ChoiceField(
+        choices=ACTION_CHOICES,
+        initial='share',
+        widget=forms.Select(attrs={'class': 'form-control'}),
+        label='Acción'
+    )
+
+    teams = forms.ModelMultipleChoiceField(
+        queryset=Team.objects.none(),
+        widget=forms.CheckboxSelectMultiple,
+        label='Grupos'
+    )
+
+    client = forms.ModelChoiceField(
+        queryset=Client.objects.none(),
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-control'}),
+        label='Todos los proyectos del cliente',
+        empty_label='-- Ninguno --'
+    )
+
+    only_open = forms.BooleanField(
+        required=False,
+        initial=True,
+        label='Solo proyectos abiertos'
+    )
+
+    project_ids = forms.CharField(
+        required=False,
+        widget=forms.Textarea(attrs={
+            'rows': 3,
+            'placeholder': 'IDs de proyectos separados por comas (ej: 12, 15, 40)',
+            'class': 'form-control'
+        }),
+        label='Proyectos',
+        help_text='Opcional si se selecciona un cliente. Se combinan ambos criterios.'
+    )
+
+    notes = forms.CharField(
+        required=False,
+        widget=forms.Textarea(attrs={
+            'class': 'form-control',
+            'rows': 2,
+            'placeholder': 'Notas adicionales (opcional)'
+        }),
+        label='Notas'
+    )
+
+    def __init__(self, *args, **kwargs):
+        self.user = kwargs.pop('user', None)
+        super().__init__(*args, **kwargs)
+
+        if self.user:
+            self.fields['teams'].queryset = Team.objects.filter(
+                owner=self.user,
+                is_active=True
+            ).order_by('name')
+            self.fields['client'].queryset = Client.objects.filter(
+                user=self.user,
+                flag=True
+            ).order_by('name')
+
+    def clean_project_ids(self):
+        """Convertir la lista separada por comas en enteros"""
+        raw = self.cleaned_data.get('project_ids', '')
+        ids = set()
+        invalid = []
+
+        for value in raw.replace('\n', ',').split(','):
+            value = value.strip()
+            if not value:
+                continue
+            if value.isdigit():
+                ids.add(int(value))
+            else:
+                invalid.append(value)
+
+        if invalid:
+            raise forms.ValidationError(
+                f"Los siguientes valores no son IDs válidos: {', '.join(invalid)}"
+            )
+
+        return sorted(ids)
+
+    def clean(self):
+        cleaned_data = super().clean()
+
+        if not cleaned_data.get('project_ids') and not cleaned_data.get('client'):
+            raise forms.ValidationError(
+                'Seleccione un cliente o ingrese al menos un ID de proyecto.'
+            )
+
+        return cleaned_data
+
+    def get_projects(self):
+        """
+        Queryset con los proyectos seleccionados, siempre limitado al usuario.
+        Se usa como subconsulta para no materializar miles de IDs.
+        """
+        query = Q()
+        if self.cleaned_data.get('project_ids'):
+            query |= Q(pk__in=self.cleaned_data['project_ids'])
+        if self.cleaned_data.get('client'):
+            query |= Q(client=self.cleaned_data['client'])
+
+        projects = Project.objects.filter(query, user=self.user)
+        if self.cleaned_data.get('only_open'):
+            projects = projects.filter(closed=False)
+
+        return projects
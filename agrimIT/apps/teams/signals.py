@@ -0,0 +1,53 @@
+"""
+Keep the cached team dashboards in sync with shares and account movements.
+
+Bulk writes done with ``bulk_create``/``update`` skip these signals, so the
+helpers in ``views.py`` invalidate explicitly (with ``cache.py``) after them.
+"""
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+from apps.accounting.models import Account, AccountMovement
+from apps.project_admin.models import Project
+from .models import ProjectShare
+from .cache import invalidate_team_dashboards
+
+
+def _invalidate_for_projects(**project_filter):
+    invalidate_team_dashboards(
+        ProjectShare.objects.filter(
+            is_active=True,
+            **project_filter
+        ).values_list('team_id', flat=True)
+    )
+
+
+@receiver([post_save, post_delete], sender=ProjectShare)
+def project_share_changed(sender, instance, **kwargs):
+    invalidate_team_dashboards([instance.team_id])
+
+
+@receiver([post_save, post_delete], sender=AccountMovement)
+def account_movement_changed(sender, instance, origin=None, **kwargs):
+    # Movements deleted in cascade are covered once by account_deleted
+    if isinstance(origin, (Account, Project)):
+        return
+    _invalidate_for_projects(project__account_id=instance.account_id)
+
+
+@receiver(pre_delete, sender=Account)
+def account_deleted(sender, instance, origin=None, **kwargs):
+    # Before the delete, while the project (and its shares) still point here
+    if origin is instance:
+        _invalidate_for_projects(project__account_id=instance.pk)
+
+
+@receiver(post_save, sender=Account)
+def account_changed(sender, instance, created, **kwargs):
+    if not created:
+        _invalidate_for_projects(project__account_id=instance.pk)
+
+
+@receiver(post_save, sender=Project)
+def project_changed(sender, instance, created, **kwargs):
+    if not created:
+        _invalidate_for_projects(project_id=instance.pk)
@@ -1,4 +1,238 @@
-# Teams app tests
+from decimal import Decimal
+
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
+
+from apps.accounting.models import Account, AccountMovement
+from apps.clients.models import Client
+from apps.monitoring.seeding import seed_dataset
+from apps.monitoring.testing import PerformanceTestCase
+from apps.project_admin.models import Project
+from apps.users.models import User
+
+from .models import ProjectShare, Team, TeamMembership
+from .cache import team_dashboard_cache_key
+from .views import bulk_share_projects, bulk_unshare_projects, get_team_dashboard_data
+
+
+class TeamViewsPerformanceTests(PerformanceTestCase):
+    """Query counts and latency of the team views over a seeded dataset"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('propietario', password='clave-segura-123')
+        cls.member = User.objects.create_user('miembro', password='clave-segura-123')
+        cls.data = seed_dataset(cls.owner, projects=30)
+
+        cls.teams = Team.objects.bulk_create([
+            Team(name=f"Grupo {index}", owner=cls.owner) for index in range(5)
+        ])
+        TeamMembership.objects.bulk_create([
+            TeamMembership(team=team, user=cls.member, role='member') for team in cls.teams
+        ])
+        ProjectShare.objects.bulk_create([
+            ProjectShare(project=project, team=team, shared_by=cls.owner)
+            for team in cls.teams
+            for project in cls.data['projects'][:10]
+        ])
+        cls.team = cls.teams[0]
+
+    def test_team_list_owner(self):
+        self.client.force_login(self.owner)
+        self.assertPerformance('team_list_owner', reverse('team_list'), queries=4, max_ms=150)
+
+    def test_team_list_member(self):
+        self.client.force_login(self.member)
+        self.assertPerformance('team_list_member', reverse('team_list'), queries=4, max_ms=150)
+
+    def test_team_detail(self):
+        self.client.force_login(self.member)
+        url = reverse('team_detail', args=[self.team.pk])
+        self.assertPerformance('team_detail', url, queries=9, max_ms=150)
+
+    def test_shared_projects(self):
+        self.client.force_login(self.member)
+        self.assertPerformance('shared_projects', reverse('shared_projects'), queries=3, max_ms=150)
+
+
+def create_projects(user, count):
+    return Project.objects.bulk_create([
+        Project(user=user, type='Mensura', titular_name=f"Titular {index}", titular_phone='1')
+        for index in range(count)
+    ])
+
+
+class BulkShareTests(TestCase):
+    """Sharing and unsharing many projects with several teams at once"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('propietario', password='clave-segura-123')
+        cls.other = User.objects.create_user('otro', password='clave-segura-123')
+        cls.projects = create_projects(cls.owner, 4)
+        cls.foreign_project = create_projects(cls.other, 1)[0]
+        cls.team, cls.second_team = Team.objects.bulk_create([
+            Team(name='Grupo A', owner=cls.owner), Team(name='Grupo B', owner=cls.owner),
+        ])
+        cls.foreign_team = Team.objects.create(name='Grupo ajeno', owner=cls.other)
+        # Already shared, and shared before but deactivated
+        ProjectShare.objects.create(project=cls.projects[0], team=cls.team, shared_by=cls.owner)
+        ProjectShare.objects.create(project=cls.projects[1], team=cls.team, shared_by=cls.owner, is_active=False)
+
+    def setUp(self):
+        self.client.force_login(self.owner)
+
+    def post(self, **data):
+        data = {'action': 'share', 'teams': [self.team.pk], **data}
+        return self.client.post(reverse('project_bulk_share'), data, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+
+    def active_shares(self, team):
+        return set(ProjectShare.objects.filter(team=team, is_active=True).values_list('project_id', flat=True))
+
+    def test_share_counts_created_reactivated_and_already_shared(self):
+        ids = ','.join(str(project.pk) for project in self.projects[:3])
+        response = self.post(project_ids=ids, teams=[self.team.pk, self.second_team.pk], notes='Lote')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['summary'], {
+            'projects': 3, 'teams': 2, 'created': 4, 'reactivated': 1, 'already_shared': 1,
+        })
+        self.assertEqual(self.active_shares(self.team), {project.pk for project in self.projects[:3]})
+        self.assertEqual(self.active_shares(self.second_team), {project.pk for project in self.projects[:3]})
+        # The share that was already active keeps its notes
+        self.assertEqual(ProjectShare.objects.get(project=self.projects[0], team=self.team).notes, '')
+        self.assertEqual(ProjectShare.objects.get(project=self.projects[1], team=self.team).notes, 'Lote')
+
+    def test_projects_of_other_users_are_not_shared(self):
+        response = self.post(project_ids=f"{self.projects[2].pk},{self.foreign_project.pk}")
+        self.assertEqual(response.json()['summary']['projects'], 1)
+        self.assertFalse(ProjectShare.objects.filter(project=self.foreign_project).exists())
+
+    def test_unshare(self):
+        ids = ','.join(str(project.pk) for project in self.projects)
+        response = self.post(action='unshare', project_ids=ids)
+        self.assertEqual(response.json()['summary'], {'teams': 1, 'deactivated': 1})
+        self.assertEqual(self.active_shares(self.team), set())
+        # Deactivated, not deleted, so sharing again reactivates them
+        summary = bulk_share_projects(Project.objects.filter(pk__in=[self.projects[0].pk]), [self.team], self.owner)
+        self.assertEqual((summary['created'], summary['reactivated']), (0, 1))
+        self.assertEqual(bulk_unshare_projects(Project.objects.filter(pk=self.projects[3].pk), [self.team])['deactivated'], 0)
+
+    def test_query_count_does_not_grow_with_the_projects(self):
+        client = Client.objects.create(user=self.owner, name='Cliente grande')
+        Project.objects.bulk_create([
+            Project(user=self.owner, client=client, type='Mensura', titular_name=f"Titular {index}")
+            for index in range(1500)
+        ])
+        with self.settings(QUERY_BUDGET_MODE='raise'):
+            response = self.post(client=client.pk, teams=[self.team.pk, self.second_team.pk])
+        self.assertEqual(response.json()['summary']['created'], 3000)
+        self.assertEqual(ProjectShare.objects.filter(project__client=client, is_active=True).count(), 3000)
+
+    def test_teams_of_other_users_are_rejected(self):
+        response = self.post(project_ids=str(self.projects[2].pk), teams=[self.foreign_team.pk])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('teams', response.json()['errors'])
+        self.assertFalse(ProjectShare.objects.filter(team=self.foreign_team).exists())
+
+        # A member, not the owner, cannot share with the team either
+        TeamMembership.objects.create(team=self.foreign_team, user=self.owner, role='member')
+        response = self.post(project_ids=str(self.projects[2].pk), teams=[self.foreign_team.pk])
+        self.assertEqual(response.status_code, 400)
+
+
+class TeamDashboardTests(TestCase):
+    """Totals of the team dashboard and the invalidation of its cache"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('propietario', password='clave-segura-123')
+        cls.member = User.objects.create_user('miembro', password='clave-segura-123')
+        cls.outsider = User.objects.create_user('ajeno', password='clave-segura-123')
+        cls.team = Team.objects.create(name='Grupo', owner=cls.owner)
+        TeamMembership.objects.create(team=cls.team, user=cls.member, role='member')
+
+        cls.mensura = cls.project(cls.owner, 'Mensura', 1000, 300, 100)
+        cls.amojonamiento = cls.project(cls.owner, 'Amojonamiento', 2000, 500, 0)
+        cls.of_member = cls.project(cls.member, 'Mensura', 500, 0, 50)
+        cls.unshared = cls.project(cls.owner, 'Mensura', 7000, 0, 0)
+        inactive = cls.project(cls.owner, 'Relevamiento', 9999, 0, 0)
+        for project in (cls.mensura, cls.amojonamiento, cls.of_member):
+            ProjectShare.objects.create(project=project, team=cls.team, shared_by=project.user)
+        ProjectShare.objects.create(project=inactive, team=cls.team, shared_by=cls.owner, is_active=False)
+
+    @classmethod
+    def project(cls, user, type, estimated, advance, expense):
+        account = Account.objects.create(user=user, estimated=estimated, advance=advance, expense=expense)
+        return Project.objects.create(user=user, type=type, titular_phone='1', account=account)
+
+    def setUp(self):
+        cache.clear()
+
+    @staticmethod
+    def row(name, projects, estimated, advance, expense, pending):
+        return {
+            'name': name, 'projects': projects, 'estimated': estimated,
+            'advance': advance, 'expense': expense, 'pending': pending,
+        }
+
+    def test_totals_by_type_and_owner(self):
+        data = get_team_dashboard_data(self.team)
+        row = self.row
+        self.assertEqual(data['totals'], row('Total', 3, '3.500,00', '800,00', '150,00', '2.550,00'))
+        self.assertEqual(data['by_type'], [
+            row('Amojonamiento', 1, '2.000,00', '500,00', '0,00', '1.500,00'),
+            row('Mensura', 2, '1.500,00', '300,00', '150,00', '1.050,00'),
+        ])
+        self.assertEqual(data['by_owner'], [
+            row('miembro', 1, '500,00', '0,00', '50,00', '450,00'),
+            row('propietario', 2, '3.000,00', '800,00', '100,00', '2.100,00'),
+        ])
+        # Cached: no queries the second time
+        with self.assertNumQueries(0):
+            self.assertEqual(get_team_dashboard_data(self.team), data)
+
+    def test_dashboard_page(self):
+        url = reverse('team_dashboard', args=[self.team.pk])
+        self.client.force_login(self.member)
+        self.assertContains(self.client.get(url), '2.550,00')
+        self.client.force_login(self.outsider)
+        self.assertRedirects(self.client.get(url), reverse('team_list'))
+
+    def assertInvalidates(self, change, invalidates=True):
+        key = team_dashboard_cache_key(self.team.pk)
+        get_team_dashboard_data(self.team)
+        with self.captureOnCommitCallbacks(execute=True):
+            change()
+        self.assertEqual(cache.get(key) is None, invalidates)
+
+    def test_share_changes_invalidate(self):
+        self.assertInvalidates(lambda: ProjectShare.objects.create(project=self.unshared, team=self.team, shared_by=self.owner))
+        self.assertInvalidates(lambda: ProjectShare.objects.get(project=self.unshared).delete())
+
+    def test_movement_changes_invalidate(self):
+        self.assertInvalidates(lambda: AccountMovement.objects.create(
+            user=self.owner, account=self.mensura.account, amount=Decimal('10'), movement_type='ADV',
+        ))
+        self.assertInvalidates(lambda: AccountMovement.objects.filter(account=self.mensura.account).first().delete())
+
+    def test_account_and_project_changes_invalidate(self):
+        def change_account():
+            account = Account.objects.get(pk=self.mensura.account_id)
+            account.estimated = Decimal('1200')
+            account.save()
+        self.assertInvalidates(change_account)
+        self.assertEqual(get_team_dashboard_data(self.team)['totals']['estimated'], '3.700,00')
+
+        def change_project():
+            project = Project.objects.get(pk=self.amojonamiento.pk)
+            project.closed = True
+            project.save()
+        self.assertInvalidates(change_project)
 
-# Create your tests here.
+    def test_changes_to_unshared_projects_keep_the_cache(self):
+        def change_account():
+            account = Account.objects.get(pk=self.unshared.account_id)
+            account.estimated = Decimal('1')
+            account.save()
+        self.assertInvalidates(change_account, invalidates=False)
@@ -1,18 +1,93 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db import transaction
-from django.db.models import Q, Count
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, router, transaction
+from django.db.models import Q, Count, Sum
 from django.http import JsonResponse, HttpResponse
+from django.utils import timezone
+from apps.accounting.models import Account
+from apps.accounting.views import format_currency
+from apps.monitoring.budget import query_budget
 from apps.project_admin.models import Project
+from apps.utils.replica import read_replica
+from .cache import invalidate_team_dashboards, team_dashboard_cache_key
 from .models import Team, TeamMembership, ProjectShare
-from .forms import TeamForm, AddMemberForm, ShareProjectForm
+from .forms import TeamForm, AddMemberForm, ShareProjectForm, BulkShareProjectForm
 import logging
 
 logger = logging.getLogger(__name__)
 
+TEAM_DASHBOARD_CACHE_TIMEOUT = getattr(settings, 'TEAM_DASHBOARD_CACHE_TIMEOUT', 60 * 15)
+
+
+def get_team_dashboard_data(team: Team) -> dict:
+    """
+    Aggregate the accounts of every project actively shared with ``team``.
+
+    All figures come from a single GROUP BY (project type, owner) query; the
+    per-type, per-owner and overall totals are folded from those rows.
+    The result only holds JSON-friendly values and is cached per team.
+    """
+    key = team_dashboard_cache_key(team.pk)
+    data = cache.get(key)
+    if data is not None:
+        return data
+
+    rows = Account.objects.filter(
+        project__team_shares__team=team,
+        project__team_shares__is_active=True,
+    ).values(
+        'project__type',
+        'project__user__username',
+    ).annotate(
+        projects=Count('id'),
+        estimated=Sum('estimated'),
+        advance=Sum('advance'),
+        expense=Sum('expense'),
+    ).order_by('project__type', 'project__user__username')
+
+    def empty():
+        return {'projects': 0, 'estimated': 0, 'advance': 0, 'expense': 0}
+
+    totals = empty()
+    by_type = {}
+    by_owner = {}
+    for row in rows:
+        for bucket in (
+            totals,
+            by_type.setdefault(row['project__type'], empty()),
+            by_owner.setdefault(row['project__user__username'], empty()),
+        ):
+            bucket['projects'] += row['projects']
+            bucket['estimated'] += row['estimated'] or 0
+            bucket['advance'] += row['advance'] or 0
+            bucket['expense'] += row['expense'] or 0
+
+    def formatted(name, bucket):
+        pending = bucket['estimated'] - bucket['advance'] - bucket['expense']
+        return {
+            'name': name,
+            'projects': bucket['projects'],
+            'estimated': format_currency(bucket['estimated']),
+            'advance': format_currency(bucket['advance']),
+            'expense': format_currency(bucket['expense']),
+            'pending': format_currency(pending),
+        }
+
+    data = {
+        'totals': formatted('Total', totals),
+        'by_type': [formatted(name, bucket) for name, bucket in sorted(by_type.items())],
+        'by_owner': [formatted(name, bucket) for name, bucket in sorted(by_owner.items())],
+    }
+    cache.set(key, data, TEAM_DASHBOARD_CACHE_TIMEOUT)
+    return data
+
 
 @login_required
+@query_budget(6)
+@read_replica
 def team_list(request):
     """Lista de todos los equipos del usuario (propios y donde es miembro)"""
     # Equipos donde el usuario es propietario
@@ -20,16 +95,21 @@ def team_list(request):
         owner=request.user,
         is_active=True
     ).annotate(
-        members_count=Count('memberships', filter=Q(memberships__is_active=True))
+        members_count=Count('memberships', filter=Q(memberships__is_active=True), distinct=True),
+        shared_projects_count=Count('shared_projects', filter=Q(shared_projects__is_active=True), distinct=True),
     ).order_by('-created')
     
     # Equipos donde el usuario es miembro
+    # (subquery filter, so the counts below are not limited to the user's membership)
     member_teams = Team.objects.filter(
-        memberships__user=request.user,
-        memberships__is_active=True,
+        pk__in=TeamMembership.objects.filter(
+            user=request.user,
+            is_active=True
+        ).values('team_id'),
         is_active=True
     ).select_related('owner').annotate(
-        members_count=Count('memberships', filter=Q(memberships__is_active=True))
+        members_count=Count('memberships', filter=Q(memberships__is_active=True), distinct=True),
+        shared_projects_count=Count('shared_projects', filter=Q(shared_projects__is_active=True), distinct=True),
     ).order_by('-created')
     
     context = {
@@ -42,6 +122,7 @@ def team_list(request):
 
 @login_required
 @transaction.atomic
+@query_budget(10)
 def team_create(request):
     """Crear un nuevo equipo"""
     if request.method == 'POST':
@@ -75,6 +156,7 @@ def team_create(request):
 
 
 @login_required
+@query_budget(10)
 def team_detail(request, pk):
     """Ver detalles de un equipo"""
     team = get_object_or_404(Team, pk=pk, is_active=True)
@@ -120,8 +202,33 @@ def team_detail(request, pk):
     return render(request, 'teams/team_detail.html', context)
 
 
+@login_required
+@query_budget(6)
+def team_dashboard(request, pk):
+    """Totales financieros de los proyectos compartidos con un equipo"""
+    team = get_object_or_404(Team, pk=pk, is_active=True)
+
+    is_owner = team.owner == request.user
+    if not is_owner and not TeamMembership.objects.filter(
+        team=team,
+        user=request.user,
+        is_active=True
+    ).exists():
+        messages.error(request, 'No tienes permiso para ver este grupo.')
+        return redirect('team_list')
+
+    context = {
+        'team': team,
+        'is_owner': is_owner,
+        'dashboard': get_team_dashboard_data(team),
+    }
+
+    return render(request, 'teams/team_dashboard.html', context)
+
+
 @login_required
 @transaction.atomic
+@query_budget(8)
 def team_edit(request, pk):
     """Editar un equipo (solo propietario)"""
     team = get_object_or_404(Team, pk=pk, owner=request.user, is_active=True)
@@ -173,6 +280,7 @@ def team_edit(request, pk):
 
 @login_required
 @transaction.atomic
+@query_budget(10)
 def team_add_member(request, pk):
     """Agregar un miembro a un equipo (solo propietario)"""
     team = get_object_or_404(Team, pk=pk, owner=request.user, is_active=True)
@@ -204,6 +312,7 @@ def team_add_member(request, pk):
 
 @login_required
 @transaction.atomic
+@query_budget(8)
 def team_remove_member(request, pk, member_pk):
     """Remover un miembro de un equipo (solo propietario)"""
     team = get_object_or_404(Team, pk=pk, owner=request.user, is_active=True)
@@ -230,6 +339,7 @@ def team_remove_member(request, pk, member_pk):
 
 @login_required
 @transaction.atomic
+@query_budget(8)
 def team_delete(request, pk):
     """Eliminar un equipo (solo propietario)"""
     team = get_object_or_404(Team, pk=pk, owner=request.user, is_active=True)
@@ -249,6 +359,7 @@ def team_delete(request, pk):
 
 @login_required
 @transaction.atomic
+@query_budget(12)
 def project_share(request, project_pk):
     """Compartir un proyecto con un equipo"""
     project = get_object_or_404(Project, pk=project_pk, user=request.user)
@@ -282,6 +393,7 @@ def project_share(request, project_pk):
 
 @login_required
 @transaction.atomic
+@query_budget(8)
 def project_unshare(request, project_pk, share_pk):
     """Dejar de compartir un proyecto con un equipo"""
     project = get_object_or_404(Project, pk=project_pk, user=request.user)
@@ -308,7 +420,157 @@ def project_unshare(request, project_pk, share_pk):
     return redirect('projectview', pk=project.pk)
 
 
+def bulk_share_projects(projects, teams, shared_by, notes='') -> dict:
+    """
+    Share every project in ``projects`` with every team in ``teams``.
+
+    Missing shares are inserted and inactive ones are reactivated with a single
+    INSERT ... SELECT upsert; shares that are already active are left untouched
+    so their notes and dates are preserved. The query count does not depend on
+    the number of projects.
+
+    Args:
+        projects: Project queryset, already limited to the current user.
+        teams: Teams owned by the current user.
+        shared_by: The user performing the operation.
+        notes: Notes stored on new or reactivated shares.
+
+    Returns:
+        A summary dict with the number of projects, teams, created,
+        reactivated and already shared rows.
+    """
+    teams = list(teams)
+    summary = {
+        'projects': projects.count(),
+        'teams': len(teams),
+        'created': 0,
+        'reactivated': 0,
+        'already_shared': 0,
+    }
+    if not summary['projects'] or not teams:
+        return summary
+
+    # One query to know the current state of every (project, team) pair
+    states = dict(
+        ProjectShare.objects.filter(project__in=projects, team__in=teams)
+        .order_by().values_list('is_active').annotate(count=Count('pk'))
+    )
+    summary['already_shared'] = states.get(True, 0)
+    summary['reactivated'] = states.get(False, 0)
+    summary['created'] = summary['projects'] * len(teams) - sum(states.values())
+
+    if summary['created'] or summary['reactivated']:
+        upsert_shares(projects, teams, shared_by, notes)
+        invalidate_team_dashboards(team.pk for team in teams)
+    return summary
+
+
+def upsert_shares(projects, teams, shared_by, notes=''):
+    """
+    Insert the missing (project, team) shares and reactivate the inactive
+    ones in one statement; ``projects`` goes in as a subquery.
+    """
+    connection = connections[router.db_for_write(ProjectShare)]
+    qn = connection.ops.quote_name
+    opts = ProjectShare._meta
+    column = {name: qn(opts.get_field(name).column) for name in
+              ('project', 'team', 'shared_by', 'notes', 'is_active', 'shared_at')}
+    table = qn(opts.db_table)
+    pk = qn(Project._meta.pk.column)
+    project_sql, project_params = (
+        projects.order_by().values('pk').query.get_compiler(connection=connection).as_sql()
+    )
+    shared_at = opts.get_field('shared_at').get_db_prep_value(timezone.now(), connection)
+
+    sql = (
+        f"INSERT INTO {table} ({column['project']}, {column['team']}, {column['shared_by']}, "
+        f"{column['notes']}, {column['is_active']}, {column['shared_at']}) "
+        f"SELECT p.{pk}, t.{qn(Team._meta.pk.column)}, %s, %s, %s, %s "
+        f"FROM {qn(Project._meta.db_table)} p, {qn(Team._meta.db_table)} t "
+        f"WHERE p.{pk} IN ({project_sql}) "
+        f"AND t.{qn(Team._meta.pk.column)} IN ({', '.join(['%s'] * len(teams))}) "
+        f"ON CONFLICT ({column['project']}, {column['team']}) DO UPDATE SET "
+        + ", ".join(
+            f"{column[name]} = EXCLUDED.{column[name]}"
+            for name in ('is_active', 'shared_by', 'notes', 'shared_at')
+        )
+        + f" WHERE NOT {table}.{column['is_active']}"
+    )
+    params = [shared_by.pk, notes, True, shared_at, *project_params, *(team.pk for team in teams)]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def bulk_unshare_projects(projects, teams) -> dict:
+    """
+    Deactivate the shares of ``projects`` with ``teams`` in a single UPDATE.
+
+    Returns:
+        A summary dict with the number of teams and deactivated shares.
+    """
+    teams = list(teams)
+    deactivated = ProjectShare.objects.filter(
+        project__in=projects,
+        team__in=teams,
+        is_active=True
+    ).update(is_active=False)
+    if deactivated:
+        invalidate_team_dashboards(team.pk for team in teams)
+    return {'teams': len(teams), 'deactivated': deactivated}
+
+
+@login_required
+@transaction.atomic
+@query_budget(6)
+def project_bulk_share(request):
+    """Compartir o dejar de compartir muchos proyectos con varios grupos"""
+    if request.method == 'POST':
+        form = BulkShareProjectForm(request.POST, user=request.user)
+
+        if form.is_valid():
+            projects = form.get_projects()
+            teams = form.cleaned_data['teams']
+
+            if form.cleaned_data['action'] == 'share':
+                summary = bulk_share_projects(
+                    projects,
+                    teams,
+                    shared_by=request.user,
+                    notes=form.cleaned_data.get('notes', '')
+                )
+                message = (
+                    f"{summary['projects']} proyecto(s) compartido(s) con "
+                    f"{summary['teams']} grupo(s): {summary['created']} nuevo(s), "
+                    f"{summary['reactivated']} reactivado(s), "
+                    f"{summary['already_shared']} ya compartido(s)."
+                )
+            else:
+                summary = bulk_unshare_projects(projects, teams)
+                message = (
+                    f"Se dejaron de compartir {summary['deactivated']} proyecto(s) "
+                    f"con {summary['teams']} grupo(s)."
+                )
+
+            logger.info(
+                f"Bulk {form.cleaned_data['action']} by {request.user.username}: {summary}"
+            )
+
+            if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+                return JsonResponse({'success': True, 'summary': summary})
+
+            messages.success(request, message)
+            return redirect('team_list')
+
+        if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+            return JsonResponse({'success': False, 'errors': form.errors}, status=400)
+    else:
+        form = BulkShareProjectForm(user=request.user)
+
+    return render(request, 'teams/project_bulk_share_form.html', {'form': form})
+
+
 @login_required
+@query_budget(5)
 def shared_projects(request):
     """Ver todos los proyectos compartidos conmigo a través de equipos"""
     # Obtener equipos donde el usuario es miembro
@@ -0,0 +1,43 @@
+import time
+
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete expired sessions in small chunks, so the session table is not '
+        'locked for long. Safe to run periodically (e.g. daily).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help='Rows deleted per statement (default: 1000)')
+        parser.add_argument('--sleep', type=float, default=0.1,
+                            help='Seconds to pause between chunks (default: 0.1)')
+        parser.add_argument('--max-chunks', type=int, default=None,
+                            help='Stop after this many chunks (default: no limit)')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        now = timezone.now()
+        expired = Session.objects.filter(expire_date__lt=now).order_by('expire_date')
+
+        deleted = 0
+        chunks = 0
+        while options['max_chunks'] is None or chunks < options['max_chunks']:
+            keys = list(expired.values_list('session_key', flat=True)[:chunk_size])
+            if not keys:
+                break
+            count, _ = Session.objects.filter(session_key__in=keys).delete()
+            deleted += count
+            chunks += 1
+            if len(keys) < chunk_size:
+                break
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        self.stdout.write(
+            self.style.SUCCESS(f"🧹 Deleted {deleted} expired sessions in {chunks} chunks")
+        )
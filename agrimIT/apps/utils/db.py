@@ -0,0 +1,170 @@
+"""
+Statement timeouts for views and querysets.
+
+    with statement_timeout('search'):
+        results = list(queryset)
+
+A budget is a name from the STATEMENT_TIMEOUTS setting or milliseconds.
+Every statement run inside the block is cancelled by the database once it
+takes longer, and the block raises QueryTimeout, so the caller can fall back
+to partial or cached results instead of holding a worker until gunicorn
+kills it (``cached_on_timeout`` does the latter):
+
+- PostgreSQL: ``statement_timeout`` is set for the block and put back when
+  it ends, so the next user of a pooled connection never inherits it.
+- SQLite (development, tests): emulated with a progress handler that
+  interrupts a statement once its budget is spent.
+- Other databases: no limit.
+
+Use it in sync code only (in async views, inside the sync_to_async helper).
+The limit applies to the database reads go to at that point, the replica
+inside ``read_replica`` (apps.utils.replica).
+"""
+
+import logging
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.db import DatabaseError, OperationalError, connections
+
+from .replica import read_database
+
+logger = logging.getLogger(__name__)
+
+# SQLite virtual machine instructions between two checks of the deadline
+SQLITE_PROGRESS_STEPS = 10000
+# SQLSTATE of a statement cancelled by statement_timeout
+QUERY_CANCELED = '57014'
+
+
+class QueryTimeout(OperationalError):
+    """A statement ran past the budget of ``statement_timeout``"""
+
+
+def timeout_ms(budget):
+    """Milliseconds of a budget name (STATEMENT_TIMEOUTS) or number"""
+    if isinstance(budget, str):
+        return getattr(settings, 'STATEMENT_TIMEOUTS', {})[budget]
+    return budget
+
+
+def is_query_timeout(exc):
+    """Whether a database error is a statement cancelled for taking too long"""
+    if isinstance(exc, QueryTimeout):
+        return True
+    if getattr(exc.__cause__, 'sqlstate', None) == QUERY_CANCELED:  # psycopg
+        return True
+    return str(exc) == 'interrupted'  # sqlite3 progress handler
+
+
+@contextmanager
+def statement_timeout(budget, using=None):
+    """
+    Cancel any statement in the block that runs longer than ``budget``
+    (a STATEMENT_TIMEOUTS name or milliseconds) and raise QueryTimeout.
+    ``using`` defaults to the database reads go to.
+    """
+    ms = timeout_ms(budget)
+    connection = connections[using or read_database()]
+    if connection.vendor == 'postgresql':
+        context = _postgresql_timeout(connection, ms)
+    elif connection.vendor == 'sqlite':
+        context = _sqlite_timeout(connection, ms)
+    else:
+        context = _no_timeout()
+    try:
+        with context:
+            yield
+    except OperationalError as exc:
+        if not is_query_timeout(exc) or isinstance(exc, QueryTimeout):
+            raise
+        logger.warning("Statement cancelled after %sms (%s)", ms, budget)
+        raise QueryTimeout(f"Statement took longer than {ms}ms ({budget})") from exc
+
+
+def cached_on_timeout(key, budget, func, *args, cache_timeout=DEFAULT_TIMEOUT, **kwargs):
+    """
+    Call ``func(*args, **kwargs)`` under the ``budget`` statement timeout and
+    cache its (JSON-friendly) result under ``key``; if it times out, return
+    the last cached result instead.
+
+    Returns:
+        (result, stale), stale being True for a cached result. QueryTimeout
+        is raised when it times out and nothing is cached.
+    """
+    try:
+        with statement_timeout(budget):
+            result = func(*args, **kwargs)
+    except QueryTimeout:
+        cached = cache.get(key)
+        if cached is None:
+            raise
+        return cached, True
+    cache.set(key, result, cache_timeout)
+    return result, False
+
+
+def _set_statement_timeout(connection, value, local):
+    """Set statement_timeout and return its previous value"""
+    # Session bookkeeping, like Django's own time zone setup: run on the raw
+    # connection so query budgets and query logs do not count it
+    with connection.wrap_database_errors, connection.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT current_setting('statement_timeout'), set_config('statement_timeout', %s, %s)",
+            [str(value), local],
+        )
+        return cursor.fetchone()[0]
+
+
+@contextmanager
+def _postgresql_timeout(connection, ms):
+    # Inside a transaction SET LOCAL, so nothing outlives it even if the
+    # block fails (rolling back undoes the change); a session value otherwise
+    local = connection.in_atomic_block
+    connection.ensure_connection()
+    previous = _set_statement_timeout(connection, int(ms), local)
+    try:
+        yield
+    except BaseException:
+        if not local:
+            try:
+                _set_statement_timeout(connection, previous, local)
+            except DatabaseError:
+                pass  # a broken connection is discarded anyway
+        raise
+    _set_statement_timeout(connection, previous, local)
+
+
+@contextmanager
+def _sqlite_timeout(connection, ms):
+    deadlines = getattr(connection, 'statement_deadlines', None)
+    if deadlines is None:
+        deadlines = connection.statement_deadlines = []
+
+    def start_statement(execute, sql, params, many, context):
+        # The budget is per statement, like PostgreSQL's
+        deadlines[index] = time.monotonic() + ms / 1000
+        return execute(sql, params, many, context)
+
+    def interrupt():
+        return bool(deadlines) and time.monotonic() > min(deadlines)
+
+    connection.ensure_connection()
+    index = len(deadlines)
+    deadlines.append(float('inf'))
+    try:
+        connection.connection.set_progress_handler(interrupt, SQLITE_PROGRESS_STEPS)
+        with connection.execute_wrapper(start_statement):
+            yield
+    finally:
+        deadlines.pop()
+        if not deadlines and connection.connection is not None:
+            connection.connection.set_progress_handler(None, SQLITE_PROGRESS_STEPS)
+
+
+@contextmanager
+def _no_timeout():
+    yield
@@ -0,0 +1,181 @@
+"""
+CSV and XLSX exports of querysets of any size at constant memory.
+
+    from apps.utils.export import export_response
+
+    @login_required
+    @read_replica
+    def export_clients(request):
+        clients = Client.objects.filter(user=request.user)
+        return export_response(request, clients, CLIENT_COLUMNS, 'clientes')
+
+Rows are read with ``values_list(...).iterator(chunk_size=EXPORT_CHUNK_SIZE)``
+(a server-side cursor on PostgreSQL), so no model instances are built and
+only one chunk is in memory at a time. CSV is streamed to the client while
+it is read. XLSX is written by openpyxl in write-only mode, which keeps rows
+in a temporary file rather than in memory, and the file is then streamed.
+
+Under ASGI the response content is an async iterator (a chunk of rows or
+FILE_CHUNK_SIZE bytes of the XLSX file per step): Django serves a sync
+iterator there by collecting all of it in a list first.
+
+``?format=csv`` (default) or ``?format=xlsx`` picks the format.
+"""
+
+import csv
+import os
+import tempfile
+from datetime import date, datetime, timedelta
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, HttpResponseBadRequest, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.http import content_disposition_header
+
+# Rows fetched from the database per round trip
+EXPORT_CHUNK_SIZE = 2000
+
+# Bytes per read of the XLSX file when streamed to an ASGI client
+FILE_CHUNK_SIZE = 64 * 1024
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+class Echo:
+    """File-like object whose write() returns the data, for csv.writer"""
+
+    def write(self, value):
+        return value
+
+
+def date_range(request, field: str) -> dict:
+    """
+    Filters for ``field`` from the 'start-date' and 'end-date' GET parameters
+    (YYYY-MM-DD, both days included), like the accounting history. Invalid
+    dates are ignored.
+    """
+    filters = {}
+    for param, lookup, shift in (('start-date', 'gte', 0), ('end-date', 'lt', 1)):
+        value = request.GET.get(param)
+        if not value:
+            continue
+        try:
+            day = datetime.strptime(value, '%Y-%m-%d') + timedelta(days=shift)
+        except ValueError:
+            continue
+        filters[f"{field}__{lookup}"] = timezone.make_aware(day)
+    return filters
+
+
+def cell(value):
+    """A database value as an export cell: local naive datetimes, Sí/No, '' for None"""
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'Sí' if value else 'No'
+    if isinstance(value, datetime):
+        if timezone.is_aware(value):
+            value = timezone.localtime(value)
+        return value.replace(tzinfo=None, microsecond=0)
+    return value
+
+
+def export_rows(queryset, columns):
+    """The cells of every row of ``queryset`` for ``columns`` [(header, field[, format]), ...]"""
+    fields = [column[1] for column in columns]
+    formats = [column[2] if len(column) > 2 else None for column in columns]
+    for row in queryset.values_list(*fields).iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield [cell(fmt(value) if fmt else value) for fmt, value in zip(formats, row)]
+
+
+async def export_chunks(queryset, columns):
+    """
+    export_rows for async consumers, in lists of up to EXPORT_CHUNK_SIZE
+    rows. The rows are read in the request's sync thread, one chunk per
+    call: ``aiterator`` runs the query of a values_list in the event loop.
+    """
+    rows = export_rows(queryset, columns)
+    next_chunk = sync_to_async(lambda: list(islice(rows, EXPORT_CHUNK_SIZE)))
+    while chunk := await next_chunk():
+        yield chunk
+
+
+def csv_line(writer, row) -> str:
+    return writer.writerow([
+        value.isoformat(' ') if isinstance(value, (date, datetime)) else value
+        for value in row
+    ])
+
+
+def stream_csv(queryset, columns, filename: str, asynchronous: bool = False) -> StreamingHttpResponse:
+    writer = csv.writer(Echo())
+    # BOM, so Excel opens the file as UTF-8
+    header = '\ufeff' + writer.writerow([column[0] for column in columns])
+
+    def lines():
+        yield header
+        for row in export_rows(queryset, columns):
+            yield csv_line(writer, row)
+
+    async def alines():
+        yield header
+        async for chunk in export_chunks(queryset, columns):
+            yield ''.join(csv_line(writer, row) for row in chunk)
+
+    response = StreamingHttpResponse(alines() if asynchronous else lines(), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = content_disposition_header(True, f"{filename}.csv")
+    return response
+
+
+def xlsx_file(queryset, columns, title: str):
+    """A temporary file with the rows as an XLSX workbook, positioned at its start"""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title[:31])
+    sheet.append([column[0] for column in columns])
+    for row in export_rows(queryset, columns):
+        sheet.append(row)
+    output = tempfile.TemporaryFile()
+    workbook.save(output)
+    output.seek(0)
+    return output
+
+
+async def file_chunks(file):
+    """The content of ``file`` in FILE_CHUNK_SIZE reads, closing it at the end"""
+    read = sync_to_async(file.read, thread_sensitive=False)
+    try:
+        while chunk := await read(FILE_CHUNK_SIZE):
+            yield chunk
+    finally:
+        file.close()
+
+
+def export_response(request, queryset, columns, filename: str):
+    """
+    The export of ``queryset`` in the format asked for. The rows are read
+    from the database chosen now (a replica inside @read_replica), even
+    though a CSV is only read while it streams, after the view returned.
+    """
+    queryset = queryset.using(queryset.db)
+    asynchronous = isinstance(request, ASGIRequest)
+    fmt = request.GET.get('format', 'csv')
+    if fmt == 'csv':
+        return stream_csv(queryset, columns, filename, asynchronous)
+    if fmt == 'xlsx' and asynchronous:
+        output = xlsx_file(queryset, columns, filename)
+        response = StreamingHttpResponse(file_chunks(output), content_type=XLSX_CONTENT_TYPE)
+        response['Content-Length'] = os.fstat(output.fileno()).st_size
+        response['Content-Disposition'] = content_disposition_header(True, f"{filename}.xlsx")
+        return response
+    if fmt == 'xlsx':
+        return FileResponse(
+            xlsx_file(queryset, columns, filename),
+            as_attachment=True,
+            filename=f"{filename}.xlsx",
+            content_type=XLSX_CONTENT_TYPE,
+        )
+    return HttpResponseBadRequest('Formato de exportación no válido')
@@ -4,6 +4,7 @@ from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 from django.contrib import messages
 from django.http import JsonResponse
 from django.db import transaction
+from apps.monitoring.budget import QueryBudget, budget_sampled
 import logging
 
 logger = logging.getLogger(__name__)
@@ -184,4 +185,19 @@ def paginate_queryset_cbv(queryset, request, per_page=12):
     except EmptyPage:
         paginated = paginator.page(paginator.num_pages)
     
-    return paginated, paginator
\ No newline at end of file
+    return paginated, paginator
+
+
+class QueryBudgetMixin:
+    """
+    Mixin to declare a query budget for a class-based view.
+    Same behaviour as the ``query_budget`` decorator.
+    """
+    query_budget = None
+    query_budget_max_repeats = None
+
+    def dispatch(self, request, *args, **kwargs):
+        if self.query_budget is None or not budget_sampled():
+            return super().dispatch(request, *args, **kwargs)
+        with QueryBudget(type(self).__qualname__, self.query_budget, self.query_budget_max_repeats):
+            return super().dispatch(request, *args, **kwargs)
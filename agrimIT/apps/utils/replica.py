@@ -0,0 +1,148 @@
+"""
+Read replica routing for reports and dashboards.
+
+    @login_required
+    @query_budget(12)
+    @read_replica
+    def balance(request):
+        ...
+
+    with read_replica():
+        rows = list(queryset)
+
+Reads run inside ``read_replica`` go to the REPLICA_DATABASE alias; every
+other read and every write goes to the primary (``default``), including
+saves of objects that were fetched from the replica. Use it for read-only
+code: the first write in the block sends the reads after it back to the
+primary.
+
+Read-your-writes: ReplicaStickinessMiddleware (agrimIT.middleware) tracks
+whether a request writes and, if it does, pins that browser to the primary
+for REPLICA_STICKY_SECONDS with a short-lived cookie, so the pages after a
+form post never show data the replica has not replayed yet.
+
+Without REPLICA_DATABASE (the default) everything reads from the primary and
+this is a no-op. Raw cursors are not routed.
+"""
+
+import functools
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+# Cookie that pins a browser to the primary after it wrote
+PIN_COOKIE = 'agrimit_primary'
+# Writes that do not pin: session saves, request metrics, admin log
+UNTRACKED_APPS = frozenset({'sessions', 'monitoring', 'admin'})
+
+_replica_reads = ContextVar('replica_reads', default=False)
+_writes = ContextVar('replica_writes', default=None)
+
+
+class WriteTracker:
+    """Whether the current request is pinned to the primary or wrote to it"""
+
+    __slots__ = ('pinned', 'wrote')
+
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False
+
+
+def replica_alias():
+    """The alias replica reads go to, or None when no replica is configured"""
+    return getattr(settings, 'REPLICA_DATABASE', None)
+
+
+def read_database():
+    """Alias the reads at this point go to"""
+    alias = replica_alias()
+    if not alias or not _replica_reads.get():
+        return DEFAULT_DB_ALIAS
+    tracker = _writes.get()
+    if tracker is not None and (tracker.pinned or tracker.wrote):
+        return DEFAULT_DB_ALIAS
+    return alias
+
+
+@contextmanager
+def track_writes(pinned=False):
+    """
+    Record the writes made inside the block (in this context and in the
+    sync_to_async threads it starts) on the WriteTracker it yields. With
+    ``pinned``, replica reads in the block go to the primary instead.
+    """
+    tracker = WriteTracker(pinned)
+    token = _writes.set(tracker)
+    try:
+        yield tracker
+    finally:
+        _writes.reset(token)
+
+
+@contextmanager
+def _reading_from_replica():
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def read_replica(func=None):
+    """
+    Send the reads of a view or function (decorator, sync or async) or of a
+    block (``with read_replica():``) to the replica.
+    """
+    if func is None:
+        return _reading_from_replica()
+
+    if iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            with _reading_from_replica():
+                return await func(*args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with _reading_from_replica():
+            return func(*args, **kwargs)
+    return wrapper
+
+
+class ReplicaRouter:
+    """Database router for REPLICA_DATABASE (see the module docstring)"""
+
+    def db_for_read(self, model, **hints):
+        if not replica_alias():
+            return None
+        return read_database()
+
+    def db_for_write(self, model, **hints):
+        if not replica_alias():
+            return None
+        tracker = _writes.get()
+        if tracker is not None and model._meta.app_label not in UNTRACKED_APPS:
+            tracker.wrote = True
+        # Explicitly, or objects read from the replica would be saved there
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        alias = replica_alias()
+        if not alias:
+            return None
+        # Both aliases hold the same data
+        databases = {DEFAULT_DB_ALIAS, alias}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica gets its schema by replicating the primary
+        if db == replica_alias():
+            return False
+        return None
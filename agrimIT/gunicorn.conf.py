@@ -0,0 +1,13 @@
+"""
+gunicorn hooks, read from the working directory by every gunicorn started
+here (Procfile, railway.json and the load-test commands). Bind address,
+workers and worker class stay on the command line.
+"""
+
+
+def post_worker_init(worker):
+    # The app is loaded by now (in the worker, or in the master with
+    # preload_app) and the worker has not accepted any request yet
+    from apps.monitoring.warmup import warm_up_worker
+
+    warm_up_worker(worker.log)